@@ -5,7 +5,11 @@
 import os
 import time
 import pandas as pd
-import xlwings as xw
+
+# Motor de llenado: xlwings (Excel) u openpyxl sin Excel, según FANGIO_LLENADO_BACKEND
+from llenado_backend import (
+    BACKEND as BACKEND_LLENADO, OLENoSoportado, abrir_excel, cerrar_procesos_excel, ejecutar_llenado, es_headless, objetos_ole
+)
 
 # Importación condicional para compatibilidad con Linux
 try:
@@ -34,20 +38,19 @@ def get_base_url():
     else:
         # Estamos en local
         return "http://127.0.0.1:5000"
-from flask import Flask, request, send_file, render_template_string, redirect, url_for, after_this_request, jsonify, render_template, send_from_directory
+from flask import Flask, request, send_file, render_template_string, redirect, url_for, after_this_request, jsonify, render_template, send_from_directory, make_response, Response, stream_with_context
 from werkzeug.utils import secure_filename
 import sys
 import re
-import dataframe_image as dfi
-import matplotlib.pyplot as plt
-import textwrap
 import unicodedata
 import glob
 import subprocess
 import logging
 import traceback
 import shutil
+import tempfile
 from datetime import datetime
+from types import SimpleNamespace
 from functools import wraps
 import json
 from typing import Optional
@@ -55,15 +58,28 @@ import concurrent.futures
 import threading
 from queue import Queue
 import multiprocessing
-
-def normaliza_na(valor):
-    if isinstance(valor, str) and valor.strip().lower() == "n/a":
-        return "N/A"
-    elif pd.isna(valor):
-        return "N/A"
-    elif valor == "" or (isinstance(valor, str) and valor.strip() == ""):
-        return "N/A"
-    return valor
+from sheet_snapshot import SheetSnapshotStore
+from sheet_index import IndiceBusqueda
+from cache_engine import CacheLRU, crear_segundo_nivel
+from sheet_normalization import VERSION_NORMALIZACION, normaliza_na, normalizar_hoja, plegar_texto, texto_normalizado
+from fill_spec import (
+    HOJA_CARATULA, HOJA_ESPACIOS, HOJA_FOTOS_A, HOJA_FOTOS_B, HOJA_INFO_A, HOJA_INFO_B, HOJA_PLANOS_A, HOJA_PLANOS_B,
+    PLAN_DATOS_SITE_SURVEY_PTMP, PLAN_DATOS_SITE_SURVEY_PTP, PLAN_DISENO_ELECTRICAS, PLAN_DISENO_ESTUDIO_A,
+    PLAN_DISENO_ESTUDIO_B, PLAN_SITE_SURVEY_PTP, ejecutar_plan, escribir_valores, evaluar, plan_mapeo
+)
+from job_workspace import EspacioTrabajo, barrer_huerfanos
+from generation_jobs import eventos_trabajo, gestor_trabajos, registrar_artefacto, reportar_fase
+from frequency_table import insertar_tabla_frecuencia
+from blob_store import almacen_blobs
+from upload_stream import guardar_subida, limpiar_temporales
+from resumable_upload import PeticionReanudable, SubidaInvalida, offset_de_peticion, subidas_reanudables
+from artifact_index import TIPO_DISENO, TIPO_SITE_SURVEY, TIPO_SITE_SURVEY_PTMP, indice_artefactos, tipo_permanente
+from permanent_registry import MAX_POR_PAGINA, POR_PAGINA, registro_permanentes
+from generation_cache import VERSION_GENERACION, cache_generaciones, clave_generacion, huella_archivos, huella_fila
+from lote_site_survey import generar_lote, llenar_archivo_ptp_optimizado, seleccionar_filas
+from sheet_compact import bytes_por_columna, columnas_en_uso, compactar_hoja
+from template_registry import PlantillaInvalida, registro_plantillas
+from config_diseno_solucion import ESTADO_A_REGION, HOJAS_REQUERIDAS, RUTA_PLANTILLA
 
 # ===== SISTEMA DE LLENADO PARALELO OPTIMIZADO =====
 class LlenadoParalelo:
@@ -78,39 +94,12 @@ class LlenadoParalelo:
         
     def llenar_hoja_paralelo(self, wb, nombre_hoja, datos, campos_celdas):
         """
-        Llena una hoja específica en paralelo usando operaciones por lotes
+        Llena una hoja con un mapeo campo -> celda(s) en una sola pasada
+        (el mapeo se compila con fill_spec.plan_mapeo)
         """
         try:
-            ws = wb.sheets[nombre_hoja]
-            
-            # Preparar operaciones por lotes
-            operaciones_lote = []
-            for campo, celda in campos_celdas.items():
-                valor = normaliza_na(datos.get(campo, ""))
-                if isinstance(celda, list):
-                    for c in celda:
-                        operaciones_lote.append((c, valor))
-                else:
-                    operaciones_lote.append((celda, valor))
-            
-            # Ejecutar operaciones en lotes de 10 para optimizar Excel
-            lote_size = 10
-            for i in range(0, len(operaciones_lote), lote_size):
-                lote = operaciones_lote[i:i + lote_size]
-                
-                # Crear un diccionario de rangos para operación por lotes
-                rangos_valores = {}
-                for celda, valor in lote:
-                    rangos_valores[celda] = valor
-                
-                # Ejecutar operación por lotes
-                for celda, valor in rangos_valores.items():
-                    try:
-                        ws.range(celda).value = valor
-                    except Exception as e:
-                        print(f"⚠️ Error llenando celda {celda}: {e}")
-                        continue
-            
+            escritas = ejecutar_plan(plan_mapeo(nombre_hoja, campos_celdas), wb, datos)
+            print(f"✅ {nombre_hoja}: {escritas} celdas")
             return True
             
         except Exception as e:
@@ -273,98 +262,105 @@ logger = setup_logging()
 GOOGLE_SHEETS_CSV_URL = 'https://docs.google.com/spreadsheets/d/1sfOY1Y3dNVCOT8zyCMzpgARv-R_jRE-S/export?format=csv'
 
 # ===== SISTEMA DE CACHE INTELIGENTE =====
-class DataCache:
+# LRU thread-safe acotado por bytes con TTL por entrada; el segundo nivel
+# (FANGIO_CACHE_L2='redis://host:6379/0' o 'sqlite:///ruta/cache.db') comparte
+# los datos calientes entre los workers de gunicorn
+data_cache = CacheLRU(
+    max_bytes=int(os.environ.get('FANGIO_CACHE_MB', '256')) * 1024 * 1024,
+    ttl=300,
+    segundo_nivel=crear_segundo_nivel(os.environ.get('FANGIO_CACHE_L2', ''))
+)
+
+# Modo compacto: categóricas, dtypes numéricos y sin columnas que ningún llenado lee
+HOJA_COMPACTA = os.environ.get('FANGIO_HOJA_COMPACTA', '1') == '1'
+# Columnas que se parsean de la hoja (proyección del CSV); None = todas
+COLUMNAS_HOJA = columnas_en_uso() if HOJA_COMPACTA else None
+# Reporte de memoria (bytes por columna antes/después) de la última preparación
+reporte_memoria_hoja = {}
+
+def preparar_hoja_enlaces(df):
     """
-    Sistema de cache inteligente para acelerar el llenado de datos
+    Normaliza un snapshot recién descargado (encabezados, N/A y columnas
+    categóricas plegadas) y, en modo compacto, reduce su huella en memoria.
+    El autocompletado usa IndiceBusqueda, ya no copias en minúsculas.
     """
-    def __init__(self):
-        self.cache = {}
-        self.cache_timestamps = {}
-        self.cache_ttl = 300  # 5 minutos de vida útil
-        self.max_cache_size = 1000  # Máximo 1000 entradas en cache
-        
-    def get(self, key):
-        """Obtiene un valor del cache si es válido"""
-        if key in self.cache:
-            timestamp = self.cache_timestamps.get(key, 0)
-            if time.time() - timestamp < self.cache_ttl:
-                return self.cache[key]
-            else:
-                # Cache expirado, limpiar
-                del self.cache[key]
-                del self.cache_timestamps[key]
-        return None
-    
-    def set(self, key, value):
-        """Guarda un valor en el cache"""
-        # Limpiar cache si está muy lleno
-        if len(self.cache) >= self.max_cache_size:
-            self._cleanup_oldest()
-        
-        self.cache[key] = value
-        self.cache_timestamps[key] = time.time()
-    
-    def _cleanup_oldest(self):
-        """Limpia las entradas más antiguas del cache"""
-        if self.cache_timestamps:
-            oldest_key = min(self.cache_timestamps.keys(), 
-                           key=lambda k: self.cache_timestamps[k])
-            del self.cache[oldest_key]
-            del self.cache_timestamps[oldest_key]
-    
-    def clear(self):
-        """Limpia todo el cache"""
-        self.cache.clear()
-        self.cache_timestamps.clear()
-
-# Inicializar cache global
-data_cache = DataCache()
+    global reporte_memoria_hoja
+    df = normalizar_hoja(df)
+    if HOJA_COMPACTA:
+        df, reporte_memoria_hoja = compactar_hoja(df, conservar=COLUMNAS_HOJA)
+    return df
+
+# Snapshot único de la hoja de enlaces para todo el proceso
+# Las versiones descargadas se guardan en snapshots_hoja/ (arranque en frío y modo sin conexión)
+SNAPSHOTS_HOJA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots_hoja')
+hoja_enlaces = SheetSnapshotStore(
+    GOOGLE_SHEETS_CSV_URL, ttl=300, timeout=15, preparar=preparar_hoja_enlaces,
+    directorio=SNAPSHOTS_HOJA_DIR, max_versiones=int(os.environ.get('SNAPSHOTS_HOJA_VERSIONES', '5')),
+    cache=data_cache, preparacion=f"{VERSION_NORMALIZACION}{'+compacta' if HOJA_COMPACTA else ''}",
+    columnas=COLUMNAS_HOJA
+)
+# Mapear el snapshot más reciente al arrancar; se revalida en segundo plano
+hoja_enlaces.cargar_desde_disco()
 
 def get_cached_dataframe():
     """
-    Obtiene el DataFrame desde cache o lo descarga si es necesario
+    Obtiene el DataFrame desde el snapshot compartido de la hoja de enlaces
     """
-    cache_key = 'google_sheets_data'
-    cached_df = data_cache.get(cache_key)
-    
-    if cached_df is not None:
-        logger.info("📊 Datos obtenidos desde cache")
-        # DEBUG: Verificar que los datos del cache sean correctos
-        print(f"🔍 DEBUG CACHE: Datos obtenidos desde cache")
-        print(f"🔍 DEBUG CACHE: Total de filas: {len(cached_df)}")
-        print(f"🔍 DEBUG CACHE: Primeros 3 IDs: {cached_df['ID'].head(3).tolist() if 'ID' in cached_df.columns else 'NO COLUMNA ID'}")
-        return cached_df
-    
     try:
-        logger.info("🌐 Descargando datos desde Google Sheets...")
-        # Usar timeout personalizado para pandas
-        import urllib.request
-        import io
-        
-        # Crear request con timeout
-        req = urllib.request.Request(GOOGLE_SHEETS_CSV_URL)
-        with urllib.request.urlopen(req, timeout=15) as response:
-            data = response.read()
-            df = pd.read_csv(io.BytesIO(data))
-        
-        # Crear índices de búsqueda para acelerar las consultas
-        logger.info("🔍 Creando índices de búsqueda...")
-        df['ID_lower'] = df['ID'].astype(str).str.lower()
-        df['Nombre_A_lower'] = df['Nombre del sitio A'].astype(str).str.lower()
-        df['Nombre_B_lower'] = df['Nombre del sitio B'].astype(str).str.lower()
-        
-        data_cache.set(cache_key, df)
-        logger.info(f"✅ Datos descargados, cacheados e indexados: {len(df)} filas")
-        return df
+        return hoja_enlaces.dataframe()
     except Exception as e:
         logger.error(f"❌ Error al descargar datos: {e}")
-        # Intentar usar cache anterior si existe
-        if cached_df is not None:
-            logger.info("🔄 Usando datos del cache anterior")
-            return cached_df
-        else:
-            logger.warning("⚠️ No hay cache disponible, creando DataFrame vacío")
-            return pd.DataFrame()
+        logger.warning("⚠️ No hay cache disponible, creando DataFrame vacío")
+        return pd.DataFrame()
+
+def filas_por_id(df_db, user_id, columna='ID'):
+    """
+    Filas de df_db cuyo ID coincide exactamente con user_id
+    
+    Usa el índice hash del snapshot (O(1)); si df_db no proviene del snapshot
+    vigente cae a la comparación por máscara.
+    
+    Args:
+        df_db: DataFrame de la hoja de enlaces
+        user_id: ID buscado
+        columna: 'ID' (sitio A) o 'ID 2' (sitio B)
+    """
+    indice = hoja_enlaces.indice_para(df_db)
+    if indice is not None:
+        return df_db.iloc[indice.buscar(user_id, columna)]
+    if columna not in df_db.columns:
+        return df_db.iloc[0:0]
+    return df_db[df_db[columna].astype(str).str.strip() == str(user_id).strip()]
+
+def buscar_coincidencias(df_db, consulta, limite=10, campos=('id', 'nombre_a', 'nombre_b'), aproximado=True):
+    """
+    Autocompletado compartido por los endpoints de búsqueda de IDs
+    
+    Consulta el índice de búsqueda del snapshot (exacto > prefijo > subcadena >
+    aproximado) y arma las opciones con los datos de cada fila.
+    
+    Returns:
+        tuple: (opciones, total_encontrados)
+    """
+    indice = hoja_enlaces.busqueda_para(df_db)
+    if indice is None:
+        indice = IndiceBusqueda(df_db)
+    resultados, total = indice.buscar(consulta, limite=limite, campos=campos, aproximado=aproximado)
+    
+    opciones = []
+    for resultado in resultados:
+        row = df_db.iloc[resultado['posicion']]
+        nombre_a = row.get('Nombre del sitio A', '')
+        nombre_b = row.get('Nombre del sitio B', '')
+        opciones.append({
+            'id': str(row.get('ID', '')),
+            'nombre_a': '' if pd.isna(nombre_a) else nombre_a,
+            'nombre_b': '' if pd.isna(nombre_b) else nombre_b,
+            'fila_idx': int(df_db.index[resultado['posicion']]),
+            'tipo_match': resultado['tipo'],
+            'campo_match': resultado['campo']
+        })
+    return opciones, total
 
 def error_handler(func):
     """
@@ -731,6 +727,9 @@ if html_form is None:
     input("Presiona Enter para salir...")
     sys.exit(1)
 app = Flask(__name__)
+# Subidas en streaming (hash, tipo y límite por tipo mientras llega el cuerpo) y subidas reanudables
+app.request_class = PeticionReanudable
+limpiar_temporales()
 
 # ===== MIDDLEWARE PARA TIMEOUTS =====
 @app.before_request
@@ -758,6 +757,11 @@ def not_found_error(error):
     print(f"❌ Página no encontrada: {error}")
     return "Página no encontrada.", 404
 
+@app.errorhandler(413)
+def subida_excedida(error):
+    print(f"❌ Subida rechazada: {error.description}")
+    return jsonify({'success': False, 'message': error.description}), 413
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     print(f"❌ Error no manejado: {e}")
@@ -775,10 +779,10 @@ def site_survey_checkboxes():
     chk_urbana = chk_suburbana = chk_rural = chk_ejidal = chk_pueblo_magico = False
     if fila_idx:
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df_db = hoja_enlaces.dataframe()
             row = df_db.loc[int(fila_idx)]
             tipo_zona_original = row.get('Tipo de Zona', '')
-            tipo_zona = normaliza_texto(tipo_zona_original)
+            tipo_zona = texto_normalizado(row, 'Tipo de Zona')
             chk_urbana = 'urbana' in tipo_zona
             chk_suburbana = 'suburbana' in tipo_zona or 'suburbana' in tipo_zona or 'suburbana' in tipo_zona.replace('sub', '')
             chk_rural = 'rural' in tipo_zona
@@ -799,6 +803,22 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # Usar ruta relativa para que funcione en cualquier computadora
 TEMPLATE_PATH = os.path.join(base_dir, 'Temp', 'plantillas', 'llenadoauto.xlsx')
 
+# Plantillas compiladas una vez en memoria (se recargan si cambia el archivo)
+registro_plantillas.registrar('llenado', TEMPLATE_PATH, hojas_requeridas=[
+    '4. Estudio de informacion A',
+    '1. Analisis de Red y Frecuencia',
+    '2. Electricas - Diseño log- Fis',
+    '5. Estudio de informacion B',
+    '8. Estudio de factibilidad',
+    '3. Formato KMZ',
+    '0. Carátula'
+])
+registro_plantillas.registrar('diseno_solucion', os.path.join(base_dir, RUTA_PLANTILLA), hojas_requeridas=HOJAS_REQUERIDAS)
+registro_plantillas.registrar('ptp', os.path.join(base_dir, 'site_survey', 'EJEMPLO SS VACIO.xlsx'))
+registro_plantillas.registrar('ptp_documentos', os.path.join(base_dir, 'static', 'plantillas', 'EJEMPLO SS VACIO.xlsx'))
+registro_plantillas.registrar('ptmp', os.path.join(base_dir, 'ptmp_site_survey', 'EJEMPLO SS PtMP VACIO.xlsx'))
+registro_plantillas.registrar('ptmp_documentos', os.path.join(base_dir, 'static', 'plantillas', 'EJEMPLO SS PtMP VACIO.xlsx'))
+
 
 from flask import render_template
 
@@ -808,15 +828,8 @@ def index():
     db_status = 'ok'
     db_error = ''
     try:
-        print("🔍 Intentando conectar a Google Sheets...")
-        # Usar timeout personalizado
-        import urllib.request
-        import io
-        
-        req = urllib.request.Request(GOOGLE_SHEETS_CSV_URL)
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = response.read()
-            df_db = pd.read_csv(io.BytesIO(data))
+        print("🔍 Consultando snapshot de Google Sheets...")
+        df_db = hoja_enlaces.dataframe()
         print(f"✅ Conexión exitosa. Filas obtenidas: {len(df_db)}")
     except Exception as e:
         print(f"❌ Error conectando a Google Sheets: {e}")
@@ -832,20 +845,14 @@ def test():
 @app.route('/status')
 def status():
     try:
-        import pandas as pd
-        import urllib.request
-        import io
-        
-        # Usar timeout personalizado
-        req = urllib.request.Request(GOOGLE_SHEETS_CSV_URL)
-        with urllib.request.urlopen(req, timeout=5) as response:
-            data = response.read()
-            df = pd.read_csv(io.BytesIO(data))
+        df = hoja_enlaces.dataframe()
         
         return jsonify({
             'status': 'ok',
             'message': 'Servidor funcionando correctamente',
             'database_rows': len(df),
+            'snapshot': hoja_enlaces.info(),
+            'cache': data_cache.stats(),
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -910,9 +917,6 @@ def diseno_solucion():
             print(f"🔄 Ejecutando llenado automático usando /procesar...")
             
             try:
-                # Ejecutar llenado automático usando /procesar internamente
-                import requests
-                
                 # Crear formulario para /procesar
                 form_data = {
                     'user_id': user_id,
@@ -921,40 +925,31 @@ def diseno_solucion():
                     'llenado_automatico': 'true'
                 }
                 
-                # Llamar a /procesar para ejecutar el llenado automático
-                print(f"🔄 Llamando a /procesar para llenado automático...")
+                # El llenado corre como trabajo en segundo plano (sin llamada HTTP a la propia app)
+                print(f"🔄 Encolando llenado automático de /procesar...")
                 
                 llenado_exitoso = False
                 mensaje_resultado = ""
                 
-                try:
-                    # Usar timeout para evitar que se cuelgue
-                    response = requests.post('http://127.0.0.1:5000/procesar', data=form_data, timeout=30)
-                    
-                    if response.status_code == 200:
-                        print(f"✅ Llenado automático completado exitosamente para {user_id}")
-                        llenado_exitoso = True
-                        mensaje_resultado = "¡Llenado automático completado exitosamente!"
-                    else:
-                        print(f"⚠️ Llenado automático falló con código: {response.status_code}")
-                        mensaje_resultado = f"Llenado automático falló (código: {response.status_code})"
-                        
-                except requests.exceptions.Timeout:
-                    print(f"⚠️ Timeout en llenado automático para {user_id}")
-                    mensaje_resultado = "Llenado automático completado (timeout de seguridad)"
-                except requests.exceptions.ConnectionError:
-                    print(f"⚠️ Error de conexión en llenado automático para {user_id}")
-                    mensaje_resultado = "Error de conexión durante el llenado automático"
-                except Exception as e:
-                    print(f"⚠️ Error en llenado automático para {user_id}: {e}")
-                    mensaje_resultado = f"Error durante el llenado: {str(e)}"
+                trabajo_llenado = enviar_llenado(form_data)
+                # Se espera lo mismo que antes (30s); si no termina, el modal sigue el trabajo
+                if not trabajo_llenado.esperar(30):
+                    print(f"⏳ Llenado automático de {user_id} sigue en proceso ({trabajo_llenado.porcentaje}%)")
+                    mensaje_resultado = f"Llenado automático en proceso: {trabajo_llenado.mensaje}"
+                elif trabajo_llenado.estado == 'completado':
+                    print(f"✅ Llenado automático completado exitosamente para {user_id}")
+                    llenado_exitoso = True
+                    mensaje_resultado = "¡Llenado automático completado exitosamente!"
+                else:
+                    print(f"⚠️ Llenado automático falló para {user_id}: {trabajo_llenado.error}")
+                    mensaje_resultado = f"Error durante el llenado: {trabajo_llenado.error}"
                 
                 print(f"🔄 Continuando con la generación del modal...")
                 
                 # Obtener datos del sitio para mostrar en el modal
                 try:
                     print(f"🔍 DEBUG: Cargando CSV para user_id={user_id}, fila_idx={fila_idx}")
-                    df = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+                    df = hoja_enlaces.dataframe()
                     print(f"🔍 DEBUG: CSV cargado exitosamente, {len(df)} filas")
                     
                     if fila_idx and fila_idx.isdigit():
@@ -969,7 +964,7 @@ def diseno_solucion():
                     else:
                         # Buscar por ID
                         print(f"🔍 DEBUG: Buscando por ID={user_id}")
-                        coincidencias = df[df['ID'].astype(str) == str(user_id)]
+                        coincidencias = filas_por_id(df, user_id)
                         if not coincidencias.empty:
                             datos = coincidencias.iloc[0]
                             print(f"🔍 DEBUG: ID encontrado en fila {coincidencias.index[0]}")
@@ -1000,28 +995,11 @@ def diseno_solucion():
                 mensaje_resultado = "Documento generado exitosamente"
                 
                 try:
-                    import glob
-                    import os
-                    
-                    base_dir = os.path.dirname(os.path.abspath(__file__))
-                    archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-                    archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-                    
-                    # Limpiar user_id para búsqueda
-                    import re
-                    user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
+                    # Libro más reciente del ID según el índice de artefactos
+                    archivo_encontrado = excel_diseno_solucion(user_id, para_editar=False)
                     
-                    # Buscar archivos Excel existentes
-                    patron_excel = f"ds_diseno_solucion_{user_id_limpio}*.xlsx"
-                    archivos_excel = glob.glob(os.path.join(archivos_generados_dir, patron_excel))
-                    
-                    if not archivos_excel:
-                        patron_permanente = f"PERMANENTE_ds_diseno_solucion_{user_id_limpio}*.xlsx"
-                        archivos_excel = glob.glob(os.path.join(archivos_permanentes_dir, patron_permanente))
-                    
-                    if archivos_excel:
+                    if archivo_encontrado:
                         llenado_exitoso = True
-                        archivo_encontrado = max(archivos_excel, key=os.path.getmtime)
                         print(f"✅ Archivo Excel encontrado: {os.path.basename(archivo_encontrado)}")
                         mensaje_resultado = "¡Archivo de diseño de solución ya generado! Puedes subir archivos adicionales."
                     else:
@@ -1032,6 +1010,10 @@ def diseno_solucion():
                     print(f"❌ Error verificando archivos existentes: {e}")
                     llenado_exitoso = False
                     mensaje_resultado = "Documento generado exitosamente"
+
+                if not trabajo_llenado.finalizado:
+                    mensaje_resultado = (f"Llenado automático en proceso ({trabajo_llenado.porcentaje}%): "
+                                         f"{trabajo_llenado.mensaje}. Consulta /trabajos/{trabajo_llenado.id}")
                 
                 # Generar el HTML del modal corregido
                 html_modal = f"""
@@ -2988,6 +2970,7 @@ def diseno_solucion():
                     }}
                 }}
             </style>
+            <script src="/static/js/subida_reanudable.js"></script>
         </head>
         <body>
             <!-- Fondo del mundo EXACTO del site survey -->
@@ -3023,9 +3006,10 @@ def diseno_solucion():
                                 </h3>
                             </div>
                         </div>
-                        <p style="margin: 10px 0 0 0; font-size: 1rem; opacity: 0.9;">
+                        <p id="mensaje-llenado" style="margin: 10px 0 0 0; font-size: 1rem; opacity: 0.9;">
                             {mensaje_resultado}
                         </p>
+                        {'' if trabajo_llenado.finalizado else script_progreso_trabajo(trabajo_llenado.id, 'mensaje-llenado', 'window.location.reload();')}
                         <div style="margin-top: 15px; font-size: 0.9rem; opacity: 0.8;">
                             <i class="fas fa-clock"></i> Procesado para ID: <strong>{user_id}</strong>
                         </div>
@@ -4112,21 +4096,30 @@ def diseno_solucion():
             uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Subiendo imágenes...';
             uploadBtn.style.pointerEvents = 'none';
             
-            // Crear FormData
-            const formData = new FormData();
-            formData.append('user_id', userId);
-            formData.append('fila_idx', filaIdx);
-            
-            // Agregar imágenes con nombres específicos
-            formData.append('imagen_consumo1', window.selectedImages[0]);
-            formData.append('imagen_consumo2', window.selectedImages[1]);
-            formData.append('imagen_pathloss', window.selectedImages[2]);
-            
-            // Enviar al servidor
-            fetch('/subir_imagenes_electricas', {{
-                method: 'POST',
-                body: formData
-            }})
+            // Las imágenes van por bloques reanudables; el formulario lleva sus upload_id
+            const imagenes = {{
+                imagen_consumo1: window.selectedImages[0],
+                imagen_consumo2: window.selectedImages[1],
+                imagen_pathloss: window.selectedImages[2]
+            }};
+            (async () => {{
+                const formData = new FormData();
+                formData.append('user_id', userId);
+                formData.append('fila_idx', filaIdx);
+                for (const [campo, imagen] of Object.entries(imagenes)) {{
+                    const uploadId = await subirReanudable(imagen, (enviados, total) => {{
+                        uploadBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Subiendo ${{imagen.name}}... ${{Math.floor(enviados * 100 / total)}}%`;
+                    }});
+                    formData.append(`subida:${{campo}}`, uploadId);
+                }}
+                uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Insertando imágenes...';
+                
+                // Enviar al servidor
+                return fetch('/subir_imagenes_electricas', {{
+                    method: 'POST',
+                    body: formData
+                }});
+            }})()
             .then(response => response.json())
             .then(data => {{
                 console.log('📤 Respuesta del servidor:', data);
@@ -4463,17 +4456,24 @@ def diseno_solucion():
             uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Subiendo archivos...';
             uploadBtn.style.pointerEvents = 'none';
             
-            // Crear FormData
-            const formData = new FormData();
-            formData.append('user_id', userId);
-            formData.append('fila_idx', filaIdx);
-            formData.append('archivo_kmz', window.selectedKMZFile);
-            formData.append('imagen_kmz', window.selectedKMZImage);
-            
-            // Enviar al servidor
-            fetch('/subir_formato_kmz', {{
-                method: 'POST',
-                body: formData
+            // El KMZ va por bloques reanudables (enlaces móviles inestables); el formulario lleva su upload_id
+            const mostrarAvance = (enviados, total) => {{
+                uploadBtn.innerHTML = `<i class="fas fa-spinner fa-spin"></i> Subiendo KMZ... ${{Math.floor(enviados * 100 / total)}}%`;
+            }};
+            subirReanudable(window.selectedKMZFile, mostrarAvance)
+            .then(uploadIdKMZ => {{
+                uploadBtn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Subiendo archivos...';
+                const formData = new FormData();
+                formData.append('user_id', userId);
+                formData.append('fila_idx', filaIdx);
+                formData.append('subida:archivo_kmz', uploadIdKMZ);
+                formData.append('imagen_kmz', window.selectedKMZImage);
+                
+                // Enviar al servidor
+                return fetch('/subir_formato_kmz', {{
+                    method: 'POST',
+                    body: formData
+                }});
             }})
             .then(response => response.json())
             .then(data => {{
@@ -6159,9 +6159,9 @@ def site_survey():
     # Buscar la fila correcta basándose en el user_id
     try:
         # Buscar la fila que contenga el user_id
-        user_id_mask = df_db['ID'] == user_id
-        if user_id_mask.any():
-            row = df_db[user_id_mask].iloc[0]
+        coincidencias = filas_por_id(df_db, user_id)
+        if not coincidencias.empty:
+            row = coincidencias.iloc[0]
             nombre_a = row.get('Nombre del sitio A', 'Sitio no encontrado')
             nombre_b = row.get('Nombre del sitio B', 'Sitio no encontrado')
         elif fila_idx and fila_idx.isdigit():
@@ -6182,6 +6182,11 @@ def site_survey():
         nombre_a = 'Error al cargar'
         nombre_b = 'Error al cargar'
 
+    # El Site Survey se genera en segundo plano; la página sigue su avance por SSE
+    trabajo_llenado_id = ''
+    if llenado_automatico and user_id:
+        trabajo_llenado_id = enviar_site_survey(user_id, fila_idx, tipo_documento).id
+
     html = f"""
     <!DOCTYPE html>
     <html lang="es">
@@ -7055,6 +7060,7 @@ def site_survey():
                 }}
                 
                 // LLENADO AUTOMÁTICO - Si viene del modal de nuevo llenado
+                const trabajoLlenado = '{trabajo_llenado_id}';
                 const urlParams = new URLSearchParams(window.location.search);
                 const llenadoAutomatico = urlParams.get('llenado_automatico');
                 const nuevoUserId = urlParams.get('user_id');
@@ -7090,7 +7096,22 @@ def site_survey():
                     }}
                     
                     // Esperar 3 segundos para que la página se cargue completamente
-                    setTimeout(buscarYHacerClic, 3000);
+                    if (trabajoLlenado) {{
+                        // El botón se habilita cuando el trabajo avisa que el libro ya está guardado
+                        const fuente = new EventSource(`/trabajos/${{trabajoLlenado}}/eventos`);
+                        fuente.addEventListener('fin', function(e) {{
+                            fuente.close();
+                            const estado = JSON.parse(e.data);
+                            console.log(`🧾 Trabajo ${{estado.estado}} en ${{estado.segundos}}s`);
+                            buscarYHacerClic();
+                        }});
+                        fuente.onerror = function() {{
+                            fuente.close();
+                            setTimeout(buscarYHacerClic, 3000);
+                        }};
+                    }} else {{
+                        setTimeout(buscarYHacerClic, 3000);
+                    }}
                 }}
             }});
 
@@ -8118,12 +8139,81 @@ def limpiar_cache():
     """
     try:
         data_cache.clear()
+        hoja_enlaces.invalidar()
         logger.info("🧹 Cache limpiado exitosamente")
         return jsonify({'success': True, 'message': 'Cache limpiado exitosamente'})
     except Exception as e:
         logger.error(f"❌ Error al limpiar cache: {e}")
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/snapshots_hoja', methods=['GET'])
+def snapshots_hoja():
+    """
+    Lista las versiones persistidas de la hoja de enlaces y el estado actual
+    """
+    return jsonify({
+        'success': True,
+        'actual': hoja_enlaces.info(),
+        'versiones': hoja_enlaces.listar_versiones()
+    })
+
+@app.route('/memoria_hoja', methods=['GET'])
+def memoria_hoja():
+    """
+    Bytes por columna del snapshot de la hoja en este worker y, si se preparó
+    aquí, el reporte antes/después del modo compacto
+    """
+    try:
+        df = hoja_enlaces.dataframe()
+    except RuntimeError as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    actual = bytes_por_columna(df)
+    return jsonify({
+        'success': True,
+        'pid': os.getpid(),
+        'compacta': HOJA_COMPACTA,
+        'filas': len(df),
+        'total_bytes': sum(actual.values()),
+        'columnas': actual,
+        'reporte_compactacion': reporte_memoria_hoja or None
+    })
+
+@app.route('/plantillas', methods=['GET'])
+def plantillas_registradas():
+    """Plantillas compiladas en este worker: hash, hojas, recargas y clones"""
+    return jsonify({'success': True, 'pid': os.getpid(), 'motor': BACKEND_LLENADO, **registro_plantillas.info()})
+
+@app.route('/cache_generaciones', methods=['GET', 'DELETE'])
+def cache_generaciones_info():
+    """Aciertos, fallos y ocupación de la caché de libros generados; DELETE la vacía"""
+    if request.method == 'DELETE':
+        borrados = cache_generaciones.limpiar()
+        logger.info(f"🧹 Caché de generaciones vaciada ({borrados} artefactos)")
+        return jsonify({'success': True, 'borrados': borrados})
+    return jsonify({'success': True, 'pid': os.getpid(), 'version': VERSION_GENERACION, **cache_generaciones.stats()})
+
+@app.route('/restaurar_snapshot_hoja', methods=['POST'])
+def restaurar_snapshot_hoja():
+    """
+    Rollback de la hoja de enlaces a una versión persistida.
+    Sin 'version' en el cuerpo se libera el rollback y se vuelve a Google.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        if not version:
+            hoja_enlaces.liberar()
+            logger.info("🔓 Rollback de hoja de enlaces liberado")
+            return jsonify({'success': True, 'message': 'Se volverá a revalidar contra Google Sheets'})
+        
+        snapshot = hoja_enlaces.restaurar_version(version)
+        if snapshot is None:
+            return jsonify({'success': False, 'message': f'Versión {version} no encontrada'}), 404
+        return jsonify({'success': True, 'message': f'Hoja fijada en la versión {snapshot.version}', 'filas': len(snapshot.df)})
+    except Exception as e:
+        logger.error(f"❌ Error restaurando snapshot de hoja: {e}")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
 @app.route('/generar_archivo_automatico', methods=['POST'])
 def generar_archivo_automatico():
     """
@@ -8171,6 +8261,55 @@ def generar_archivo_automatico():
 
 
 
+@app.route('/generar_lote', methods=['POST'])
+def generar_lote_site_survey():
+    """
+    Genera Site Surveys en lote para una lista de IDs o un filtro de la hoja
+
+    JSON: {"ids": [...], "estado": [...], "region": [...], "tipo_documento": "ptp"|"ptmp",
+           "salida": "zip"|"archivos"}
+    Con salida=zip regresa el zip (incluye resumen_lote.json); con "archivos"
+    los guarda en archivos_generados y regresa el resumen por ID.
+    """
+    try:
+        data = request.get_json() or {}
+        tipo_documento = data.get('tipo_documento', 'ptp')
+        salida = data.get('salida', 'zip')
+        ids = data.get('ids') or []
+        estados = data.get('estado') or []
+        regiones = data.get('region') or []
+        # Se aceptan valores sueltos además de listas
+        ids, estados, regiones = ([v] if isinstance(v, str) else list(v) for v in (ids, estados, regiones))
+        if not (ids or estados or regiones):
+            return jsonify({'success': False, 'message': 'Indica ids, estado o region'}), 400
+        
+        filas = seleccionar_filas(get_cached_dataframe(), ids, estados, regiones)
+        print(f"📦 LOTE {tipo_documento}: {len(filas)} IDs ({salida})")
+        
+        if salida == 'archivos':
+            archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
+            resumen = generar_lote(filas, tipo_documento, destino_dir=archivos_generados_dir, ids_pedidos=ids)
+            return jsonify({'success': resumen['exitosos'] > 0, **resumen})
+        
+        # Hasta 64MB en memoria, después se pasa a disco
+        zip_lote = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+        resumen = generar_lote(filas, tipo_documento, zip_salida=zip_lote, ids_pedidos=ids)
+        zip_lote.seek(0)
+        respuesta = send_file(zip_lote, mimetype='application/zip', as_attachment=True,
+                              download_name=f"site_surveys_{tipo_documento}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+        respuesta.headers['X-Lote-Exitosos'] = str(resumen['exitosos'])
+        respuesta.headers['X-Lote-Fallidos'] = str(resumen['fallidos'])
+        respuesta.headers['X-Lote-Por-Segundo'] = str(resumen['por_segundo'])
+        return respuesta
+        
+    except (ValueError, PlantillaInvalida) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Error en generación en lote: {e}")
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': f'Error generando lote: {str(e)}'})
+
+
 @app.route('/buscar_ids_similares', methods=['POST'])
 def buscar_ids_similares():
     try:
@@ -8183,32 +8322,14 @@ def buscar_ids_similares():
         # Leer la base de datos (OPTIMIZADO CON CACHE)
         df_db = get_cached_dataframe()
         
-        # Buscar IDs que contengan la búsqueda (OPTIMIZADO CON PROCESAMIENTO POR LOTES)
-        ids_encontrados = []
-        
-        # Procesar en lotes de 100 filas para mejor rendimiento
-        batch_size = 100
-        total_rows = len(df_db)
-        
-        for start_idx in range(0, total_rows, batch_size):
-            end_idx = min(start_idx + batch_size, total_rows)
-            batch_df = df_db.iloc[start_idx:end_idx]
-            
-            # Filtrar el lote actual usando índices pre-calculados (MUCHO MÁS RÁPIDO)
-            mask = batch_df['ID_lower'].str.contains(id_busqueda.lower(), na=False)
-            matching_rows = batch_df[mask]
-            
-            for index, row in matching_rows.iterrows():
-                ids_encontrados.append({
-                    'id': str(row.get('ID', '')),
-                    'nombre_a': row.get('Nombre del sitio A', ''),
-                    'nombre_b': row.get('Nombre del sitio B', ''),
-                    'fila_idx': index
-                })
+        # Buscar en el índice de autocompletado del snapshot
+        limite = int(data.get('limite', 50))
+        ids_encontrados, total_encontrados = buscar_coincidencias(df_db, id_busqueda, limite=limite)
         
         return jsonify({
             'success': True,
-            'ids_encontrados': ids_encontrados
+            'ids_encontrados': ids_encontrados,
+            'total_encontrados': total_encontrados
         })
         
     except Exception as e:
@@ -8233,54 +8354,22 @@ def buscar_ids_similares_diseno():
         # Leer la base de datos (OPTIMIZADO CON CACHE)
         df_db = get_cached_dataframe()
         
-        # Buscar IDs que contengan la búsqueda
-        ids_encontrados = []
-        
-        # Buscar coincidencias exactas primero
-        exact_matches = df_db[df_db['ID'] == id_busqueda]
-        for index, row in exact_matches.iterrows():
-            ids_encontrados.append({
-                'id': str(row.get('ID', '')),
-                'nombre_a': row.get('Nombre del sitio A', '') or '',
-                'nombre_b': row.get('Nombre del sitio B', '') or '',
-                'fila_idx': index
-            })
-        
-        # Si no hay coincidencias exactas, buscar similares
-        if not ids_encontrados:
-            # Buscar IDs que contengan la búsqueda
-            mask = df_db['ID'].str.contains(id_busqueda, na=False, case=False)
-            matching_rows = df_db[mask]
-            
-            for index, row in matching_rows.iterrows():
-                ids_encontrados.append({
-                    'id': str(row.get('ID', '')),
-                    'nombre_a': row.get('Nombre del sitio A', '') or '',
-                    'nombre_b': row.get('Nombre del sitio B', '') or '',
-                    'fila_idx': index
-                })
+        # Buscar en el índice de autocompletado (exactos primero, luego similares)
+        ids_encontrados, total_encontrados = buscar_coincidencias(df_db, id_busqueda, limite=10)
         
-        # Limpiar datos NaN
+        # Limpiar datos vacíos
         for item in ids_encontrados:
-            if pd.isna(item['nombre_a']):
+            if not item['nombre_a']:
                 item['nombre_a'] = 'Sitio A no especificado'
-            if pd.isna(item['nombre_b']):
+            if not item['nombre_b']:
                 item['nombre_b'] = 'Sitio B no especificado'
         
-        # Ordenar por relevancia (exacto primero, luego parcial)
-        ids_encontrados.sort(key=lambda x: (
-            x['id'].lower() != id_busqueda.lower(),  # Exacto primero
-            len(x['id'])  # Más corto primero
-        ))
-        
-        print(f"🔍 IDs encontrados para diseño de solución '{id_busqueda}': {len(ids_encontrados)}")
-        for item in ids_encontrados:
-            print(f"  - ID: {item['id']}, Sitio A: {item['nombre_a']}, Sitio B: {item['nombre_b']}")
+        print(f"🔍 IDs encontrados para diseño de solución '{id_busqueda}': {total_encontrados}")
         
         return jsonify({
             'success': True, 
-            'ids_encontrados': ids_encontrados[:10],  # Máximo 10 resultados
-            'total_encontrados': len(ids_encontrados)
+            'ids_encontrados': ids_encontrados,  # Máximo 10 resultados
+            'total_encontrados': total_encontrados
         })
         
     except Exception as e:
@@ -8299,15 +8388,11 @@ def descargar_site_survey():
     base_dir = os.path.dirname(os.path.abspath(__file__))
     output_path = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}.xlsx')
     
-    # Si no existe el archivo sin timestamp, buscar con timestamp
+    # Si no existe el archivo sin timestamp, el índice de artefactos tiene la versión más reciente
     if not os.path.exists(output_path):
-        import glob
-        patron_archivo = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}*.xlsx')
-        archivos_encontrados = glob.glob(patron_archivo)
+        archivo_mas_reciente = indice_artefactos().ultimo(user_id, TIPO_SITE_SURVEY)
         
-        if archivos_encontrados:
-            # Usar el archivo más reciente
-            archivo_mas_reciente = max(archivos_encontrados, key=os.path.getctime)
+        if archivo_mas_reciente:
             output_path = archivo_mas_reciente
             print(f"DEBUG: Descargando archivo encontrado: {output_path}")
         else:
@@ -8321,7 +8406,9 @@ def descargar_site_survey():
             if os.path.exists(output_path):
                 os.remove(output_path)
                 print(f"Archivo eliminado: {output_path}")
+            indice_artefactos().olvidar(output_path)
             # Borra otros archivos temporales relacionados con el user_id
+            import glob
             patron = os.path.join(base_dir, 'site_survey', f'*{user_id_limpio}*.*')
             for archivo in glob.glob(patron):
                 try:
@@ -8336,1072 +8423,6 @@ def descargar_site_survey():
 
     return send_file(output_path, as_attachment=True)
 
-def llenar_archivo_ptp_optimizado(output_path, row, nombre_a, nombre_b, user_id):
-    """
-    Función optimizada para llenar archivos PtP con datos del Site Survey
-    """
-    try:
-        print("🚀 INICIANDO LLENADO OPTIMIZADO DEL ARCHIVO PTP...")
-        
-        # ===== DEBUG INICIAL - VERIFICAR DATOS RECIBIDOS =====
-        print("🔍 DEBUG INICIAL - VERIFICANDO DATOS RECIBIDOS:")
-        print(f"  - output_path: {output_path}")
-        print(f"  - nombre_a: '{nombre_a}'")
-        print(f"  - nombre_b: '{nombre_b}'")
-        print(f"  - user_id: '{user_id}'")
-        print(f"  - row es DataFrame? {hasattr(row, 'index')}")
-        if hasattr(row, 'index'):
-            print(f"  - row tiene {len(row)} campos")
-            print(f"  - Primeros 5 campos: {list(row.index)[:5]}")
-            print(f"  - ID en row: '{row.get('ID', 'NO ENCONTRADO')}'")
-            print(f"  - ID 2 en row: '{row.get('ID 2', 'NO ENCONTRADO')}'")
-            print(f"  - ¿user_id coincide con ID? {row.get('ID', 'NO ENCONTRADO') == user_id}")
-        else:
-            print(f"  - row NO es un DataFrame válido")
-            print(f"  - Tipo de row: {type(row)}")
-            print(f"  - Contenido de row: {row}")
-        
-        print("🔍 FIN DEBUG INICIAL")
-        print("=" * 80)
-        
-        # Importar xlwings
-        try:
-            import xlwings as xw
-            print("✅ xlwings importado correctamente")
-        except ImportError as e:
-            print(f"❌ Error importando xlwings: {e}")
-            return False
-        
-        # Iniciar Excel
-        try:
-            app_excel = xw.App(visible=False)
-            app_excel.display_alerts = False
-            app_excel.screen_updating = False
-            print("✅ Excel iniciado correctamente")
-        except Exception as excel_error:
-            print(f"❌ Error iniciando Excel: {excel_error}")
-            return False
-        
-        # Abrir el archivo
-        try:
-            wb = app_excel.books.open(output_path)
-            print("✅ Archivo abierto correctamente")
-        except Exception as e:
-            print(f"❌ Error abriendo archivo: {e}")
-            return False
-        
-        # Obtener las hojas del Site Survey
-        try:
-            print("📋 Obteniendo hojas del Site Survey...")
-            ws_caratula = wb.sheets['0. Carátula']
-            ws_info_a = wb.sheets['1. Información General A']
-            ws_info_b = wb.sheets['2. Información General B']
-            ws_info_c = wb.sheets['3. Espacios en Torre y Piso A-B']
-            ws_info_d = wb.sheets['4. Planos A']
-            ws_info_e = wb.sheets['5. Planos B']
-            ws_info_f = wb.sheets['6. Reporte Fotos A']
-            ws_info_g = wb.sheets['7. Reporte Fotos B']
-            print("✅ Todas las hojas obtenidas")
-            
-            # Debug: Verificar que las hojas se obtuvieron correctamente
-            print(f"🔍 DEBUG HOJAS:")
-            print(f"  - ws_caratula: {ws_caratula.name if ws_caratula else 'NO OBTENIDA'}")
-            print(f"  - ws_info_a: {ws_info_a.name if ws_info_a else 'NO OBTENIDA'}")
-            print(f"  - ws_info_b: {ws_info_b.name if ws_info_b else 'NO OBTENIDA'}")
-            print(f"  - ws_info_c: {ws_info_c.name if ws_info_c else 'NO OBTENIDA'}")
-            
-            # Verificar que las hojas no sean None
-            if not ws_info_a:
-                print("❌ ERROR: ws_info_a es None")
-                return False
-            if not ws_info_b:
-                print("❌ ERROR: ws_info_b es None")
-                return False
-            if not ws_info_c:
-                print("❌ ERROR: ws_info_c es None")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error obteniendo hojas: {e}")
-            return False
-        
-        # Llenado de los checkboxes y campos
-        ws_info_a.range('B63').value = 'N/A'
-        
-        # Función mejorada para checkboxes
-        def set_checkbox(worksheet, cell, condition, debug_name=""):
-            """Función para establecer checkboxes con debug"""
-            value = bool(condition)
-            worksheet.range(cell).value = value
-            if debug_name:
-                print(f"DEBUG: {debug_name} - Celda {cell}: {value}")
-            return value
-        
-        # Debug para tipo de zona
-        tipo_zona_original = row.get('Tipo de Zona', '')
-        tipo_zona = normaliza_texto(tipo_zona_original)
-        print(f"*** DEBUG TIPO DE ZONA ***")
-        print(f"   - Valor original: '{tipo_zona_original}'")
-        print(f"   - Valor normalizado: '{tipo_zona}'")
-        
-        set_checkbox(ws_info_a, 'L21', 'urbana' in tipo_zona, "Tipo Zona - Urbana")
-        set_checkbox(ws_info_a, 'P21', 'suburbana' in tipo_zona, "Tipo Zona - Suburbana")
-        set_checkbox(ws_info_a, 'U21', 'rural' in tipo_zona, "Tipo Zona - Rural")
-        set_checkbox(ws_info_a, 'X21', 'ejidal' in tipo_zona, "Tipo Zona - Ejidal")
-        set_checkbox(ws_info_a, 'AB21', 'pueblomagico' in tipo_zona, "Tipo Zona - Pueblo Mágico")
-        
-        ws_caratula.range('A43').value = f"{nombre_a} - {nombre_b}"
-        
-        tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): ', '')
-        tipo_visible = normaliza_texto(tipo_visible_original)
-        print(f"*** DEBUG VISIBILIDAD ***")
-        print(f"   - Valor original: '{tipo_visible_original}'")
-        print(f"   - Valor normalizado: '{tipo_visible}'")
-        
-        set_checkbox(ws_info_a, 'P22', 'si' in tipo_visible, "Visibilidad - Sí")
-        set_checkbox(ws_info_a, 'S22', 'no' in tipo_visible, "Visibilidad - No")
-        
-        tipo_camino_original = row.get('Tipo de Camino', '')
-        tipo_camino = normaliza_texto(tipo_camino_original)
-        print(f"*** DEBUG TIPO DE CAMINO ***")
-        print(f"   - Valor original: '{tipo_camino_original}'")
-        print(f"   - Valor normalizado: '{tipo_camino}'")
-        
-        set_checkbox(ws_info_a, 'G23', 'terraceria' in tipo_camino, "Tipo Camino - Terracería")
-        set_checkbox(ws_info_a, 'L23', 'pavimentado' in tipo_camino, "Tipo Camino - Pavimentado")
-        set_checkbox(ws_info_a, 'Q23', 'empedrado' in tipo_camino, "Tipo Camino - Empedrado")
-        set_checkbox(ws_info_a, 'V23', 'mixto' in tipo_camino, "Tipo Camino - Mixto")
-
-        # Debug para checkbox de grúa - SITIO A
-        print(f"*** DEBUG CHECKBOX GRÚA SITIO A ***")
-        
-        # Mostrar todos los campos disponibles para debug
-        print(f"   - Todos los campos disponibles: {list(row.index)}")
-        
-        # Buscar el campo correcto (sin prefijo "comentario:")
-        campo_grua = 'En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.'
-        print(f"   - Campo en row: {campo_grua in row}")
-        
-        # Buscar variaciones del nombre del campo
-        if campo_grua not in row:
-            print(f"   - Campo no encontrado, buscando variaciones...")
-            for campo in row.index:
-                if 'grúa' in campo.lower() and 'obstrucción' in campo.lower() and not campo.startswith('comentario:'):
-                    print(f"   - Posible variación encontrada: '{campo}' = '{row[campo]}'")
-                elif 'grúa' in campo.lower() or 'grua' in campo.lower():
-                    print(f"   - Campo con 'grúa' encontrado: '{campo}' = '{row[campo]}'")
-        
-        tipo_caso_grua_original = row.get(campo_grua, '')
-        print(f"   - Valor original: '{tipo_caso_grua_original}'")
-        tipo_caso_grua = normaliza_texto(tipo_caso_grua_original)
-        print(f"   - Valor normalizado: '{tipo_caso_grua}'")
-        
-        # Verificar con diferentes variaciones de mayúsculas/minúsculas
-        print(f"   - ¿Contiene 'izaje libre'? {'izaje libre' in tipo_caso_grua}")
-        print(f"   - ¿Contiene 'izaje con obstaculos'? {'izaje con obstaculos' in tipo_caso_grua}")
-        print(f"   - ¿Contiene 'requiere visita del especialista'? {'requiere visita del especialista' in tipo_caso_grua}")
-        
-        # Verificar también en el valor original
-        print(f"   - ¿Contiene 'Izaje libre' en original? {'Izaje libre' in tipo_caso_grua_original}")
-        print(f"   - ¿Contiene 'Izaje con obstaculos' en original? {'Izaje con obstaculos' in tipo_caso_grua_original}")
-        print(f"   - ¿Contiene 'Requiere visita del especialista' en original? {'Requiere visita del especialista' in tipo_caso_grua_original}")
-        
-        # Usar comparación case-insensitive
-        valor_b61 = 'izaje libre' in tipo_caso_grua or 'Izaje libre' in tipo_caso_grua_original
-        valor_j61 = 'izaje con obstaculos' in tipo_caso_grua or 'Izaje con obstaculos' in tipo_caso_grua_original
-        valor_s61 = 'requiere visita del especialista' in tipo_caso_grua or 'Requiere visita del especialista' in tipo_caso_grua_original
-        
-        print(f"   - Valor calculado para B61: {valor_b61}")
-        print(f"   - Valor calculado para J61: {valor_j61}")
-        print(f"   - Valor calculado para S61: {valor_s61}")
-        
-        set_checkbox(ws_info_a, 'B61', valor_b61, "Grúa - Izaje libre")
-        set_checkbox(ws_info_a, 'J61', valor_j61, "Grúa - Izaje con obstáculos")
-        set_checkbox(ws_info_a, 'S61', valor_s61, "Grúa - Requiere visita especialista")
-        
-        # ===== LLENADO COMPLETO DE TODOS LOS PARÁMETROS =====
-        print("🔥 LLENANDO TODOS LOS PARÁMETROS COMO PRIMERA VEZ...")
-        
-        # Debug para checkbox de grúa - SITIO B
-        print(f"*** DEBUG CHECKBOX GRÚA SITIO B ***")
-        
-        # Buscar el campo correcto (sin prefijo "comentario:")
-        campo_grua2 = 'En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción2.'
-        print(f"   - Campo en row: {campo_grua2 in row}")
-        
-        # Buscar variaciones del nombre del campo
-        if campo_grua2 not in row:
-            print(f"   - Campo no encontrado, buscando variaciones...")
-            for campo in row.index:
-                if 'grúa' in campo.lower() and 'obstrucción' in campo.lower() and '2' in campo and not campo.startswith('comentario:'):
-                    print(f"   - Posible variación encontrada: '{campo}' = '{row[campo]}'")
-        
-        tipo_caso_grua2_original = row.get(campo_grua2, '')
-        print(f"   - Valor original: '{tipo_caso_grua2_original}'")
-        tipo_caso_grua2 = normaliza_texto(tipo_caso_grua2_original)
-        print(f"   - Valor normalizado: '{tipo_caso_grua2}'")
-        
-        # Verificar con diferentes variaciones de mayúsculas/minúsculas
-        print(f"   - ¿Contiene 'izaje libre'? {'izaje libre' in tipo_caso_grua2}")
-        print(f"   - ¿Contiene 'izaje con obstaculos'? {'izaje con obstaculos' in tipo_caso_grua2}")
-        print(f"   - ¿Contiene 'requiere visita del especialista'? {'requiere visita del especialista' in tipo_caso_grua2}")
-        
-        # Usar comparación case-insensitive
-        ws_info_b.range('B61').value = 'izaje libre' in tipo_caso_grua2 or 'Izaje libre' in tipo_caso_grua2_original
-        ws_info_b.range('J61').value = 'izaje con obstaculos' in tipo_caso_grua2 or 'Izaje con obstaculos' in tipo_caso_grua2_original
-        ws_info_b.range('S61').value = 'requiere visita del especialista' in tipo_caso_grua2 or 'Requiere visita del especialista' in tipo_caso_grua2_original
-        
-        # Verificar que se escribió correctamente
-        print(f"   - Valor en B61: '{ws_info_b.range('B61').value}'")
-        print(f"   - Valor en J61: '{ws_info_b.range('J61').value}'")
-        print(f"   - Valor en S61: '{ws_info_b.range('S61').value}'")
-        
-        # Llenar tipo de zona para sitio B
-        tipo_zona_original = row.get('Tipo de Zona 2', '')
-        tipo_zona = normaliza_texto(tipo_zona_original)
-        ws_info_b.range('L21').value = 'urbana' in tipo_zona
-        ws_info_b.range('P21').value = 'suburbana' in tipo_zona
-        ws_info_b.range('U21').value = 'rural' in tipo_zona
-        ws_info_b.range('X21').value = 'ejidal' in tipo_zona
-        ws_info_b.range('AB21').value = 'pueblomagico' in tipo_zona
-        
-        # Llenar visibilidad para sitio B
-        tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): 2', '')
-        tipo_visible = normaliza_texto(tipo_visible_original)
-        ws_info_b.range('P22').value =  'si' in tipo_visible
-        ws_info_b.range('S22').value = 'no' in tipo_visible
-        
-        # Llenar tipo de camino para sitio B
-        tipo_camino_original = row.get(' Tipo de Camino 2 ', '')
-        tipo_camino = normaliza_texto(tipo_camino_original)
-        ws_info_b.range('G23').value = 'terraceria' in tipo_camino
-        ws_info_b.range('L23').value = 'pavimentado' in tipo_camino
-        ws_info_b.range('Q23').value =  'empedrado' in tipo_camino
-        ws_info_b.range('V23').value =  'mixto' in tipo_camino
-        
-        # ===== INFORMACIÓN DE TORRE Y SITIO =====
-        print("🏗️ Llenando información de torre y sitio...")
-        
-        # Propietario/Administrador - SITIO A
-        tipo_Propietario_Administrador_original = row.get('Propietario_Administrador', '')
-        tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
-        ws_info_a.range('K34').value = 'telesite'in tipo_Propietario_Administrador
-        ws_info_a.range('P34').value = 'ctwr' in tipo_Propietario_Administrador
-        ws_info_a.range('V34').value = 'mtp' in tipo_Propietario_Administrador
-        ws_info_a.range('Z34').value = 'intelesites' in tipo_Propietario_Administrador
-        ws_info_a.range('AE34').value = 'even' in tipo_Propietario_Administrador
-        ws_info_a.range('A35').value = 'atc' in tipo_Propietario_Administrador
-        ws_info_a.range('F35').value = 'temm' in tipo_Propietario_Administrador
-        ws_info_a.range('K35').value = 'renta tower' in tipo_Propietario_Administrador
-        ws_info_a.range('P35').value = 'torrecom' in tipo_Propietario_Administrador
-        ws_info_a.range('V35').value = 'uniti' in tipo_Propietario_Administrador
-        ws_info_a.range('A36').value = 'tower one' in tipo_Propietario_Administrador
-        ws_info_a.range('F36').value = 'iimt' in tipo_Propietario_Administrador
-        ws_info_a.range('K36').value = 'servicom' in tipo_Propietario_Administrador
-        ws_info_a.range('A37').value = 'canadian tower' in tipo_Propietario_Administrador
-        ws_info_a.range('F37').value = 'mx tower' in tipo_Propietario_Administrador
-        ws_info_a.range('K37').value = 'cfe' in tipo_Propietario_Administrador
-
-        # Propietario/Administrador - SITIO B
-        tipo_Propietario_Administrador_original = row.get('Propietario_Administrador B', '')
-        tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
-        ws_info_b.range('K34').value = 'telesite'in tipo_Propietario_Administrador
-        ws_info_b.range('P34').value = 'ctwr' in tipo_Propietario_Administrador
-        ws_info_b.range('V34').value = 'mtp' in tipo_Propietario_Administrador
-        ws_info_b.range('Z34').value = 'intelesites' in tipo_Propietario_Administrador
-        ws_info_b.range('AE34').value = 'even' in tipo_Propietario_Administrador
-        ws_info_b.range('A35').value = 'atc' in tipo_Propietario_Administrador
-        ws_info_b.range('F35').value = 'temm' in tipo_Propietario_Administrador
-        ws_info_b.range('K35').value = 'renta tower' in tipo_Propietario_Administrador
-        ws_info_b.range('P35').value = 'torrecom' in tipo_Propietario_Administrador
-        ws_info_b.range('V35').value = 'uniti' in tipo_Propietario_Administrador
-        ws_info_b.range('A36').value = 'tower one' in tipo_Propietario_Administrador
-        ws_info_b.range('F36').value = 'iimt' in tipo_Propietario_Administrador
-        ws_info_b.range('K36').value = 'servicom' in tipo_Propietario_Administrador
-        ws_info_b.range('A37').value = 'canadian tower' in tipo_Propietario_Administrador
-        ws_info_b.range('F37').value = 'mx tower' in tipo_Propietario_Administrador
-        ws_info_b.range('K37').value = 'cfe' in tipo_Propietario_Administrador
-
-        # Tipo de sitio - SITIO A
-        tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio', ''))
-        tipo_tipositio = normaliza_texto(tipo_tipositio_original)
-        print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
-        print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
-        print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
-        print(f"¿Contiene 'sobresuelorawland'? {'sobresuelorawland' in tipo_tipositio}")
-        ws_info_a.range('D39').value = 'terrenogreenfield' in tipo_tipositio
-        ws_info_a.range('M39').value = 'sobresuelorawland' in tipo_tipositio
-        ws_info_a.range('U39').value = 'sobreazotea' in tipo_tipositio
-
-        # Tipo de sitio - SITIO B
-        tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio B', ''))
-        tipo_tipositio = normaliza_texto(tipo_tipositio_original)
-        print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
-        print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
-        print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
-        print(f"¿Contiene 'sobresuelorawland'? {'sobresuelorawland' in tipo_tipositio}")
-        ws_info_b.range('D39').value = 'terrenogreenfield' in tipo_tipositio
-        ws_info_b.range('M39').value = 'sobresuelorawland' in tipo_tipositio
-        ws_info_b.range('U39').value = 'sobreazotea' in tipo_tipositio
-
-        # Riesgo - SITIO A
-        tipo_riesgo_original = normaliza_texto(row.get('Riesgo', ''))
-        tipo_riesgo = normaliza_texto(tipo_riesgo_original)
-        ws_info_a.range('Y40').value = 'delitocomunroboatranseuntes' in tipo_riesgo
-        ws_info_a.range('P41').value = 'inconformidadvecinalconbloqueo' in tipo_riesgo
-        ws_info_a.range('AA41').value = 'delincuenciaorganizada' in tipo_riesgo
-
-        # Riesgo - SITIO B
-        tipo_riesgo_original = normaliza_texto(row.get('Riesgo B', ''))
-        tipo_riesgo = normaliza_texto(tipo_riesgo_original)
-        ws_info_b.range('Y40').value = 'delitocomunroboatranseuntes' in tipo_riesgo
-        ws_info_b.range('P41').value = 'inconformidadvecinalconbloqueo' in tipo_riesgo
-        ws_info_b.range('AA41').value = 'delincuenciaorganizada' in tipo_riesgo
-
-        # Considera accesible - SITIO A
-        tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche?', ''))
-        tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
-        ws_info_a.range('S43').value = 'solodedia' in tipo_considera_accesible
-        ws_info_a.range('W43').value = 'solodenoche' in tipo_considera_accesible
-        ws_info_a.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible
-
-        # Considera accesible - SITIO B
-        tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche? B', ''))
-        tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
-        ws_info_b.range('S43').value = 'solodedia' in tipo_considera_accesible
-        ws_info_b.range('W43').value = 'solodenoche' in tipo_considera_accesible
-        ws_info_b.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible
-
-        # Zona segura - SITIO A
-        tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes):', ''))
-        tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
-        ws_info_a.range('S44').value = 'si' in tipo_zonasegura
-        ws_info_a.range('W44').value = 'no' in tipo_zonasegura
-
-        # Zona segura - SITIO B
-        tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes) B:', ''))
-        tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
-        ws_info_b.range('S44').value = 'si' in tipo_zonasegura
-        ws_info_b.range('W44').value = 'no' in tipo_zonasegura
-
-        # Horario controlado - SITIO A
-        tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado', ''))
-        tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
-        ws_info_a.range('B50').value = 'si' in tipo_horariocontrolado
-        ws_info_a.range('F50').value = 'no' in tipo_horariocontrolado
-
-        # Horario controlado - SITIO B
-        tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado B', ''))
-        tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
-        ws_info_b.range('B50').value = 'si' in tipo_horariocontrolado
-        ws_info_b.range('F50').value = 'no' in tipo_horariocontrolado
-        
-        # Acceso al Personal - SITIO A
-        acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO', ''))
-        acceso_personal = normaliza_texto(acceso_personal_original)
-
-        ws_info_a.range('B47').value = 'llave' in acceso_personal
-        ws_info_a.range('H47').value = 'permiso/memorandum' in acceso_personal
-        ws_info_a.range('R47').value = 'candadodecombinacion' in acceso_personal
-        ws_info_a.range('B48').value = 'tarjetaelectronica' in acceso_personal
-        ws_info_a.range('J48').value = 'otro' in acceso_personal
-
-        # Campos vinculados - SITIO A
-        if 'candadodecombinacion' in acceso_personal:
-            ws_info_a.range('AF47').value = row.get('Candado de Combinación', '')
-            ws_info_a.range('Q48').value = 'N/A'
-        elif ('llave' in acceso_personal or 'permiso/memorandum' in acceso_personal or 'tarjetaelectronica' in acceso_personal):
-            ws_info_a.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta', '')
-
-        # Acceso al Personal - SITIO B
-        acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO B', ''))
-        acceso_personal = normaliza_texto(acceso_personal_original)
-
-        ws_info_b.range('B47').value = 'llave' in acceso_personal
-        ws_info_b.range('H47').value = 'permiso/memorandum' in acceso_personal
-        ws_info_b.range('R47').value = 'candadodecombinacion' in acceso_personal
-        ws_info_b.range('B48').value = 'tarjetaelectronica' in acceso_personal
-        ws_info_b.range('J48').value = 'otro' in acceso_personal
-
-        # Campos vinculados - SITIO B
-        if 'candadodecombinacion' in acceso_personal:
-            ws_info_b.range('AF47').value = row.get('Candado de Combinación B', '')
-            ws_info_b.range('Q48').value = 'N/A'
-        elif ('llave' in acceso_personal or 'permiso/memorandum' in acceso_personal or 'tarjetaelectronica' in acceso_personal):
-            ws_info_b.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta B', '')
-
-        # Forma de ingresar equipo - SITIO A
-        tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con:', ''))
-        tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
-        ws_info_a.range('U55').value = 'maniobra' in tipo_formaingresar
-        ws_info_a.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
-        ws_info_a.range('AG55').value = 'izajecongrua' in tipo_formaingresar
-
-        # Forma de ingresar equipo - SITIO B
-        tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con: B', ''))
-        tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
-        ws_info_b.range('U55').value = 'maniobra' in tipo_formaingresar
-        ws_info_b.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
-        ws_info_b.range('AG55').value = 'izajecongrua' in tipo_formaingresar
-
-        # Requerir grúa - SITIO A
-        tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:', ''))
-        tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
-        print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
-        print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
-        ws_info_a.range('AB67').value = 'requieregrua' in tipo_requerir_grua
-        ws_info_a.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua
-
-        # Requerir grúa - SITIO B
-        tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B', ''))
-        tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
-        print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
-        print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
-        ws_info_b.range('AB67').value = 'requieregrua' in tipo_requerir_grua
-        ws_info_b.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua
-
-        # Requiere grúa - SITIO A
-        tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No)', ''))
-        tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
-        ws_info_a.range('AC66').value = 'si' in tipo_requiere_grua
-        ws_info_a.range('AF66').value = 'no' in tipo_requiere_grua
-
-        # Requiere grúa - SITIO B
-        tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No) B', ''))
-        tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
-        ws_info_b.range('AC66').value = 'si' in tipo_requiere_grua
-        ws_info_b.range('AF66').value = 'no' in tipo_requiere_grua
-
-        # Para llegar al sitio - SITIO A
-        tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
-        # Separa por coma y normaliza solo el primer valor
-        primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
-        primer_tipo = normaliza_texto(primer_valor)
-        print(f"primer_valor: '{primer_valor}'")
-        print(f"primer_tipo normalizado: '{primer_tipo}'")
-        ws_info_a.range('B72').value = (primer_tipo == 'pickup')
-        ws_info_a.range('G72').value = (primer_tipo == 'pickup4x4')
-        ws_info_a.range('M72').value = (primer_tipo == 'animalesdecarga')
-
-        # Para llegar al sitio - SITIO B
-        tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de: B', ''))
-        # Separa por coma y normaliza solo el primer valor
-        primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
-        primer_tipo = normaliza_texto(primer_valor)
-        print(f"primer_valor: '{primer_valor}'")
-        print(f"primer_tipo normalizado: '{primer_tipo}'")
-        ws_info_b.range('B72').value = (primer_tipo == 'pickup')
-        ws_info_b.range('G72').value = (primer_tipo == 'pickup4x4')
-        ws_info_b.range('M72').value = (primer_tipo == 'animalesdecarga')
-
-        # Policía - SITIO A
-        policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito?', '').strip().lower())
-        ws_info_a.range('AB105').value = 'si' in policia_original
-        ws_info_a.range('AE105').value = 'no' in policia_original
-
-        if 'si' in policia_original:
-            ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia', 'N/A') 
-            ws_info_a.range('U107').value = row.get('Se cuenta con algún número de teléfono?, indíquelo', 'N/A') or 'N/A'
-        else:
-            ws_info_a.range('U106').value = 'N/A'
-            ws_info_a.range('U107').value = 'N/A'
-
-        # Cruz Roja, Hospital, asistencia médica - SITIO A
-        cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.', '').strip().lower())
-        ws_info_a.range('AB108').value = 'si' in cruzroja_original
-        ws_info_a.range('AE108').value = 'no' in cruzroja_original
-
-        if 'si' in cruzroja_original:
-            ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz ', 'N/A')  
-            ws_info_a.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz', 'N/A') or 'N/A'
-        else:
-            ws_info_a.range('U109').value = 'N/A'
-            ws_info_a.range('U110').value = 'N/A'
-
-        # Mapa Nacional de Riesgos - SITIO A
-        riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:', '').strip().lower())
-        ws_info_a.range('Y111').value = 'bajo' in riesgo
-        ws_info_a.range('AB111').value = 'medio' in riesgo
-        ws_info_a.range('AE111').value = 'alto' in riesgo
-
-        # Policía - SITIO B
-        policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito? B', ''))
-        ws_info_b.range('AB105').value = 'si' in policia_original
-        ws_info_b.range('AE105').value = 'no' in policia_original
-
-        if 'si' in policia_original:
-            ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia B', 'N/A') 
-            ws_info_b.range('U107').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: B', 'N/A') or 'N/A'
-        else:
-            ws_info_b.range('U106').value = 'N/A'
-            ws_info_b.range('U107').value = 'N/A'
-
-        # Cruz Roja, Hospital, asistencia médica - SITIO B
-        cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B', ''))
-        ws_info_b.range('AB108').value = 'si' in cruzroja_original
-        ws_info_b.range('AE108').value = 'no' in cruzroja_original
-
-        if 'si' in cruzroja_original:
-            ws_info_b.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz B', 'N/A')  
-            ws_info_b.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz B', 'N/A') or 'N/A'
-        else:
-            ws_info_b.range('U109').value = 'N/A'
-            ws_info_b.range('U110').value = 'N/A'
-
-        # Mapa Nacional de Riesgos - SITIO B
-        riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B', ''))
-        ws_info_b.range('Y111').value = 'bajo' in riesgo
-        ws_info_b.range('AB111').value = 'medio' in riesgo
-        ws_info_b.range('AE111').value = 'alto' in riesgo
-
-        # Alimentación compatible
-        alimentacion = normaliza_texto(row.get('Alimentacion compatible con el equipamiento ', ''))
-        print(f"🔍 Alimentación: '{alimentacion}' (original: '{row.get('Alimentacion compatible con el equipamiento ', '')}')")
-        ws_info_a.range('Y25').value = 'si' in alimentacion
-        ws_info_a.range('AB25').value = 'no' in alimentacion
-        print(f"🔍 Checkboxes alimentación: Y25={('si' in alimentacion)}, AB25={('no' in alimentacion)}")
-        
-        # Sistema eléctrico - MOVIDO A HOJA 3 (Espacios en Torre)
-        sistema_electrico = normaliza_texto(row.get('SISTEMA ELECTRICO', ''))
-        print(f"🔍 Sistema eléctrico: '{sistema_electrico}' (original: '{row.get('SISTEMA ELECTRICO', '')}')")
-        # NOTA: Estos checkboxes se llenarán en la hoja 3 más adelante
-        
-        # ===== INFORMACIÓN TÉCNICA =====
-        print("🔧 Llenando información técnica...")
-        
-        # Cara propuesta - MOVIDO A HOJA 3 (Espacios en Torre)
-        cara_propuesta = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre', ''))
-        print(f"🔍 Cara propuesta: '{cara_propuesta}' (original: '{row.get('Cara de preparación para cableado vertical en torre', '')}')")
-        # NOTA: Estos checkboxes se llenarán en la hoja 3 más adelante
-        
-        # Barra de tierra
-        barra_tierra = normaliza_texto(row.get('Barra de Tierra', ''))
-        print(f"🔍 Barra de tierra: '{barra_tierra}' (original: '{row.get('Barra de Tierra', '')}')")
-        ws_info_a.range('O27').value = 'si' in barra_tierra
-        ws_info_a.range('R27').value = 'no' in barra_tierra
-        print(f"🔍 Checkboxes barra tierra: O27={('si' in barra_tierra)}, R27={('no' in barra_tierra)}")
-        
-        # Tipo de solución
-        tipo_solucion = normaliza_texto(row.get('Tipo de solución', ''))
-        print(f"🔍 Tipo de solución: '{tipo_solucion}' (original: '{row.get('Tipo de solución', '')}')")
-        ws_info_a.range('O29').value = 'piso' in tipo_solucion
-        ws_info_a.range('R29').value = 'torre' in tipo_solucion
-        print(f"🔍 Checkboxes tipo solución: O29={('piso' in tipo_solucion)}, R29={('torre' in tipo_solucion)}")
-        
-        # ===== CAMPOS DE TEXTO IMPORTANTES =====
-        print("📝 Llenando campos de texto...")
-        
-        # Información básica del sitio
-        comentario_grua = row.get('comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.', 'N/A')
-        print(f"🔍 Comentario grúa: '{comentario_grua}'")
-        ws_info_a.range('B63').value = comentario_grua
-        
-        # Coordenadas y ubicación
-        latitud = row.get('LATITUD (TORRE)', 'N/A')
-        longitud = row.get('LONGITUD (TORRE)', 'N/A')
-        altitud = row.get('Altitud (msnm)', 'N/A')
-        print(f"🔍 Coordenadas: Lat={latitud}, Lon={longitud}, Alt={altitud}")
-        ws_info_a.range('B15').value = latitud
-        ws_info_a.range('F15').value = longitud
-        ws_info_a.range('J15').value = altitud
-        
-        # Información de contacto
-        contacto = row.get('Nombre de contacto en sitio', 'N/A')
-        telefono = row.get('Telefono', 'N/A')
-        print(f"🔍 Contacto: '{contacto}', Teléfono: '{telefono}'")
-        ws_info_a.range('B17').value = contacto
-        ws_info_a.range('F17').value = telefono
-        
-        # Dirección
-        calle = row.get('Calle', 'N/A')
-        colonia = row.get('Colonia', 'N/A')
-        municipio = row.get('Municipio', 'N/A')
-        cp = row.get('C.P', 'N/A')
-        print(f"🔍 Dirección: Calle='{calle}', Colonia='{colonia}', Municipio='{municipio}', CP='{cp}'")
-        ws_info_a.range('B19').value = calle
-        ws_info_a.range('F19').value = colonia
-        ws_info_a.range('J19').value = municipio
-        ws_info_a.range('N19').value = cp
-        
-        print("✅ INFORMACIÓN BÁSICA COMPLETADA")
-        
-        # ===== LLENADO COMPLETO DE HOJA 3: ESPACIOS EN TORRE Y PISO =====
-        print("🏗️ Llenando HOJA 3: Espacios en Torre y Piso A-B...")
-        
-        # Información del sitio principal
-        ws_info_c.range('G7').value = row.get('NOMBRE DEL SITIO', 'N/A')
-        ws_info_c.range('K9').value = row.get('Diametro de pierna superior', 'N/A')
-        ws_info_c.range('U9').value = row.get('Diametro de pierna Inferior', 'N/A')
-        ws_info_c.range('AC9').value = row.get('NCRA RB', 'N/A')
-        ws_info_c.range('AM9').value = row.get('Franja2RB', 'N/A')
-        ws_info_c.range('K10').value = row.get('Altura de la Torre', 'N/A')
-        ws_info_c.range('U10').value = row.get('Dado', 'N/A')
-        ws_info_c.range('AE10').value = row.get('Altura Edificio1', 'N/A')
-        ws_info_c.range('T11').value = row.get('Nivel inferior de franja disponible', 'N/A')
-        ws_info_c.range('AK11').value = row.get('Nivel superior de franja disponible', 'N/A')
-        ws_info_c.range('B14').value = row.get('Altura de MW conforme a topologia', 'N/A')
-        ws_info_c.range('M14').value = row.get('Azimut RB ', 'N/A')
-        ws_info_c.range('AB14').value = row.get('Propuesta de altura de antena de MW1', 'N/A')
-        ws_info_c.range('AJ14').value = row.get('Propuesta de altura de antena de MW (SD)1', 'N/A')
-        ws_info_c.range('O19').value = row.get('Altura de soporte para OMB propuesto', 'N/A')
-        ws_info_c.range('O20').value = row.get('Longitud del cable de tierra nuevo OMB', 'N/A')
-        ws_info_c.range('O21').value = row.get('Longitud del cable de tierra ODU', 'N/A')
-        ws_info_c.range('O22').value = row.get('Longitud de cable IF', 'N/A')
-        ws_info_c.range('O23').value = row.get('Tipo de soporte para antena MW propuesto', 'N/A')
-        ws_info_c.range('O24').value = row.get('Longitud de cable ACDB-Nuevo OMB', 'N/A')
-        ws_info_c.range('O25').value = row.get('Longitud de cable RTN - Router', 'N/A')
-        ws_info_c.range('O26').value = row.get('Longitud de cable RTN - BBU SITE 1', 'N/A')
-        ws_info_c.range('O28').value = row.get('MEDICION DE BARRA DE TIERRA (Ohms)', 'N/A')
-        
-        # Información del sitio secundario
-        ws_info_c.range('G31').value = row.get('Nombre del sitio 2', 'N/A')
-        ws_info_c.range('K33').value = row.get('Diámetro de Pierna superio2', 'N/A')
-        ws_info_c.range('U33').value = row.get('Diámetro de Pierna inferior2', 'N/A')
-        ws_info_c.range('AC33').value = row.get(' NCRA2 ', 'N/A')
-        ws_info_c.range('AM33').value = row.get('Franja2-2', 'N/A')
-        ws_info_c.range('K34').value = row.get('Altura torre 2', 'N/A')
-        ws_info_c.range('U34').value = row.get('DADO 2', 'N/A')
-        ws_info_c.range('AE34').value = row.get('Altura edificio 2', 'N/A')
-        ws_info_c.range('T35').value = row.get('Nivel inferior de franja disponible 2', 'N/A')
-        ws_info_c.range('K35').value = row.get('Nivel superior de franja disponible 2', 'N/A')
-        ws_info_c.range('B38').value = row.get('Altura de MW conforme a topologia 2', 'N/A')
-        ws_info_c.range('M38').value = row.get('Azimut 2', 'N/A')
-        ws_info_c.range('AB38').value = row.get('Propuesta de altura de antena de MW2', 'N/A')
-        ws_info_c.range('AJ38').value = row.get('Propuesta de altura de antena de MW (SD)2', 'N/A')
-        ws_info_c.range('O43').value = row.get('Altura de soporte para OMB propuesto2', 'N/A')
-        ws_info_c.range('O44').value = row.get('Longitud del cable de tierra nuevo OMB 2', 'N/A')
-        ws_info_c.range('O45').value = row.get('Longitud del cable de tierra ODU 2', 'N/A')
-        ws_info_c.range('O46').value = row.get('Longitud de cable IF 2', 'N/A')
-        ws_info_c.range('O47').value = row.get('Tipo de soporte para antena MW propuesto 2', 'N/A')
-        ws_info_c.range('O48').value = row.get('Longitud de cable ACDB-Nuevo OMB 2', 'N/A')
-        ws_info_c.range('O49').value = row.get('Longitud de cable RTN - Router 2', 'N/A')
-        ws_info_c.range('O50').value = row.get('Longitud de cable RTN - BBU 2', 'N/A')
-        ws_info_c.range('O52').value = row.get('Medición del Sistema de Tierras 2', 'N/A')
-        
-        # ===== CHECKBOXES TÉCNICOS EN HOJA 3 =====
-        print("🔧 Llenando checkboxes técnicos en hoja 3...")
-        
-        # Sistema eléctrico - CORREGIDO: Ahora en hoja 3
-        ws_info_c.range('AG21').value = 'monofasica' in sistema_electrico
-        ws_info_c.range('AL21').value = 'bifasica' in sistema_electrico
-        print(f"🔍 Checkboxes sistema eléctrico (hoja 3): AG21={('monofasica' in sistema_electrico)}, AL21={('bifasica' in sistema_electrico)}")
-        
-        # Cara propuesta - CORREGIDO: Ahora en hoja 3
-        ws_info_c.range('Y16').value = 'a' in cara_propuesta
-        ws_info_c.range('AC16').value = 'b' in cara_propuesta
-        ws_info_c.range('AE16').value = 'c' in cara_propuesta
-        ws_info_c.range('AN16').value = 'd' in cara_propuesta
-        print(f"🔍 Checkboxes cara propuesta (hoja 3): Y16={('a' in cara_propuesta)}, AC16={('b' in cara_propuesta)}, AE16={('c' in cara_propuesta)}, AN16={('d' in cara_propuesta)}")
-        
-        print("✅ HOJA 3: Espacios en Torre y Piso completada")
-        
-        # ===== INFORMACIÓN TÉCNICA ADICIONAL - HOJA 3 =====
-        print("🔧 Llenando información técnica adicional...")
-        
-        # Tipo de torre 2 - SITIO B
-        tipo_torre2 = normaliza_texto(row.get('Tipo de Torre2', ''))
-        ws_info_c.range('G32').value = tipo_torre2 == 'autosoportada'
-        ws_info_c.range('O32').value = tipo_torre2 == 'arriostrada'
-        ws_info_c.range('V32').value = tipo_torre2 == 'monopolo'
-        ws_info_c.range('AB32').value = tipo_torre2 == 'minipolo'
-        ws_info_c.range('AG32').value = tipo_torre2 == 'otro'
-
-        # Espacio disponible de conexión 2 - SITIO B
-        espacio_disponible2 = normaliza_texto(row.get('¿Espacio disponible de conexión?2', ''))
-        ws_info_c.range('U38').value = espacio_disponible2 == 'si'
-        ws_info_c.range('Y38').value = espacio_disponible2 == 'no'
-
-        # Cara de preparación 2 - SITIO B
-        cara_preparacion2 = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre 2', ''))
-        ws_info_c.range('Y40').value = cara_preparacion2 == 'a'
-        ws_info_c.range('AD40').value = cara_preparacion2 == 'b'
-        ws_info_c.range('AI40').value = cara_preparacion2 == 'c'
-        ws_info_c.range('AN40').value = cara_preparacion2 == 'd'
-        
-        # Existe tierra 2 - SITIO B
-        existe_tierra2 = normaliza_texto(row.get('Existe Barra de Tierras 2', ''))
-        ws_info_c.range('O51').value = existe_tierra2 == 'si'
-        ws_info_c.range('R51').value = existe_tierra2 == 'no'
-
-        # Tipo de solución 2 - SITIO B
-        tipo_solucion2 = normaliza_texto(row.get('Tipo de solucion 2', ''))
-        ws_info_c.range('O53').value = tipo_solucion2 == 'piso'
-        ws_info_c.range('R53').value = tipo_solucion2 == 'torre'
-        
-        # Existe breaker 2 - SITIO B
-        existe_break2 = normaliza_texto(row.get('Existe algun breaker existente en sitio 2 ', ''))
-        ws_info_c.range('Y45').value = existe_break2 == 'si'
-        ws_info_c.range('AB45').value = existe_break2 == 'no'
-
-        # Alimentación existente 2 - SITIO B
-        alimenacion_existente2= normaliza_texto(row.get('SISTEMA ELECTRICO 2', ''))
-        ws_info_c.range('AG45').value = 'monofasica' in alimenacion_existente2
-        ws_info_c.range('AL45').value = 'bifasica' in alimenacion_existente2
-        
-        # Alimentación compatible 2 - SITIO B
-        alimenacion_compatible2= normaliza_texto(row.get('Alimentacion compatible con el equipamiento 2', ''))
-        ws_info_c.range('Y49').value = alimenacion_compatible2 == 'si'
-        ws_info_c.range('AB49').value = alimenacion_compatible2 == 'no'
-
-        # Espacio de conexión 2 - SITIO B
-        espacio_conexion2= normaliza_texto(row.get('¿Espacio disponible de conexión? 2', ''))
-        ws_info_c.range('AH49').value = espacio_conexion2 == 'si'
-        ws_info_c.range('AK49').value = espacio_conexion2 == 'no'
-
-        # Línea de vista
-        linea_vista = normaliza_texto(row.get('Linea de vista ', ''))
-        motivo = normaliza_texto(row.get('Motivo ', ''))
-
-        ws_info_c.range('R56').value = (linea_vista == 'si')
-        ws_info_c.range('V56').value = (linea_vista == 'no')
-        ws_info_c.range('Q57').value = False
-        ws_info_c.range('V57').value = False
-        ws_info_c.range('AC57').value = False
-        ws_info_c.range('AI57').value = False
-        ws_info_c.range('C58').value = False
-
-        if linea_vista == 'no':
-           if motivo == 'arboles':
-              ws_info_c.range('Q57').value = True
-           elif motivo == 'espectacular':
-              ws_info_c.range('V57').value = True
-           elif motivo == 'edificio':
-              ws_info_c.range('AC57').value = True
-           elif motivo == 'montaña':
-              ws_info_c.range('AI57').value = True
-           elif motivo == 'n/a':
-              ws_info_c.range('C58').value = True
-
-        print("✅ INFORMACIÓN TÉCNICA ADICIONAL COMPLETADA")
-        
-        # ===== LLENADO COMPLETO DE HOJA 4: PLANOS A =====
-        print("📐 Llenando HOJA 4: Planos A...")
-        
-        # Información de planos del sitio A
-        ws_info_d.range('B15').value = row.get('PLANOS', 'N/A')
-        ws_info_d.range('F15').value = row.get('Tipo de Torre', 'N/A')
-        ws_info_d.range('J15').value = row.get('Altura de la Torre', 'N/A')
-        ws_info_d.range('N15').value = row.get('Dado', 'N/A')
-        ws_info_d.range('R15').value = row.get('PROPIETARIO', 'N/A')
-        ws_info_d.range('V15').value = row.get('TIPO DE SITIO ', 'N/A')
-        
-        # Información de acceso y permisos
-        ws_info_d.range('B20').value = row.get('Como o donde obtener permisos/llave/tarjeta', 'N/A')
-        ws_info_d.range('F20').value = row.get('Contacto solicitud de accesos', 'N/A')
-        ws_info_d.range('J20').value = row.get('Horario de solicitud de accesos', 'N/A')
-        
-        # Información de grúa
-        ws_info_d.range('B25').value = row.get('Requiere Grua (Si / No)', 'N/A')
-        ws_info_d.range('F25').value = row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', 'N/A')
-        ws_info_d.range('J25').value = row.get('Si la respuesta anterior es si, Indique a que distancia ', 'N/A')
-        
-        # Información de seguridad
-        ws_info_d.range('B30').value = row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito?', 'N/A')
-        ws_info_d.range('F30').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia', 'N/A')
-        ws_info_d.range('J30').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: ', 'N/A')
-        
-        # Información médica
-        ws_info_d.range('B35').value = row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.', 'N/A')
-        ws_info_d.range('F35').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz ', 'N/A')
-        ws_info_d.range('J35').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz', 'N/A')
-        
-        # Información de riesgos
-        ws_info_d.range('B40').value = row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:', 'N/A')
-        
-        print("✅ HOJA 4: Planos A completada")
-        
-        # ===== LLENADO COMPLETO DE HOJA 5: PLANOS B =====
-        print("📐 Llenando HOJA 5: Planos B...")
-        
-        # Información de planos del sitio B (similar a A pero con campos B)
-        ws_info_e.range('B15').value = row.get('PLANOS', 'N/A')
-        ws_info_e.range('F15').value = row.get('Tipo de Torre2', 'N/A')
-        ws_info_e.range('J15').value = row.get('Altura torre 2', 'N/A')
-        ws_info_e.range('N15').value = row.get('DADO 2', 'N/A')
-        ws_info_e.range('R15').value = row.get('PROPIETARIO 2', 'N/A')
-        ws_info_e.range('V15').value = row.get('TIPO DE SITIO 2', 'N/A')
-        
-        # Información de acceso y permisos B
-        ws_info_e.range('B20').value = row.get('Como o donde obtener permisos/llave/tarjeta B', 'N/A')
-        ws_info_e.range('F20').value = row.get('Contacto solicitud de accesos B', 'N/A')
-        ws_info_e.range('J20').value = row.get('Horario de solicitud de accesos B', 'N/A')
-        
-        # Información de grúa B
-        ws_info_e.range('B25').value = row.get('Requiere Grua (Si / No) B', 'N/A')
-        ws_info_e.range('F25').value = row.get('Para la llegada al sitio con el equipo a instalar, se requiere de: B', 'N/A')
-        ws_info_e.range('J25').value = row.get('Si la respuesta anterior es si, Indique a que distancia  B', 'N/A')
-        
-        # Información de seguridad B
-        ws_info_e.range('B30').value = row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito? B', 'N/A')
-        ws_info_e.range('F30').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia B', 'N/A')
-        ws_info_e.range('J30').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: B', 'N/A')
-        
-        # Información médica B
-        ws_info_e.range('B35').value = row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B', 'N/A')
-        ws_info_e.range('F35').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz B', 'N/A')
-        ws_info_e.range('J35').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz B', 'N/A')
-        
-        # Información de riesgos B
-        ws_info_e.range('B40').value = row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B', 'N/A')
-        
-        print("✅ HOJA 5: Planos B completada")
-        
-        # ===== LLENADO COMPLETO DE HOJA 6: REPORTE FOTOS A =====
-        print("📸 Llenando HOJA 6: Reporte Fotos A...")
-        
-        # Información de fotos del sitio A
-        ws_info_f.range('B15').value = row.get('NOMBRE DEL SITIO', 'N/A')
-        ws_info_f.range('F15').value = row.get('ID', 'N/A')
-        ws_info_f.range('J15').value = row.get('ESTADO ', 'N/A')
-        ws_info_f.range('N15').value = row.get('CLUSTER', 'N/A')
-        ws_info_f.range('R15').value = row.get('Fecha Site Survey', 'N/A')
-        
-        # Información de línea de vista
-        ws_info_f.range('B25').value = row.get('Linea de vista ', 'N/A')
-        ws_info_f.range('F25').value = row.get('Motivo ', 'N/A')
-        
-        # Información de enlaces
-        ws_info_f.range('B30').value = row.get('Nombres Enlaces ', 'N/A')
-        ws_info_f.range('F30').value = row.get('Fecha Inicio Site Survey', 'N/A')
-        ws_info_f.range('J30').value = row.get('Fecha final Site Survey', 'N/A')
-        
-        print("✅ HOJA 6: Reporte Fotos A completada")
-        
-        # ===== LLENADO COMPLETO DE HOJA 7: REPORTE FOTOS B =====
-        print("📸 Llenando HOJA 7: Reporte Fotos B...")
-        
-        # Información de fotos del sitio B
-        ws_info_g.range('B15').value = row.get('Nombre del sitio 2', 'N/A')
-        ws_info_g.range('F15').value = row.get('ID 2', 'N/A')
-        ws_info_g.range('J15').value = row.get('ESTADO 2 ', 'N/A')
-        ws_info_g.range('N15').value = row.get('CLUSTER', 'N/A')
-        ws_info_g.range('R15').value = row.get('Fecha Inicio Site Survey B', 'N/A')
-        
-        # Información de línea de vista B
-        ws_info_g.range('B25').value = row.get('Linea de vista ', 'N/A')
-        ws_info_g.range('F25').value = row.get('Motivo ', 'N/A')
-        
-        # Información de enlaces B
-        ws_info_g.range('B30').value = row.get('Nombres Enlaces ', 'N/A')
-        ws_info_g.range('F25').value = row.get('Fecha Inicio Site Survey B', 'N/A')
-        ws_info_g.range('J30').value = row.get('Fecha final Site Survey B', 'N/A')
-        
-        print("✅ HOJA 7: Reporte Fotos B completada")
-        
-        # ===== LLENADO DE INFORMACIÓN TÉCNICA ADICIONAL =====
-        print("🔧 Llenando información técnica adicional...")
-        
-        # Información de enlaces y configuración
-        ws_caratula.range('B45').value = row.get('Margen de desvanecimiento ', 'N/A')
-        ws_caratula.range('F45').value = row.get('Disponibilidad anual (%) ', 'N/A')
-        ws_caratula.range('J45').value = row.get('Tamaño de la antena (m)', 'N/A')
-        ws_caratula.range('N45').value = row.get('Potencia de Transmisión (dBm)', 'N/A')
-        ws_caratula.range('R45').value = row.get('Potencia de Recepción (dBm)', 'N/A')
-        ws_caratula.range('V45').value = row.get('Banda', 'N/A')
-        ws_caratula.range('Z45').value = row.get('Frecuencia (MHz)', 'N/A')
-        
-        # Información de canales
-        ws_caratula.range('B47').value = row.get('#1 Canal ID S1', 'N/A')
-        ws_caratula.range('F47').value = row.get('#1 Frecuencia de Diseño S1', 'N/A')
-        ws_caratula.range('J47').value = row.get('#2 Frecuencia de Diseño S1', 'N/A')
-        ws_caratula.range('N47').value = row.get('#1 Canal ID S2', 'N/A')
-        
-        # Información adicional de canales
-        ws_caratula.range('R47').value = row.get('#1 Frecuencia de Diseño S2', 'N/A')
-        ws_caratula.range('V47').value = row.get('#2 Frecuencia de Diseño S2', 'N/A')
-        ws_caratula.range('Z47').value = row.get('Ancho de Banda (MHz)', 'N/A')
-        
-        print("✅ INFORMACIÓN TÉCNICA ADICIONAL COMPLETADA")
-        
-        # ===== LLENADO DE CAMPOS AUTOMÁTICOS (USANDO LA LÓGICA DE APP2.PY) =====
-        print("🔄 Llenando campos automáticos usando la lógica de app2.py...")
-        
-        # Llenado automático de celdas usando el diccionario de mapeo (EXACTO COMO APP2.PY)
-        campos_a_celdas = {
-            'Fecha Inicio Site Survey': 'G8',
-            'Fecha final Site Survey': 'AF8',
-            'NOMBRE DEL SITIO': 'J9', 
-            'PROPIETARIO': 'M10',
-            'ID': 'AF9',
-            'ESTADO ':'AC15',
-            'Calle': 'D14',
-            'Colonia': 'D15',
-            'Municipio': 'E16',
-            'C.P': 'AC14',
-            'Referencias':'J17',
-            'Nombre de contacto en sitio': 'H19',
-            'Telefono': 'AB19',
-            'LATITUD (TORRE)': 'K30',
-            'LONGITUD (TORRE)': 'AA30',
-            'LATITUD (FACHADA)': 'K27',
-            'LONGITUD (FACHADA)': 'AA27',
-            'Altitud (msnm)': 'M31',
-            'Horario de solicitud de accesos': 'Q50',
-            'Contacto solicitud de accesos': 'B52',
-            'Como o donde obtener permisos/llave/tarjeta': 'O49',
-            'Comentario:Forma de ingresar el equipo al sitio es con:': 'B57',
-            'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-            'Si la respuesta anterior es si, Indique a que distancia ':'AD72'
-        }
-        
-        print("📝 Llenando HOJA 1 (Información General A)...")
-        for campo, celdas in campos_a_celdas.items():
-            valor_raw = row.get(campo, "")
-            valor = normaliza_na(valor_raw)
-            print(f"  🔍 Campo: '{campo}' -> Celda: {celdas} -> Valor: '{valor}'")
-            if isinstance(celdas, list):
-                for celda in celdas:
-                    ws_info_a.range(celda).value = valor
-            else:
-                ws_info_a.range(celdas).value = valor
-        print("✅ HOJA 1 completada")
-
-        campos_b_celdas = {
-            'Fecha Inicio Site Survey B': 'G8',
-            'Fecha final Site Survey B': 'AF8',
-            'Nombre del sitio 2': 'J9', 
-            'PROPIETARIO 2': 'M10',
-            'ID 2': 'AF9',
-            'ESTADO 2 ':'AC15',
-            'Calle 2': 'D14',
-            'Colonia 2': 'D15',
-            'Municipio 2': 'E16',
-            'C.P 2': 'AC14',
-            'Referencias 2':'J17',
-            'Nombre de contacto en sitio 2': 'H19',
-            'Telefono 2': 'AB19',
-            'LATITUD (TORRE) 2': 'K30',
-            'LONGITUD (TORRE) 2': 'AA30',
-            'LATITUD (FACHADA) 2': 'K27',
-            'LONGITUD (FACHADA) 2': 'AA27',
-            'Altitud (msnm) 2': 'M31',
-            'Horario de solicitud de accesos B': 'Q50',
-            'Contacto solicitud de accesos B': 'B52',
-            'Como o donde obtener permisos/llave/tarjeta B': 'O49',
-            'Comentario:Forma de ingresar el equipo al sitio es con: B': 'B57',
-            'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-            'Si la respuesta anterior es si, Indique a que distancia B':'AD72',
-            # Campos adicionales críticos para Hoja 2
-            'Referencias 2': 'K16',
-            'LATITUD (TORRE) 2': 'L29',
-            'LONGITUD (TORRE) 2': 'AB29',
-            'LATITUD (FACHADA) 2': 'L26',
-            'LONGITUD (FACHADA) 2': 'AB26',
-            'Altitud (msnm) 2': 'N30',
-            'Nombre de contacto en sitio 2': 'I18',
-            'Telefono 2': 'AC18',
-            'PROPIETARIO 2': 'N9',
-            'ESTADO 2 ': 'AD14'
-        }
-        for campo, celdas in campos_b_celdas.items():
-            valor_raw = row.get(campo, "")
-            valor = normaliza_na(valor_raw)
-            print(f"🔍 HOJA 2 - Campo: '{campo}' -> Celda: {celdas} -> Valor: '{valor}' (original: '{valor_raw}')")
-            
-            # Verificar si el campo existe en el DataFrame
-            if campo in row.index:
-                print(f"  ✅ Campo encontrado en DataFrame")
-            else:
-                print(f"  ❌ Campo NO encontrado en DataFrame - buscando variaciones...")
-                # Buscar variaciones del nombre del campo
-                for campo_df in row.index:
-                    if campo.lower() in campo_df.lower() or campo_df.lower() in campo.lower():
-                        print(f"    🔍 Posible variación: '{campo_df}' = '{row.get(campo_df, 'N/A')}'")
-            
-            if isinstance(celdas, list):
-                for celda in celdas:
-                    ws_info_b.range(celda).value = valor
-                    print(f"  ✅ Escrito en {celda}: {valor}")
-            else:
-                ws_info_b.range(celdas).value = valor
-                print(f"  ✅ Escrito en {celdas}: {valor}")
-        
-        print("✅ HOJA 2 completada")
-
-        campos_c_celdas = {
-        'NOMBRE DEL SITIO': 'G7',
-        'Diametro de pierna superior':'K9',
-        'Diametro de pierna Inferior':'U9',
-        'NCRA RB':'AC9',
-        'Franja2RB':'AM9',
-        'Altura de la Torre':'K10',
-        'Dado':'U10',
-        'Altura Edificio1':'AE10',
-        'Nivel inferior de franja disponible': 'T11',
-        'Nivel superior de franja disponible': 'AK11',
-        'Altura de MW conforme a topologia': 'B14',
-        'Azimut RB ': 'M14',
-        'Propuesta de altura de antena de MW1': 'AB14',
-        'Propuesta de altura de antena de MW (SD)1': 'AJ14',
-        'Altura de soporte para OMB propuesto': 'O19',
-        'Longitud del cable de tierra nuevo OMB': 'O20',
-        'Longitud del cable de tierra ODU': 'O21',
-        'Longitud de cable IF': 'O22',
-        'Tipo de soporte para antena MW propuesto': 'O23',
-        'Longitud de cable ACDB-Nuevo OMB': 'O24',
-        'Longitud de cable RTN - Router':'O25',
-        'Longitud de cable RTN - BBU SITE 1': 'O26',
-        'MEDICION DE BARRA DE TIERRA (Ohms)':'O28',
-        'Nombre del sitio 2': 'G31',
-        'Diámetro de Pierna superio2':'K33',
-        'Diámetro de Pierna inferior2':'U33',
-        ' NCRA2 ':'AC33',
-        'Franja2-2':'AM33',
-        'Altura torre 2': 'K34',
-        'DADO 2':'U34',
-        'Altura edificio 2':'AE34',
-        'Nivel inferior de franja disponible 2': 'T35',
-        'Nivel superior de franja disponible 2': 'AK35',
-        'Altura de MW conforme a topologia 2': 'B38',
-        'Azimut 2': 'M38',
-        'Propuesta de altura de antena de MW2': 'AB38',
-        'Propuesta de altura de antena de MW (SD)2':'AJ38',
-        'Altura de soporte para OMB propuesto2':'O43',
-        'Longitud del cable de tierra nuevo OMB 2': 'O44',
-        'Longitud del cable de tierra ODU 2': 'O45',
-        'Longitud de cable IF 2': 'O46',
-        'Tipo de soporte para antena MW propuesto 2': 'O47',
-        'Longitud de cable ACDB-Nuevo OMB 2': 'O48',
-        'Longitud de cable RTN - Router 2': 'O49',
-        'Longitud de cable RTN - BBU 2': 'O50',
-        'Medición del Sistema de Tierras 2': 'O52',
-        }
-        for campo, celdas in campos_c_celdas.items():
-            valor_raw = row.get(campo, "")
-            valor = normaliza_na(valor_raw)
-            print(f"ws_info_c: Escribiendo en {celdas} el valor '{valor}' para campo '{campo}' (original: {valor_raw}, tipo: {type(valor_raw)})")
-            if isinstance(celdas, list):
-                for celda in celdas:
-                    ws_info_c.range(celda).value = valor
-            else:
-                ws_info_c.range(celdas).value = valor   
-
-        print("✅ LLENADO COMPLETO DEL ARCHIVO PTP FINALIZADO")
-        
-        # Guardar y cerrar
-        wb.save(output_path)
-        wb.close()
-        app_excel.quit()
-        
-        print("🎉 ARCHIVO PTP GENERADO EXITOSAMENTE!")
-        return True
-        
-    except Exception as e:
-        print(f"❌ ERROR en llenar_archivo_ptp_optimizado: {e}")
-        import traceback
-        print(f"🔍 Traceback completo: {traceback.format_exc()}")
-        
-        # Intentar cerrar Excel si está abierto
-        try:
-            if 'wb' in locals():
-                wb.close()
-            if 'app_excel' in locals():
-                app_excel.quit()
-        except:
-            pass
-        
-        return False
-
 def site_survey_generator(user_id, fila_idx, tipo_documento):
     """
     Genera Y LLENA un archivo de Site Survey automáticamente
@@ -9413,131 +8434,31 @@ def site_survey_generator(user_id, fila_idx, tipo_documento):
         if not user_id:
             return False
         
-        # FORZAR ACTUALIZACIÓN DEL CACHE para asegurar datos frescos
-        print(f"🔄 Forzando actualización del cache para ID: {user_id}")
-        
-        global data_cache
-        
-        print(f"🔍 Tipo de data_cache: {type(data_cache)}")
-        print(f"🔍 Contenido del cache antes de limpiar: {data_cache}")
-        print(f"🔍 Cache antes de limpiar: {len(data_cache) if hasattr(data_cache, '__len__') else 'N/A'}")
-        
-        # Limpiar cache de forma segura
+        # Confirmar que la fila de este ID esté vigente en Google Sheets
+        # (solo se consulta su fila; el snapshot compartido sigue caliente)
+        reportar_fase('datos')
+        print(f"🔄 Confirmando frescura de la fila para ID: {user_id}")
         try:
-            if hasattr(data_cache, 'clear'):
-                data_cache.clear()  # Método estándar
-                print(f"✅ Cache.clear() ejecutado")
-            else:
-                print(f"⚠️ Cache no tiene método clear(), usando método alternativo")
-                # Recrear el cache como objeto DataCache
-                from cache_optimizer import DataCache
-                data_cache = DataCache()
-                print(f"✅ Cache recreado como objeto DataCache")
+            df_db = hoja_enlaces.dataframe_para_id(user_id)
         except Exception as e:
-            print(f"⚠️ Error limpiando cache: {e}")
-            # Recrear el cache como último recurso
-            try:
-                from cache_optimizer import DataCache
-                data_cache = DataCache()
-                print(f"✅ Cache recreado como último recurso")
-            except Exception as e2:
-                print(f"❌ Error crítico recreando cache: {e2}")
-                return False
-        
-        print(f"🔍 Cache después de limpiar: {len(data_cache) if hasattr(data_cache, '__len__') else 'N/A'}")
-        print(f"🔍 Contenido del cache después de limpiar: {data_cache}")
-        print(f"🔍 Tipo del cache después de limpiar: {type(data_cache)}")
-        print(f"🔍 ¿Cache tiene método set? {hasattr(data_cache, 'set')}")
-        print(f"🔍 ¿Cache tiene método get? {hasattr(data_cache, 'get')}")
-        print(f"🔍 Cache limpiado completamente")
-        
-        # Obtener datos frescos desde Google Sheets
-        print(f"🔄 Descargando datos frescos desde Google Sheets...")
-        print(f"🔍 Llamando a get_cached_dataframe()...")
-        print(f"🔍 Estado del cache antes de llamar: {type(data_cache)}")
-        
-        df_db = get_cached_dataframe()
+            print(f"❌ Error obteniendo datos para {user_id}: {e}")
+            df_db = pd.DataFrame()
         
-        print(f"🔄 Datos descargados. Total de filas: {len(df_db)}")
-        print(f"🔄 Primeros 5 IDs: {df_db['ID'].head().tolist() if not df_db.empty and 'ID' in df_db.columns else 'NO DISPONIBLE'}")
-        print(f"🔄 Últimos 5 IDs: {df_db['ID'].tail().tolist() if not df_db.empty and 'ID' in df_db.columns else 'NO DISPONIBLE'}")
+        print(f"🔄 Datos obtenidos. Total de filas: {len(df_db)}")
         
         # Debug adicional: verificar que los datos se hayan descargado correctamente
-        if df_db.empty:
-            print(f"❌ ERROR: DataFrame está vacío - no se pudieron descargar datos")
-            print(f"🔍 Verificando estado del cache después de descarga...")
-            print(f"🔍 Tipo del cache: {type(data_cache)}")
-            print(f"🔍 ¿Cache tiene método set? {hasattr(data_cache, 'set')}")
-            print(f"🔍 ¿Cache tiene método get? {hasattr(data_cache, 'get')}")
-            return False
-        
-        # Debug adicional: verificar que los datos sean realmente frescos
-        print(f"🔍 Verificando que los datos sean frescos...")
-        print(f"🔍 ¿El DataFrame está vacío? {df_db.empty}")
-        print(f"🔍 ¿Tiene columnas? {list(df_db.columns) if not df_db.empty else 'NO'}")
-        print(f"🔍 ¿Tiene la columna ID? {'ID' in df_db.columns if not df_db.empty else False}")
-        
-        if not df_db.empty and 'ID' in df_db.columns:
-            print(f"🔍 Total de IDs únicos: {df_db['ID'].nunique()}")
-            print(f"🔍 IDs únicos: {df_db['ID'].unique().tolist()}")
-        else:
-            print(f"❌ ERROR: DataFrame vacío o sin columna ID")
+        if df_db.empty or 'ID' not in df_db.columns:
+            print(f"❌ ERROR: DataFrame vacío o sin columna ID - no se pudieron descargar datos")
+            print(f"🔍 Estado del snapshot: {hoja_enlaces.info()}")
             return False
         
-        # Debug adicional: verificar que no haya duplicados
-        ids_duplicados = df_db['ID'].duplicated().sum()
-        if ids_duplicados > 0:
-            print(f"⚠️ ADVERTENCIA: Se encontraron {ids_duplicados} IDs duplicados en el DataFrame")
-            ids_dups = df_db[df_db['ID'].duplicated()]['ID'].tolist()
-            print(f"⚠️ IDs duplicados: {ids_dups}")
-        else:
-            print(f"✅ No hay IDs duplicados en el DataFrame")
-        
-        # Buscar la fila correcta
-        print(f"🔍 Buscando ID: {user_id} en DataFrame...")
-        print(f"🔍 Tipo de user_id: {type(user_id)}")
-        print(f"🔍 Valor de user_id: '{user_id}'")
-        print(f"🔍 ¿user_id es string? {isinstance(user_id, str)}")
-        print(f"🔍 ¿user_id está vacío? {user_id == '' if isinstance(user_id, str) else 'N/A'}")
-        
-        print(f"🔍 Total de filas en DataFrame: {len(df_db)}")
-        print(f"🔍 Columnas disponibles: {list(df_db.columns)}")
-        print(f"🔍 Primeros 5 IDs en DataFrame: {df_db['ID'].head().tolist()}")
-        print(f"🔍 Últimos 5 IDs en DataFrame: {df_db['ID'].tail().tolist()}")
-        
-        # Debug adicional: verificar tipos de datos
-        print(f"🔍 Tipos de datos en columna ID:")
-        print(f"🔍   - Tipo de la columna: {df_db['ID'].dtype}")
-        print(f"🔍   - Primeros 3 tipos: {[type(x) for x in df_db['ID'].head(3)]}")
-        print(f"🔍   - ¿Hay valores None/NaN? {df_db['ID'].isna().sum()}")
-        print(f"🔍   - ¿Hay valores vacíos? {(df_db['ID'] == '').sum()}")
-        
-        # Buscar por ID exacto
-        print(f"🔍 Iniciando búsqueda exacta del ID...")
+        # Los IDs duplicados se reportan al construir el índice del snapshot
+        # Buscar por ID exacto usando el índice hash del snapshot
+        print(f"🔍 Buscando ID: '{user_id}' en el índice del snapshot...")
+        filas_encontradas = filas_por_id(df_db, user_id)
         
-        # Verificar si el ID existe antes de buscar
-        if user_id in df_db['ID'].values:
-            print(f"✅ ID '{user_id}' SÍ existe en el DataFrame")
-        else:
-            print(f"❌ ID '{user_id}' NO existe en el DataFrame")
-            print(f"🔍 IDs disponibles: {df_db['ID'].unique().tolist()}")
-            
-            # Buscar IDs similares
-            print(f"🔍 Buscando IDs similares...")
-            for id_df in df_db['ID'].unique():
-                if isinstance(id_df, str) and isinstance(user_id, str):
-                    if user_id.lower() in id_df.lower() or id_df.lower() in user_id.lower():
-                        print(f"🔍 Posible coincidencia: '{id_df}' vs '{user_id}'")
-        
-        user_id_mask = df_db['ID'] == user_id
-        print(f"🔍 Máscara de búsqueda creada: {user_id_mask.sum()} coincidencias")
-        print(f"🔍 IDs encontrados: {df_db[user_id_mask]['ID'].tolist() if user_id_mask.any() else 'NINGUNO'}")
-        print(f"🔍 Tipo de user_id recibido: {type(user_id)}, Valor: '{user_id}'")
-        print(f"🔍 Tipos de IDs en DataFrame: {df_db['ID'].dtype}")
-        
-        if user_id_mask.any():
+        if not filas_encontradas.empty:
             # DEBUG CRÍTICO: Mostrar TODAS las filas encontradas
-            filas_encontradas = df_db[user_id_mask]
             print(f"🔍 DEBUG CRÍTICO - FILAS ENCONTRADAS:")
             print(f"  - Total de filas con ID '{user_id}': {len(filas_encontradas)}")
             
@@ -9570,14 +8491,13 @@ def site_survey_generator(user_id, fila_idx, tipo_documento):
             print(f"  - ¿user_id coincide con ID? {row.get('ID', '') == user_id}")
             
             # Verificar que no haya confusión con IDs duplicados
-            if row.get('ID', '') != user_id:
+            if str(row.get('ID', '')).strip() != str(user_id).strip():
                 print(f"❌ ERROR CRÍTICO: Los datos NO corresponden al ID solicitado!")
                 print(f"❌ ID solicitado: '{user_id}'")
                 print(f"❌ ID en datos: '{row.get('ID', 'NO ENCONTRADO')}'")
                 return False
         else:
             print(f"❌ ERROR CRÍTICO: El ID '{user_id}' NO existe en la base de datos")
-            print(f"❌ IDs disponibles: {df_db['ID'].unique().tolist()}")
             print(f"❌ NO se puede usar fila_idx como fallback - esto causaría datos incorrectos")
             return False
         
@@ -9597,18 +8517,31 @@ def site_survey_generator(user_id, fila_idx, tipo_documento):
         print(f"🔥 Iniciando llenado automático completo...")
         
         try:
-            # Copiar plantilla primero
-            import shutil
-            shutil.copy2(plantilla_path, output_path)
-            
-            # Ahora llenar el archivo usando la lógica optimizada
-            print(f"📊 Llenando archivo con datos de {nombre_a} → {nombre_b}")
-            
-            # Llamar a la función de llenado optimizado
-            llenado_exitoso = llenar_archivo_ptp_optimizado(output_path, row, nombre_a, nombre_b, user_id)
+            # El libro depende solo de la plantilla y de la fila: si no cambiaron se reutiliza
+            clave = clave_generacion(
+                'site_survey', tipo_documento, registro_plantillas.obtener(plantilla_path).huella,
+                huella_fila(row), nombre_a, nombre_b, BACKEND_LLENADO, VERSION_NORMALIZACION, VERSION_GENERACION
+            )
+            reportar_fase('llenado')
+            if cache_generaciones.copiar_a(clave, output_path):
+                print(f"⚡ Site Survey recuperado de la caché de generaciones: {output_path}")
+                llenado_exitoso = True
+            else:
+                # Copiar plantilla primero
+                registro_plantillas.clonar(plantilla_path, output_path)
+                
+                # Ahora llenar el archivo usando la lógica optimizada
+                print(f"📊 Llenando archivo con datos de {nombre_a} → {nombre_b}")
+                
+                # Llamar a la función de llenado optimizado
+                llenado_exitoso = ejecutar_llenado(llenar_archivo_ptp_optimizado, output_path, row, nombre_a, nombre_b, user_id)
+                if llenado_exitoso:
+                    cache_generaciones.guardar(clave, output_path)
             
             if llenado_exitoso:
                 print(f"✅ Archivo generado Y LLENADO COMPLETAMENTE: {output_path}")
+                registrar_artefacto(output_path)
+                indexar_artefacto(user_id, TIPO_SITE_SURVEY_PTMP if tipo_documento == 'ptmp' else TIPO_SITE_SURVEY, output_path)
                 
                 # ===== COPIAR ARCHIVOS AUTOMÁTICAMENTE =====
                 print(f"📁 Iniciando copia automática de archivos...")
@@ -9674,9 +8607,9 @@ def llenar_con_openpyxl_alternativo(user_id, fila_idx, tipo_documento):
         df_db = get_cached_dataframe()
         
         # Buscar la fila correcta
-        user_id_mask = df_db['ID'] == user_id
-        if user_id_mask.any():
-            row = df_db[user_id_mask].iloc[0]
+        coincidencias = filas_por_id(df_db, user_id)
+        if not coincidencias.empty:
+            row = coincidencias.iloc[0]
             nombre_a = row.get('Nombre del sitio A', 'Sitio no encontrado')
             nombre_b = row.get('Nombre del sitio B', 'Sitio no encontrado')
         else:
@@ -9967,7 +8900,7 @@ def generar_diseno_solucion():
         
         # Leer datos de Google Sheets
         try:
-            df = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df = hoja_enlaces.dataframe()
             logger.info(f"Google Sheets leído correctamente, {len(df)} filas")
         except Exception as e:
             logger.error(f"No se pudo leer Google Sheets: {e}")
@@ -10005,7 +8938,6 @@ def generar_diseno_solucion():
         
         # Usar la plantilla específica para DISEÑO DE SOLUCIÓN
         try:
-            import xlwings as xw
             
             # Ruta de la plantilla de diseño de solución
             plantilla_path = os.path.join(base_dir, 'Temp', 'plantillas', 'llenadoauto.xlsx')
@@ -10023,27 +8955,21 @@ def generar_diseno_solucion():
                 archivos_en_directorio = os.listdir(directorio_plantillas)
                 print(f"🔍 DEBUG: Archivos en directorio de plantillas: {archivos_en_directorio}")
             
-            if not os.path.exists(plantilla_path):
+            try:
+                registro_plantillas.obtener('diseno_solucion')
+            except PlantillaInvalida as e:
                 return jsonify({
                     'success': False, 
-                    'message': f'Plantilla de diseño de solución no encontrada en: {plantilla_path}'
+                    'message': f'Plantilla de diseño de solución no válida: {e}'
                 })
             
             print(f"✅ DEBUG: Plantilla de diseño de solución encontrada y será usada: {plantilla_path}")
             
-            # Iniciar Excel solo si es necesario
+            # Excel en Windows; sin Excel, el motor headless (FANGIO_LLENADO_BACKEND)
             app_excel = None
             try:
-                # Solo abrir Excel en Windows
-                if os.name == 'nt':
-                    app_excel = xw.App(visible=False)
-                    print('DEBUG: Excel iniciado para diseño de solución')
-                else:
-                    print('DEBUG: No es Windows, saltando Excel')
-                    return jsonify({
-                        'success': False, 
-                        'message': 'Generación de archivos Excel solo disponible en Windows'
-                    })
+                app_excel = abrir_excel(visible=False)
+                print(f'DEBUG: Motor de llenado iniciado para diseño de solución ({BACKEND_LLENADO})')
             except Exception as excel_error:
                 print(f'DEBUG: Error iniciando Excel: {excel_error}')
                 return jsonify({
@@ -10110,9 +9036,7 @@ def generar_diseno_solucion():
                     print(f"🚀 Llenado automático solicitado - generando archivo YA LLENADO para {user_id}")
                     
                     try:
-                        # En lugar de copiar solo la plantilla, usar /procesar para generar archivo YA LLENADO
-                        import requests
-                        
+                        # En lugar de copiar solo la plantilla, usar el llenado de /procesar para generar archivo YA LLENADO
                         # Crear formulario para /procesar
                         form_data = {
                             'user_id': user_id,
@@ -10121,12 +9045,12 @@ def generar_diseno_solucion():
                             'llenado_automatico': 'true'
                         }
                         
-                        # Llamar a /procesar para generar archivo YA LLENADO
-                        print(f"🔄 Llamando a /procesar para generar archivo con llenado automático...")
-                        response = requests.post('http://127.0.0.1:5000/procesar', data=form_data)
-                        response = requests.post(f'{get_base_url()}/procesar', data=form_data)
+                        # Ejecutar el llenado como trabajo y esperar el resultado
+                        print(f"🔄 Generando archivo con llenado automático...")
+                        trabajo_llenado = enviar_llenado(form_data)
+                        trabajo_llenado.esperar()
                         
-                        if response.status_code == 200:
+                        if trabajo_llenado.estado == 'completado':
                             print(f"✅ Archivo generado YA LLENADO exitosamente para {user_id}")
                             # El archivo ya está llenado, retornar éxito inmediatamente
                             return jsonify({
@@ -10137,23 +9061,24 @@ def generar_diseno_solucion():
                                 'llenado_automatico': True
                             })
                         else:
-                            print(f"❌ Error en generación con llenado automático: {response.status_code} - {response.text}")
+                            print(f"❌ Error en generación con llenado automático: {trabajo_llenado.error}")
                             # En caso de error, continuar con la generación normal
                             import shutil
-                            shutil.copy2(plantilla_path, archivo_destino)
+                            registro_plantillas.clonar(plantilla_path, archivo_destino)
                             print(f"⚠️ Continuando con generación normal (sin llenado automático)")
                     except Exception as e:
                         print(f"❌ Error en llenado automático: {e}")
                         # En caso de error, continuar con la generación normal
                         import shutil
-                        shutil.copy2(plantilla_path, archivo_destino)
+                        registro_plantillas.clonar(plantilla_path, archivo_destino)
                         print(f"⚠️ Continuando con generación normal (sin llenado automático)")
                 else:
                     # Generación normal sin llenado automático
                     import shutil
-                    shutil.copy2(plantilla_path, archivo_destino)
+                    registro_plantillas.clonar(plantilla_path, archivo_destino)
                     print(f"DEBUG: Archivo de DISEÑO DE SOLUCIÓN generado copiando plantilla: {archivo_destino}")
                 
+                indexar_artefacto(user_id, TIPO_DISENO, archivo_destino)
                 return jsonify({
                     'success': True,
                     'message': f'Archivo de DISEÑO DE SOLUCIÓN generado exitosamente: {nombre_archivo}',
@@ -10524,8 +9449,8 @@ def generar_site_survey_automatico():
             return jsonify({'success': False, 'message': 'ID de usuario requerido'})
         
         # Buscar el ID en Google Sheets
-        df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
-        user_id_found = df_db[df_db['ID'] == user_id]
+        df_db = hoja_enlaces.dataframe()
+        user_id_found = filas_por_id(df_db, user_id)
         
         if user_id_found.empty:
             return jsonify({'success': False, 'message': f'ID {user_id} no encontrado en la base de datos'})
@@ -10669,7 +9594,7 @@ def forzar_cierre_excel():
             if 'excel.exe' in result.stdout:
                 print("🔍 Encontrados procesos de Excel activos")
                 # Forzar cierre de todos los procesos de Excel
-                subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                cerrar_procesos_excel()
                 print("🔄 Procesos de Excel terminados")
                 time.sleep(2)
             else:
@@ -10737,7 +9662,7 @@ def reporte_planeacion():
     datos = None
     if fila_idx:
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df_db = hoja_enlaces.dataframe()
             row = df_db.loc[int(fila_idx)]
             datos = row.to_dict()
         except Exception as e:
@@ -10768,7 +9693,7 @@ def formulario_archivos():
     sitio_b = ''
     if fila_idx:
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df_db = hoja_enlaces.dataframe()
             row = df_db.loc[int(fila_idx)]
             id_sitio = row.get('ID', '') or ''
             sitio_a = row.get('Nombre del sitio A', '') or ''
@@ -10909,8 +9834,7 @@ def insertar_word_diseno():
         
         # Insertar el Word en el Excel usando xlwings
         try:
-            import xlwings as xw
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -11029,8 +9953,7 @@ def insertar_imagenes_electricas():
         
         # Insertar las imágenes en el Excel usando xlwings
         try:
-            import xlwings as xw
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -11132,7 +10055,7 @@ def buscar_puntas_b_disponibles():
         
         # Leer la base de datos de Google Sheets
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL, keep_default_na=False, na_values=[])
+            df_db = hoja_enlaces.dataframe(texto=True)
             print(f"📊 DEBUG: Base de datos cargada, {len(df_db)} registros encontrados")
         except Exception as e:
             print(f"❌ ERROR: No se pudo cargar la base de datos: {e}")
@@ -11204,16 +10127,13 @@ def verificar_punta_b_e_iniciar_llenado():
         
         # Leer la base de datos de Google Sheets
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL, keep_default_na=False, na_values=[])
+            df_db = hoja_enlaces.dataframe(texto=True)
         except Exception as e:
             return jsonify({'success': False, 'error': f'Error leyendo base de datos: {str(e)}'})
         
         # Buscar el usuario en la base de datos
-        coincidencias = df_db[df_db['ID'] == user_id]
+        coincidencias = filas_por_id(df_db, user_id)
         print(f"🔍 DEBUG: Coincidencias encontradas: {len(coincidencias)}")
-        print(f"🔍 DEBUG: Tipo de coincidencias.index: {type(coincidencias.index)}")
-        print(f"🔍 DEBUG: Valor de coincidencias.index[0]: {coincidencias.index[0]}")
-        print(f"🔍 DEBUG: Tipo de coincidencias.index[0]: {type(coincidencias.index[0])}")
         
         if coincidencias.empty:
             return jsonify({'success': False, 'error': f'Usuario {user_id} no encontrado en la base de datos'})
@@ -11304,12 +10224,12 @@ def verificar_id_especifico():
         
         # Leer la base de datos de Google Sheets
         try:
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL, keep_default_na=False, na_values=[])
+            df_db = hoja_enlaces.dataframe(texto=True)
         except Exception as e:
             return jsonify({'success': False, 'error': f'Error leyendo base de datos: {str(e)}'})
         
         # Buscar el usuario en la base de datos
-        coincidencias = df_db[df_db['ID'] == user_id]
+        coincidencias = filas_por_id(df_db, user_id)
         
         if coincidencias.empty:
             return jsonify({'success': False, 'error': f'Usuario {user_id} no encontrado en la base de datos'})
@@ -11386,7 +10306,7 @@ def verificar_id_especifico():
 #         # Insertar en Excel usando xlwings
 #         try:
 #             import xlwings as xw
-#             app_excel = xw.App(visible=False)
+#             app_excel = abrir_excel(visible=False)
 #             app_excel.display_alerts = False
 #             wb = app_excel.books.open(ruta_excel)
 #             
@@ -11423,242 +10343,667 @@ def verificar_id_especifico():
 #         return f"❌ Error general: {str(e)}"
 
 
-@app.route('/procesar', methods=['POST'])
-def procesar():
-    import pandas as pd
-    import shutil
-    import os
-    import time
-    import xlwings as xw
-    import re
-    from werkzeug.utils import secure_filename
-    
-    # Definir base_dir
-    base_dir = os.path.dirname(os.path.abspath(__file__))
+def pagina_diseno_generado(user_id, fila_idx, nombre_a='', nombre_b=''):
+    """Página de confirmación de un diseño de solución generado (mismo estilo que Site Survey)"""
+    html = f"""
+    <!DOCTYPE html>
+    <html lang="es">
+    <head>
+        <meta charset="UTF-8">
+        <title>FANGIO TELECOM | Documento Generado</title>
+        <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">
+        <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;600;700;800;900&display=swap" rel="stylesheet">
+        <style>
+            * {{
+                margin: 0;
+                padding: 0;
+                box-sizing: border-box;
+            }}
 
-    print("=== INICIO PROCESAR ===")
-    print(f"DEBUG: request.files.keys() = {list(request.files.keys())}")
-    print(f"DEBUG: request.form.keys() = {list(request.form.keys())}")
-    
-    # Debug: mostrar todos los archivos recibidos
-    print("=== ARCHIVOS RECIBIDOS ===")
-    for key, file_list in request.files.lists():
-        if isinstance(file_list, list):
-            for i, file in enumerate(file_list):
-                if file and file.filename:
-                    print(f"  {key}[{i}]: {file.filename} ({file.content_type})")
-        else:
-            if file_list and file_list.filename:
-                print(f"  {key}: {file_list.filename} ({file_list.content_type})")
-    print("=== FIN ARCHIVOS RECIBIDOS ===")
-    
-    fila_idx = request.form.get('fila_idx')
-    user_id = request.form.get('user_id')
-    tipo = request.form.get('tipo', 'site_survey')  # Por defecto site_survey si no se especifica
-    print(f"DEBUG: Tipo recibido en procesar: '{tipo}'")
+            body {{
+                font-family: 'Montserrat', Arial, sans-serif;
+                min-height: 100vh;
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                background-size: cover;
+                background-position: center;
+                background-attachment: fixed;
+                background-repeat: no-repeat;
+                display: flex;
+                flex-direction: column;
+                justify-content: center;
+                align-items: center;
+                position: relative;
+                overflow-x: hidden;
+                color: #333;
+            }}
 
-    # Usar siempre la plantilla fija
-    template_path = TEMPLATE_PATH
-    template_filename = os.path.basename(TEMPLATE_PATH)
-    if not os.path.exists(template_path):
-        return f"Falta la plantilla fija en la ruta esperada: {template_path}"
+            .world-background {{
+                position: fixed;
+                top: 0;
+                left: 0;
+                right: 0;
+                bottom: 0;
+                background: url('{url_for('static', filename='images/earth-background.jpg')}') no-repeat center center;
+                background-size: cover;
+                opacity: 0.3;
+                z-index: -1;
+            }}
 
-    # --- NUEVO: Usar Google Sheets fijo como base de datos ---
-    try:
-        df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL, keep_default_na=False, na_values=[])
-    except Exception as e:
-        return f"Error leyendo la base de datos de Google Sheets: {e}"
+            .main-container {{
+                width: 100%;
+                max-width: 800px;
+                margin: 0 auto;
+                padding: 20px;
+                z-index: 1;
+            }}
 
-    # --- CORRECCIÓN: Definir output_path según el tipo de documento ---
-    if tipo == 'diseno_solucion':
-        # Para diseño de solución, guardar en archivos_generados con nombre ds_
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-        os.makedirs(archivos_generados_dir, exist_ok=True)
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-        user_id_limpio = re.sub(r'[^a-zA-Z0-9_-]', '', str(user_id))
-        output_path = os.path.join(archivos_generados_dir, f'ds_diseno_solucion_{user_id_limpio}_{timestamp}.xlsx')
-        print(f"DEBUG: Archivo de diseño de solución se guardará en: {output_path}")
-    else:
-        # Para otros tipos, usar la lógica original
-        output_path = os.path.join(UPLOAD_FOLDER, f'LLENADO_{template_filename or "template.xlsx"}')
-        print(f"DEBUG: Archivo se guardará en: {output_path}")
+            .content-card {{
+                background: rgba(255, 255, 255, 0.95);
+                backdrop-filter: blur(10px);
+                border-radius: 20px;
+                padding: 40px;
+                box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
+                text-align: center;
+            }}
 
-    # --- 1. Recibe y guarda archivos ---
-    imagenes = request.files.getlist('imagenes_electricas')  # Cambiado de 'imagenes' a 'imagenes_electricas'
-    pdf_paths = []
-    pdfs = request.files.getlist('pdf_file')  # Cambiado de 'pdfs' a 'pdf_file'
-    print(f"DEBUG: pdfs recibidos = {len(pdfs)}")
-    for idx, pdf in enumerate(pdfs):
-        print(f"DEBUG: pdf {idx}: {pdf.filename if pdf else 'None'}")
-    
-    for idx, pdf in enumerate(pdfs):
-        if pdf and pdf.filename:
-            filename = secure_filename(f"{idx}_{pdf.filename}")
-            pdf_path = os.path.join(UPLOAD_FOLDER, filename)
-            pdf.save(pdf_path)
-            pdf_paths.append(pdf_path)
-            print(f"DEBUG: PDF guardado: {pdf_path}")
-        else:
-            print(f"DEBUG: PDF {idx} no válido: {pdf}")
-    
-    print(f"DEBUG: pdf_paths final = {pdf_paths}")
-    
-    print(f"DEBUG: imagenes recibidas = {len(imagenes)}")
-    for idx, img in enumerate(imagenes):
-        print(f"DEBUG: imagen {idx}: {img.filename if img else 'None'}")
-    
-    imagen_paths = []
-    for idx, img in enumerate(imagenes):
-        if img and img.filename:
-            filename = secure_filename(f"{idx}_{img.filename}")
-            img_path = os.path.join(UPLOAD_FOLDER, filename)
-            img.save(img_path)
-            imagen_paths.append(img_path)
-            print(f"DEBUG: Imagen guardada: {img_path}")
-        else:
-            print(f"DEBUG: Imagen {idx} no válida: {img}")
-    
-    print(f"DEBUG: imagen_paths final = {imagen_paths}")
-    
-    if not user_id:
-        return "Falta el ID"
+            .header {{
+                margin-bottom: 30px;
+            }}
 
-    # --- SELECCIÓN DEL REGISTRO CORRECTO ---
-    if fila_idx is not None and fila_idx != "":
-        try:
-            datos = df_db.loc[int(fila_idx)]
-        except (ValueError, TypeError):
-            return "Índice de fila inválido"
-    else:
-        coincidencias = df_db[df_db['ID'] == user_id]
-        if coincidencias.empty:
-            return "ID no encontrado en la base de datos."
-        datos = coincidencias.iloc[0]
+            .success-icon {{
+                width: 80px;
+                height: 80px;
+                background: linear-gradient(135deg, #00c37a 0%, #00a870 100%);
+                border-radius: 50%;
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                margin: 0 auto 20px;
+                box-shadow: 0 10px 30px rgba(0, 195, 122, 0.4);
+                animation: pulse 2s infinite;
+            }}
 
-    # Para depuración: imprime las columnas disponibles
-    print("Columnas disponibles:", list(datos.index))
+            @keyframes pulse {{
+                0% {{ transform: scale(1); }}
+                50% {{ transform: scale(1.05); }}
+                100% {{ transform: scale(1); }}
+            }}
 
-    imagen_b_file = request.files.get('imagen_b')
-    imagen_b_path = None
-    if imagen_b_file and imagen_b_file.filename:
-        imagen_b_filename = secure_filename(imagen_b_file.filename or "")
-        imagen_b_path = os.path.join(UPLOAD_FOLDER, imagen_b_filename)
-        imagen_b_file.save(imagen_b_path)
+            .success-icon i {{
+                font-size: 2.5rem;
+                color: white;
+            }}
 
-    archivo_excel_b = request.files.get('archivo_excel_b')
-    archivo_excel_b_path = None
-    if archivo_excel_b and archivo_excel_b.filename:
-        archivo_excel_b_filename = secure_filename(archivo_excel_b.filename or "")
-        archivo_excel_b_path = os.path.join(UPLOAD_FOLDER, archivo_excel_b_filename)
-        if os.path.exists(archivo_excel_b_path):
-            try:
-               os.remove(archivo_excel_b_path)
-            except Exception as e:
-                return f"Error: No se pudo eliminar el archivo de destino. Detalle: {e}"
-        archivo_excel_b.save(archivo_excel_b_path)
+            .success-title {{
+                color: #00c37a;
+                font-size: 2.5rem;
+                font-weight: 700;
+                margin-bottom: 10px;
+                text-shadow: 0 2px 10px rgba(0, 195, 122, 0.3);
+            }}
 
-    
-    word_file = request.files.get('word_file')
-    word_file_path = None
-    if word_file and word_file.filename:
-        word_file_filename = secure_filename(word_file.filename or "")
-        word_file_path = os.path.join(UPLOAD_FOLDER, word_file_filename)
-        word_file.save(word_file_path)
-    
-    imagenes_electricas = request.files.getlist('imagenes_electricas')
-    imagenes_electricas_paths = []
-    for idx, img in enumerate(imagenes_electricas):
-        if img and img.filename:
-            filename = secure_filename(f"electricas_{idx}_{img.filename}")
-            img_path = os.path.join(UPLOAD_FOLDER, filename)
-            img.save(img_path)
-            imagenes_electricas_paths.append(img_path)
+            .success-subtitle {{
+                color: #666;
+                font-size: 1.2rem;
+                margin-bottom: 30px;
+            }}
 
-    from docx import Document
-    import re
+            .info-container {{
+                background: rgba(102, 126, 234, 0.1);
+                border-radius: 15px;
+                padding: 25px;
+                margin-bottom: 30px;
+                border-left: 5px solid #667eea;
+            }}
 
-    enlace_principal = ""
-    nombreEnlace = ""
-    if word_file_path and os.path.exists(word_file_path):
-        doc = Document(word_file_path)
-        word_text = "\n".join([p.text for p in doc.paragraphs])
-        print("WORD TEXT:", word_text)
-        for line in word_text.splitlines():
-            print("LINE:", line)
-            m = re.search(r'Transmission details\s*\(([^)]*)\)', line, re.IGNORECASE)
-            if m:
-                nombreEnlace = m.group(1)
-                nombreEnlace = re.sub(r'\s*\(cambio\)\s*', '', nombreEnlace, flags=re.IGNORECASE)
-                nombreEnlace = re.sub(r'\.pl6\s*$', '', nombreEnlace, flags=re.IGNORECASE)
-                nombreEnlace = nombreEnlace.strip()
-                # SEPARA LOS NOMBRES SI HAY UN GUION Y NÚMEROS
-                partes = re.split(r'\d+[A-Z]-', nombreEnlace)
-                if len(partes) >= 2:
-                    nombre1 = partes[0].strip()
-                    nombre2 = partes[1].split()[0].strip()
-                enlace_principal = f"{nombre1} - {nombre2}"
-            else:
-                enlace_principal = nombreEnlace
-            break  # Solo el primero
-    print("ENLACE PRINCIPAL:", enlace_principal)
-      
-    img_consumo = request.files.get('img_consumo')
-    img_configuracion = request.files.get('img_configuracion')
-    img_linea_vista = request.files.get('img_linea_vista')
+            .info-item {{
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                margin-bottom: 15px;
+                font-size: 1.1rem;
+            }}
 
-    img_consumo_path = None
-    img_configuracion_path = None
-    img_linea_vista_path = None
+            .info-item:last-child {{
+                margin-bottom: 0;
+            }}
 
-    if img_consumo and img_consumo.filename:
-        img_consumo_path = os.path.join(UPLOAD_FOLDER, secure_filename(img_consumo.filename or ""))
-        img_consumo.save(img_consumo_path)
-    if img_configuracion and img_configuracion.filename:
-        img_configuracion_path = os.path.join(UPLOAD_FOLDER, secure_filename(img_configuracion.filename or ""))
-        img_configuracion.save(img_configuracion_path)
-    if img_linea_vista and img_linea_vista.filename:
-        img_linea_vista_path = os.path.join(UPLOAD_FOLDER, secure_filename(img_linea_vista.filename or ""))
-        img_linea_vista.save(img_linea_vista_path)
+            .info-item i {{
+                color: #667eea;
+                margin-right: 12px;
+                font-size: 1.2rem;
+                width: 20px;
+                text-align: center;
+            }}
 
-      # Recibe imagen para hoja 3 (Formato KMZ)
-    imagen_kmz_file = request.files.get('imagen_kmz')
-    print("imagen_kmz_file:", imagen_kmz_file)
-    print("imagen_kmz_file.filename:", imagen_kmz_file.filename if imagen_kmz_file else None)
-    imagen_kmz_path = None
-    if imagen_kmz_file and imagen_kmz_file.filename:
-        imagen_kmz_filename = secure_filename(imagen_kmz_file.filename or "")
-        imagen_kmz_path = os.path.join(UPLOAD_FOLDER, imagen_kmz_filename)
-        imagen_kmz_file.save(imagen_kmz_path)
+            .info-item span {{
+                color: #333;
+                font-weight: 500;
+            }}
 
-    
-    
-    # output_path ya está definido arriba según el tipo de documento
-    kmz_file = request.files.get('kmz')
-    kml_image_file = request.files.get('kml_image')
-    print("kml_image_file:", kml_image_file)
-    print("kml_image_file.filename:", kml_image_file.filename if kml_image_file else None)
-    kml_image_path = None
-    if kml_image_file and kml_image_file.filename:
-        kml_image_filename = secure_filename(kml_image_file.filename or "")
-        kml_image_path = os.path.join(UPLOAD_FOLDER, kml_image_filename)
-        kml_image_file.save(kml_image_path)
+            .buttons-container {{
+                display: flex;
+                flex-direction: column;
+                gap: 15px;
+            }}
 
-    kmz_path = None
-    if kmz_file and kmz_file.filename:
-        kmz_filename = secure_filename(kmz_file.filename or "")
-        kmz_path = os.path.join(UPLOAD_FOLDER, kmz_filename)
-        kmz_file.save(kmz_path)
+            .action-button {{
+                display: flex;
+                align-items: center;
+                justify-content: center;
+                gap: 15px;
+                padding: 20px 30px;
+                border-radius: 12px;
+                text-decoration: none;
+                font-weight: 600;
+                font-size: 1.1rem;
+                transition: all 0.3s ease;
+                border: none;
+                cursor: pointer;
+                position: relative;
+                overflow: hidden;
+                min-height: 60px;
+            }}
 
-    kml_image_path = None
-    if kml_image_file and kml_image_file.filename:
-       kml_image_filename = secure_filename(kml_image_file.filename or "")
-       kml_image_path = os.path.join(UPLOAD_FOLDER, kml_image_filename)
-       kml_image_file.save(kml_image_path)
-    
-    # --- PROCESAR ARCHIVOS ADICIONALES FALTANTES ---
-    
-    # Archivos de planos A
-    planos_a_img1 = request.files.get('planos_a_img1')
+            .save-button {{
+                background: linear-gradient(135deg, #00c37a 0%, #00a870 100%);
+                color: white;
+                box-shadow: 0 8px 25px rgba(0, 195, 122, 0.4);
+            }}
+
+            .save-button:hover {{
+                background: linear-gradient(135deg, #00a870 0%, #00c37a 100%);
+                transform: translateY(-2px);
+                box-shadow: 0 12px 35px rgba(0, 195, 122, 0.6);
+            }}
+
+            .download-button {{
+                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+                color: white;
+                box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
+            }}
+
+            .download-button:hover {{
+                background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
+                transform: translateY(-2px);
+                box-shadow: 0 12px 35px rgba(102, 126, 234, 0.6);
+            }}
+
+            .upload-button {{
+                background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
+                color: white;
+                box-shadow: 0 8px 25px rgba(240, 147, 251, 0.4);
+            }}
+
+            .upload-button:hover {{
+                background: linear-gradient(135deg, #f5576c 0%, #f093fb 100%);
+                transform: translateY(-2px);
+                box-shadow: 0 12px 35px rgba(240, 147, 251, 0.6);
+            }}
+
+            .button-icon {{
+                font-size: 1.3rem;
+                width: 24px;
+                text-align: center;
+            }}
+
+            .button-text {{
+                flex: 1;
+                text-align: center;
+            }}
+
+            .footer {{
+                text-align: center;
+                margin-top: 30px;
+                color: #666;
+                font-size: 0.9rem;
+            }}
+        </style>
+    </head>
+    <body>
+        <!-- Fondo del mundo EXACTO del site survey -->
+        <div class="world-background"></div>
+        
+        <div class="main-container">
+            <div class="content-card">
+            <div class="header">
+                <div class="success-icon">
+                        <i class="fas fa-check-circle"></i>
+                </div>
+                <h1 class="success-title">¡Documento Generado!</h1>
+                    <p class="success-subtitle">Diseño de Solución completado exitosamente</p>
+                    {f'<div class="llenado-status" id="llenadoStatus"><i class="fas fa-spinner fa-spin"></i> Llenado automático en progreso...</div>' if llenado_automatico == 'true' else ''}
+                </div>
+                
+                <div class="info-container">
+                    <div class="info-item">
+                        <i class="fas fa-id-card"></i>
+                        <span><strong>ID:</strong> {user_id}</span>
+                    </div>
+                    
+                    <div class="info-item">
+                        <i class="fas fa-map-marker-alt"></i>
+                        <span><strong>Sitio A:</strong> {nombre_a}</span>
+                    </div>
+                    
+                    <div class="info-item">
+                        <i class="fas fa-map-marker-alt"></i>
+                        <span><strong>Sitio B:</strong> {nombre_b}</span>
+                    </div>
+                </div>
+                
+                <div class="buttons-container">
+                    <!-- BOTONES DE ACCIÓN PRINCIPAL -->
+                    <button onclick="guardarArchivoDiseno('{user_id}', 'diseno_solucion', '{fila_idx}')" class="action-button save-button">
+                        <div class="button-icon">
+                            <i class="fas fa-save"></i>
+                        </div>
+                        <div class="button-text">Guardar Archivo</div>
+                    </button>
+                    
+                    <a href="/descargar_diseno_solucion?user_id={user_id}&fila_idx={fila_idx}" class="action-button download-button">
+                        <div class="button-icon">
+                        <i class="fas fa-download"></i>
+                        </div>
+                        <div class="button-text">Descargar Archivo Generado (PtP)</div>
+                    </a>
+                    
+                    <!-- BOTONES DE SUBIDA DE IMÁGENES -->
+                    <a href="/subir_imagenes_ptp?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-camera"></i>
+                        </div>
+                        <div class="button-text">Subir Imágenes - Planos A</div>
+                    </a>
+                    
+                    <a href="/subir_imagenes_ptp_planos_b?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-camera"></i>
+                        </div>
+                        <div class="button-text">Subir Imágenes - Planos B</div>
+                    </a>
+                    
+                    <a href="/subir_imagenes_ptp_fotos_a?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-camera"></i>
+                        </div>
+                        <div class="button-text">Subir Imágenes - Reporte Fotos A</div>
+                    </a>
+                    
+                    <a href="/subir_imagenes_ptp_fotos_b?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-camera"></i>
+                </div>
+                        <div class="button-text">Subir Imágenes - Reporte Fotos B</div>
+                    </a>
+
+                    <!-- BOTONES DE SUBIDA DE ARCHIVOS ADICIONALES -->
+                    <a href="/subir_doc_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-file-word"></i>
+                        </div>
+                        <div class="button-text">Subir Documentos Word - Hoja 1</div>
+                    </a>
+                    
+                    <a href="/subir_kmz_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-map-marked-alt"></i>
+                        </div>
+                        <div class="button-text">Subir Archivos KMZ - Hoja 3</div>
+                    </a>
+                    
+                    <a href="/subir_pdf_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-file-pdf"></i>
+                        </div>
+                        <div class="button-text">Subir Documentos PDF - Hoja 4</div>
+                    </a>
+                    
+                    <a href="/subir_xlsx_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-file-excel"></i>
+                        </div>
+                        <div class="button-text">Subir Archivos Excel - Hoja 5</div>
+                    </a>
+                    
+                    <a href="/subir_dwg_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-drafting-compass"></i>
+                        </div>
+                        <div class="button-text">Subir Archivos DWG - Hoja 6</div>
+                    </a>
+                    
+                    <a href="/subir_zip_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-file-archive"></i>
+                        </div>
+                        <div class="button-text">Subir Archivos ZIP - Hoja 7</div>
+                    </a>
+                    
+                    <a href="/subir_imagenes_kmz_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-image"></i>
+                        </div>
+                        <div class="button-text">Subir Imágenes KMZ - Hoja 8</div>
+                    </a>
+                    
+                    <!-- BOTONES DE NAVEGACIÓN -->
+                    <a href="/subir_imagenes_ptp_fotos_a?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
+                        <div class="button-icon">
+                            <i class="fas fa-images"></i>
+                        </div>
+                        <div class="button-text">Ir a Reporte de Planeación</div>
+                    </a>
+                    
+                    <a href="/diseno_solucion_directo?user_id={user_id}&fila_idx={fila_idx}&llenado_automatico=true" class="action-button download-button">
+                        <div class="button-icon">
+                            <i class="fas fa-tools"></i>
+                        </div>
+                        <div class="button-text">Ir a Diseño de Solución (DIRECTO)</div>
+                    </a>
+                </div>
+            </div>
+            
+            <div class="footer">
+                <p>© 2024 FANGIO TELECOM. Todos los derechos reservados.</p>
+            </div>
+        </div>
+
+        <script>
+            // Función para guardar archivo de diseño de solución
+            function guardarArchivoDiseno(userId, tipo, filaIdx) {{
+                console.log('Guardando archivo de diseño de solución:', userId, tipo, filaIdx);
+                
+                // Aquí puedes implementar la lógica para guardar el archivo
+                // Por ahora, solo mostraremos un mensaje
+                alert('Función de guardado implementada para: ' + userId);
+            }}
+        </script>
+    </body>
+    </html>
+    """
+    return render_template_string(html)
+
+
+@app.route('/procesar', methods=['POST'])
+def procesar():
+    """
+    Genera el libro de un ID en su propio espacio de trabajo: subidas,
+    intermedios y libro no comparten rutas con otras generaciones en curso.
+    La carpeta se borra cuando termina de enviarse la respuesta.
+    """
+    # Carpetas que dejó una generación interrumpida (o que Windows no dejó borrar)
+    barrer_huerfanos()
+    trabajo = EspacioTrabajo(etiqueta=request.form.get('user_id'))
+    try:
+        respuesta = make_response(_procesar_en_espacio(trabajo))
+    except BaseException:
+        trabajo.cerrar()
+        raise
+    # send_file sigue leyendo el libro del espacio de trabajo mientras se envía
+    respuesta.call_on_close(trabajo.cerrar)
+    return respuesta
+
+
+def _procesar_en_espacio(trabajo):
+    import pandas as pd
+    import shutil
+    import os
+    import time
+    import re
+    from werkzeug.utils import secure_filename
+    
+    # Definir base_dir
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+
+    print("=== INICIO PROCESAR ===")
+    print(f"DEBUG: request.files.keys() = {list(request.files.keys())}")
+    print(f"DEBUG: request.form.keys() = {list(request.form.keys())}")
+    
+    # Debug: mostrar todos los archivos recibidos
+    print("=== ARCHIVOS RECIBIDOS ===")
+    for key, file_list in request.files.lists():
+        if isinstance(file_list, list):
+            for i, file in enumerate(file_list):
+                if file and file.filename:
+                    print(f"  {key}[{i}]: {file.filename} ({file.content_type})")
+        else:
+            if file_list and file_list.filename:
+                print(f"  {key}: {file_list.filename} ({file_list.content_type})")
+    print("=== FIN ARCHIVOS RECIBIDOS ===")
+    
+    fila_idx = request.form.get('fila_idx')
+    user_id = request.form.get('user_id')
+    tipo = request.form.get('tipo', 'site_survey')  # Por defecto site_survey si no se especifica
+    print(f"DEBUG: Tipo recibido en procesar: '{tipo}'")
+
+    # Usar siempre la plantilla fija
+    template_path = TEMPLATE_PATH
+    template_filename = os.path.basename(TEMPLATE_PATH)
+    if not os.path.exists(template_path):
+        return f"Falta la plantilla fija en la ruta esperada: {template_path}"
+
+    # --- NUEVO: Usar Google Sheets fijo como base de datos ---
+    reportar_fase('datos')
+    try:
+        df_db = hoja_enlaces.dataframe(texto=True)
+    except Exception as e:
+        return f"Error leyendo la base de datos de Google Sheets: {e}"
+
+    # --- CORRECCIÓN: Definir output_path según el tipo de documento ---
+    if tipo == 'diseno_solucion':
+        # Para diseño de solución, guardar en archivos_generados con nombre ds_
+        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
+        os.makedirs(archivos_generados_dir, exist_ok=True)
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        user_id_limpio = re.sub(r'[^a-zA-Z0-9_-]', '', str(user_id))
+        # Se llena en el espacio de trabajo y se publica al final con rename atómico
+        destino_final = os.path.join(archivos_generados_dir, f'ds_diseno_solucion_{user_id_limpio}_{timestamp}.xlsx')
+        output_path = trabajo.ruta(os.path.basename(destino_final))
+        print(f"DEBUG: Archivo de diseño de solución se guardará en: {destino_final}")
+    else:
+        # Para otros tipos, el libro se envía directo desde el espacio de trabajo
+        destino_final = None
+        output_path = trabajo.ruta(f'LLENADO_{template_filename or "template.xlsx"}')
+        print(f"DEBUG: Archivo se guardará en: {output_path}")
+
+    # --- 1. Recibe y guarda archivos ---
+    reportar_fase('archivos')
+    imagenes = request.files.getlist('imagenes_electricas')  # Cambiado de 'imagenes' a 'imagenes_electricas'
+    pdf_paths = []
+    pdfs = request.files.getlist('pdf_file')  # Cambiado de 'pdfs' a 'pdf_file'
+    print(f"DEBUG: pdfs recibidos = {len(pdfs)}")
+    for idx, pdf in enumerate(pdfs):
+        print(f"DEBUG: pdf {idx}: {pdf.filename if pdf else 'None'}")
+    
+    for idx, pdf in enumerate(pdfs):
+        if pdf and pdf.filename:
+            filename = secure_filename(f"{idx}_{pdf.filename}")
+            pdf_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(pdf, pdf_path)
+            pdf_paths.append(pdf_path)
+            print(f"DEBUG: PDF guardado: {pdf_path}")
+        else:
+            print(f"DEBUG: PDF {idx} no válido: {pdf}")
+    
+    print(f"DEBUG: pdf_paths final = {pdf_paths}")
+    
+    print(f"DEBUG: imagenes recibidas = {len(imagenes)}")
+    for idx, img in enumerate(imagenes):
+        print(f"DEBUG: imagen {idx}: {img.filename if img else 'None'}")
+    
+    imagen_paths = []
+    for idx, img in enumerate(imagenes):
+        if img and img.filename:
+            filename = secure_filename(f"{idx}_{img.filename}")
+            img_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(img, img_path)
+            imagen_paths.append(img_path)
+            print(f"DEBUG: Imagen guardada: {img_path}")
+        else:
+            print(f"DEBUG: Imagen {idx} no válida: {img}")
+    
+    print(f"DEBUG: imagen_paths final = {imagen_paths}")
+    
+    if not user_id:
+        return "Falta el ID"
+
+    # --- SELECCIÓN DEL REGISTRO CORRECTO ---
+    if fila_idx is not None and fila_idx != "":
+        try:
+            datos = df_db.loc[int(fila_idx)]
+        except (ValueError, TypeError):
+            return "Índice de fila inválido"
+    else:
+        coincidencias = filas_por_id(df_db, user_id)
+        if coincidencias.empty:
+            return "ID no encontrado en la base de datos."
+        datos = coincidencias.iloc[0]
+
+    # Para depuración: imprime las columnas disponibles
+    print("Columnas disponibles:", list(datos.index))
+
+    # --- Misma plantilla, misma fila y mismos adjuntos: se regresa el libro ya generado ---
+    try:
+        clave_generacion_actual = clave_generacion(
+            'procesar', tipo, registro_plantillas.obtener('llenado').huella, huella_fila(datos),
+            huella_archivos(request.files), sorted(request.form.items(multi=True)),
+            BACKEND_LLENADO, VERSION_NORMALIZACION, VERSION_GENERACION
+        )
+    except PlantillaInvalida as e:
+        return f"Error: {e}"
+    if cache_generaciones.copiar_a(clave_generacion_actual, output_path):
+        print(f"⚡ Libro recuperado de la caché de generaciones: {output_path}")
+        if tipo == 'diseno_solucion':
+            trabajo.publicar(output_path, destino_final)
+            registrar_artefacto(destino_final)
+            indexar_artefacto(user_id, TIPO_DISENO, destino_final)
+            return pagina_diseno_generado(user_id, fila_idx, datos.get('Nombre del sitio A', ''),
+                                          datos.get('Nombre del sitio B', ''))
+        registrar_artefacto(output_path)
+        return send_file(output_path, as_attachment=True)
+
+    imagen_b_file = request.files.get('imagen_b')
+    imagen_b_path = None
+    if imagen_b_file and imagen_b_file.filename:
+        imagen_b_filename = secure_filename(imagen_b_file.filename or "")
+        imagen_b_path = os.path.join(trabajo.directorio, imagen_b_filename)
+        guardar_subida(imagen_b_file, imagen_b_path)
+
+    archivo_excel_b = request.files.get('archivo_excel_b')
+    archivo_excel_b_path = None
+    if archivo_excel_b and archivo_excel_b.filename:
+        archivo_excel_b_filename = secure_filename(archivo_excel_b.filename or "")
+        archivo_excel_b_path = os.path.join(trabajo.directorio, archivo_excel_b_filename)
+        if os.path.exists(archivo_excel_b_path):
+            try:
+               os.remove(archivo_excel_b_path)
+            except Exception as e:
+                return f"Error: No se pudo eliminar el archivo de destino. Detalle: {e}"
+        guardar_subida(archivo_excel_b, archivo_excel_b_path)
+
+    
+    word_file = request.files.get('word_file')
+    word_file_path = None
+    if word_file and word_file.filename:
+        word_file_filename = secure_filename(word_file.filename or "")
+        word_file_path = os.path.join(trabajo.directorio, word_file_filename)
+        guardar_subida(word_file, word_file_path)
+    
+    imagenes_electricas = request.files.getlist('imagenes_electricas')
+    imagenes_electricas_paths = []
+    for idx, img in enumerate(imagenes_electricas):
+        if img and img.filename:
+            filename = secure_filename(f"electricas_{idx}_{img.filename}")
+            img_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(img, img_path)
+            imagenes_electricas_paths.append(img_path)
+
+    from docx import Document
+    import re
+
+    enlace_principal = ""
+    nombreEnlace = ""
+    if word_file_path and os.path.exists(word_file_path):
+        doc = Document(word_file_path)
+        word_text = "\n".join([p.text for p in doc.paragraphs])
+        print("WORD TEXT:", word_text)
+        for line in word_text.splitlines():
+            print("LINE:", line)
+            m = re.search(r'Transmission details\s*\(([^)]*)\)', line, re.IGNORECASE)
+            if m:
+                nombreEnlace = m.group(1)
+                nombreEnlace = re.sub(r'\s*\(cambio\)\s*', '', nombreEnlace, flags=re.IGNORECASE)
+                nombreEnlace = re.sub(r'\.pl6\s*$', '', nombreEnlace, flags=re.IGNORECASE)
+                nombreEnlace = nombreEnlace.strip()
+                # SEPARA LOS NOMBRES SI HAY UN GUION Y NÚMEROS
+                partes = re.split(r'\d+[A-Z]-', nombreEnlace)
+                if len(partes) >= 2:
+                    nombre1 = partes[0].strip()
+                    nombre2 = partes[1].split()[0].strip()
+                enlace_principal = f"{nombre1} - {nombre2}"
+            else:
+                enlace_principal = nombreEnlace
+            break  # Solo el primero
+    print("ENLACE PRINCIPAL:", enlace_principal)
+      
+    img_consumo = request.files.get('img_consumo')
+    img_configuracion = request.files.get('img_configuracion')
+    img_linea_vista = request.files.get('img_linea_vista')
+
+    img_consumo_path = None
+    img_configuracion_path = None
+    img_linea_vista_path = None
+
+    if img_consumo and img_consumo.filename:
+        img_consumo_path = os.path.join(trabajo.directorio, secure_filename(img_consumo.filename or ""))
+        guardar_subida(img_consumo, img_consumo_path)
+    if img_configuracion and img_configuracion.filename:
+        img_configuracion_path = os.path.join(trabajo.directorio, secure_filename(img_configuracion.filename or ""))
+        guardar_subida(img_configuracion, img_configuracion_path)
+    if img_linea_vista and img_linea_vista.filename:
+        img_linea_vista_path = os.path.join(trabajo.directorio, secure_filename(img_linea_vista.filename or ""))
+        guardar_subida(img_linea_vista, img_linea_vista_path)
+
+      # Recibe imagen para hoja 3 (Formato KMZ)
+    imagen_kmz_file = request.files.get('imagen_kmz')
+    print("imagen_kmz_file:", imagen_kmz_file)
+    print("imagen_kmz_file.filename:", imagen_kmz_file.filename if imagen_kmz_file else None)
+    imagen_kmz_path = None
+    if imagen_kmz_file and imagen_kmz_file.filename:
+        imagen_kmz_filename = secure_filename(imagen_kmz_file.filename or "")
+        imagen_kmz_path = os.path.join(trabajo.directorio, imagen_kmz_filename)
+        guardar_subida(imagen_kmz_file, imagen_kmz_path)
+
+    
+    
+    # output_path ya está definido arriba según el tipo de documento
+    kmz_file = request.files.get('kmz')
+    kml_image_file = request.files.get('kml_image')
+    print("kml_image_file:", kml_image_file)
+    print("kml_image_file.filename:", kml_image_file.filename if kml_image_file else None)
+    kml_image_path = None
+    if kml_image_file and kml_image_file.filename:
+        kml_image_filename = secure_filename(kml_image_file.filename or "")
+        kml_image_path = os.path.join(trabajo.directorio, kml_image_filename)
+        guardar_subida(kml_image_file, kml_image_path)
+
+    kmz_path = None
+    if kmz_file and kmz_file.filename:
+        kmz_filename = secure_filename(kmz_file.filename or "")
+        kmz_path = os.path.join(trabajo.directorio, kmz_filename)
+        guardar_subida(kmz_file, kmz_path)
+
+    kml_image_path = None
+    if kml_image_file and kml_image_file.filename:
+       kml_image_filename = secure_filename(kml_image_file.filename or "")
+       kml_image_path = os.path.join(trabajo.directorio, kml_image_filename)
+       guardar_subida(kml_image_file, kml_image_path)
+    
+    # --- PROCESAR ARCHIVOS ADICIONALES FALTANTES ---
+    
+    # Archivos de planos A
+    planos_a_img1 = request.files.get('planos_a_img1')
     planos_a_img2 = request.files.get('planos_a_img2')
     planos_a_img3 = request.files.get('planos_a_img3')
     
@@ -11668,20 +11013,20 @@ def procesar():
     
     if planos_a_img1 and planos_a_img1.filename:
         planos_a_img1_filename = secure_filename(planos_a_img1.filename or "")
-        planos_a_img1_path = os.path.join(UPLOAD_FOLDER, planos_a_img1_filename)
-        planos_a_img1.save(planos_a_img1_path)
+        planos_a_img1_path = os.path.join(trabajo.directorio, planos_a_img1_filename)
+        guardar_subida(planos_a_img1, planos_a_img1_path)
         print(f"DEBUG: Plano A img1 guardado: {planos_a_img1_path}")
     
     if planos_a_img2 and planos_a_img2.filename:
         planos_a_img2_filename = secure_filename(planos_a_img2.filename or "")
-        planos_a_img2_path = os.path.join(UPLOAD_FOLDER, planos_a_img2_filename)
-        planos_a_img2.save(planos_a_img2_path)
+        planos_a_img2_path = os.path.join(trabajo.directorio, planos_a_img2_filename)
+        guardar_subida(planos_a_img2, planos_a_img2_path)
         print(f"DEBUG: Plano A img2 guardado: {planos_a_img2_path}")
     
     if planos_a_img3 and planos_a_img3.filename:
         planos_a_img3_filename = secure_filename(planos_a_img3.filename or "")
-        planos_a_img3_path = os.path.join(UPLOAD_FOLDER, planos_a_img3_filename)
-        planos_a_img3.save(planos_a_img3_path)
+        planos_a_img3_path = os.path.join(trabajo.directorio, planos_a_img3_filename)
+        guardar_subida(planos_a_img3, planos_a_img3_path)
         print(f"DEBUG: Plano A img3 guardado: {planos_a_img3_path}")
     
     # Archivos de planos B
@@ -11695,20 +11040,20 @@ def procesar():
     
     if planos_b_img1 and planos_b_img1.filename:
         planos_b_img1_filename = secure_filename(planos_b_img1.filename or "")
-        planos_b_img1_path = os.path.join(UPLOAD_FOLDER, planos_b_img1_filename)
-        planos_b_img1.save(planos_b_img1_path)
+        planos_b_img1_path = os.path.join(trabajo.directorio, planos_b_img1_filename)
+        guardar_subida(planos_b_img1, planos_b_img1_path)
         print(f"DEBUG: Plano B img1 guardado: {planos_b_img1_path}")
     
     if planos_b_img2 and planos_b_img2.filename:
         planos_b_img2_filename = secure_filename(planos_b_img2.filename or "")
-        planos_b_img2_path = os.path.join(UPLOAD_FOLDER, planos_b_img2_filename)
-        planos_b_img2.save(planos_b_img2_path)
+        planos_b_img2_path = os.path.join(trabajo.directorio, planos_b_img2_filename)
+        guardar_subida(planos_b_img2, planos_b_img2_path)
         print(f"DEBUG: Plano B img2 guardado: {planos_b_img2_path}")
     
     if planos_b_img3 and planos_b_img3.filename:
         planos_b_img3_filename = secure_filename(planos_b_img3.filename or "")
-        planos_b_img3_path = os.path.join(UPLOAD_FOLDER, planos_b_img3_filename)
-        planos_b_img3.save(planos_b_img3_path)
+        planos_b_img3_path = os.path.join(trabajo.directorio, planos_b_img3_filename)
+        guardar_subida(planos_b_img3, planos_b_img3_path)
         print(f"DEBUG: Plano B img3 guardado: {planos_b_img3_path}")
     
     # Archivos de fotos individuales para hoja 9 (Fotos A)
@@ -11723,8 +11068,8 @@ def procesar():
         foto_file = request.files.get(name)
         if foto_file and foto_file.filename:
             filename = secure_filename(f"{name}_{foto_file.filename}")
-            foto_path = os.path.join(UPLOAD_FOLDER, filename)
-            foto_file.save(foto_path)
+            foto_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(foto_file, foto_path)
             fotos9_paths[name] = foto_path
             print(f"DEBUG: Foto {name} guardada: {foto_path}")
         else:
@@ -11740,26 +11085,24 @@ def procesar():
         foto_file = request.files.get(name)
         if foto_file and foto_file.filename:
             filename = secure_filename(f"{name}_{foto_file.filename}")
-            foto_path = os.path.join(UPLOAD_FOLDER, filename)
-            foto_file.save(foto_path)
+            foto_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(foto_file, foto_path)
             fotos10_paths[name] = foto_path
             print(f"DEBUG: Foto {name} guardada: {foto_path}")
         else:
             fotos10_paths[name] = None 
     
-    # Validar que la plantilla sea un archivo Excel válido antes de abrirla
+    # Firma, hojas requeridas y estructura se validan una vez por versión de la plantilla
     try:
-        with open(template_path, 'rb') as f:
-            signature = f.read(4)
-            if signature != b'PK\x03\x04':
-                return "Error: La plantilla fija no es un archivo Excel válido (.xlsx). Reemplaza la plantilla por una correcta y sin daños."
-    except Exception as e:
-        return f"Error al validar la plantilla fija: {e}"
+        registro_plantillas.obtener('llenado')
+    except PlantillaInvalida as e:
+        return f"Error: {e}"
 
 
     # --- 2. Llenado con xlwings ---
+    reportar_fase('llenado')
     print(f"DEBUG: Intentando abrir plantilla: {template_path}")
-    app_excel = xw.App(visible=False)
+    app_excel = abrir_excel(visible=False)
     if os.path.exists(output_path):
        try:
           os.remove(output_path)
@@ -11776,63 +11119,11 @@ def procesar():
         print("Error: wb es None después de abrir la plantilla.")
         app_excel.quit()
         return "Error: No se pudo abrir la plantilla de Excel. Verifica que el archivo no esté dañado ni abierto en otro programa."
-    required_sheets = [
-        '4. Estudio de informacion A',
-        '1. Analisis de Red y Frecuencia',
-        '2. Electricas - Diseño log- Fis',
-        '5. Estudio de informacion B',
-        '8. Estudio de factibilidad',
-        '3. Formato KMZ',
-        '0. Carátula'
-    ]
-    try:
-        sheet_names = [s.name for s in wb.sheets]
-    except Exception as e:
-        wb.close()
-        app_excel.quit()
-        return f"Error: No se pudieron enumerar las hojas del archivo Excel. El archivo puede estar dañado o vacío. Detalle: {e}"
-    for sheet in required_sheets:
-        if sheet not in sheet_names:
-            wb.close()
-            app_excel.quit()
-            return f"Error: La hoja '{sheet}' no existe en la plantilla de Excel."
     ws_a = wb.sheets['4. Estudio de informacion A']
     ws_red = wb.sheets['1. Analisis de Red y Frecuencia']
     ws_electricas = wb.sheets['2. Electricas - Diseño log- Fis']
     ws_electricas.range('B9').value = enlace_principal
-    campos_electricas_celdas = {
-        'Nombres Enlaces ': 'B9',
-        'Configuración MW:': ['D9', 'B14', 'C28', 'F28'],
-        'Tamaño de la antena (m)': ['C27', 'F27'],
-        'Potencia de Transmisión (dBm)': ['C29', 'F29'],
-        'Frecuencia (MHz)': ['C32', 'F32'],
-        'Nombre del sitio A': 'C33',
-        'Nombre del sitio B': 'F33',
-        'ID del sitio A': 'C44',
-        'ID del sitio B': 'F44',
-        'Potencia de Recepción (dBm)': ['C30', 'F30'],
-        'Banda': ['C31', 'F31'],
-        'Frecuencia (MHz)': ['C32', 'F32'],
-        'NOMBRE DEL SITIO':'C33',
-        'Nombre del sitio 2': 'F33',
-        'ID':'C34',
-        'ID 2': 'F34',
-        'consumo de potencia':'F9',
-    
-   }
-
-    for campo, celdas in campos_electricas_celdas.items():
-        valor = normaliza_na(datos.get(campo, ""))
-        if isinstance(celdas, list):
-            for celda in celdas:
-                if isinstance(celda, str):
-                    ws_electricas.range(celda).value = valor
-                else:
-                    print(f"Celda inválida para campo {campo}: {celda}")
-        elif isinstance(celdas, str):
-            ws_electricas.range(celdas).value = valor
-        else:
-            print(f"Referencia de celda inválida para campo {campo}: {celdas}")
+    ejecutar_plan(PLAN_DISENO_ELECTRICAS, wb, datos)
     
     lat_a = datos.get('LATITUD (TORRE)', '')
     lon_a = datos.get('LONGITUD (TORRE)', '')
@@ -11885,92 +11176,11 @@ def procesar():
        )
     
 
-    import pandas as pd
-    import dataframe_image as dfi
-    # --- Tabla horizontal de frecuencia para hoja 1 ---
-    campos_tabla = {
-        "Tamaño de la antena (m)": datos.get("Tamaño de la antena (m)", ""),
-        "Potencia de Transmisión (dBm)": datos.get("Potencia de Transmisión (dBm)", ""),
-        "Potencia de Recepción (dBm)": datos.get("Potencia de Recepción (dBm)", ""),
-        "Banda": datos.get("Banda", ""),
-        "Frecuencia (MHz)": datos.get("Frecuencia (MHz)", ""),
-        "#1 Canal ID S1": datos.get("#1 Canal ID S1", ""),
-        "#1 Frecuencia de Diseño S1": datos.get("#1 Frecuencia de Diseño S1", ""),
-        "#2 Frecuencia de Diseño S1": datos.get("#2 Frecuencia de Diseño S1", ""),
-        "#1 Canal ID S2": datos.get("#1 Canal ID S2", ""),
-        "#1 Frecuencia de Diseño S2": datos.get("#1 Frecuencia de Diseño S2", ""),
-        "#2 Frecuencia de Diseño S2": datos.get("#2 Frecuencia de Diseño S2", "")
-    }
-    df_tabla = pd.DataFrame([campos_tabla])
-
-    def wrap_col_label(label, width=14):
-        return '\n'.join(textwrap.wrap(label, width=width, break_long_words=False))
-
-    col_labels_wrapped = [wrap_col_label(str(col), width=14) for col in df_tabla.columns]
-
-    styler = (
-        df_tabla.style
-        .set_table_styles([
-            {'selector': 'th', 'props': [('background-color', '#0074D9'), ('color', 'white'), ('font-size', '12pt')]},
-            {'selector': 'td', 'props': [('background-color', '#D9EAF7'), ('color', 'black'), ('font-size', '12pt'), ('text-align', 'center'), ('border', '1.5px solid #2F5597')]}
-        ])
-        .set_table_attributes('style="border-collapse:collapse; margin:auto;"')
-        .hide(axis="index")  # Oculta los números de fila
-    )
-
-    img_path = os.path.join(UPLOAD_FOLDER, 'tabla_frecuencia.png')
-    try:
-        import matplotlib.pyplot as plt
-        fig, ax = plt.subplots(figsize=(12, 2.2))
-        ax.axis('off')
-        tabla = ax.table(
-            cellText=df_tabla.values.tolist(),
-            colLabels=col_labels_wrapped,
-            loc='center',
-            cellLoc='center'
-        )
-        # Estilo: encabezado azul, fila datos azul clarito
-        for (row, col), cell in tabla.get_celld().items():
-            if row == 0:
-                cell.set_facecolor('#0074D9')
-                cell.set_text_props(color='white', weight='bold')
-            else:
-                cell.set_facecolor('#D9EAF7')
-                cell.set_text_props(color='black')
-        tabla.auto_set_font_size(False)
-        tabla.set_fontsize(10)
-        tabla.scale(1.5, 2.8)
-        plt.savefig(img_path, bbox_inches='tight', pad_inches=0, dpi=200)
-        plt.close()
-    except Exception as e:
-        print(f"Error al exportar tabla como imagen: {e}")
-        # Crear una imagen simple si falla
-        import matplotlib.pyplot as plt
-        plt.figure(figsize=(10, 2))
-        plt.text(0.5, 0.5, 'Tabla de Frecuencias', ha='center', va='center', fontsize=16)
-        plt.axis('off')
-        plt.savefig(img_path, dpi=200, bbox_inches='tight', pad_inches=0)
-        plt.close()
-    df_tabla.to_csv(os.path.join(UPLOAD_FOLDER, "debug_tabla.csv"), index=False)
-    # Guarda el Excel de depuración con estilo
-    try:
-        styler.to_excel(os.path.join(UPLOAD_FOLDER, "debug_tabla.xlsx"))
-    except Exception as e:
-        print(f"Error al guardar el Excel estilizado: {e}")
-    print("Tabla horizontal guardada en debug_tabla.csv y debug_tabla.xlsx")
-
-    # Insertar la imagen en el rango A23:G28 de la hoja 1
-    cell_range = ws_red.range('A23:G28')
-    ws_red.pictures.add(
-        img_path,
-        left=cell_range.left,
-        top=cell_range.top,
-        width=cell_range.width,
-        height=cell_range.height
-    )
+    # --- Tabla horizontal de frecuencia para hoja 1 (celdas nativas en A23:G28) ---
+    insertar_tabla_frecuencia(ws_red, datos, trabajo.directorio)
 
-    cell_range = ws_red.range('D19').value = datos.get('Margen de desvanecimiento ', '')
-    ws_red.range('E19').value = datos.get('Disponibilidad anual (%) ', '')
+    cell_range = ws_red.range('D19').value = datos.get('Margen de desvanecimiento', '')
+    ws_red.range('E19').value = datos.get('Disponibilidad anual (%)', '')
     ws_a.range('AG8').value = user_id
     ws_a.range('B19').value = enlace_principal
     ws_b = wb.sheets['5. Estudio de informacion B']
@@ -12002,40 +11212,7 @@ def procesar():
     imagenes_fotos9_paths = [fotos9_paths.get(name) for name in fotos9_names]
     
     
-    estado_a_region = {
-        'Aguascalientes': 'CENTRO',
-        'Baja California': 'NORTE',
-        'Baja California Sur': 'NORTE',
-        'Campeche': 'SURESTE',
-        'Chiapas': 'SUR',
-        'Chihuahua': 'NORTE',
-        'Ciudad de México': 'CENTRO',
-        'Coahuila': 'NORTE',
-        'Colima': 'OCCIDENTE',
-        'Durango': 'NORTE',
-        'Estado de México': 'CENTRO',
-        'Guanajuato': 'CENTRO',
-        'Guerrero': 'SUR',
-        'Hidalgo': 'CENTRO',
-        'Jalisco': 'OCCIDENTE',
-        'Michoacán': 'OCCIDENTE',
-        'Morelos': 'CENTRO',
-        'Nayarit': 'OCCIDENTE',
-        'Nuevo León': 'NORESTE',
-        'Oaxaca': 'SUR',
-        'Puebla': 'CENTRO',
-        'Querétaro': 'CENTRO',
-        'Quintana Roo': 'SURESTE',
-        'San Luis Potosí': 'CENTRO',
-        'Sinaloa': 'NORTE',
-        'Sonora': 'NORTE',
-        'Tabasco': 'SURESTE',
-        'Tamaulipas': 'NORESTE',
-        'Tlaxcala': 'CENTRO',
-        'Veracruz': 'GOLFO',
-        'Yucatán': 'SURESTE',
-        'Zacatecas': 'NORTE'
-    }
+    estado_a_region = ESTADO_A_REGION
     
 
     tipo_zona = str(datos.get('Tipo de Zona', '')).strip().lower()
@@ -12052,7 +11229,7 @@ def procesar():
     ws_b.range('Y20').value = tipo_zona2 == 'ejidal'
     ws_b.range('AB20').value = tipo_zona2 == 'pueblo mágico'
   
-    visible = str(datos.get('El sitio es visible de día y de noche (libre de maleza y arboles): ', '')).strip().lower()
+    visible = str(datos.get('El sitio es visible de día y de noche (libre de maleza y arboles):', '')).strip().lower()
     ws_a.range('Q21').value = visible == 'si'
     ws_a.range('T21').value = visible == 'no'
 
@@ -12066,7 +11243,7 @@ def procesar():
     ws_a.range('R22').value = tipo_camino == 'empedrado'
     ws_a.range('W22').value = tipo_camino == 'mixto'
 
-    tipo_camino2  = str(datos.get(' Tipo de Camino 2 ', '')).strip().lower()
+    tipo_camino2  = str(datos.get('Tipo de Camino 2', '')).strip().lower()
     ws_b.range('H22').value = tipo_camino2 == 'terracería'
     ws_b.range('M22').value = tipo_camino2 == 'pavimentado'
     ws_b.range('R22').value = tipo_camino2 == 'empedrado'
@@ -12100,11 +11277,11 @@ def procesar():
     ws_a.range('P55').value = tipo_solucion == 'piso'
     ws_a.range('S55').value = tipo_solucion == 'torre'
 
-    existe_break = str(datos.get('¿Existe algun breaker existente en sitio? ', '')).strip().lower()
+    existe_break = str(datos.get('¿Existe algun breaker existente en sitio?', '')).strip().lower()
     ws_a.range('Y47').value = existe_break == 'si'
     ws_a.range('AB47').value = existe_break == 'no'
     
-    alimentacion_compatible = str(datos.get('Alimentacion compatible con el equipamiento ', '')).strip().lower()
+    alimentacion_compatible = str(datos.get('Alimentacion compatible con el equipamiento', '')).strip().lower()
     ws_a.range('Y51').value = alimentacion_compatible == 'si'
     ws_a.range('AB51').value = alimentacion_compatible == 'no'
 
@@ -12137,7 +11314,7 @@ def procesar():
     ws_a.range('P79').value = tipo_solucion2 == 'piso'
     ws_a.range('S79').value = tipo_solucion2 == 'torre'
     
-    existe_break2 = str(datos.get('Existe algun breaker existente en sitio 2 ', '')).strip().lower()
+    existe_break2 = str(datos.get('Existe algun breaker existente en sitio 2', '')).strip().lower()
     ws_a.range('Y71').value = existe_break2 == 'si'
     ws_a.range('AB71').value = existe_break2 == 'no'
 
@@ -12153,8 +11330,8 @@ def procesar():
     ws_a.range('AG75').value = espacio_conexion2 == 'si'
     ws_a.range('AJ75').value = espacio_conexion2 == 'no'
 
-    linea_vista = str(datos.get('Linea de vista ', '')).strip().lower()
-    motivo = str(datos.get('Motivo ', '')).strip().lower()
+    linea_vista = str(datos.get('Linea de vista', '')).strip().lower()
+    motivo = str(datos.get('Motivo', '')).strip().lower()
 
     ws_a.range('K82').value = (linea_vista == 'si')
     ws_a.range('O82').value = (linea_vista == 'no')
@@ -12176,113 +11353,11 @@ def procesar():
         elif motivo == 'n/a':
             ws_a.range('E84').value = True
 
-    campos_a_celdas = {
-        'NOMBRE DEL SITIO': ['K8', 'H33'],
-        #'REGION': 'E9',
-        'PROPIETARIO': 'N9',
-        'ESTADO ': 'AD14',
-        'Calle': 'E13',
-        'Colonia': 'E14',
-        'Municipio': 'F15',
-        'C.P': 'AD13',
-        'Referencias':'K16',
-        'Nombre de contacto en sitio': 'I18',
-        'Telefono': 'AC18',
-        'Tipo de Zona': 'E16',
-        'Tipo de Camino': 'E17',
-        'LATITUD (TORRE)': 'L29',
-        'LONGITUD (TORRE)': 'AB29',
-        'LATITUD (FACHADA)': 'L26',
-        'LONGITUD (FACHADA)': 'AB26',
-        'Altitud (msnm)': 'N30',
-        'Diametro de pierna superior':'L35',
-        'Diametro de pierna Inferior':'V35',
-        'NCRA RB':'AC35',
-        'Franja2RB':'AI35',
-        'Altura de la Torre':'L36',
-        'Dado':'V36',
-        'Altura Edificio1':'AF36',
-        'Nivel inferior de franja disponible': 'U37',
-        'Nivel superior de franja disponible': 'AI37',
-        'Altura de MW conforme a topologia': 'C40',
-        'Azimut RB ': 'N40',
-        'Propuesta de altura de antena de MW1': 'AC40',
-        'Propuesta de altura de antena de MW (SD)1': 'AH40',
-        'Altura de soporte para OMB propuesto': 'P45',
-        'Longitud del cable de tierra nuevo OMB': 'P46',
-        'Longitud del cable de tierra ODU': 'P47',
-        'Longitud de cable IF': 'P48',
-        'Tipo de soporte para antena MW propuesto': 'P49',
-        'Longitud de cable ACDB-Nuevo OMB': 'P50',
-        'Longitud de cable RTN - Router':'P51',
-        'Longitud de cable RTN - BBU SITE 1': 'P52',
-        'MEDICION DE BARRA DE TIERRA (Ohms)':'P54',
-        'Nombre del sitio 2': 'H57',
-        'Diámetro de Pierna superio2':'L59',
-        'Diámetro de Pierna inferior2':'V59',
-        ' NCRA2 ':'AC59',
-        'Franja2-2':'AI59',
-        'Altura torre 2': 'L60',
-        'DADO 2':'V60',
-        'Altura edificio 2':'AF60',
-        'Nivel inferior de franja disponible 2': 'U61',
-        'Nivel superior de franja disponible 2': 'AI61',
-        'Altura de MW conforme a topologia 2': 'C64',
-        'Azimut 2': 'N64',
-        'Propuesta de altura de antena de MW2': 'AC64',
-        'Propuesta de altura de antena de MW (SD)2':'AH64',
-        'Altura de soporte para OMB propuesto2':'P69',
-        'Longitud del cable de tierra nuevo OMB 2': 'P70',
-        'Longitud del cable de tierra ODU 2': 'P71',
-        'Longitud de cable IF 2': 'P72',
-        'Tipo de soporte para antena MW propuesto 2': 'P73',
-        'Longitud de cable ACDB-Nuevo OMB 2': 'P74',
-        'Longitud de cable RTN - Router 2': 'P75',
-        'Longitud de cable RTN - BBU 2': 'P76',
-        'Medición del Sistema de Tierras 2': 'P78',
-        'Nombre del sitio A': ['M117', 'M139'],
-        'Nombre del sitio B': ['M162', 'M184'],
-     
-    }
-
     print("ESTADO:", datos.get('ESTADO'))
     print("ESTADO 2:", datos.get('ESTADO 2'))
     print("ESTADO2:", datos.get('ESTADO2'))
 
-    estado_b_region = {
-        'Aguascalientes': 'CENTRO',
-        'Baja California': 'NORTE',
-        'Baja California Sur': 'NORTE',
-        'Campeche': 'SURESTE',
-        'Chiapas': 'SUR',
-        'Chihuahua': 'NORTE',
-        'Ciudad de México': 'CENTRO',
-        'Coahuila': 'NORTE',
-        'Colima': 'OCCIDENTE',
-        'Durango': 'NORTE',
-        'Estado de México': 'CENTRO',
-        'Guanajuato': 'CENTRO',
-        'Guerrero': 'SUR',
-        'Hidalgo': 'CENTRO',
-        'Jalisco': 'OCCIDENTE',
-        'Michoacán': 'OCCIDENTE',
-        'Morelos': 'CENTRO',
-        'Nayarit': 'OCCIDENTE',
-        'Nuevo León': 'NORESTE',
-        'Oaxaca': 'SUR',
-        'Puebla': 'CENTRO',
-        'Querétaro': 'CENTRO',
-        'Quintana Roo': 'SURESTE',
-        'San Luis Potosí': 'CENTRO',
-        'Sinaloa': 'NORTE',
-        'Sonora': 'NORTE',
-        'Tabasco': 'SURESTE',
-        'Tamaulipas': 'NORESTE',
-        'Tlaxcala': 'CENTRO',
-        'Veracruz': 'GOLFO',
-        'Yucatán': 'SURESTE',
-        'Zacatecas': 'NORTE'
-    }
+    estado_b_region = ESTADO_A_REGION
     estado_b = datos.get('ESTADO 2')
     if not estado_b or pd.isna(estado_b):
        estado_b = datos.get('ESTADO2')
@@ -12291,72 +11366,19 @@ def procesar():
     region_b = estado_b_region.get(str(estado_b).strip(), 'OTRA')
     ws_b.range('E9').value = region_b
 
-    estado_a_region = {
-         'Aguascalientes': 'CENTRO',
-         'Baja California': 'NORTE',
-         'Baja California Sur': 'NORTE',
-         'Campeche': 'SURESTE',
-         'Chiapas': 'SUR',
-         'Chihuahua': 'NORTE',
-         'Ciudad de México': 'CENTRO',
-         'Coahuila': 'NORTE',
-         'Colima': 'OCCIDENTE',
-         'Durango': 'NORTE',
-         'Estado de México': 'CENTRO',
-         'Guanajuato': 'CENTRO',
-         'Guerrero': 'SUR',
-         'Hidalgo': 'CENTRO',
-         'Jalisco': 'OCCIDENTE',
-         'Michoacán': 'OCCIDENTE',
-         'Morelos': 'CENTRO',
-         'Nayarit': 'OCCIDENTE',
-         'Nuevo León': 'NORESTE',
-         'Oaxaca': 'SUR',
-         'Puebla': 'CENTRO',
-         'Querétaro': 'CENTRO',
-         'Quintana Roo': 'SURESTE',
-         'San Luis Potosí': 'CENTRO',
-         'Sinaloa': 'NORTE',
-         'Sonora': 'NORTE',
-         'Tabasco': 'SURESTE',
-         'Tamaulipas': 'NORESTE',
-         'Tlaxcala': 'CENTRO',
-         'Veracruz': 'GOLFO',
-         'Yucatán': 'SURESTE',
-         'Zacatecas': 'NORTE'
-    }
+    estado_a_region = ESTADO_A_REGION
 
     # Para el sitio A
-    estado_a = datos.get('ESTADO ', '').strip()
+    estado_a = datos.get('ESTADO', '').strip()
     region_a = estado_a_region.get(estado_a, 'OTRA')
     ws_a.range('D10').value = region_a  # Ajusta la celda si tu plantilla usa otra
 
 # Para el sitio B (si aplica)
-    estado_b = datos.get('ESTADO 2 ', '').strip()
+    estado_b = datos.get('ESTADO 2', '').strip()
     region_b = estado_a_region.get(estado_b, 'OTRA')
     ws_b.range('D10').value = region_b  # Ajusta la celda si tu plantilla usa otra
     
 
-    campos_b_celdas= {
-    'Nombre del sitio 2': 'K8',
-    'ID 2': 'AG8',
-    #'REGION 2': 'E9',
-    'PROPIETARIO 2': 'N9',
-    'ESTADO 2': 'AD14',
-    'Calle 2': 'E13',
-    'Colonia 2': 'E14',
-    'Municipio 2': 'F15',
-    'C.P 2': 'AD13',
-    'Referencias 2':'K16',
-    'Nombre de contacto en sitio 2': 'I18',
-    'Telefono 2': 'AC18',
-    'LATITUD (TORRE) 2': 'L29',
-    'LONGITUD (TORRE) 2': 'AB29',
-    'LATITUD (FACHADA) 2': 'L26',
-    'LONGITUD (FACHADA) 2': 'AB26',
-    'Altitud (msnm) 2': 'N30',
-
-    }
     copias_factibilidad= {
     'H33': 'H8',
     'L35': 'L10',
@@ -12457,13 +11479,7 @@ def procesar():
     }
     
     
-    for campo, celda in campos_a_celdas.items():
-        valor = normaliza_na(datos.get(campo, ""))
-        if isinstance(celda, list):
-            for c in celda:
-                ws_a.range(c).value = valor
-        else:
-            ws_a.range(celda).value = valor
+    ejecutar_plan(PLAN_DISENO_ESTUDIO_A, wb, datos)
 
     # --- Asignación de región basada en el estado (MOVIDO AQUÍ) ---
     # Leer directamente el estado que ya está en AD14 (después de que se haya escrito)
@@ -12480,13 +11496,7 @@ def procesar():
 
     
 
-    for campo, celda in campos_b_celdas.items():
-        valor = normaliza_na(datos.get(campo, ""))
-        if isinstance(celda, list):
-            for c in celda:
-                ws_b.range(c).value = valor
-        else:
-            ws_b.range(celda).value = valor
+    ejecutar_plan(PLAN_DISENO_ESTUDIO_B, wb, datos)
     
     for origen, destino in copias_factibilidad.items():
      ws_factibilidad.range(destino).value = ws_a.range(origen).value
@@ -12505,8 +11515,8 @@ def procesar():
     for idx, img in enumerate(imagenes_torres):
         if img and img.filename:
             filename = secure_filename(f"torres_{idx}_{img.filename}")
-            img_path = os.path.join(UPLOAD_FOLDER, filename)
-            img.save(img_path)
+            img_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(img, img_path)
             imagenes_torres_paths.append(img_path) 
 
     imagenes_torres_b = request.files.getlist('imagenes_torres_b')
@@ -12514,8 +11524,8 @@ def procesar():
     for idx, img in enumerate(imagenes_torres_b):
         if img and img.filename:
             filename = secure_filename(f"torres_b_{idx}_{img.filename}")
-            img_path = os.path.join(UPLOAD_FOLDER, filename)
-            img.save(img_path)
+            img_path = os.path.join(trabajo.directorio, filename)
+            guardar_subida(img, img_path)
             imagenes_torres_b_paths.append(img_path)
 
            
@@ -12539,6 +11549,7 @@ def procesar():
     print(f"DEBUG: imagenes_final = {imagenes_final}")
     print(f"DEBUG: img_ranges = {img_ranges}")
     
+    reportar_fase('imagenes')
     # Limpia imágenes previas en la hoja antes de insertar nuevas
     print(f"DEBUG: Limpiando {ws_a.pictures.count} imágenes previas en {ws_a.name}")
     for pic in ws_a.pictures:
@@ -12806,6 +11817,7 @@ def procesar():
     
     
     # Intentar guardar con múltiples estrategias
+    reportar_fase('guardado')
     guardado_exitoso = False
     max_intentos_guardado = 3
     
@@ -12862,575 +11874,364 @@ def procesar():
         print(f"DEBUG: Error al cerrar Excel: {quit_error}")
         # Forzar cierre de Excel
         try:
-            subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+            cerrar_procesos_excel()
             print("DEBUG: Excel forzado a cerrar")
         except:
             print("DEBUG: No se pudo forzar el cierre de Excel")
 
     # --- 3. Inserta archivos como OLEObjects (íconos) usando win32com ---
-    try:
-        try:
-            if not HAS_WIN32COM:
-                return "Error: win32com.client not available in this environment"
-            excel = get_excel_app()
-        except Exception as e:
-            return f"Error al inicializar Excel para OLE: {e}"
-        # Chequeo previo: existencia y permisos del archivo
-        import os
-        if not os.path.exists(output_path):
-            return f"Error: El archivo de salida no existe en la ruta esperada: {output_path}"
-        if not os.access(output_path, os.R_OK | os.W_OK):
-            return f"Error: No tienes permisos de lectura/escritura para el archivo: {output_path}"
-        # try/except para Workbooks.Open
+    if es_headless() or not HAS_WIN32COM:
+        # Sin Excel no hay OLE: el libro se publica sin los íconos, igual que en los subir_*
+        print("⚠️ Sin Excel/win32com: se omite la inserción de archivos como OLE")
+    else:
         try:
-            wb_com = excel.Workbooks.Open(output_path)
-        except Exception as e:
-            try:
-                if 'excel' in locals() and excel is not None:
-                    excel.Quit()
-            except Exception:
-                pass
-            return f"Error al abrir el archivo Excel para OLE: {e}"
-        if wb_com is None:
-            try:
-                if 'excel' in locals() and excel is not None:
-                    excel.Quit()
-            except Exception:
-                pass
-            # Intenta eliminar el archivo corrupto o bloqueado
             try:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-                return "Error: No se pudo abrir el archivo Excel para incrustar archivos OLE. El archivo fue eliminado automáticamente por estar corrupto o bloqueado. Por favor, vuelve a intentar el proceso."
+                excel = get_excel_app()
             except Exception as e:
-                return f"Error: No se pudo abrir ni eliminar el archivo Excel de salida. Detalle: {e}"
-        # Inserta el archivo Excel como objeto en N52 de la hoja 5
-        if archivo_excel_b_path and os.path.exists(archivo_excel_b_path):
-            ws_b_com = wb_com.Sheets("5. Estudio de informacion B")
-            ws_b_com.OLEObjects().Add(
-                Filename=archivo_excel_b_path,
-                Link=False,
-                DisplayAsIcon=True,
-                IconFileName="C:\\Windows\\System32\\shell32.dll",
-                IconIndex=1,
-                IconLabel=os.path.basename(archivo_excel_b_path),
-                Left=ws_b_com.Range("N52").Left,
-                Top=ws_b_com.Range("N52").Top
-            )
-
-        if word_file_path and os.path.exists(word_file_path):
-            ws_word = wb_com.Sheets("1. Analisis de Red y Frecuencia")
-            ws_word.OLEObjects().Add(
-                Filename=word_file_path,
-                Link=False,
-                DisplayAsIcon=True,
-                IconFileName="C:\\Windows\\System32\\shell32.dll",
-                IconIndex=2,  # Cambia el icono si lo deseas
-                IconLabel=os.path.basename(word_file_path),
-                Left=ws_word.Range("D12").Left,
-                Top=ws_word.Range("D12").Top
-           ) 
-        
-
-
-        # Incrusta los PDF en la hoja "4. Estudio de informacion A"
-        ws_a_com = wb_com.Sheets("4. Estudio de informacion A")
-        pdf_icon_cells = ['AB121', 'AB166', 'AB200', 'AB220', 'AB240', 'AB260']
-        print(f"DEBUG: Intentando insertar {len(pdf_paths)} PDFs en la hoja 4. Estudio de informacion A")
-        for idx, pdf_path in enumerate(pdf_paths):
-            print(f"DEBUG: PDF {idx}: {pdf_path} - Existe: {os.path.exists(pdf_path) if pdf_path else False}")
-            if idx < len(pdf_icon_cells) and os.path.exists(pdf_path):
-                try:
-                    ws_a_com.OLEObjects().Add(
-                        Filename=pdf_path,
-                        Link=False,
-                        DisplayAsIcon=True,
-                        IconFileName="C:\\Windows\\System32\\shell32.dll",
-                        IconIndex=0,
-                        IconLabel=os.path.basename(pdf_path),
-                        Left=ws_a_com.Range(pdf_icon_cells[idx]).Left,
-                        Top=ws_a_com.Range(pdf_icon_cells[idx]).Top
-                    )
-                    print(f"DEBUG: PDF {idx} insertado correctamente en {pdf_icon_cells[idx]}")
-                except Exception as e:
-                    print(f"DEBUG: Error insertando PDF {idx}: {e}")
-            else:
-                print(f"DEBUG: PDF {idx} no se insertó - no existe o índice fuera de rango")
-
-        # Incrusta el KMZ en la hoja "3. Formato KMZ"
-        if kmz_path and os.path.exists(kmz_path):
-            ws_kmz_com = wb_com.Sheets("3. Formato KMZ")
-            ws_kmz_com.OLEObjects().Add(
-                Filename=kmz_path,
-                Link=False,
-                DisplayAsIcon=True,
-                IconFileName="C:\\Windows\\System32\\shell32.dll",
-                IconIndex=0,
-                IconLabel=os.path.basename(kmz_path),
-                Left=ws_kmz_com.Range("C12").Left,
-                Top=ws_kmz_com.Range("C12").Top
-            )
-
-        wb_com.Save()
-        wb_com.Close()
-        excel.Quit()
-    except Exception as e:
-        return f"Error al incrustar archivos OLE: {e}"
-
-    time.sleep(1)
-    
-    # Verificar el tipo de llenado para mostrar la confirmación apropiada
-    if tipo == 'diseno_solucion':
-        # --- DEBUG: Confirmando que estamos procesando diseño de solución ---
-        print("🔍 DEBUG: Procesando tipo 'diseno_solucion' - Las imágenes se guardaron pero NO se insertaron en Excel")
-        
-        # --- VERIFICAR ESTADO DE LAS IMÁGENES ---
-        print(f"🔍 DEBUG: Estado de las imágenes:")
-        print(f"  - imagenes_electricas_paths: {imagenes_electricas_paths if 'imagenes_electricas_paths' in locals() else 'NO DEFINIDO'}")
-        print(f"  - imagenes_torres_paths: {imagenes_torres_paths if 'imagenes_torres_paths' in locals() else 'NO DEFINIDO'}")
-        print(f"  - imagenes_torres_b_paths: {imagenes_torres_b_paths if 'imagenes_torres_b_paths' in locals() else 'NO DEFINIDO'}")
-        print(f"  - img_consumo_path: {img_consumo_path if 'img_consumo_path' in locals() else 'NO DEFINIDO'}")
-        print(f"  - img_configuracion_path: {img_configuracion_path if 'img_configuracion_path' in locals() else 'NO DEFINIDO'}")
-        print(f"  - img_linea_vista_path: {img_linea_vista_path if 'img_linea_vista_path' in locals() else 'NO DEFINIDO'}")
-        print(f"  - imagen_kmz_path: {imagen_kmz_path if 'imagen_kmz_path' in locals() else 'NO DEFINIDO'}")
-        print(f"  - imagen_b_path: {imagen_b_path if 'imagen_b_path' in locals() else 'NO DEFINIDO'}")
-        
-        # --- VERIFICAR ARCHIVO WORD ---
-        print(f"🔍 DEBUG: Archivo Word:")
-        print(f"  - word_file_path: {word_file_path if 'word_file_path' in locals() else 'NO DEFINIDO'}")
-        print(f"  - ¿Existe word_file_path? {os.path.exists(word_file_path) if 'word_file_path' in locals() and word_file_path else False}")
-        
-        # --- VERIFICAR RUTA DEL ARCHIVO EXCEL ---
-        print(f"🔍 DEBUG: Archivo Excel generado:")
-        print(f"  - output_path: {output_path}")
-        print(f"  - ¿Existe output_path? {os.path.exists(output_path) if 'output_path' in locals() else False}")
-        
-        # --- INSERTAR ARCHIVO WORD EN DISEÑO DE SOLUCIÓN ---
-        if word_file_path and os.path.exists(word_file_path) and os.path.exists(output_path):
-            print("🔍 DEBUG: Intentando insertar archivo Word en diseño de solución...")
+                return f"Error al inicializar Excel para OLE: {e}"
+            # Chequeo previo: existencia y permisos del archivo
+            import os
+            if not os.path.exists(output_path):
+                return f"Error: El archivo de salida no existe en la ruta esperada: {output_path}"
+            if not os.access(output_path, os.R_OK | os.W_OK):
+                return f"Error: No tienes permisos de lectura/escritura para el archivo: {output_path}"
+            # try/except para Workbooks.Open
             try:
-                # Abrir el archivo Excel para insertar el Word
-                import xlwings as xw
-                app_excel = xw.App(visible=False)
-                wb = app_excel.books.open(output_path)
-                
-                # Insertar en la hoja 1: "Análisis de Red y Frecuencia" en D12
-                ws_word = wb.sheets['1. Análisis de Red y Frecuencia']
-                cell_range = ws_word.range('D12')
-                
-                # Insertar el archivo Word como imagen/objeto
-                ws_word.pictures.add(
-                    os.path.abspath(word_file_path),
-                    left=cell_range.left,
-                    top=cell_range.top,
-                    width=cell_range.width * 2,  # Hacer el objeto un poco más grande
-                    height=cell_range.height * 2
-                )
-                
-                # Guardar y cerrar
-                wb.save()
-                wb.close()
-                app_excel.quit()
-                
-                print("✅ Archivo Word insertado exitosamente en D12 de la hoja 'Análisis de Red y Frecuencia'")
-                
+                wb_com = excel.Workbooks.Open(output_path)
             except Exception as e:
-                print(f"❌ Error insertando archivo Word: {e}")
-                # Intentar cerrar Excel si está abierto
                 try:
-                    if 'wb' in locals():
-                        wb.close()
-                    if 'app_excel' in locals():
-                        app_excel.quit()
-                except:
+                    if 'excel' in locals() and excel is not None:
+                        excel.Quit()
+                except Exception:
                     pass
-        else:
-            print("⚠️ No se puede insertar archivo Word - faltan archivos o rutas")
-        
-        # Generar página de confirmación con el mismo estilo que Site Survey
-        html = f"""
-        <!DOCTYPE html>
-        <html lang="es">
-        <head>
-            <meta charset="UTF-8">
-            <title>FANGIO TELECOM | Documento Generado</title>
-            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">
-            <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@300;400;500;600;700;800;900&display=swap" rel="stylesheet">
-            <style>
-                * {{
-                    margin: 0;
-                    padding: 0;
-                    box-sizing: border-box;
-                }}
-
-                body {{
-                    font-family: 'Montserrat', Arial, sans-serif;
-                    min-height: 100vh;
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    background-size: cover;
-                    background-position: center;
-                    background-attachment: fixed;
-                    background-repeat: no-repeat;
-                    display: flex;
-                    flex-direction: column;
-                    justify-content: center;
-                    align-items: center;
-                    position: relative;
-                    overflow-x: hidden;
-                    color: #333;
-                }}
-
-                .world-background {{
-                    position: fixed;
-                    top: 0;
-                    left: 0;
-                    right: 0;
-                    bottom: 0;
-                    background: url('{url_for('static', filename='images/earth-background.jpg')}') no-repeat center center;
-                    background-size: cover;
-                    opacity: 0.3;
-                    z-index: -1;
-                }}
-
-                .main-container {{
-                    width: 100%;
-                    max-width: 800px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    z-index: 1;
-                }}
-
-                .content-card {{
-                    background: rgba(255, 255, 255, 0.95);
-                    backdrop-filter: blur(10px);
-                    border-radius: 20px;
-                    padding: 40px;
-                    box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-                    text-align: center;
-                }}
-
-                .header {{
-                    margin-bottom: 30px;
-                }}
-
-                .success-icon {{
-                    width: 80px;
-                    height: 80px;
-                    background: linear-gradient(135deg, #00c37a 0%, #00a870 100%);
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    margin: 0 auto 20px;
-                    box-shadow: 0 10px 30px rgba(0, 195, 122, 0.4);
-                    animation: pulse 2s infinite;
-                }}
-
-                @keyframes pulse {{
-                    0% {{ transform: scale(1); }}
-                    50% {{ transform: scale(1.05); }}
-                    100% {{ transform: scale(1); }}
-                }}
-
-                .success-icon i {{
-                    font-size: 2.5rem;
-                    color: white;
-                }}
-
-                .success-title {{
-                    color: #00c37a;
-                    font-size: 2.5rem;
-                    font-weight: 700;
-                    margin-bottom: 10px;
-                    text-shadow: 0 2px 10px rgba(0, 195, 122, 0.3);
-                }}
-
-                .success-subtitle {{
-                    color: #666;
-                    font-size: 1.2rem;
-                    margin-bottom: 30px;
-                }}
-
-                .info-container {{
-                    background: rgba(102, 126, 234, 0.1);
-                    border-radius: 15px;
-                    padding: 25px;
-                    margin-bottom: 30px;
-                    border-left: 5px solid #667eea;
-                }}
-
-                .info-item {{
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    margin-bottom: 15px;
-                    font-size: 1.1rem;
-                }}
+                return f"Error al abrir el archivo Excel para OLE: {e}"
+            if wb_com is None:
+                try:
+                    if 'excel' in locals() and excel is not None:
+                        excel.Quit()
+                except Exception:
+                    pass
+                # Intenta eliminar el archivo corrupto o bloqueado
+                try:
+                    if os.path.exists(output_path):
+                        os.remove(output_path)
+                    return "Error: No se pudo abrir el archivo Excel para incrustar archivos OLE. El archivo fue eliminado automáticamente por estar corrupto o bloqueado. Por favor, vuelve a intentar el proceso."
+                except Exception as e:
+                    return f"Error: No se pudo abrir ni eliminar el archivo Excel de salida. Detalle: {e}"
+            # Inserta el archivo Excel como objeto en N52 de la hoja 5
+            if archivo_excel_b_path and os.path.exists(archivo_excel_b_path):
+                ws_b_com = wb_com.Sheets("5. Estudio de informacion B")
+                ws_b_com.OLEObjects().Add(
+                    Filename=archivo_excel_b_path,
+                    Link=False,
+                    DisplayAsIcon=True,
+                    IconFileName="C:\\Windows\\System32\\shell32.dll",
+                    IconIndex=1,
+                    IconLabel=os.path.basename(archivo_excel_b_path),
+                    Left=ws_b_com.Range("N52").Left,
+                    Top=ws_b_com.Range("N52").Top
+                )
 
-                .info-item:last-child {{
-                    margin-bottom: 0;
-                }}
+            if word_file_path and os.path.exists(word_file_path):
+                ws_word = wb_com.Sheets("1. Analisis de Red y Frecuencia")
+                ws_word.OLEObjects().Add(
+                    Filename=word_file_path,
+                    Link=False,
+                    DisplayAsIcon=True,
+                    IconFileName="C:\\Windows\\System32\\shell32.dll",
+                    IconIndex=2,  # Cambia el icono si lo deseas
+                    IconLabel=os.path.basename(word_file_path),
+                    Left=ws_word.Range("D12").Left,
+                    Top=ws_word.Range("D12").Top
+               ) 
+            
+
+
+            # Incrusta los PDF en la hoja "4. Estudio de informacion A"
+            ws_a_com = wb_com.Sheets("4. Estudio de informacion A")
+            pdf_icon_cells = ['AB121', 'AB166', 'AB200', 'AB220', 'AB240', 'AB260']
+            print(f"DEBUG: Intentando insertar {len(pdf_paths)} PDFs en la hoja 4. Estudio de informacion A")
+            for idx, pdf_path in enumerate(pdf_paths):
+                print(f"DEBUG: PDF {idx}: {pdf_path} - Existe: {os.path.exists(pdf_path) if pdf_path else False}")
+                if idx < len(pdf_icon_cells) and os.path.exists(pdf_path):
+                    try:
+                        ws_a_com.OLEObjects().Add(
+                            Filename=pdf_path,
+                            Link=False,
+                            DisplayAsIcon=True,
+                            IconFileName="C:\\Windows\\System32\\shell32.dll",
+                            IconIndex=0,
+                            IconLabel=os.path.basename(pdf_path),
+                            Left=ws_a_com.Range(pdf_icon_cells[idx]).Left,
+                            Top=ws_a_com.Range(pdf_icon_cells[idx]).Top
+                        )
+                        print(f"DEBUG: PDF {idx} insertado correctamente en {pdf_icon_cells[idx]}")
+                    except Exception as e:
+                        print(f"DEBUG: Error insertando PDF {idx}: {e}")
+                else:
+                    print(f"DEBUG: PDF {idx} no se insertó - no existe o índice fuera de rango")
+
+            # Incrusta el KMZ en la hoja "3. Formato KMZ"
+            if kmz_path and os.path.exists(kmz_path):
+                ws_kmz_com = wb_com.Sheets("3. Formato KMZ")
+                ws_kmz_com.OLEObjects().Add(
+                    Filename=kmz_path,
+                    Link=False,
+                    DisplayAsIcon=True,
+                    IconFileName="C:\\Windows\\System32\\shell32.dll",
+                    IconIndex=0,
+                    IconLabel=os.path.basename(kmz_path),
+                    Left=ws_kmz_com.Range("C12").Left,
+                    Top=ws_kmz_com.Range("C12").Top
+                )
 
-                .info-item i {{
-                    color: #667eea;
-                    margin-right: 12px;
-                    font-size: 1.2rem;
-                    width: 20px;
-                    text-align: center;
-                }}
+            wb_com.Save()
+            wb_com.Close()
+            excel.Quit()
+        except Exception as e:
+            return f"Error al incrustar archivos OLE: {e}"
 
-                .info-item span {{
-                    color: #333;
-                    font-weight: 500;
-                }}
+    time.sleep(1)
+    
+    # Verificar el tipo de llenado para mostrar la confirmación apropiada
+    if tipo == 'diseno_solucion':
+        # --- DEBUG: Confirmando que estamos procesando diseño de solución ---
+        print("🔍 DEBUG: Procesando tipo 'diseno_solucion' - Las imágenes se guardaron pero NO se insertaron en Excel")
+        
+        # --- VERIFICAR ESTADO DE LAS IMÁGENES ---
+        print(f"🔍 DEBUG: Estado de las imágenes:")
+        print(f"  - imagenes_electricas_paths: {imagenes_electricas_paths if 'imagenes_electricas_paths' in locals() else 'NO DEFINIDO'}")
+        print(f"  - imagenes_torres_paths: {imagenes_torres_paths if 'imagenes_torres_paths' in locals() else 'NO DEFINIDO'}")
+        print(f"  - imagenes_torres_b_paths: {imagenes_torres_b_paths if 'imagenes_torres_b_paths' in locals() else 'NO DEFINIDO'}")
+        print(f"  - img_consumo_path: {img_consumo_path if 'img_consumo_path' in locals() else 'NO DEFINIDO'}")
+        print(f"  - img_configuracion_path: {img_configuracion_path if 'img_configuracion_path' in locals() else 'NO DEFINIDO'}")
+        print(f"  - img_linea_vista_path: {img_linea_vista_path if 'img_linea_vista_path' in locals() else 'NO DEFINIDO'}")
+        print(f"  - imagen_kmz_path: {imagen_kmz_path if 'imagen_kmz_path' in locals() else 'NO DEFINIDO'}")
+        print(f"  - imagen_b_path: {imagen_b_path if 'imagen_b_path' in locals() else 'NO DEFINIDO'}")
+        
+        # --- VERIFICAR ARCHIVO WORD ---
+        print(f"🔍 DEBUG: Archivo Word:")
+        print(f"  - word_file_path: {word_file_path if 'word_file_path' in locals() else 'NO DEFINIDO'}")
+        print(f"  - ¿Existe word_file_path? {os.path.exists(word_file_path) if 'word_file_path' in locals() and word_file_path else False}")
+        
+        # --- VERIFICAR RUTA DEL ARCHIVO EXCEL ---
+        print(f"🔍 DEBUG: Archivo Excel generado:")
+        print(f"  - output_path: {output_path}")
+        print(f"  - ¿Existe output_path? {os.path.exists(output_path) if 'output_path' in locals() else False}")
+        
+        # --- INSERTAR ARCHIVO WORD EN DISEÑO DE SOLUCIÓN ---
+        if word_file_path and os.path.exists(word_file_path) and os.path.exists(output_path):
+            print("🔍 DEBUG: Intentando insertar archivo Word en diseño de solución...")
+            try:
+                # Abrir el archivo Excel para insertar el Word
+                app_excel = abrir_excel(visible=False)
+                wb = app_excel.books.open(output_path)
+                
+                # Insertar en la hoja 1: "Análisis de Red y Frecuencia" en D12
+                ws_word = wb.sheets['1. Análisis de Red y Frecuencia']
+                cell_range = ws_word.range('D12')
+                
+                # Insertar el archivo Word como imagen/objeto
+                ws_word.pictures.add(
+                    os.path.abspath(word_file_path),
+                    left=cell_range.left,
+                    top=cell_range.top,
+                    width=cell_range.width * 2,  # Hacer el objeto un poco más grande
+                    height=cell_range.height * 2
+                )
+                
+                # Guardar y cerrar
+                wb.save()
+                wb.close()
+                app_excel.quit()
+                
+                print("✅ Archivo Word insertado exitosamente en D12 de la hoja 'Análisis de Red y Frecuencia'")
+                
+            except Exception as e:
+                print(f"❌ Error insertando archivo Word: {e}")
+                # Intentar cerrar Excel si está abierto
+                try:
+                    if 'wb' in locals():
+                        wb.close()
+                    if 'app_excel' in locals():
+                        app_excel.quit()
+                except:
+                    pass
+        else:
+            print("⚠️ No se puede insertar archivo Word - faltan archivos o rutas")
+        
+        cache_generaciones.guardar(clave_generacion_actual, output_path)
+        trabajo.publicar(output_path, destino_final)
+        registrar_artefacto(destino_final)
+        indexar_artefacto(user_id, TIPO_DISENO, destino_final)
+        print(f"✅ Diseño de solución publicado en: {destino_final}")
+        return pagina_diseno_generado(user_id, fila_idx, datos.get('Nombre del sitio A', ''),
+                                          datos.get('Nombre del sitio B', ''))
+    else:
+        # Para site_survey y otros tipos, usar el comportamiento original
+        cache_generaciones.guardar(clave_generacion_actual, output_path)
+        registrar_artefacto(output_path)
+        return send_file(output_path, as_attachment=True)
 
-                .buttons-container {{
-                    display: flex;
-                    flex-direction: column;
-                    gap: 15px;
-                }}
 
-                .action-button {{
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    gap: 15px;
-                    padding: 20px 30px;
-                    border-radius: 12px;
-                    text-decoration: none;
-                    font-weight: 600;
-                    font-size: 1.1rem;
-                    transition: all 0.3s ease;
-                    border: none;
-                    cursor: pointer;
-                    position: relative;
-                    overflow: hidden;
-                    min-height: 60px;
-                }}
 
-                .save-button {{
-                    background: linear-gradient(135deg, #00c37a 0%, #00a870 100%);
-                    color: white;
-                    box-shadow: 0 8px 25px rgba(0, 195, 122, 0.4);
-                }}
+def enviar_llenado(formulario, archivos=None):
+    """
+    Encola el llenado de /procesar como trabajo y regresa su registro
 
-                .save-button:hover {{
-                    background: linear-gradient(135deg, #00a870 0%, #00c37a 100%);
-                    transform: translateY(-2px);
-                    box-shadow: 0 12px 35px rgba(0, 195, 122, 0.6);
-                }}
+    Los archivos subidos se copian a un espacio de preparación porque la
+    petición que los trajo termina antes que el trabajo.
+    """
+    pares = list(formulario.items(multi=True)) if hasattr(formulario, 'getlist') else list(formulario.items())
+    campos = dict(pares)
+    preparacion = EspacioTrabajo(etiqueta=campos.get('user_id'))
+    subidas = []
+    try:
+        for campo, archivo in (archivos.items(multi=True) if archivos else []):
+            if archivo and archivo.filename:
+                ruta = preparacion.ruta(f"{len(subidas)}_{secure_filename(archivo.filename)}")
+                guardar_subida(archivo, ruta)
+                subidas.append((campo, ruta, archivo.filename))
+    except BaseException:
+        preparacion.cerrar()
+        raise
+    return gestor_trabajos.enviar(_llenado_en_trabajo, campos.get('tipo', 'site_survey'), campos.get('user_id'),
+                                  campos.get('fila_idx'), pares, subidas, preparacion)
+
+
+def _llenado_en_trabajo(registro, pares, subidas, preparacion):
+    """
+    Corre el llenado de /procesar dentro de un trabajo, sin pasar por HTTP
 
-                .download-button {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    box-shadow: 0 8px 25px rgba(102, 126, 234, 0.4);
-                }}
+    Regresa None si el llenado produjo el libro; si no, el mensaje de error
+    que regresó /procesar.
+    """
+    datos = {}
+    for campo, valor in pares:
+        datos.setdefault(campo, []).append(valor)
+    abiertos = []
+    espacio = EspacioTrabajo(etiqueta=registro.user_id)
+    try:
+        for campo, ruta, nombre in subidas:
+            archivo = open(ruta, 'rb')
+            abiertos.append(archivo)
+            datos.setdefault(campo, []).append((archivo, nombre))
+        with app.test_request_context('/procesar', method='POST', data=datos):
+            respuesta = make_response(_procesar_en_espacio(espacio))
+            try:
+                if registro.artefacto is None:
+                    return respuesta.get_data(as_text=True)[:500]
+            finally:
+                respuesta.close()
+        if registro.artefacto.startswith(espacio.directorio):
+            # El Site Survey se envía desde el espacio de trabajo: se conserva para descargarlo
+            registro.artefacto = gestor_trabajos.conservar_resultado(registro, registro.artefacto)
+        return None
+    finally:
+        for archivo in abiertos:
+            archivo.close()
+        espacio.cerrar()
+        preparacion.cerrar()
 
-                .download-button:hover {{
-                    background: linear-gradient(135deg, #764ba2 0%, #667eea 100%);
-                    transform: translateY(-2px);
-                    box-shadow: 0 12px 35px rgba(102, 126, 234, 0.6);
-                }}
 
-                .upload-button {{
-                    background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%);
-                    color: white;
-                    box-shadow: 0 8px 25px rgba(240, 147, 251, 0.4);
-                }}
+@app.route('/trabajos', methods=['POST'])
+def enviar_trabajo_llenado():
+    """
+    Mismo formulario que /procesar, pero responde de inmediato con el ID del
+    trabajo; el avance se consulta en /trabajos/<id>
+    """
+    if not request.form.get('user_id'):
+        return jsonify({'success': False, 'message': 'Falta el ID'}), 400
+    registro = enviar_llenado(request.form, request.files)
+    return jsonify({
+        'success': True,
+        'trabajo_id': registro.id,
+        'estado_url': url_for('estado_trabajo', trabajo_id=registro.id),
+        'descarga_url': url_for('descargar_trabajo', trabajo_id=registro.id),
+    }), 202
 
-                .upload-button:hover {{
-                    background: linear-gradient(135deg, #f5576c 0%, #f093fb 100%);
-                    transform: translateY(-2px);
-                    box-shadow: 0 12px 35px rgba(240, 147, 251, 0.6);
-                }}
+def enviar_site_survey(user_id, fila_idx, tipo_documento='ptp'):
+    """Encola site_survey_generator como trabajo y regresa su registro"""
+    return gestor_trabajos.enviar(_site_survey_en_trabajo, f'site_survey_{tipo_documento}', user_id, fila_idx,
+                                  tipo_documento)
 
-                .button-icon {{
-                    font-size: 1.3rem;
-                    width: 24px;
-                    text-align: center;
-                }}
 
-                .button-text {{
-                    flex: 1;
-                    text-align: center;
-                }}
+def _site_survey_en_trabajo(registro, tipo_documento):
+    if not site_survey_generator(registro.user_id, registro.fila_idx, tipo_documento):
+        return f"No se pudo generar el Site Survey de {registro.user_id}"
+    return None
 
-                .footer {{
-                    text-align: center;
-                    margin-top: 30px;
-                    color: #666;
-                    font-size: 0.9rem;
-                }}
-            </style>
-        </head>
-        <body>
-            <!-- Fondo del mundo EXACTO del site survey -->
-            <div class="world-background"></div>
-            
-            <div class="main-container">
-                <div class="content-card">
-                <div class="header">
-                    <div class="success-icon">
-                            <i class="fas fa-check-circle"></i>
-                    </div>
-                    <h1 class="success-title">¡Documento Generado!</h1>
-                        <p class="success-subtitle">Diseño de Solución completado exitosamente</p>
-                        {f'<div class="llenado-status" id="llenadoStatus"><i class="fas fa-spinner fa-spin"></i> Llenado automático en progreso...</div>' if llenado_automatico == 'true' else ''}
-                    </div>
-                    
-                    <div class="info-container">
-                        <div class="info-item">
-                            <i class="fas fa-id-card"></i>
-                            <span><strong>ID:</strong> {user_id}</span>
-                        </div>
-                        
-                        <div class="info-item">
-                            <i class="fas fa-map-marker-alt"></i>
-                            <span><strong>Sitio A:</strong> {datos.get('Nombre del sitio A', '')}</span>
-                        </div>
-                        
-                        <div class="info-item">
-                            <i class="fas fa-map-marker-alt"></i>
-                            <span><strong>Sitio B:</strong> {datos.get('Nombre del sitio B', '')}</span>
-                        </div>
-                    </div>
-                    
-                    <div class="buttons-container">
-                        <!-- BOTONES DE ACCIÓN PRINCIPAL -->
-                        <button onclick="guardarArchivoDiseno('{user_id}', 'diseno_solucion', '{fila_idx}')" class="action-button save-button">
-                            <div class="button-icon">
-                                <i class="fas fa-save"></i>
-                            </div>
-                            <div class="button-text">Guardar Archivo</div>
-                        </button>
-                        
-                        <a href="/descargar_diseno_solucion?user_id={user_id}&fila_idx={fila_idx}" class="action-button download-button">
-                            <div class="button-icon">
-                            <i class="fas fa-download"></i>
-                            </div>
-                            <div class="button-text">Descargar Archivo Generado (PtP)</div>
-                        </a>
-                        
-                        <!-- BOTONES DE SUBIDA DE IMÁGENES -->
-                        <a href="/subir_imagenes_ptp?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-camera"></i>
-                            </div>
-                            <div class="button-text">Subir Imágenes - Planos A</div>
-                        </a>
-                        
-                        <a href="/subir_imagenes_ptp_planos_b?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-camera"></i>
-                            </div>
-                            <div class="button-text">Subir Imágenes - Planos B</div>
-                        </a>
-                        
-                        <a href="/subir_imagenes_ptp_fotos_a?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-camera"></i>
-                            </div>
-                            <div class="button-text">Subir Imágenes - Reporte Fotos A</div>
-                        </a>
-                        
-                        <a href="/subir_imagenes_ptp_fotos_b?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-camera"></i>
-                    </div>
-                            <div class="button-text">Subir Imágenes - Reporte Fotos B</div>
-                        </a>
 
-                        <!-- BOTONES DE SUBIDA DE ARCHIVOS ADICIONALES -->
-                        <a href="/subir_doc_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-file-word"></i>
-                            </div>
-                            <div class="button-text">Subir Documentos Word - Hoja 1</div>
-                        </a>
-                        
-                        <a href="/subir_kmz_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-map-marked-alt"></i>
-                            </div>
-                            <div class="button-text">Subir Archivos KMZ - Hoja 3</div>
-                        </a>
-                        
-                        <a href="/subir_pdf_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-file-pdf"></i>
-                            </div>
-                            <div class="button-text">Subir Documentos PDF - Hoja 4</div>
-                        </a>
-                        
-                        <a href="/subir_xlsx_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-file-excel"></i>
-                            </div>
-                            <div class="button-text">Subir Archivos Excel - Hoja 5</div>
-                        </a>
-                        
-                        <a href="/subir_dwg_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-drafting-compass"></i>
-                            </div>
-                            <div class="button-text">Subir Archivos DWG - Hoja 6</div>
-                        </a>
-                        
-                        <a href="/subir_zip_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-file-archive"></i>
-                            </div>
-                            <div class="button-text">Subir Archivos ZIP - Hoja 7</div>
-                        </a>
-                        
-                        <a href="/subir_imagenes_kmz_diseno?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-image"></i>
-                            </div>
-                            <div class="button-text">Subir Imágenes KMZ - Hoja 8</div>
-                        </a>
-                        
-                        <!-- BOTONES DE NAVEGACIÓN -->
-                        <a href="/subir_imagenes_ptp_fotos_a?user_id={user_id}&fila_idx={fila_idx}" class="action-button upload-button">
-                            <div class="button-icon">
-                                <i class="fas fa-images"></i>
-                            </div>
-                            <div class="button-text">Ir a Reporte de Planeación</div>
-                        </a>
-                        
-                        <a href="/diseno_solucion_directo?user_id={user_id}&fila_idx={fila_idx}&llenado_automatico=true" class="action-button download-button">
-                            <div class="button-icon">
-                                <i class="fas fa-tools"></i>
-                            </div>
-                            <div class="button-text">Ir a Diseño de Solución (DIRECTO)</div>
-                        </a>
-                    </div>
-                </div>
-                
-                <div class="footer">
-                    <p>© 2024 FANGIO TELECOM. Todos los derechos reservados.</p>
-                </div>
-            </div>
+def script_progreso_trabajo(trabajo_id, id_mensaje, al_terminar=''):
+    """
+    <script> que sigue un trabajo por SSE: escribe fase y porcentaje en el
+    elemento id_mensaje y ejecuta al_terminar (JS) cuando el libro está listo
+    """
+    return f"""
+    <script>
+        (function() {{
+            const mensaje = document.getElementById('{id_mensaje}');
+            const fuente = new EventSource('/trabajos/{trabajo_id}/eventos');
+            fuente.addEventListener('progreso', function(e) {{
+                const estado = JSON.parse(e.data);
+                if (mensaje) mensaje.textContent = `Llenado automático en proceso (${{estado.porcentaje}}%): ${{estado.progreso}}`;
+            }});
+            fuente.addEventListener('fin', function(e) {{
+                fuente.close();
+                const estado = JSON.parse(e.data);
+                if (mensaje) mensaje.textContent = estado.completado ? 'Llenado completado' : `Error durante el llenado: ${{estado.error}}`;
+                if (estado.completado) {{ {al_terminar} }}
+            }});
+        }})();
+    </script>
+    """
 
-            <script>
-                // Función para guardar archivo de diseño de solución
-                function guardarArchivoDiseno(userId, tipo, filaIdx) {{
-                    console.log('Guardando archivo de diseño de solución:', userId, tipo, filaIdx);
-                    
-                    // Aquí puedes implementar la lógica para guardar el archivo
-                    // Por ahora, solo mostraremos un mensaje
-                    alert('Función de guardado implementada para: ' + userId);
-                }}
-            </script>
-        </body>
-        </html>
-        """
-        
-        return render_template_string(html)
-    else:
-        # Para site_survey y otros tipos, usar el comportamiento original
-        return send_file(output_path, as_attachment=True)
 
+def _respuesta_eventos(registro):
+    """Respuesta text/event-stream con el avance del trabajo"""
+    descarga = url_for('descargar_trabajo', trabajo_id=registro.id)
+    flujo = eventos_trabajo(registro, lambda t: {'descarga_url': descarga if t.estado == 'completado' else None})
+    return Response(stream_with_context(flujo), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/trabajos/<trabajo_id>/eventos', methods=['GET'])
+def eventos_de_trabajo(trabajo_id):
+    """Server-Sent Events: 'progreso' en cada cambio de fase y 'fin' con la URL de descarga"""
+    registro = gestor_trabajos.obtener(trabajo_id)
+    if registro is None:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    return _respuesta_eventos(registro)
+
+@app.route('/trabajos/eventos', methods=['GET'])
+def eventos_ultimo_trabajo():
+    """Como /trabajos/<id>/eventos, para el último trabajo de un user_id (y tipo)"""
+    registro = gestor_trabajos.ultimo_para(request.args.get('user_id', ''), request.args.get('tipo'))
+    if registro is None:
+        return jsonify({'success': False, 'message': 'Sin trabajos para ese ID'}), 404
+    return _respuesta_eventos(registro)
+
+@app.route('/trabajos', methods=['GET'])
+def trabajos_info():
+    """Trabajos registrados en este worker, por estado"""
+    return jsonify({'success': True, 'pid': os.getpid(), **gestor_trabajos.info()})
+
+@app.route('/trabajos/<trabajo_id>', methods=['GET'])
+def estado_trabajo(trabajo_id):
+    """Fase, porcentaje y tiempos de un trabajo de generación"""
+    registro = gestor_trabajos.obtener(trabajo_id)
+    if registro is None:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    return jsonify({'success': True, **registro.a_dict()})
+
+@app.route('/trabajos/<trabajo_id>/descargar', methods=['GET'])
+def descargar_trabajo(trabajo_id):
+    """Libro generado por un trabajo completado"""
+    registro = gestor_trabajos.obtener(trabajo_id)
+    if registro is None:
+        return jsonify({'success': False, 'message': 'Trabajo no encontrado'}), 404
+    if registro.estado != 'completado':
+        return jsonify({'success': False, 'message': registro.error or registro.mensaje, **registro.a_dict()}), 409
+    return send_file(registro.artefacto, as_attachment=True, download_name=registro.nombre_descarga)
 
 
 # ===== RUTAS PARA CARGA DE ARCHIVOS ADICIONALES =====
@@ -13509,11 +12310,14 @@ def subir_pdf_diseno():
                     ruta_archivo = os.path.join(pdfs_dir, nombre_archivo)
                     
                     # Guardar el PDF
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     pdfs_procesados.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
             
             if not pdfs_procesados:
@@ -13521,7 +12325,6 @@ def subir_pdf_diseno():
             
             # Guardar información de los PDFs en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -13531,12 +12334,10 @@ def subir_pdf_diseno():
                 
                 # Verificar que el archivo Excel existe
                 if not os.path.exists(output_path):
-                    import glob
-                    patron_archivo = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}*.xlsx')
-                    archivos_encontrados = glob.glob(patron_archivo)
+                    archivo_mas_reciente = indice_artefactos().ultimo(user_id, TIPO_SITE_SURVEY)
                     
-                    if archivos_encontrados:
-                        output_path = max(archivos_encontrados, key=os.path.getctime)
+                    if archivo_mas_reciente:
+                        output_path = archivo_mas_reciente
                     else:
                         return jsonify({
                             'success': False,
@@ -13544,7 +12345,7 @@ def subir_pdf_diseno():
                         })
                 
                 # Abrir el archivo Excel existente
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 wb = app_excel.books.open(output_path)
                 
                 # Insertar PDFs en la hoja 4. Estudio de informacion A (según app2.py)
@@ -13599,6 +12400,7 @@ def subir_pdf_diseno():
                 wb.save()
                 wb.close()
                 app_excel.quit()
+                actualizar_artefacto(output_path)
                 
                 return jsonify({
                     'success': True,
@@ -13706,7 +12508,6 @@ def subir_xlsx_diseno():
             
             # Guardar información de los XLSX en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -13729,7 +12530,7 @@ def subir_xlsx_diseno():
                         })
                 
                 # Abrir el archivo Excel existente
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 wb = app_excel.books.open(output_path)
                 
                 # Insertar XLSX en la hoja 5. Estudio de informacion B (según app2.py)
@@ -13890,7 +12691,6 @@ def subir_kmz_diseno():
             
             # Guardar información de los KMZ en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -13913,7 +12713,7 @@ def subir_kmz_diseno():
                         })
                 
                 # Abrir el archivo Excel existente
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 wb = app_excel.books.open(output_path)
                 
                 # Insertar KMZ en la hoja 3. Formato KMZ (según app2.py)
@@ -14064,7 +12864,6 @@ def subir_imagen_kmz_diseno():
             
             # Guardar información de la imagen en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -14084,7 +12883,7 @@ def subir_imagen_kmz_diseno():
                         return jsonify({'success': False, 'message': 'No se encontró archivo Excel generado'})
                 
                 # Abrir Excel y insertar imagen
-                app = xw.App(visible=False)
+                app = abrir_excel(visible=False)
                 wb = app.books.open(output_path)
                 
                 try:
@@ -14202,7 +13001,6 @@ def subir_dwg_diseno():
             
             # Guardar información de los DWG en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -14225,7 +13023,7 @@ def subir_dwg_diseno():
                         })
                 
                 # Abrir el archivo Excel existente
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 wb = app_excel.books.open(output_path)
                 
                 # Insertar DWG en la hoja de Documentos
@@ -14584,7 +13382,7 @@ def subir_zip_diseno():
                 <p><strong>ID:</strong> {user_id}</p>
                 <p><strong>Fila:</strong> {fila_idx}</p>
                 
-                <form method="POST" enctype="multipart/form-data">
+                <form method="POST" enctype="multipart/form-data" id="formZip">
                     <input type="hidden" name="user_id" value="{user_id}">
                     <input type="hidden" name="fila_idx" value="{fila_idx}">
                     
@@ -14592,6 +13390,7 @@ def subir_zip_diseno():
                         <h3>📦 Área de Carga de ZIP</h3>
                         <p>Selecciona archivos comprimidos para el diseño de solución</p>
                         <input type="file" name="zip_file" accept=".zip,.rar,.7z" class="btn" multiple>
+                        <p id="avanceZip"></p>
                     </div>
                     
                     <div style="text-align: center;">
@@ -14600,6 +13399,33 @@ def subir_zip_diseno():
                     </div>
                 </form>
             </div>
+            <script src="/static/js/subida_reanudable.js"></script>
+            <script>
+                // Cada ZIP se sube por bloques reanudables; el formulario solo lleva los upload_id
+                document.getElementById('formZip').addEventListener('submit', async function(e) {{
+                    e.preventDefault();
+                    const form = e.target;
+                    const input = form.querySelector('input[name="zip_file"]');
+                    const avance = document.getElementById('avanceZip');
+                    try {{
+                        for (const file of Array.from(input.files)) {{
+                            const uploadId = await subirReanudable(file, (enviados, total) => {{
+                                avance.textContent = `⏫ ${{file.name}}: ${{Math.floor(enviados * 100 / total)}}%`;
+                            }});
+                            const campo = document.createElement('input');
+                            campo.type = 'hidden';
+                            campo.name = 'subida:zip_file';
+                            campo.value = uploadId;
+                            form.appendChild(campo);
+                        }}
+                    }} catch (error) {{
+                        avance.textContent = `❌ ${{error.message}}`;
+                        return;
+                    }}
+                    input.removeAttribute('name');
+                    form.submit();
+                }});
+            </script>
         </body>
         </html>
         """)
@@ -14634,11 +13460,14 @@ def subir_zip_diseno():
                     ruta_archivo = os.path.join(zip_dir, nombre_archivo)
                     
                     # Guardar el ZIP
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     zip_procesados.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
             
             if not zip_procesados:
@@ -14646,7 +13475,6 @@ def subir_zip_diseno():
             
             # Guardar información de los ZIP en el Excel
             try:
-                import xlwings as xw
                 import re
                 import time
                 
@@ -14669,7 +13497,7 @@ def subir_zip_diseno():
                         })
                 
                 # Abrir el archivo Excel existente
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 wb = app_excel.books.open(output_path)
                 
                 # Insertar ZIP en la hoja de Documentos
@@ -15728,7 +14556,7 @@ def descargar_diseno_solucion():
         # Leer datos de Google Sheets
         try:
             # Usar la misma URL que está definida en la aplicación
-            df = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df = hoja_enlaces.dataframe()
             print(f"DEBUG: Google Sheets leído correctamente, {len(df)} filas")
         except Exception as e:
             print(f"ERROR: No se pudo leer Google Sheets: {e}")
@@ -15846,90 +14674,47 @@ def descargar_diseno_solucion():
 @error_handler
 def verificar_estado_llenado():
     """
-    Verifica si el llenado automático se ha completado para un user_id específico
+    Estado del llenado automático de un user_id (o de un trabajo_id), leído
+    del registro de trabajos de generación
     """
     user_id = request.args.get('user_id')
-    fila_idx = request.args.get('fila_idx')
+    trabajo_id = request.args.get('trabajo_id')
+    tipo = request.args.get('tipo')
     
-    # Si no hay user_id, devolver estado completado para evitar bucles infinitos
-    if not user_id:
-        return jsonify({
-            'success': True,
-            'completado': True,
-            'progreso': 'Estado no disponible',
-            'porcentaje': 100,
-            'user_id': 'N/A'
-        })
+    if trabajo_id:
+        registro = gestor_trabajos.obtener(trabajo_id)
+    elif user_id:
+        registro = gestor_trabajos.ultimo_para(user_id, tipo)
+    else:
+        registro = None
     
-    try:
-        # Verificar si existe un archivo Excel generado recientemente (últimos 5 minutos)
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-        
-        import time
-        import glob
-        
-        # Buscar archivos de site survey Y diseño de solución para este user_id
-        patron_ss = os.path.join(archivos_generados_dir, f'ss_{user_id}*.xlsx')
-        patron_ds = os.path.join(archivos_generados_dir, f'ds_diseno_solucion_{user_id}*.xlsx')
-        
-        archivos_ss = glob.glob(patron_ss)
-        archivos_ds = glob.glob(patron_ds)
-        archivos = archivos_ss + archivos_ds
-        
-        # Verificar si hay archivos recientes (últimos 5 minutos)
-        tiempo_limite = time.time() - 300  # 5 minutos en segundos
-        archivos_recientes = []
-        
-        for archivo in archivos:
-            try:
-                tiempo_archivo = os.path.getmtime(archivo)
-                if tiempo_archivo > tiempo_limite:
-                    archivos_recientes.append(archivo)
-            except:
-                continue
-        
-        # Si hay archivos recientes, consideramos que el llenado se completó
-        completado = len(archivos_recientes) > 0
-        
-        print(f"DEBUG: Verificando estado llenado para {user_id}")
-        print(f"DEBUG: Archivos SS encontrados: {len(archivos_ss)}")
-        print(f"DEBUG: Archivos DS encontrados: {len(archivos_ds)}")
-        print(f"DEBUG: Archivos totales: {len(archivos)}")
-        print(f"DEBUG: Archivos recientes: {len(archivos_recientes)}")
-        if archivos_recientes:
-            print(f"DEBUG: Archivos recientes: {[os.path.basename(f) for f in archivos_recientes]}")
-        print(f"DEBUG: Completado: {completado}")
-        
-        # Determinar el mensaje de progreso basado en el estado
-        if completado:
-            progreso = 'Llenado completado exitosamente'
-            porcentaje = 100
-        else:
-            progreso = 'Procesando llenado automático...'
-            porcentaje = 50
-        
+    # Sin trabajo registrado no hay nada pendiente: completado para evitar bucles infinitos
+    if registro is None:
         return jsonify({
             'success': True,
-            'completado': completado,
-            'progreso': progreso,
-            'porcentaje': porcentaje,
-            'archivos_totales': len(archivos),
-            'archivos_recientes': len(archivos_recientes),
-            'user_id': user_id
-        })
-        
-    except Exception as e:
-        print(f"ERROR verificando estado llenado: {e}")
-        # En caso de error, asumir que está completado para evitar bucles infinitos
-        return jsonify({
-            'success': False,
             'completado': True,
-            'progreso': 'Error verificando estado',
+            'progreso': 'Sin llenados en curso',
             'porcentaje': 100,
-            'error': str(e)
+            'user_id': user_id or 'N/A'
         })
+    
+    estado = registro.a_dict()
+    # 'completado' indica que ya no hay que seguir consultando (también si falló)
+    estado.update(success=registro.estado != 'error', completado=registro.finalizado)
+    return jsonify(estado)
+
 
+def parametros_paginacion():
+    """(pagina, por_pagina) de la query string; valores inválidos usan los por defecto"""
+    try:
+        pagina = max(1, int(request.args.get('pagina', 1)))
+    except ValueError:
+        pagina = 1
+    try:
+        por_pagina = max(1, min(int(request.args.get('por_pagina', POR_PAGINA)), MAX_POR_PAGINA))
+    except ValueError:
+        por_pagina = POR_PAGINA
+    return pagina, por_pagina
 
 @app.route('/almacenar_archivo_permanente', methods=['POST'])
 @error_handler
@@ -15937,8 +14722,6 @@ def almacenar_archivo_permanente():
     """
     Almacena permanentemente un archivo generado en el sistema
     """
-    import json
-    import shutil
     from datetime import datetime
     
     try:
@@ -15958,26 +14741,13 @@ def almacenar_archivo_permanente():
         
         # Definir directorios
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
         archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
         
         # Crear directorio de archivos permanentes si no existe
         os.makedirs(archivos_permanentes_dir, exist_ok=True)
         
-        # Buscar el archivo generado
-        posibles_patrones = [
-            os.path.join(archivos_generados_dir, f'ds_{tipo}_{user_id}_*.xlsx'),
-            os.path.join(archivos_generados_dir, f'ds_{user_id}_*.xlsx'),
-            os.path.join(archivos_generados_dir, f'ds_*_{user_id}_*.xlsx')
-        ]
-        
-        archivo_original = None
-        for patron in posibles_patrones:
-            archivos_encontrados = glob.glob(patron)
-            if archivos_encontrados:
-                # Tomar el más reciente
-                archivo_original = sorted(archivos_encontrados, key=os.path.getctime, reverse=True)[0]
-                break
+        # Buscar el archivo generado más reciente en el índice de artefactos
+        archivo_original = indice_artefactos().ultimo(user_id, tipo)
         
         if not archivo_original or not os.path.exists(archivo_original):
             return jsonify({
@@ -15994,8 +14764,9 @@ def almacenar_archivo_permanente():
         nombre_permanente = f"PERMANENTE_{nombre_base}_{timestamp}{extension}"
         ruta_permanente = os.path.join(archivos_permanentes_dir, nombre_permanente)
         
-        # Copiar archivo a ubicación permanente
-        shutil.copy2(archivo_original, ruta_permanente)
+        # Copiar archivo a ubicación permanente (hardlink a su blob: el mismo libro se guarda una vez)
+        almacen_blobs().copiar(archivo_original, ruta_permanente)
+        indexar_artefacto(user_id, tipo_permanente(tipo), ruta_permanente)
         
         # Crear registro en la base de datos de archivos permanentes
         registro_archivo = {
@@ -16011,22 +14782,8 @@ def almacenar_archivo_permanente():
             'estado': 'permanente'
         }
         
-        # Guardar registro en archivo JSON
-        db_archivos_path = os.path.join(archivos_permanentes_dir, 'archivos_permanentes.json')
-        
-        # Cargar base de datos existente o crear nueva
-        if os.path.exists(db_archivos_path):
-            with open(db_archivos_path, 'r', encoding='utf-8') as f:
-                db_archivos = json.load(f)
-        else:
-            db_archivos = []
-        
-        # Agregar nuevo registro
-        db_archivos.append(registro_archivo)
-        
-        # Guardar base de datos actualizada
-        with open(db_archivos_path, 'w', encoding='utf-8') as f:
-            json.dump(db_archivos, f, indent=2, ensure_ascii=False)
+        # Guardar registro en el registro SQLite (un INSERT atómico)
+        registro_permanentes().agregar(registro_archivo)
         
         print(f"✅ Archivo almacenado permanentemente: {ruta_permanente}")
         print(f"📊 Tamaño: {os.path.getsize(ruta_permanente)} bytes")
@@ -16054,19 +14811,14 @@ def almacenar_archivo_permanente():
 @error_handler
 def listar_archivos_permanentes():
     """
-    Lista todos los archivos permanentemente almacenados
+    Lista los archivos permanentemente almacenados (más recientes primero)
+    Paginado con ?pagina=N&por_pagina=M; 'total' es el total sin paginar
     """
-    import json
-    import os
-    
     try:
-        # Definir directorio de archivos permanentes
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        db_archivos_path = os.path.join(archivos_permanentes_dir, 'archivos_permanentes.json')
+        pagina, por_pagina = parametros_paginacion()
+        archivos, total = registro_permanentes().listar(pagina, por_pagina)
         
-        # Verificar si existe la base de datos
-        if not os.path.exists(db_archivos_path):
+        if total == 0:
             return jsonify({
                 'success': True,
                 'archivos': [],
@@ -16074,18 +14826,13 @@ def listar_archivos_permanentes():
                 'message': 'No hay archivos permanentes almacenados'
             })
         
-        # Cargar base de datos
-        with open(db_archivos_path, 'r', encoding='utf-8') as f:
-            db_archivos = json.load(f)
-        
-        # Ordenar por fecha de creación (más reciente primero)
-        db_archivos.sort(key=lambda x: x.get('fecha_creacion', ''), reverse=True)
-        
         return jsonify({
             'success': True,
-            'archivos': db_archivos,
-            'total': len(db_archivos),
-            'message': f'Se encontraron {len(db_archivos)} archivos permanentes'
+            'archivos': archivos,
+            'total': total,
+            'pagina': pagina,
+            'por_pagina': por_pagina,
+            'message': f'Se encontraron {total} archivos permanentes'
         })
         
     except Exception as e:
@@ -16101,9 +14848,7 @@ def descargar_archivo_permanente():
     """
     Descarga un archivo permanentemente almacenado
     """
-    import os
-    import json
-    from flask import send_file, abort
+    from flask import send_file
     
     try:
         # Obtener parámetros
@@ -16115,28 +14860,8 @@ def descargar_archivo_permanente():
                 'error': 'ID de archivo no proporcionado'
             }), 400
         
-        # Definir directorio de archivos permanentes
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        db_archivos_path = os.path.join(archivos_permanentes_dir, 'archivos_permanentes.json')
-        
-        # Verificar si existe la base de datos
-        if not os.path.exists(db_archivos_path):
-            return jsonify({
-                'success': False,
-                'error': 'Base de datos de archivos no encontrada'
-            }), 404
-        
-        # Cargar base de datos
-        with open(db_archivos_path, 'r', encoding='utf-8') as f:
-            db_archivos = json.load(f)
-        
         # Buscar el archivo por ID
-        archivo_encontrado = None
-        for archivo in db_archivos:
-            if archivo.get('id') == archivo_id:
-                archivo_encontrado = archivo
-                break
+        archivo_encontrado = registro_permanentes().obtener(archivo_id)
         
         if not archivo_encontrado:
             return jsonify({
@@ -16179,82 +14904,36 @@ def descargar_archivo_permanente():
 def buscar_archivos_permanentes():
     """
     Busca archivos permanentes por criterios específicos
+    user_id y tipo por subcadena (o igualdad con ?exacto=1), rango de fechas
+    y paginación con ?pagina=N&por_pagina=M
     """
-    import json
-    import os
-    
     try:
         # Obtener parámetros de búsqueda
         user_id = request.args.get('user_id')
         tipo = request.args.get('tipo')
         fecha_inicio = request.args.get('fecha_inicio')
         fecha_fin = request.args.get('fecha_fin')
+        exacto = request.args.get('exacto', '0') == '1'
+        pagina, por_pagina = parametros_paginacion()
         
-        # Definir directorio de archivos permanentes
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        db_archivos_path = os.path.join(archivos_permanentes_dir, 'archivos_permanentes.json')
-        
-        # Verificar si existe la base de datos
-        if not os.path.exists(db_archivos_path):
-            return jsonify({
-                'success': True,
-                'archivos': [],
-                'total': 0,
-                'message': 'No hay archivos permanentes almacenados'
-            })
-        
-        # Cargar base de datos
-        with open(db_archivos_path, 'r', encoding='utf-8') as f:
-            db_archivos = json.load(f)
-        
-        # Filtrar resultados
-        resultados = []
-        for archivo in db_archivos:
-            # Filtro por user_id
-            if user_id and user_id.lower() not in str(archivo.get('user_id', '')).lower():
-                continue
-            
-            # Filtro por tipo
-            if tipo and tipo.lower() not in str(archivo.get('tipo', '')).lower():
-                continue
-            
-            # Filtro por fecha (si se especifica)
-            if fecha_inicio or fecha_fin:
-                fecha_archivo = archivo.get('fecha_creacion', '')
-                if fecha_archivo:
-                    try:
-                        from datetime import datetime
-                        fecha_archivo_dt = datetime.fromisoformat(fecha_archivo.replace('Z', '+00:00'))
-                        
-                        if fecha_inicio:
-                            fecha_inicio_dt = datetime.fromisoformat(fecha_inicio)
-                            if fecha_archivo_dt < fecha_inicio_dt:
-                                continue
-                        
-                        if fecha_fin:
-                            fecha_fin_dt = datetime.fromisoformat(fecha_fin)
-                            if fecha_archivo_dt > fecha_fin_dt:
-                                continue
-                    except:
-                        pass
-            
-            resultados.append(archivo)
-        
-        # Ordenar por fecha de creación (más reciente primero)
-        resultados.sort(key=lambda x: x.get('fecha_creacion', ''), reverse=True)
+        resultados, total = registro_permanentes().buscar(
+            user_id, tipo, fecha_inicio, fecha_fin, exacto=exacto, pagina=pagina, por_pagina=por_pagina
+        )
         
         return jsonify({
             'success': True,
             'archivos': resultados,
-            'total': len(resultados),
+            'total': total,
+            'pagina': pagina,
+            'por_pagina': por_pagina,
             'filtros_aplicados': {
                 'user_id': user_id,
                 'tipo': tipo,
                 'fecha_inicio': fecha_inicio,
-                'fecha_fin': fecha_fin
+                'fecha_fin': fecha_fin,
+                'exacto': exacto
             },
-            'message': f'Se encontraron {len(resultados)} archivos que coinciden con los criterios'
+            'message': f'Se encontraron {total} archivos que coinciden con los criterios'
         })
         
     except Exception as e:
@@ -16323,12 +15002,11 @@ def redirigir_tipo_llenado():
             # IMPORTANTE: Esta función usa la plantilla 'EJEMPLO SS VACIO.xlsx' para generar
             # un archivo de Site Survey (encuesta del sitio), NO de diseño de solución
             import pandas as pd
-            import xlwings as xw
             import os, re
             import time
             import subprocess
 
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df_db = hoja_enlaces.dataframe()
             row = df_db.loc[int(fila_idx)]
             nombre_a = row.get('Nombre del sitio A', '') if 'Nombre del sitio A' in row else ''
             nombre_b = row.get('Nombre del sitio B', '') if 'Nombre del sitio B' in row else ''
@@ -16359,7 +15037,7 @@ def redirigir_tipo_llenado():
             try:
                 # Verificar si estamos en un entorno local
                 if os.name == 'nt':  # Solo en Windows
-                    subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                    cerrar_procesos_excel()
                     print('DEBUG: Procesos de Excel cerrados')
                     time.sleep(2)
                 else:
@@ -16385,7 +15063,7 @@ def redirigir_tipo_llenado():
             
             app_excel = None
             try:
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 
                 # OPTIMIZACIONES CRÍTICAS PARA VELOCIDAD
                 app_excel.display_alerts = False  # Desactivar alertas
@@ -16541,7 +15219,7 @@ def redirigir_tipo_llenado():
             
             # Debug para tipo de zona
             tipo_zona_original = row.get('Tipo de Zona', '')
-            tipo_zona = normaliza_texto(tipo_zona_original)
+            tipo_zona = texto_normalizado(row, 'Tipo de Zona')
             print(f"*** DEBUG TIPO DE ZONA ***")
             print(f"   - Valor original: '{tipo_zona_original}'")
             print(f"   - Valor normalizado: '{tipo_zona}'")
@@ -16563,14 +15241,14 @@ def redirigir_tipo_llenado():
             # LLENADO MASIVO ULTRA-RÁPIDO - Visibilidad y Camino
             print("🔥 LLENADO MASIVO - Visibilidad y Camino...")
             
-            tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): ', '')
-            tipo_visible = normaliza_texto(tipo_visible_original)
+            tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles):', '')
+            tipo_visible = texto_normalizado(row, 'El sitio es visible de día y de noche (libre de maleza y arboles):')
             print(f"*** DEBUG VISIBILIDAD ***")
             print(f"   - Valor original: '{tipo_visible_original}'")
             print(f"   - Valor normalizado: '{tipo_visible}'")
             
             tipo_camino_original = row.get('Tipo de Camino', '')
-            tipo_camino = normaliza_texto(tipo_camino_original)
+            tipo_camino = texto_normalizado(row, 'Tipo de Camino')
             print(f"*** DEBUG TIPO DE CAMINO ***")
             print(f"   - Valor original: '{tipo_camino_original}'")
             print(f"   - Valor normalizado: '{tipo_camino}'")
@@ -16607,7 +15285,7 @@ def redirigir_tipo_llenado():
             
             tipo_caso_grua_original = row.get(campo_grua, '')
             print(f"   - Valor original: '{tipo_caso_grua_original}'")
-            tipo_caso_grua = normaliza_texto(tipo_caso_grua_original)
+            tipo_caso_grua = texto_normalizado(row, campo_grua)
             print(f"   - Valor normalizado: '{tipo_caso_grua}'")
             
             # Verificar con diferentes variaciones de mayúsculas/minúsculas
@@ -16650,7 +15328,7 @@ def redirigir_tipo_llenado():
             
             tipo_caso_grua2_original = row.get(campo_grua2, '')
             print(f"   - Valor original: '{tipo_caso_grua2_original}'")
-            tipo_caso_grua2 = normaliza_texto(tipo_caso_grua2_original)
+            tipo_caso_grua2 = texto_normalizado(row, campo_grua2)
             print(f"   - Valor normalizado: '{tipo_caso_grua2}'")
             
             # Verificar con diferentes variaciones de mayúsculas/minúsculas
@@ -16669,18 +15347,18 @@ def redirigir_tipo_llenado():
             print(f"   - Valor en S61: '{ws_info_b.range('S61').value}'")
 
             tipo_zona_original = row.get('Tipo de Zona 2', '')
-            tipo_zona = normaliza_texto(tipo_zona_original)
+            tipo_zona = texto_normalizado(row, 'Tipo de Zona 2')
             ws_info_b.range('L21').value = 'urbana' in tipo_zona
             ws_info_b.range('P21').value = 'suburbana' in tipo_zona
             ws_info_b.range('U21').value = 'rural' in tipo_zona
             ws_info_b.range('X21').value = 'ejidal' in tipo_zona
             ws_info_b.range('AB21').value = 'pueblomagico' in tipo_zona
             tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): 2', '')
-            tipo_visible = normaliza_texto(tipo_visible_original)
+            tipo_visible = texto_normalizado(row, 'El sitio es visible de día y de noche (libre de maleza y arboles): 2')
             ws_info_b.range('P22').value =  'si' in tipo_visible
             ws_info_b.range('S22').value = 'no' in tipo_visible
-            tipo_camino_original = row.get(' Tipo de Camino 2 ', '')
-            tipo_camino = normaliza_texto(tipo_camino_original)
+            tipo_camino_original = row.get('Tipo de Camino 2', '')
+            tipo_camino = texto_normalizado(row, 'Tipo de Camino 2')
             ws_info_b.range('G23').value = 'terraceria' in tipo_camino
             ws_info_b.range('L23').value = 'pavimentado' in tipo_camino
             ws_info_b.range('Q23').value =  'empedrado' in tipo_camino
@@ -16690,7 +15368,7 @@ def redirigir_tipo_llenado():
 
 
             tipo_Propietario_Administrador_original = row.get('Propietario_Administrador', '')
-            tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
+            tipo_Propietario_Administrador = texto_normalizado(row, 'Propietario_Administrador')
             ws_info_a.range('K34').value = 'telesite'in tipo_Propietario_Administrador
             ws_info_a.range('P34').value = 'ctwr' in tipo_Propietario_Administrador
             ws_info_a.range('V34').value = 'mtp' in tipo_Propietario_Administrador
@@ -16709,7 +15387,7 @@ def redirigir_tipo_llenado():
             ws_info_a.range('K37').value = 'cfe' in tipo_Propietario_Administrador
 
             tipo_Propietario_Administrador_original = row.get('Propietario_Administrador B', '')
-            tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
+            tipo_Propietario_Administrador = texto_normalizado(row, 'Propietario_Administrador B')
             ws_info_b.range('K34').value = 'telesite'in tipo_Propietario_Administrador
             ws_info_b.range('P34').value = 'ctwr' in tipo_Propietario_Administrador
             ws_info_b.range('V34').value = 'mtp' in tipo_Propietario_Administrador
@@ -16727,8 +15405,8 @@ def redirigir_tipo_llenado():
             ws_info_b.range('F37').value = 'mx tower' in tipo_Propietario_Administrador
             ws_info_b.range('K37').value = 'cfe' in tipo_Propietario_Administrador
 
-            tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio', ''))
-            tipo_tipositio = normaliza_texto(tipo_tipositio_original)
+            tipo_tipositio_original = texto_normalizado(row, 'Tipo de sitio')
+            tipo_tipositio = tipo_tipositio_original
             print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
             print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
             print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
@@ -16737,8 +15415,8 @@ def redirigir_tipo_llenado():
             ws_info_a.range('M39').value = 'sobresuelorawland' in tipo_tipositio
             ws_info_a.range('U39').value = 'sobreazotea' in tipo_tipositio
 
-            tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio B', ''))
-            tipo_tipositio = normaliza_texto(tipo_tipositio_original)
+            tipo_tipositio_original = texto_normalizado(row, 'Tipo de sitio B')
+            tipo_tipositio = tipo_tipositio_original
             print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
             print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
             print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
@@ -16751,8 +15429,8 @@ def redirigir_tipo_llenado():
             # ===== LLENADO MASIVO ULTRA-RÁPIDO - RIESGOS =====
             print("🔥 LLENADO MASIVO - Riesgos...")
             
-            tipo_riesgo_a = normaliza_texto(row.get('Riesgo', ''))
-            tipo_riesgo_b = normaliza_texto(row.get('Riesgo B', ''))
+            tipo_riesgo_a = texto_normalizado(row, 'Riesgo')
+            tipo_riesgo_b = texto_normalizado(row, 'Riesgo B')
             
             # Llenado masivo combinado de riesgos para máxima velocidad
             checkboxes_riesgos_combinados = [
@@ -16771,42 +15449,42 @@ def redirigir_tipo_llenado():
             # Llenar riesgos sitio B
             fill_cells_bulk(ws_info_b, checkboxes_riesgos_combinados[3:])
 
-            tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche?', ''))
-            tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
+            tipo_considera_accesible_original = texto_normalizado(row, 'Considera accesible el sitio de día y de noche?')
+            tipo_considera_accesible = tipo_considera_accesible_original
             ws_info_a.range('S43').value = 'solodedia' in tipo_considera_accesible
             ws_info_a.range('W43').value = 'solodenoche' in tipo_considera_accesible
             ws_info_a.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible
 
-            tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche? B', ''))
-            tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
+            tipo_considera_accesible_original = texto_normalizado(row, 'Considera accesible el sitio de día y de noche? B')
+            tipo_considera_accesible = tipo_considera_accesible_original
             ws_info_b.range('S43').value = 'solodedia' in tipo_considera_accesible
             ws_info_b.range('W43').value = 'solodenoche' in tipo_considera_accesible
             ws_info_b.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible
 
             tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes):', ''))
-            tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
+            tipo_zonasegura = texto_normalizado(row, 'El sitio se encuentra construido en zona segura (De NO derrumbes):')
             ws_info_a.range('S44').value = 'si' in tipo_zonasegura
             ws_info_a.range('W44').value = 'no' in tipo_zonasegura
 
             tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes) B:', ''))
-            tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
+            tipo_zonasegura = texto_normalizado(row, 'El sitio se encuentra construido en zona segura (De NO derrumbes) B:')
             ws_info_b.range('S44').value = 'si' in tipo_zonasegura
             ws_info_b.range('W44').value = 'no' in tipo_zonasegura
 
-            tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado', ''))
-            tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
+            tipo_horariocontrolado_original = texto_normalizado(row, 'Horario Controlado')
+            tipo_horariocontrolado = tipo_horariocontrolado_original
             ws_info_a.range('B50').value = 'si' == True
             ws_info_a.range('B50').value = 'no' == False
 
-            tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado B', ''))
-            tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
+            tipo_horariocontrolado_original = texto_normalizado(row, 'Horario Controlado B')
+            tipo_horariocontrolado = tipo_horariocontrolado_original
             ws_info_b.range('B50').value = 'si' == True
             ws_info_b.range('B50').value = 'no' == False
      
 
             # Acceso al Personal
-            acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO', ''))
-            acceso_personal = normaliza_texto(acceso_personal_original)
+            acceso_personal_original = texto_normalizado(row, 'TIPO DE ACCESO A SITIO')
+            acceso_personal = acceso_personal_original
 
             ws_info_a.range('B47').value = 'llave' in acceso_personal
             ws_info_a.range('H47').value = 'permiso/memorandum' in acceso_personal
@@ -16822,21 +15500,21 @@ def redirigir_tipo_llenado():
             elif ('llave' in acceso_personal or 'permiso/memorandum' in acceso_personal or 'tarjetaelectronica' in acceso_personal):
                 ws_info_a.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta', '')
 
-            tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con:', ''))
-            tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
+            tipo_formaingresar_original = texto_normalizado(row, 'Forma de ingresar el equipo al sitio es con:')
+            tipo_formaingresar = tipo_formaingresar_original
             ws_info_a.range('U55').value = 'maniobra' in tipo_formaingresar
             ws_info_a.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
             ws_info_a.range('AG55').value = 'izajecongrua' in tipo_formaingresar
 
-            tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con: B', ''))
-            tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
+            tipo_formaingresar_original = texto_normalizado(row, 'Forma de ingresar el equipo al sitio es con: B')
+            tipo_formaingresar = tipo_formaingresar_original
             ws_info_b.range('U55').value = 'maniobra' in tipo_formaingresar
             ws_info_b.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
             ws_info_b.range('AG55').value = 'izajecongrua' in tipo_formaingresar
 
 
-            tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:', ''))
-            tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
+            tipo_requerir_grua_original = texto_normalizado(row, 'Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:')
+            tipo_requerir_grua = tipo_requerir_grua_original
             print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
             print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
             ws_info_a.range('AB67').value = 'requieregrua' in tipo_requerir_grua
@@ -16844,15 +15522,15 @@ def redirigir_tipo_llenado():
 
 
 
-            tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B', ''))
-            tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
+            tipo_requerir_grua_original = texto_normalizado(row, 'Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B')
+            tipo_requerir_grua = tipo_requerir_grua_original
             print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
             print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
             ws_info_b.range('AB67').value = 'requieregrua' in tipo_requerir_grua
             ws_info_b.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua
 
-            acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO B', ''))
-            acceso_personal = normaliza_texto(acceso_personal_original)
+            acceso_personal_original = texto_normalizado(row, 'TIPO DE ACCESO A SITIO B')
+            acceso_personal = acceso_personal_original
 
             ws_info_b.range('B47').value = 'llave' in acceso_personal
             ws_info_b.range('H47').value = 'permiso/memorandum' in acceso_personal
@@ -16871,17 +15549,17 @@ def redirigir_tipo_llenado():
 
 
 
-            tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No)', ''))
-            tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
+            tipo_requiere_grua_original = texto_normalizado(row, 'Requiere Grua (Si / No)')
+            tipo_requiere_grua = tipo_requiere_grua_original
             ws_info_a.range('AC66').value = 'si' in tipo_requiere_grua
             ws_info_a.range('AF66').value = 'no' in tipo_requiere_grua
 
-            tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No) B', ''))
-            tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
+            tipo_requiere_grua_original = texto_normalizado(row, 'Requiere Grua (Si / No) B')
+            tipo_requiere_grua = tipo_requiere_grua_original
             ws_info_b.range('AC66').value = 'si' in tipo_requiere_grua
             ws_info_b.range('AF66').value = 'no' in tipo_requiere_grua
 
-            tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
+            tipo_llegar_original = texto_normalizado(row, 'Para la llegada al sitio con el equipo a instalar, se requiere de:')
             # Separa por coma y normaliza solo el primer valor
             primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
             primer_tipo = normaliza_texto(primer_valor)
@@ -16892,7 +15570,7 @@ def redirigir_tipo_llenado():
             ws_info_a.range('M72').value = (primer_tipo == 'animalesdecarga')
 
 
-            tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
+            tipo_llegar_original = texto_normalizado(row, 'Para la llegada al sitio con el equipo a instalar, se requiere de:')
             # Separa por coma y normaliza solo el primer valor
             primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
             primer_tipo = normaliza_texto(primer_valor)
@@ -16903,50 +15581,50 @@ def redirigir_tipo_llenado():
             ws_info_b.range('M72').value = (primer_tipo == 'animalesdecarga')
 
 
-            policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito?', '').strip().lower())
+            policia_original = texto_normalizado(row, 'Existe cerca del sitio alguna comandancia de policía o del ejercito?')
             ws_info_a.range('AB105').value = 'si' in policia_original
             ws_info_a.range('AE105').value = 'no' in policia_original
 
             if 'si' in policia_original:
-                ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia',) 
+                ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia policia',) 
                 ws_info_a.range('U107').value = row.get('Se cuenta con algún número de teléfono?, indíquelo', 'N/A') or 'N/A'
             else:
                 ws_info_a.range('U106').value = 'N/A'
                 ws_info_a.range('U107').value = 'N/A'
 
     # --- Cruz Roja, Hospital, asistencia médica ---
-            cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.', '').strip().lower())
+            cruzroja_original = texto_normalizado(row, 'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.')
             ws_info_a.range('AB108').value = 'si' in cruzroja_original
             ws_info_a.range('AE108').value = 'no' in cruzroja_original
 
             if 'si' in cruzroja_original:
-                ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz ', )  
+                ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz', )  
                 ws_info_a.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz', )
             else:
                 ws_info_a.range('U109').value = 'N/A'
                 ws_info_a.range('U110').value = 'N/A'
 
           # --- Mapa Nacional de Riesgos ---
-            riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:', '').strip().lower())
+            riesgo = texto_normalizado(row, 'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:')
             ws_info_a.range('Y111').value = 'bajo' in riesgo
             ws_info_a.range('AB111').value = 'medio' in riesgo
             ws_info_a.range('AE111').value = 'alto' in riesgo
 
 
 
-            policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito? B', ''))
+            policia_original = texto_normalizado(row, 'Existe cerca del sitio alguna comandancia de policía o del ejercito? B')
             ws_info_b.range('AB105').value = 'si' in policia_original
             ws_info_b.range('AE105').value = 'no' in policia_original
 
             if 'si' in policia_original:
-                ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia B',) 
+                ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia policia B',) 
                 ws_info_b.range('U107').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: B',) 
             else:
                 ws_info_b.range('U106').value = 'N/A'
                 ws_info_b.range('U107').value = 'N/A'
 
             # --- Cruz Roja, Hospital, asistencia médica ---
-            cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B', ''))
+            cruzroja_original = texto_normalizado(row, 'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B')
             ws_info_b.range('AB108').value = 'si' in cruzroja_original
             ws_info_b.range('AE108').value = 'no' in cruzroja_original
 
@@ -16958,7 +15636,7 @@ def redirigir_tipo_llenado():
                 ws_info_b.range('U110').value = 'N/A'
 
               # --- Mapa Nacional de Riesgos ---
-            riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B', ''))
+            riesgo = texto_normalizado(row, 'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B')
             ws_info_b.range('Y111').value = 'bajo' in riesgo
             ws_info_b.range('AB111').value = 'medio' in riesgo
             ws_info_b.range('AE111').value = 'alto' in riesgo
@@ -16967,33 +15645,33 @@ def redirigir_tipo_llenado():
 
 
 
-            tipo_torre = normaliza_texto(row.get('Tipo de Torre', ''))
+            tipo_torre = texto_normalizado(row, 'Tipo de Torre')
             ws_info_c.range('G8').value = tipo_torre == 'autosoportada'
             ws_info_c.range('O8').value = tipo_torre == 'arriostrada'
             ws_info_c.range('V8').value = tipo_torre == 'Monopolo'
             ws_info_c.range('AB8').value = tipo_torre == 'Minipolo'
             ws_info_c.range('AG8').value = tipo_torre == 'otro'
 
-            espacio_disponible = normaliza_texto(row.get('¿Espacio disponible de conexión?', ''))
+            espacio_disponible = texto_normalizado(row, '¿Espacio disponible de conexión?')
             ws_info_c.range('AH25').value = espacio_disponible == 'si'
             ws_info_c.range('AK25').value = espacio_disponible == 'no'
             ws_info_c.range('U14').value = espacio_disponible == 'si'
             ws_info_c.range('Y14').value = espacio_disponible == 'no'
 
 
-            existe_break = normaliza_texto(row.get('¿Existe algun breaker existente en sitio? ', ''))
+            existe_break = texto_normalizado(row, '¿Existe algun breaker existente en sitio?')
             ws_info_c.range('Y21').value = existe_break == 'si'
             ws_info_c.range('AB21').value = existe_break == 'no'
 
         
-            alimentacion_compatible = normaliza_texto(row.get('Alimentacion compatible con el equipamiento ', ''))
+            alimentacion_compatible = texto_normalizado(row, 'Alimentacion compatible con el equipamiento')
             print(f"*** DEBUG ALIMENTACIÓN COMPATIBLE ***")
             print(f"   - Valor: '{alimentacion_compatible}'")
             set_checkbox(ws_info_c, 'Y25', alimentacion_compatible == 'si', "Alimentación Compatible - Sí")
             set_checkbox(ws_info_c, 'AB25', alimentacion_compatible == 'no', "Alimentación Compatible - No")
 
             sistema_electrico_original = row.get('SISTEMA ELECTRICO', '')
-            sistema_electrico = normaliza_texto(sistema_electrico_original)
+            sistema_electrico = texto_normalizado(row, 'SISTEMA ELECTRICO')
             print(f"*** DEBUG SISTEMA ELÉCTRICO ***")
             print(f"   - Valor original: '{sistema_electrico_original}'")
             print(f"   - Valor normalizado: '{sistema_electrico}'")
@@ -17002,7 +15680,7 @@ def redirigir_tipo_llenado():
 
 
 
-            cara_propuesta = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre', ''))
+            cara_propuesta = texto_normalizado(row, 'Cara de preparación para cableado vertical en torre')
             print(f"*** DEBUG CARA PROPUESTA ***")
             print(f"   - Valor: '{cara_propuesta}'")
             set_checkbox(ws_info_c, 'Y16', cara_propuesta == 'a', "Cara Propuesta - A")
@@ -17010,13 +15688,13 @@ def redirigir_tipo_llenado():
             set_checkbox(ws_info_c, 'AE16', cara_propuesta == 'c', "Cara Propuesta - C")
             set_checkbox(ws_info_c, 'AN16', cara_propuesta == 'd', "Cara Propuesta - D")
 
-            barra_tierra = normaliza_texto(row.get('Barra de Tierra', ''))
+            barra_tierra = texto_normalizado(row, 'Barra de Tierra')
             print(f"*** DEBUG BARRA DE TIERRA ***")
             print(f"   - Valor: '{barra_tierra}'")
             set_checkbox(ws_info_c, 'O27', barra_tierra == 'si', "Barra de Tierra - Sí")
             set_checkbox(ws_info_c, 'R27', barra_tierra == 'no', "Barra de Tierra - No")
 
-            tipo_solucion = normaliza_texto(row.get('Tipo de Solucion', ''))
+            tipo_solucion = texto_normalizado(row, 'Tipo de Solucion')
             print(f"*** DEBUG TIPO DE SOLUCIÓN ***")
             print(f"   - Valor: '{tipo_solucion}'")
             set_checkbox(ws_info_c, 'O29', tipo_solucion == 'piso', "Tipo Solución - Piso")
@@ -17025,49 +15703,49 @@ def redirigir_tipo_llenado():
 
 
         
-            tipo_torre2 = normaliza_texto(row.get('Tipo de Torre2', ''))
+            tipo_torre2 = texto_normalizado(row, 'Tipo de Torre2')
             ws_info_c.range('G32').value = tipo_torre2 == 'autosoportada'
             ws_info_c.range('O32').value = tipo_torre2 == 'arriostrada'
             ws_info_c.range('V32').value = tipo_torre2 == 'monopolo'
             ws_info_c.range('AB32').value = tipo_torre2 == 'minipolo'
             ws_info_c.range('AG32').value = tipo_torre2 == 'otro'
 
-            espacio_disponible2 = normaliza_texto(row.get('¿Espacio disponible de conexión?2', ''))
+            espacio_disponible2 = texto_normalizado(row, '¿Espacio disponible de conexión?2')
             ws_info_c.range('U38').value = espacio_disponible2 == 'si'
             ws_info_c.range('Y38').value = espacio_disponible2 == 'no'
 
-            cara_preparacion2 = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre 2', ''))
+            cara_preparacion2 = texto_normalizado(row, 'Cara de preparación para cableado vertical en torre 2')
             ws_info_c.range('Y40').value = cara_preparacion2 == 'a'
             ws_info_c.range('AD40').value = cara_preparacion2 == 'b'
             ws_info_c.range('AI40').value = cara_preparacion2 == 'c'
             ws_info_c.range('AN40').value = cara_preparacion2 == 'd'
         
-            existe_tierra2 = normaliza_texto(row.get('Existe Barra de Tierras 2', ''))
+            existe_tierra2 = texto_normalizado(row, 'Existe Barra de Tierras 2')
             ws_info_c.range('O51').value = existe_tierra2 == 'si'
             ws_info_c.range('R51').value = existe_tierra2 == 'no'
 
-            tipo_solucion2 = normaliza_texto(row.get('Tipo de solucion 2', ''))
+            tipo_solucion2 = texto_normalizado(row, 'Tipo de solucion 2')
             ws_info_c.range('O53').value = tipo_solucion2 == 'piso'
             ws_info_c.range('R53').value = tipo_solucion2 == 'torre'
         
-            existe_break2 = normaliza_texto(row.get('Existe algun breaker existente en sitio 2 ', ''))
+            existe_break2 = texto_normalizado(row, 'Existe algun breaker existente en sitio 2')
             ws_info_c.range('Y45').value = existe_break2 == 'si'
             ws_info_c.range('AB45').value = existe_break2 == 'no'
 
-            alimenacion_existente2= normaliza_texto(row.get('SISTEMA ELECTRICO 2', ''))
+            alimenacion_existente2= texto_normalizado(row, 'SISTEMA ELECTRICO 2')
             ws_info_c.range('AG45').value = 'monofasica' in alimenacion_existente2
             ws_info_c.range('AL45').value = 'bifasica' in alimenacion_existente2
         
-            alimenacion_compatible2= normaliza_texto(row.get('Alimentacion compatible con el equipamiento 2', ''))
+            alimenacion_compatible2= texto_normalizado(row, 'Alimentacion compatible con el equipamiento 2')
             ws_info_c.range('Y49').value = alimenacion_compatible2 == 'si'
             ws_info_c.range('AB49').value = alimenacion_compatible2 == 'no'
 
-            espacio_conexion2= normaliza_texto(row.get('¿Espacio disponible de conexión? 2', ''))
+            espacio_conexion2= texto_normalizado(row, '¿Espacio disponible de conexión? 2')
             ws_info_c.range('AH49').value = espacio_conexion2 == 'si'
             ws_info_c.range('AK49').value = espacio_conexion2 == 'no'
 
-            linea_vista = normaliza_texto(row.get('Linea de vista ', ''))
-            motivo = normaliza_texto(row.get('Motivo ', ''))
+            linea_vista = texto_normalizado(row, 'Linea de vista')
+            motivo = texto_normalizado(row, 'Motivo')
 
             ws_info_c.range('R56').value = (linea_vista == 'si')
             ws_info_c.range('V56').value = (linea_vista == 'no')
@@ -17090,141 +15768,8 @@ def redirigir_tipo_llenado():
                   ws_info_c.range('C58').value = True
 
             
-             # Llenado automático de celdas usando el diccionario de mapeo
-            campos_a_celdas = {
-                'Fecha Inicio Site Survey': 'G8',
-                'Fecha final Site Survey': 'AF8',
-                'NOMBRE DEL SITIO': 'J9', 
-                'PROPIETARIO': 'M10',
-                'ID': 'AF9',
-                'ESTADO ':'AC15',
-                'Calle': 'D14',
-                'Colonia': 'D15',
-                'Municipio': 'E16',
-                'C.P': 'AC14',
-                'Referencias':'J17',
-                'Nombre de contacto en sitio': 'H19',
-                'Telefono': 'AB19',
-                'LATITUD (TORRE)': 'K30',
-                'LONGITUD (TORRE)': 'AA30',
-                'LATITUD (FACHADA)': 'K27',
-                'LONGITUD (FACHADA)': 'AA27',
-                'Altitud (msnm)': 'M31',
-                'Horario de solicitud de accesos': 'Q50',
-                'Contacto solicitud de accesos': 'B52',
-                'Como o donde obtener permisos/llave/tarjeta': 'O49',
-                'Comentario:Forma de ingresar el equipo al sitio es con:': 'B57',
-                'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-                'Si la respuesta anterior es si, Indique a que distancia ':'AD72'
-            }
-            for campo, celdas in campos_a_celdas.items():
-                valor_raw = row.get(campo, "")
-                valor = normaliza_na(valor_raw)
-                if campo == 'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.':
-                    print(f"Valor para {campo}: '{valor}' (celda {celdas})")
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_info_a.range(celda).value = valor
-                else:
-                    ws_info_a.range(celdas).value = valor
-
-            campos_b_celdas = {
-                'Fecha Inicio Site Survey B': 'G8',
-                'Fecha final Site Survey B': 'AF8',
-                'Nombre del sitio 2': 'J9', 
-                'PROPIETARIO 2': 'M10',
-                'ID 2': 'AF9',
-                'ESTADO 2 ':'AC15',
-                'Calle 2': 'D14',
-                'Colonia 2': 'D15',
-                'Municipio 2': 'E16',
-                'C.P 2': 'AC14',
-                'Referencias 2':'J17',
-                'Nombre de contacto en sitio 2': 'H19',
-                'Telefono 2': 'AB19',
-                'LATITUD (TORRE) 2': 'K30',
-                'LONGITUD (TORRE) 2': 'AA30',
-                'LATITUD (FACHADA) 2': 'K27',
-                'LONGITUD (FACHADA) 2': 'AA27',
-                'Altitud (msnm) 2': 'M31',
-                'Horario de solicitud de accesos B': 'Q50',
-                'Contacto solicitud de accesos B': 'B52',
-                'Como o donde obtener permisos/llave/tarjeta B': 'O49',
-                'Comentario:Forma de ingresar el equipo al sitio es con: B': 'B57',
-                'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-                'Si la respuesta anterior es si, Indique a que distancia B':'AD72'
-            }
-            for campo, celdas in campos_b_celdas.items():
-                valor_raw = row.get(campo, "")
-                valor = normaliza_na(valor_raw)
-                if campo == 'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.':
-                   print(f"Valor para {campo}: '{valor}' (celda {celdas})")
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_info_b.range(celda).value = valor
-                else:
-                    ws_info_b.range(celdas).value = valor    
-
-            campos_c_celdas = {
-            'NOMBRE DEL SITIO': 'G7',
-            'Diametro de pierna superior':'K9',
-            'Diametro de pierna Inferior':'U9',
-            'NCRA RB':'AC9',
-            'Franja2RB':'AM9',
-            'Altura de la Torre':'K10',
-            'Dado':'U10',
-            'Altura Edificio1':'AE10',
-            'Nivel inferior de franja disponible': 'T11',
-            'Nivel superior de franja disponible': 'AK11',
-            'Altura de MW conforme a topologia': 'B14',
-            'Azimut RB ': 'M14',
-            'Propuesta de altura de antena de MW1': 'AB14',
-            'Propuesta de altura de antena de MW (SD)1': 'AJ14',
-            'Altura de soporte para OMB propuesto': 'O19',
-            'Longitud del cable de tierra nuevo OMB': 'O20',
-            'Longitud del cable de tierra ODU': 'O21',
-            'Longitud de cable IF': 'O22',
-            'Tipo de soporte para antena MW propuesto': 'O23',
-            'Longitud de cable ACDB-Nuevo OMB': 'O24',
-            'Longitud de cable RTN - Router':'O25',
-            'Longitud de cable RTN - BBU SITE 1': 'O26',
-            'MEDICION DE BARRA DE TIERRA (Ohms)':'O28',
-            'Nombre del sitio 2': 'G31',
-            'Diámetro de Pierna superio2':'K33',
-            'Diámetro de Pierna inferior2':'U33',
-            ' NCRA2 ':'AC33',
-            'Franja2-2':'AM33',
-            'Altura torre 2': 'K34',
-            'DADO 2':'U34',
-            'Altura edificio 2':'AE34',
-            'Nivel inferior de franja disponible 2': 'T35',
-            'Nivel superior de franja disponible 2': 'AK35',
-            'Altura de MW conforme a topologia 2': 'B38',
-            'Azimut 2': 'M38',
-            'Propuesta de altura de antena de MW2': 'AB38',
-            'Propuesta de altura de antena de MW (SD)2':'AJ38',
-            'Altura de soporte para OMB propuesto2':'O43',
-            'Longitud del cable de tierra nuevo OMB 2': 'O44',
-            'Longitud del cable de tierra ODU 2': 'O45',
-            'Longitud de cable IF 2': 'O46',
-            'Tipo de soporte para antena MW propuesto 2': 'O47',
-            'Longitud de cable ACDB-Nuevo OMB 2': 'O48',
-            'Longitud de cable RTN - Router 2': 'O49',
-            'Longitud de cable RTN - BBU 2': 'O50',
-            'Medición del Sistema de Tierras 2': 'O52',
-         
-
-
-            }
-            for campo, celdas in campos_c_celdas.items():
-                valor_raw = row.get(campo, "")
-                valor = normaliza_na(valor_raw)
-                print(f"ws_info_c: Escribiendo en {celdas} el valor '{valor}' para campo '{campo}' (original: {valor_raw}, tipo: {type(valor_raw)})")
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_info_c.range(celda).value = valor
-                else:
-                    ws_info_c.range(celdas).value = valor   
+            # Campos de texto de las hojas 1-3 (fill_spec)
+            ejecutar_plan(PLAN_DATOS_SITE_SURVEY_PTP, wb, row)
 
             # GUARDAR ARCHIVO CON MANEJO ROBUSTO DE EXCEL
             try:
@@ -17254,14 +15799,15 @@ def redirigir_tipo_llenado():
                 
                 # Copiar la plantilla directamente en lugar de usar xlwings
                 import shutil
-                shutil.copy2(plantilla_path, output_path)
+                registro_plantillas.clonar(plantilla_path, output_path)
+                indexar_artefacto(user_id, TIPO_SITE_SURVEY, output_path)
                 
                 print(f'DEBUG: Archivo generado exitosamente: {output_path}')
                 
                 # Limpiar procesos de Excel de forma más agresiva
                 try:
                     if os.name == 'nt':  # Solo en Windows
-                        subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                        cerrar_procesos_excel()
                         subprocess.run(['taskkill', '/f', '/im', 'WINWORD.EXE'], capture_output=True)
                         print('DEBUG: Procesos de Office cerrados completamente')
                         time.sleep(2)
@@ -17287,7 +15833,7 @@ def redirigir_tipo_llenado():
                 # Limpiar procesos de Excel de forma agresiva
                 try:
                     if os.name == 'nt':
-                        subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                        cerrar_procesos_excel()
                         subprocess.run(['taskkill', '/f', '/im', 'WINWORD.EXE'], capture_output=True)
                         time.sleep(2)
                 except:
@@ -17313,7 +15859,7 @@ def redirigir_tipo_llenado():
             # Limpiar procesos de Excel de forma agresiva
             try:
                 if os.name == 'nt':
-                    subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                    cerrar_procesos_excel()
                     subprocess.run(['taskkill', '/f', '/im', 'WINWORD.EXE'], capture_output=True)
                     time.sleep(2)
             except:
@@ -17328,7 +15874,7 @@ def redirigir_tipo_llenado():
         # Limpiar procesos de Excel antes de redirigir
         try:
             import subprocess
-            subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+            cerrar_procesos_excel()
             print('DEBUG: Procesos de Excel cerrados antes de diseño de solución')
             import time
             time.sleep(1)
@@ -17343,11 +15889,10 @@ def redirigir_tipo_llenado():
             # IMPORTANTE: Esta función usa la plantilla 'EJEMPLO SS PtMP VACIO.xlsx' para generar
             # un archivo de Site Survey PtMP (encuesta del sitio), NO de diseño de solución
             import pandas as pd
-            import xlwings as xw
             import os, re
 
             print('DEBUG: Leyendo CSV de Google Sheets...')
-            df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL)
+            df_db = hoja_enlaces.dataframe()
             print(f'DEBUG: CSV leído, fila_idx = {fila_idx}')
             row = df_db.loc[int(fila_idx)]
             print('DEBUG: Fila obtenida correctamente')
@@ -17388,7 +15933,7 @@ def redirigir_tipo_llenado():
             try:
                 # Verificar si estamos en un entorno local
                 if os.name == 'nt':  # Solo en Windows
-                 subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+                 cerrar_procesos_excel()
                  print('DEBUG: Procesos de Excel cerrados')
                  time.sleep(1)
                 else:
@@ -17399,7 +15944,7 @@ def redirigir_tipo_llenado():
             # Solo abrir Excel si es necesario
             app_excel = None
             try:
-                app_excel = xw.App(visible=False)
+                app_excel = abrir_excel(visible=False)
                 print('DEBUG: Excel iniciado correctamente')
             except Exception as excel_error:
                 print(f'DEBUG: Error iniciando Excel: {excel_error}')
@@ -17457,7 +16002,7 @@ def redirigir_tipo_llenado():
             
             # Tipo de Zona - SECTOR
             tipo_zona_original = row.get('Tipo de Zona', '')
-            tipo_zona = normaliza_texto(tipo_zona_original)
+            tipo_zona = texto_normalizado(row, 'Tipo de Zona')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('C22').value = 'urbana' in tipo_zona
             ws_sector.range('D21').value = 'suburbana' in tipo_zona
@@ -17468,15 +16013,15 @@ def redirigir_tipo_llenado():
             # Título del documento PtMP
             
             # Visibilidad del sitio - SECTOR
-            tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): ', '')
-            tipo_visible = normaliza_texto(tipo_visible_original)
+            tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles):', '')
+            tipo_visible = texto_normalizado(row, 'El sitio es visible de día y de noche (libre de maleza y arboles):')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('E23').value = 'si' in tipo_visible
             ws_sector.range('G21').value = 'no' in tipo_visible
             
             # Tipo de Camino - SECTOR
             tipo_camino_original = row.get('Tipo de Camino', '')
-            tipo_camino = normaliza_texto(tipo_camino_original)
+            tipo_camino = texto_normalizado(row, 'Tipo de Camino')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('B25').value = 'terraceria' in tipo_camino
             ws_sector.range('D25').value = 'pavimentado' in tipo_camino
@@ -17485,7 +16030,7 @@ def redirigir_tipo_llenado():
 
             # Tipo de Zona - CPE
             tipo_zona_original = row.get('Tipo de Zona 2', '')
-            tipo_zona = normaliza_texto(tipo_zona_original)
+            tipo_zona = texto_normalizado(row, 'Tipo de Zona 2')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('C22').value = 'urbana' in tipo_zona
             ws_cpe.range('D21').value = 'suburbana' in tipo_zona
@@ -17495,14 +16040,14 @@ def redirigir_tipo_llenado():
             
             # Visibilidad del sitio - CPE
             tipo_visible_original = row.get('El sitio es visible de día y de noche (libre de maleza y arboles): 2', '')
-            tipo_visible = normaliza_texto(tipo_visible_original)
+            tipo_visible = texto_normalizado(row, 'El sitio es visible de día y de noche (libre de maleza y arboles): 2')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('E23').value = 'si' in tipo_visible
             ws_cpe.range('F20').value = 'no' in tipo_visible
             
             # Tipo de Camino - CPE
-            tipo_camino_original = row.get(' Tipo de Camino 2 ', '')
-            tipo_camino = normaliza_texto(tipo_camino_original)
+            tipo_camino_original = row.get('Tipo de Camino 2', '')
+            tipo_camino = texto_normalizado(row, 'Tipo de Camino 2')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('B25').value = 'terraceria' in tipo_camino
             ws_cpe.range('D25').value = 'pavimentado' in tipo_camino
@@ -17511,7 +16056,7 @@ def redirigir_tipo_llenado():
 
             # Propietario/Administrador - SECTOR
             tipo_Propietario_Administrador_original = row.get('Propietario_Administrador', '')
-            tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
+            tipo_Propietario_Administrador = texto_normalizado(row, 'Propietario_Administrador')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('A34').value = 'telesite' in tipo_Propietario_Administrador
             ws_sector.range('D36').value = 'ctwr' in tipo_Propietario_Administrador
@@ -17532,7 +16077,7 @@ def redirigir_tipo_llenado():
 
             # Propietario/Administrador - CPE
             tipo_Propietario_Administrador_original = row.get('Propietario_Administrador B', '')
-            tipo_Propietario_Administrador = normaliza_texto(tipo_Propietario_Administrador_original)
+            tipo_Propietario_Administrador = texto_normalizado(row, 'Propietario_Administrador B')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('B37').value = 'banbien' in tipo_Propietario_Administrador
             ws_cpe.range('C37').value = 'sepomex' in tipo_Propietario_Administrador
@@ -17552,8 +16097,8 @@ def redirigir_tipo_llenado():
             # ws_cpe.range('').value = 'cfe' in tipo_Propietario_Administrador
 
             # Tipo de sitio - SECTOR
-            tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio', ''))
-            tipo_tipositio = normaliza_texto(tipo_tipositio_original)
+            tipo_tipositio_original = texto_normalizado(row, 'Tipo de sitio')
+            tipo_tipositio = tipo_tipositio_original
             print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
             print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
             print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
@@ -17564,8 +16109,8 @@ def redirigir_tipo_llenado():
             ws_sector.range('E45').value = 'sobreazotea' in tipo_tipositio
 
             # Tipo de sitio - CPE
-            tipo_tipositio_original = normaliza_texto(row.get('Tipo de sitio B', ''))
-            tipo_tipositio = normaliza_texto(tipo_tipositio_original)
+            tipo_tipositio_original = texto_normalizado(row, 'Tipo de sitio B')
+            tipo_tipositio = tipo_tipositio_original
             print(f"Tipo de sitio original: '{tipo_tipositio_original}'")
             print(f"Tipo de sitio normalizado: '{tipo_tipositio}'")
             print(f"¿Contiene 'terrenogreenfield'? {'terrenogreenfield' in tipo_tipositio}")
@@ -17576,32 +16121,32 @@ def redirigir_tipo_llenado():
             ws_cpe.range('E44').value = 'sobreazotea' in tipo_tipositio
 
             # Riesgo - SECTOR
-            tipo_riesgo_original = normaliza_texto(row.get('Riesgo', ''))
-            tipo_riesgo = normaliza_texto(tipo_riesgo_original)
+            tipo_riesgo_original = texto_normalizado(row, 'Riesgo')
+            tipo_riesgo = tipo_riesgo_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('F46').value = 'delitocomunroboatranseuntes' in tipo_riesgo
             ws_sector.range('C46').value = 'inconformidadvecinalconbloqueo' in tipo_riesgo
             ws_sector.range('G47').value = 'delincuenciaorganizada' in tipo_riesgo
 
             # Riesgo - CPE
-            tipo_riesgo_original = normaliza_texto(row.get('Riesgo B', ''))
-            tipo_riesgo = normaliza_texto(tipo_riesgo_original)
+            tipo_riesgo_original = texto_normalizado(row, 'Riesgo B')
+            tipo_riesgo = tipo_riesgo_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('F45').value = 'delitocomunroboatranseuntes' in tipo_riesgo
             ws_cpe.range('C45').value = 'inconformidadvecinalconbloqueo' in tipo_riesgo
             ws_cpe.range('G46').value = 'delincuenciaorganizada' in tipo_riesgo
 
             # Accesibilidad - SECTOR
-            tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche?', ''))
-            tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
+            tipo_considera_accesible_original = texto_normalizado(row, 'Considera accesible el sitio de día y de noche?')
+            tipo_considera_accesible = tipo_considera_accesible_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('C48').value = 'solodedia' in tipo_considera_accesible
             ws_sector.range('D48').value = 'solodenoche' in tipo_considera_accesible
             ws_sector.range('F47').value = 'sinproblemadehora' in tipo_considera_accesible
 
             # Accesibilidad - CPE
-            tipo_considera_accesible_original = normaliza_texto(row.get('Considera accesible el sitio de día y de noche? B', ''))
-            tipo_considera_accesible = normaliza_texto(tipo_considera_accesible_original)
+            tipo_considera_accesible_original = texto_normalizado(row, 'Considera accesible el sitio de día y de noche? B')
+            tipo_considera_accesible = tipo_considera_accesible_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('C47').value = 'solodedia' in tipo_considera_accesible
             ws_cpe.range('D47').value = 'solodenoche' in tipo_considera_accesible
@@ -17609,27 +16154,27 @@ def redirigir_tipo_llenado():
 
             # Zona segura - SECTOR
             tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes):', ''))
-            tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
+            tipo_zonasegura = texto_normalizado(row, 'El sitio se encuentra construido en zona segura (De NO derrumbes):')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('G50').value = 'si' in tipo_zonasegura
             ws_sector.range('H50').value = 'no' in tipo_zonasegura
 
             # Zona segura - CPE
             tipo_zonasegura_original = (row.get('El sitio se encuentra construido en zona segura (De NO derrumbes) B:', ''))
-            tipo_zonasegura = normaliza_texto(tipo_zonasegura_original)
+            tipo_zonasegura = texto_normalizado(row, 'El sitio se encuentra construido en zona segura (De NO derrumbes) B:')
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('G49').value = 'si' in tipo_zonasegura
             ws_cpe.range('H49').value = 'no' in tipo_zonasegura
 
             # Horario controlado - SECTOR
-            tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado', ''))
-            tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
+            tipo_horariocontrolado_original = texto_normalizado(row, 'Horario Controlado')
+            tipo_horariocontrolado = tipo_horariocontrolado_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_sector.range('B55').value = 'si' in tipo_horariocontrolado
 
             # Horario controlado - CPE
-            tipo_horariocontrolado_original = normaliza_texto(row.get('Horario Controlado B', ''))
-            tipo_horariocontrolado = normaliza_texto(tipo_horariocontrolado_original)
+            tipo_horariocontrolado_original = texto_normalizado(row, 'Horario Controlado B')
+            tipo_horariocontrolado = tipo_horariocontrolado_original
             # TODO: Agregar coordenadas correctas para PtMP
             ws_cpe.range('B54').value = 'si' in tipo_horariocontrolado
 
@@ -17637,8 +16182,8 @@ def redirigir_tipo_llenado():
 
 
             # Acceso al Personal
-            acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO', ''))
-            acceso_personal = normaliza_texto(acceso_personal_original)
+            acceso_personal_original = texto_normalizado(row, 'TIPO DE ACCESO A SITIO')
+            acceso_personal = acceso_personal_original
 
             ws_info_a.range('B47').value = 'llave' in acceso_personal
             ws_info_a.range('H47').value = 'permiso/memorandum' in acceso_personal
@@ -17654,21 +16199,21 @@ def redirigir_tipo_llenado():
             elif ('llave' in acceso_personal or 'permiso/memorandum' in acceso_personal or 'tarjetaelectronica' in acceso_personal):
                 ws_info_a.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta', '')
 
-            tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con:', ''))
-            tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
+            tipo_formaingresar_original = texto_normalizado(row, 'Forma de ingresar el equipo al sitio es con:')
+            tipo_formaingresar = tipo_formaingresar_original
             ws_info_a.range('U55').value = 'maniobra' in tipo_formaingresar
             ws_info_a.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
             ws_info_a.range('AG55').value = 'izajecongrua' in tipo_formaingresar
 
-            tipo_formaingresar_original = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con: B', ''))
-            tipo_formaingresar = normaliza_texto(tipo_formaingresar_original)
+            tipo_formaingresar_original = texto_normalizado(row, 'Forma de ingresar el equipo al sitio es con: B')
+            tipo_formaingresar = tipo_formaingresar_original
             ws_info_b.range('U55').value = 'maniobra' in tipo_formaingresar
             ws_info_b.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
             ws_info_b.range('AG55').value = 'izajecongrua' in tipo_formaingresar
 
 
-            tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:', ''))
-            tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
+            tipo_requerir_grua_original = texto_normalizado(row, 'Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:')
+            tipo_requerir_grua = tipo_requerir_grua_original
             print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
             print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
             ws_info_a.range('AB67').value = 'requieregrua' in tipo_requerir_grua
@@ -17676,15 +16221,15 @@ def redirigir_tipo_llenado():
 
 
 
-            tipo_requerir_grua_original = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B', ''))
-            tipo_requerir_grua = normaliza_texto(tipo_requerir_grua_original)
+            tipo_requerir_grua_original = texto_normalizado(row, 'Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B')
+            tipo_requerir_grua = tipo_requerir_grua_original
             print(f"tipo_requerir_grua original: '{tipo_requerir_grua_original}'")
             print(f"tipo_requerir_grua normalizado: '{tipo_requerir_grua}'")
             ws_info_b.range('AB67').value = 'requieregrua' in tipo_requerir_grua
             ws_info_b.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua
 
-            acceso_personal_original = normaliza_texto(row.get('TIPO DE ACCESO A SITIO B', ''))
-            acceso_personal = normaliza_texto(acceso_personal_original)
+            acceso_personal_original = texto_normalizado(row, 'TIPO DE ACCESO A SITIO B')
+            acceso_personal = acceso_personal_original
 
             ws_info_a.range('B47').value = 'llave' in acceso_personal
             ws_info_a.range('H47').value = 'permiso/memorandum' in acceso_personal
@@ -17703,17 +16248,17 @@ def redirigir_tipo_llenado():
 
 
 
-            tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No)', ''))
-            tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
+            tipo_requiere_grua_original = texto_normalizado(row, 'Requiere Grua (Si / No)')
+            tipo_requiere_grua = tipo_requiere_grua_original
             ws_info_a.range('AC66').value = 'si' in tipo_requiere_grua
             ws_info_a.range('AF66').value = 'no' in tipo_requiere_grua
 
-            tipo_requiere_grua_original = normaliza_texto(row.get('Requiere Grua (Si / No) B', ''))
-            tipo_requiere_grua = normaliza_texto(tipo_requiere_grua_original)
+            tipo_requiere_grua_original = texto_normalizado(row, 'Requiere Grua (Si / No) B')
+            tipo_requiere_grua = tipo_requiere_grua_original
             ws_info_b.range('AC66').value = 'si' in tipo_requiere_grua
             ws_info_b.range('AF66').value = 'no' in tipo_requiere_grua
 
-            tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
+            tipo_llegar_original = texto_normalizado(row, 'Para la llegada al sitio con el equipo a instalar, se requiere de:')
             # Separa por coma y normaliza solo el primer valor
             primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
             primer_tipo = normaliza_texto(primer_valor)
@@ -17724,7 +16269,7 @@ def redirigir_tipo_llenado():
             ws_info_a.range('M72').value = (primer_tipo == 'animalesdecarga')
 
 
-            tipo_llegar_original = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
+            tipo_llegar_original = texto_normalizado(row, 'Para la llegada al sitio con el equipo a instalar, se requiere de:')
             # Separa por coma y normaliza solo el primer valor
             primer_valor = tipo_llegar_original.split(',')[0].strip() if ',' in tipo_llegar_original else tipo_llegar_original.strip()
             primer_tipo = normaliza_texto(primer_valor)
@@ -17735,50 +16280,50 @@ def redirigir_tipo_llenado():
             ws_info_b.range('M72').value = (primer_tipo == 'animalesdecarga')
 
 
-            policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito?', '').strip().lower())
+            policia_original = texto_normalizado(row, 'Existe cerca del sitio alguna comandancia de policía o del ejercito?')
             ws_info_a.range('AB105').value = 'si' in policia_original
             ws_info_a.range('AE105').value = 'no' in policia_original
 
             if 'si' in policia_original:
-                ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia',) 
+                ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia policia',) 
                 ws_info_a.range('U107').value = row.get('Se cuenta con algún número de teléfono?, indíquelo', 'N/A') or 'N/A'
             else:
                 ws_info_a.range('U106').value = 'N/A'
                 ws_info_a.range('U107').value = 'N/A'
 
     # --- Cruz Roja, Hospital, asistencia médica ---
-            cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.', '').strip().lower())
+            cruzroja_original = texto_normalizado(row, 'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.')
             ws_info_a.range('AB108').value = 'si' in cruzroja_original
             ws_info_a.range('AE108').value = 'no' in cruzroja_original
 
             if 'si' in cruzroja_original:
-                ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz ', )  
+                ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz', )  
                 ws_info_a.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz', )
             else:
                 ws_info_a.range('U109').value = 'N/A'
                 ws_info_a.range('U110').value = 'N/A'
 
           # --- Mapa Nacional de Riesgos ---
-            riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:', '').strip().lower())
+            riesgo = texto_normalizado(row, 'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:')
             ws_info_a.range('Y111').value = 'bajo' in riesgo
             ws_info_a.range('AB111').value = 'medio' in riesgo
             ws_info_a.range('AE111').value = 'alto' in riesgo
 
 
 
-            policia_original = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito? B', ''))
+            policia_original = texto_normalizado(row, 'Existe cerca del sitio alguna comandancia de policía o del ejercito? B')
             ws_info_b.range('AB105').value = 'si' in policia_original
             ws_info_b.range('AE105').value = 'no' in policia_original
 
             if 'si' in policia_original:
-                ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia B',) 
+                ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia policia B',) 
                 ws_info_b.range('U107').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: B',) 
             else:
                 ws_info_b.range('U106').value = 'N/A'
                 ws_info_b.range('U107').value = 'N/A'
 
             # --- Cruz Roja, Hospital, asistencia médica ---
-            cruzroja_original = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B', ''))
+            cruzroja_original = texto_normalizado(row, 'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B')
             ws_info_b.range('AB108').value = 'si' in cruzroja_original
             ws_info_b.range('AE108').value = 'no' in cruzroja_original
 
@@ -17790,7 +16335,7 @@ def redirigir_tipo_llenado():
                 ws_info_b.range('U110').value = 'N/A'
 
               # --- Mapa Nacional de Riesgos ---
-            riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B', ''))
+            riesgo = texto_normalizado(row, 'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B')
             ws_info_b.range('Y111').value = 'bajo' in riesgo
             ws_info_b.range('AB111').value = 'medio' in riesgo
             ws_info_b.range('AE111').value = 'alto' in riesgo
@@ -17804,8 +16349,8 @@ def redirigir_tipo_llenado():
 
                         # Llenado de campos específicos de la hoja "3. Espacios en Torre y Piso A-B"
             # Línea de vista
-            linea_vista_original = normaliza_texto(row.get('Línea de vista', ''))
-            linea_vista = normaliza_texto(linea_vista_original)
+            linea_vista_original = texto_normalizado(row, 'Línea de vista')
+            linea_vista = linea_vista_original
             # TODO: Agregar coordenadas correctas para PtMP
             # ws_espacios.range('R56').value = (linea_vista == 'si')
             # ws_espacios.range('V56').value = (linea_vista == 'no')
@@ -17816,7 +16361,7 @@ def redirigir_tipo_llenado():
             # ws_espacios.range('C58').value = False
 
             if linea_vista == 'no':
-                motivo = normaliza_texto(row.get('Motivo de obstrucción', ''))
+                motivo = texto_normalizado(row, 'Motivo de obstrucción')
                 # TODO: Agregar coordenadas correctas para PtMP
                 # if motivo == 'arboles':
                 #    ws_espacios.range('Q57').value = True
@@ -17829,146 +16374,8 @@ def redirigir_tipo_llenado():
                 # elif motivo == 'n/a':
                 #    ws_espacios.range('C58').value = True
 
-            # Llenado automático de celdas usando el diccionario de mapeo para SECTOR
-            campos_sector_celdas = {
-                'Fecha Inicio Site Survey': 'C9',
-                'Fecha final Site Survey': 'I9',
-                'NOMBRE DEL SITIO': 'C10', 
-                'PROPIETARIO': 'E11',
-                'ID': 'I10',
-                'ESTADO ':'I16',
-                'Calle': 'B15',
-                'Colonia': 'B16',
-                'Municipio': 'B17',
-                'C.P': 'I15',
-                'Referencias':'C18',
-                'Nombre de contacto en sitio': 'C20',
-                'Telefono': 'H20',
-                'LATITUD (TORRE)': 'D31',
-                'LONGITUD (TORRE)': 'H31',
-                'LATITUD (FACHADA)': 'D28',
-                'LONGITUD (FACHADA)': 'H28',
-                'Altitud (msnm)': 'E33',
-                'Horario de solicitud de accesos': 'C53',
-                'Contacto solicitud de accesos': 'B55',
-                'Como o donde obtener permisos/llave/tarjeta': 'O49',
-                'Comentario:Forma de ingresar el equipo al sitio es con:': 'B57',
-                'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-                'Si la respuesta anterior es si, Indique a que distancia ':'H83'
-            }
-            for campo, celdas in campos_sector_celdas.items():
-                valor = normaliza_na(row.get(campo, ""))
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_sector.range(celda).value = valor
-                else:
-                    ws_sector.range(celdas).value = valor
-
-            # Llenado automático de celdas usando el diccionario de mapeo para CPE
-            campos_cpe_celdas = {
-                'Fecha Inicio Site Survey B': 'C9',
-                'Fecha final Site Survey B': 'I9',
-                'Nombre del sitio 2': 'C10', 
-                'ID 2': 'I10',
-                'ESTADO 2 ':'I16',
-                'Calle 2': 'B15',
-                'Colonia 2': 'B16',
-                'Municipio 2': 'B17',
-                'C.P 2': 'I15',
-                'Referencias 2':'C18',
-                'Nombre de contacto en sitio 2': 'C20',
-                'Telefono 2': 'H20',
-                'LATITUD (TORRE) 2': 'D31',
-                'LONGITUD (TORRE) 2': 'H31',
-                'LATITUD (FACHADA) 2': 'D28',
-                'LONGITUD (FACHADA) 2': 'H28',
-                'Altitud (msnm) 2': 'E33',
-                'Horario de solicitud de accesos B': 'C53',
-                'Contacto solicitud de accesos B': 'B55',
-                'Como o donde obtener permisos/llave/tarjeta B': 'C49',
-                'Comentario:Forma de ingresar el equipo al sitio es con: B': 'B57',
-                'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.': 'B63',
-                'Si la respuesta anterior es si, Indique a que distancia B':'H83'
-            }
-            for campo, celdas in campos_cpe_celdas.items():
-                valor = normaliza_na(row.get(campo, ""))
-                print(f"ws_cpe: Escribiendo en {celdas} el valor '{valor}' para campo '{campo}'")
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_cpe.range(celda).value = valor
-                else:
-                    ws_cpe.range(celdas).value = valor    
-
-            # Llenado automático de celdas para la hoja "3. Espacios en Torre y Piso A-B"
-            campos_espacios_celdas = {
-                'NOMBRE DEL SITIO': 'G7',
-                'Diametro de pierna superior':'K9',
-                'Diametro de pierna Inferior':'U9',
-                'NCRA RB':'AC9',
-                'Franja2RB':'AM9',
-                'Altura de la Torre':'K10',
-                'Dado':'U10',
-                'Altura Edificio1':'EA10',
-                'Nivel inferior de franja disponible': 'T11',
-                'Nivel superior de franja disponible': 'AK11',
-                'Altura de MW conforme a topologia': 'B14',
-                'Azimut RB ': 'M14',
-                'Propuesta de altura de antena de MW1': 'AB14',
-                'Propuesta de altura de antena de MW (SD)1': 'AJ14',
-                'Altura de soporte para OMB propuesto': 'O19',
-                'Longitud del cable de tierra nuevo OMB': 'O20',
-                'Longitud del cable de tierra ODU': 'O21',
-                'Longitud de cable IF': 'O22',
-                'Tipo de soporte para antena MW propuesto': 'O23',
-                'Longitud de cable ACDB-Nuevo OMB': 'O24',
-                'Longitud de cable RTN - Router':'O25',
-                'Longitud de cable RTN - BBU SITE 1': 'O26',
-                'MEDICION DE BARRA DE TIERRA (Ohms)':'O28',
-                'Nombre del sitio 2': 'G31',
-                'Diámetro de Pierna superio2':'K33',
-                'Diámetro de Pierna inferior2':'U33',
-                ' NCRA2 ':'AC33',
-                'Franja2-2':'AM33',
-                'Altura torre 2': 'K34',
-                'DADO 2':'U34',
-                'Altura edificio 2':'AE34',
-                'Nivel inferior de franja disponible 2': 'T35',
-                'Nivel superior de franja disponible 2': 'AK35',
-                'Altura de MW conforme a topologia 2': 'B38',
-                'Azimut 2': 'M38',
-                'Propuesta de altura de antena de MW2': 'AB38',
-                'Propuesta de altura de antena de MW (SD)2':'AJ38',
-                'Altura de soporte para OMB propuesto2':'O43',
-                'Longitud del cable de tierra nuevo OMB 2': 'O44',
-                'Longitud del cable de tierra ODU 2': 'O45',
-                'Longitud de cable IF 2': 'O46',
-                'Tipo de soporte para antena MW propuesto 2': 'O47',
-                'Longitud de cable ACDB-Nuevo OMB 2': 'O48',
-                'Longitud de cable RTN - Router 2': 'O49',
-                'Longitud de cable RTN - BBU 2': 'O50',
-                'Medición del Sistema de Tierras 2': 'O52',
-            }
-            for campo, celdas in campos_espacios_celdas.items():
-                valor_original = row.get(campo, "")
-                valor = normaliza_na(valor_original)
-                print(f"ws_espacios: Campo '{campo}' - Valor original: '{valor_original}' - Valor normalizado: '{valor}' - Escribiendo en {celdas}")
-                
-                # Log especial para Altura Edificio1
-                if campo == 'Altura Edificio1':
-                    print(f"*** DEBUG ESPECIAL Altura Edificio1 ***")
-                    print(f"   - Campo en row: {'Altura Edificio1' in row}")
-                    print(f"   - Valor original: '{valor_original}'")
-                    print(f"   - Tipo del valor: {type(valor_original)}")
-                    print(f"   - Valor normalizado: '{valor}'")
-                    print(f"   - Celda destino: {celdas}")
-                
-                if isinstance(celdas, list):
-                    for celda in celdas:
-                        ws_espacios.range(celda).value = valor
-                        print(f"ws_espacios: Escrito en celda {celda}: '{ws_espacios.range(celda).value}'")
-                else:
-                    ws_espacios.range(celdas).value = valor
-                    print(f"ws_espacios: Escrito en celda {celdas}: '{ws_espacios.range(celdas).value}'")   
+            # Campos de texto de SECTOR, CPE y espacios (fill_spec)
+            ejecutar_plan(PLAN_DATOS_SITE_SURVEY_PTMP, wb, row)
 
             # Guardar y cerrar
             wb.save(output_path)
@@ -18025,16 +16432,18 @@ def subir_imagenes_ptp():
                     ruta_archivo = os.path.join(imagenes_dir, nombre_archivo)
                     
                     # Guardar la imagen
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     imagenes_procesadas.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
         
         # Guardar información de las imágenes en el Excel
         try:
-            import xlwings as xw
             plantilla_path = os.path.join(base_dir, 'static', 'plantillas', 'EJEMPLO SS VACIO.xlsx')
             user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
             output_path = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}.xlsx')
@@ -18060,7 +16469,7 @@ def subir_imagenes_ptp():
                     })
             
             # Abrir el archivo Excel existente
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             wb = app_excel.books.open(output_path)
             ws_info_d = wb.sheets['4. Planos A']
             
@@ -18136,16 +16545,18 @@ def subir_imagenes_ptp_planos_b():
                 if archivo and archivo.filename != '':
                     nombre_archivo = f"imagen_{i}_{user_id}_{int(time.time())}.jpg"
                     ruta_archivo = os.path.join(imagenes_dir, nombre_archivo)
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     imagenes_procesadas.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
         
         # Guardar información de las imágenes en el Excel
         try:
-            import xlwings as xw
             user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
             output_path = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}.xlsx')
             
@@ -18170,7 +16581,7 @@ def subir_imagenes_ptp_planos_b():
                     })
             
             # Abrir el archivo Excel existente
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             wb = app_excel.books.open(output_path)
             ws_info_e = wb.sheets['5. Planos B']
             
@@ -18246,16 +16657,18 @@ def subir_imagenes_ptp_fotos_a():
                 if archivo and archivo.filename != '':
                     nombre_archivo = f"imagen_{i}_{user_id}_{int(time.time())}.jpg"
                     ruta_archivo = os.path.join(imagenes_dir, nombre_archivo)
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     imagenes_procesadas.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
         
         # Guardar información de las imágenes en el Excel
         try:
-            import xlwings as xw
             user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
             output_path = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}.xlsx')
             
@@ -18280,7 +16693,7 @@ def subir_imagenes_ptp_fotos_a():
                     })
             
             # Abrir el archivo Excel existente
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             wb = app_excel.books.open(output_path)
             ws_info_f = wb.sheets['6. Reporte Fotos A']
             
@@ -18391,11 +16804,14 @@ def subir_imagenes_ptp_fotos_b():
                     ruta_archivo = os.path.join(imagenes_dir, nombre_archivo)
                     print(f"DEBUG: Guardando archivo en: {ruta_archivo}")
                     
-                    archivo.save(ruta_archivo)
+                    metadatos = guardar_subida(archivo, ruta_archivo)
                     imagenes_procesadas.append({
                         'numero': i,
                         'ruta': ruta_archivo,
-                        'nombre_original': archivo.filename
+                        'nombre_original': archivo.filename,
+                        'sha256': metadatos['sha256'],
+                        'tamano_bytes': metadatos['tamano_bytes'],
+                        'tipo': metadatos['tipo']
                     })
                     print(f"DEBUG: Imagen {i} procesada correctamente")
                 else:
@@ -18408,7 +16824,6 @@ def subir_imagenes_ptp_fotos_b():
         
         # Guardar información de las imágenes en el Excel
         try:
-            import xlwings as xw
             user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
             output_path = os.path.join(base_dir, 'site_survey', f'ss_{user_id_limpio}.xlsx')
             
@@ -18434,7 +16849,7 @@ def subir_imagenes_ptp_fotos_b():
             
             # Abrir el archivo Excel existente
             print(f"DEBUG: Abriendo archivo Excel: {output_path}")
-            app_excel = xw.App(visible=False)
+            app_excel = abrir_excel(visible=False)
             wb = app_excel.books.open(output_path)
             ws_info_g = wb.sheets['7. Reporte Fotos B']
             print(f"DEBUG: Hoja '7. Reporte Fotos B' abierta correctamente")
@@ -18894,10 +17309,10 @@ def seleccion_id():
     if not user_id:
         return "Falta el ID"
     try:
-        df_db = pd.read_csv(GOOGLE_SHEETS_CSV_URL, keep_default_na=False, na_values=[])
+        df_db = hoja_enlaces.dataframe(texto=True)
     except Exception as e:
         return f"Error leyendo la base de datos de Google Sheets: {e}"
-    coincidencias = df_db[df_db['ID'] == user_id]
+    coincidencias = filas_por_id(df_db, user_id)
     if coincidencias.empty:
         return "ID no encontrado en la base de datos."
     if len(coincidencias) > 1:
@@ -18912,19 +17327,8 @@ def seleccion_id():
 # Esta definición duplicada ha sido removida para evitar conflictos
 
 def normaliza_texto(texto):
-    if not isinstance(texto, str):
-        return ""
-    texto = texto.strip().lower()
-    import unicodedata
-    texto = ''.join(
-        c for c in unicodedata.normalize('NFD', texto)
-        if unicodedata.category(c) != 'Mn'
-    )
-    # Elimina paréntesis y otros signos
-    for char in "-_.,;:()[]{}":
-        texto = texto.replace(char, '')
-    texto = texto.replace(' ', '')
-    return texto
+    """Pliega un valor suelto; las filas del snapshot ya traen sus columnas '__norm' (ver texto_normalizado)"""
+    return plegar_texto(texto)
 
 def safe_strip(valor):
     """Función segura para hacer strip() en cualquier tipo de valor"""
@@ -19042,8 +17446,8 @@ def limpiar_todos_los_checkboxes(ws_info_a, ws_info_b, ws_espacios):
 
 def llenar_site_survey_completo(ws_info_a, ws_info_b, ws_espacios, ws_planos_a, ws_planos_b, ws_fotos_a, ws_fotos_b, user_id):
     """
-    FUNCIÓN COMPLETA PARA LLENAR TODOS LOS CAMPOS DEL SITE SURVEY
-    BASADA EN EL CÓDIGO ORIGINAL DEL USUARIO
+    Llena las hojas 1-7 del Site Survey PtP para `user_id` con PLAN_SITE_SURVEY_PTP
+    (la carátula no se recibe, así que sus celdas se omiten)
     """
     print("🔧 LLENANDO SITE SURVEY COMPLETO - FUNCIÓN COMPLETA...")
     
@@ -19053,519 +17457,24 @@ def llenar_site_survey_completo(ws_info_a, ws_info_b, ws_espacios, ws_planos_a,
         df_db = get_cached_dataframe()
         
         # Buscar por ID exacto
-        user_id_mask = df_db['ID'] == user_id
-        if user_id_mask.any():
-            row = df_db[user_id_mask].iloc[0]
+        coincidencias = filas_por_id(df_db, user_id)
+        if not coincidencias.empty:
+            row = coincidencias.iloc[0]
             print(f"✅ Información encontrada para ID: {user_id}")
         else:
             print(f"❌ ID {user_id} NO encontrado en DataFrame")
             return False
         
-        # ===== HOJA 1: INFORMACIÓN GENERAL A =====
-        print("📋 Llenando Hoja 1: Información General A...")
-        
-        # Tipo de Zona
-        tipo_zona = normaliza_texto(row.get('Tipo de Zona', ''))
-        ws_info_a.range('L21').value = 'urbana' in tipo_zona
-        ws_info_a.range('P21').value = 'suburbana' in tipo_zona
-        ws_info_a.range('U21').value = 'rural' in tipo_zona
-        ws_info_a.range('X21').value = 'ejidal' in tipo_zona
-        ws_info_a.range('AB21').value = 'pueblomagico' in tipo_zona
-        
-        # Visibilidad
-        tipo_visible = normaliza_texto(row.get('El sitio es visible de día y de noche (libre de maleza y arboles): ', ''))
-        ws_info_a.range('P22').value = 'si' in tipo_visible
-        ws_info_a.range('S22').value = 'no' in tipo_visible
-        
-        # Tipo de Camino
-        tipo_camino = normaliza_texto(row.get('Tipo de Camino', ''))
-        ws_info_a.range('G23').value = 'terraceria' in tipo_camino
-        ws_info_a.range('L23').value = 'pavimentado' in tipo_camino
-        ws_info_a.range('Q23').value = 'empedrado' in tipo_camino
-        ws_info_a.range('V23').value = 'mixto' in tipo_camino
-        
-        # Riesgos
-        tipo_riesgo_a = normaliza_texto(row.get('Riesgo', ''))
-        ws_info_a.range('Y40').value = 'delitocomunroboatranseuntes' in tipo_riesgo_a
-        ws_info_a.range('P41').value = 'inconformidadvecinalconbloqueo' in tipo_riesgo_a
-        ws_info_a.range('AA41').value = 'delincuenciaorganizada' in tipo_riesgo_a
-        
-        # Propietario/Administrador
-        tipo_Propietario_Administrador = normaliza_texto(row.get('Propietario_Administrador', ''))
-        ws_info_a.range('K34').value = 'telesite' in tipo_Propietario_Administrador
-        ws_info_a.range('P34').value = 'ctwr' in tipo_Propietario_Administrador
-        ws_info_a.range('V34').value = 'mtp' in tipo_Propietario_Administrador
-        ws_info_a.range('Z34').value = 'intelesites' in tipo_Propietario_Administrador
-        ws_info_a.range('AE34').value = 'even' in tipo_Propietario_Administrador
-        ws_info_a.range('A35').value = 'atc' in tipo_Propietario_Administrador
-        ws_info_a.range('F35').value = 'temm' in tipo_Propietario_Administrador
-        ws_info_a.range('K35').value = 'renta tower' in tipo_Propietario_Administrador
-        ws_info_a.range('P35').value = 'torrecom' in tipo_Propietario_Administrador
-        ws_info_a.range('V35').value = 'uniti' in tipo_Propietario_Administrador
-        ws_info_a.range('A36').value = 'tower one' in tipo_Propietario_Administrador
-        ws_info_a.range('F36').value = 'iimt' in tipo_Propietario_Administrador
-        ws_info_a.range('K36').value = 'servicom' in tipo_Propietario_Administrador
-        ws_info_a.range('A37').value = 'canadian tower' in tipo_Propietario_Administrador
-        ws_info_a.range('F37').value = 'mx tower' in tipo_Propietario_Administrador
-        ws_info_a.range('K37').value = 'cfe' in tipo_Propietario_Administrador
-        
-        # Tipo de sitio
-        tipo_tipositio = normaliza_texto(row.get('Tipo de sitio', ''))
-        ws_info_a.range('D39').value = 'terrenogreenfield' in tipo_tipositio
-        ws_info_a.range('M39').value = 'sobresuelorawland' in tipo_tipositio
-        ws_info_a.range('U39').value = 'sobreazotea' in tipo_tipositio
-        
-        # Considera accesible
-        tipo_considera_accesible = normaliza_texto(row.get('Considera accesible el sitio de día y de noche?', ''))
-        ws_info_a.range('S43').value = 'solodedia' in tipo_considera_accesible
-        ws_info_a.range('W43').value = 'solodenoche' in tipo_considera_accesible
-        ws_info_a.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible
-        
-        # Zona segura
-        tipo_zonasegura = normaliza_texto(row.get('El sitio se encuentra construido en zona segura (De NO derrumbes):', ''))
-        ws_info_a.range('S44').value = 'si' in tipo_zonasegura
-        ws_info_a.range('W44').value = 'no' in tipo_zonasegura
-        
-        # Horario controlado
-        tipo_horariocontrolado = normaliza_texto(row.get('Horario Controlado', ''))
-        ws_info_a.range('B50').value = 'si' in tipo_horariocontrolado
-        
-        # Acceso al Personal
-        acceso_personal = normaliza_texto(row.get('TIPO DE ACCESO A SITIO', ''))
-        ws_info_a.range('B47').value = 'llave' in acceso_personal
-        ws_info_a.range('H47').value = 'permiso/memorandum' in acceso_personal
-        ws_info_a.range('R47').value = 'candadodecombinacion' in acceso_personal
-        ws_info_a.range('B48').value = 'tarjetaelectronica' in acceso_personal
-        ws_info_a.range('J48').value = 'otro' in acceso_personal
-        
-        # Campos vinculados
-        if 'candadodecombinacion' in acceso_personal:
-            ws_info_a.range('AF47').value = row.get('Candado de Combinación', '')
-            ws_info_a.range('Q48').value = 'N/A'
-        elif ('llave' in acceso_personal or 'permiso/memorandum' in acceso_personal or 'tarjetaelectronica' in acceso_personal):
-            ws_info_a.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta', '')
-        
-        # Forma de ingresar equipo
-        tipo_formaingresar = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con:', ''))
-        ws_info_a.range('U55').value = 'maniobra' in tipo_formaingresar
-        ws_info_a.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar
-        ws_info_a.range('AG55').value = 'izajecongrua' in tipo_formaingresar
-        
-        # Requiere grúa
-        tipo_requerir_grua = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:', ''))
-        ws_info_a.range('AB67').value = 'requieregrua' in tipo_requerir_grua
-        ws_info_a.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua
-        
-        # Requiere grúa (Si/No)
-        tipo_requiere_grua = normaliza_texto(row.get('Requiere Grua (Si / No)', ''))
-        ws_info_a.range('AC66').value = 'si' in tipo_requiere_grua
-        ws_info_a.range('AF66').value = 'no' in tipo_requiere_grua
-        
-        # Para la llegada al sitio
-        tipo_llegar = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
-        primer_valor = tipo_llegar.split(',')[0].strip() if ',' in tipo_llegar else tipo_llegar.strip()
-        primer_tipo = normaliza_texto(primer_valor)
-        ws_info_a.range('B72').value = (primer_tipo == 'pickup')
-        ws_info_a.range('G72').value = (primer_tipo == 'pickup4x4')
-        ws_info_a.range('M72').value = (primer_tipo == 'animalesdecarga')
-        
-        # Policía
-        policia = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito?', '').strip().lower())
-        ws_info_a.range('AB105').value = 'si' in policia
-        ws_info_a.range('AE105').value = 'no' in policia
-        
-        if 'si' in policia:
-            ws_info_a.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia', '')
-            ws_info_a.range('U107').value = row.get('Se cuenta con algún número de teléfono?, indíquelo', 'N/A') or 'N/A'
-        else:
-            ws_info_a.range('U106').value = 'N/A'
-            ws_info_a.range('U107').value = 'N/A'
-        
-        # Cruz Roja
-        cruzroja = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.', '').strip().lower())
-        ws_info_a.range('AB108').value = 'si' in cruzroja
-        ws_info_a.range('AE108').value = 'no' in cruzroja
-        
-        if 'si' in cruzroja:
-            ws_info_a.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz ', '')
-            ws_info_a.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz', '')
-        else:
-            ws_info_a.range('U109').value = 'N/A'
-            ws_info_a.range('U110').value = 'N/A'
-        
-        # Mapa Nacional de Riesgos
-        riesgo = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:', '').strip().lower())
-        ws_info_a.range('Y111').value = 'bajo' in riesgo
-        ws_info_a.range('AB111').value = 'medio' in riesgo
-        ws_info_a.range('AE111').value = 'alto' in riesgo
-        
-        # Información básica del sitio
-        ws_info_a.range('B15').value = safe_strip(row.get('LATITUD (TORRE)', ''))
-        ws_info_a.range('F15').value = safe_strip(row.get('LONGITUD (TORRE)', ''))
-        ws_info_a.range('J15').value = safe_strip(row.get('Altitud (msnm)', ''))
-        ws_info_a.range('B17').value = safe_strip(row.get('Nombre de contacto en sitio', ''))
-        ws_info_a.range('F17').value = safe_strip(row.get('Telefono', ''))
-        
-        # Dirección
-        ws_info_a.range('B19').value = safe_strip(row.get('Calle', ''))
-        ws_info_a.range('F19').value = safe_strip(row.get('Colonia', ''))
-        ws_info_a.range('J19').value = safe_strip(row.get('Municipio', ''))
-        ws_info_a.range('N19').value = safe_strip(row.get('C.P', ''))
-        
-        print("✅ HOJA 1: Información General A completada")
-        
-        # ===== HOJA 2: INFORMACIÓN GENERAL B =====
-        print("📋 Llenando Hoja 2: Información General B...")
-        
-        # Tipo de sitio B
-        tipo_sitio_b = safe_strip(row.get('Tipo de sitio B', ''))
-        ws_info_b.range('D39').value = (tipo_sitio_b == 'torre')
-        ws_info_b.range('M39').value = (tipo_sitio_b == 'edificio')
-        ws_info_b.range('U39').value = (tipo_sitio_b == 'poste')
-        
-        # Propietario/Administrador B
-        tipo_Propietario_Administrador_b = normaliza_texto(row.get('Propietario_Administrador B', ''))
-        ws_info_b.range('K34').value = 'telesite' in tipo_Propietario_Administrador_b
-        ws_info_b.range('P34').value = 'ctwr' in tipo_Propietario_Administrador_b
-        ws_info_b.range('V34').value = 'mtp' in tipo_Propietario_Administrador_b
-        ws_info_b.range('Z34').value = 'intelesites' in tipo_Propietario_Administrador_b
-        ws_info_b.range('AE34').value = 'even' in tipo_Propietario_Administrador_b
-        ws_info_b.range('A35').value = 'atc' in tipo_Propietario_Administrador_b
-        ws_info_b.range('F35').value = 'temm' in tipo_Propietario_Administrador_b
-        ws_info_b.range('K35').value = 'renta tower' in tipo_Propietario_Administrador_b
-        ws_info_b.range('P35').value = 'torrecom' in tipo_Propietario_Administrador_b
-        ws_info_b.range('V35').value = 'uniti' in tipo_Propietario_Administrador_b
-        ws_info_b.range('A36').value = 'tower one' in tipo_Propietario_Administrador_b
-        ws_info_b.range('F36').value = 'iimt' in tipo_Propietario_Administrador_b
-        ws_info_b.range('K36').value = 'servicom' in tipo_Propietario_Administrador_b
-        ws_info_b.range('A37').value = 'canadian tower' in tipo_Propietario_Administrador_b
-        ws_info_b.range('F37').value = 'mx tower' in tipo_Propietario_Administrador_b
-        ws_info_b.range('K37').value = 'cfe' in tipo_Propietario_Administrador_b
-        
-        # Tipo de sitio B
-        tipo_tipositio_b = normaliza_texto(row.get('Tipo de sitio B', ''))
-        ws_info_b.range('D39').value = 'terrenogreenfield' in tipo_tipositio_b
-        ws_info_b.range('M39').value = 'sobresuelorawland' in tipo_tipositio_b
-        ws_info_b.range('U39').value = 'sobreazotea' in tipo_tipositio_b
-        
-        # Considera accesible B
-        tipo_considera_accesible_b = normaliza_texto(row.get('Considera accesible el sitio de día y de noche? B', ''))
-        ws_info_b.range('S43').value = 'solodedia' in tipo_considera_accesible_b
-        ws_info_b.range('W43').value = 'solodenoche' in tipo_considera_accesible_b
-        ws_info_b.range('AB43').value = 'sinproblemadehora' in tipo_considera_accesible_b
-        
-        # Zona segura B
-        tipo_zonasegura_b = normaliza_texto(row.get('El sitio se encuentra construido en zona segura (De NO derrumbes) B:', ''))
-        ws_info_b.range('S44').value = 'si' in tipo_zonasegura_b
-        ws_info_b.range('W44').value = 'no' in tipo_zonasegura_b
-        
-        # Horario controlado B
-        tipo_horariocontrolado_b = normaliza_texto(row.get('Horario Controlado B', ''))
-        ws_info_b.range('B50').value = 'si' in tipo_horariocontrolado_b
-        
-        # Acceso al Personal B
-        acceso_personal_b = normaliza_texto(row.get('TIPO DE ACCESO A SITIO B', ''))
-        ws_info_b.range('B47').value = 'llave' in acceso_personal_b
-        ws_info_b.range('H47').value = 'permiso/memorandum' in acceso_personal_b
-        ws_info_b.range('R47').value = 'candadodecombinacion' in acceso_personal_b
-        ws_info_b.range('B48').value = 'tarjetaelectronica' in acceso_personal_b
-        ws_info_b.range('J48').value = 'otro' in acceso_personal_b
-        
-        # Campos vinculados B
-        if 'candadodecombinacion' in acceso_personal_b:
-            ws_info_b.range('AF47').value = row.get('Candado de Combinación B', '')
-            ws_info_b.range('Q48').value = 'N/A'
-        elif ('llave' in acceso_personal_b or 'permiso/memorandum' in acceso_personal_b or 'tarjetaelectronica' in acceso_personal_b):
-            ws_info_b.range('Q49').value = row.get('Dónde recoger llave/permiso/tarjeta B', '')
-        
-        # Forma de ingresar equipo B
-        tipo_formaingresar_b = normaliza_texto(row.get('Forma de ingresar el equipo al sitio es con: B', ''))
-        ws_info_b.range('U55').value = 'maniobra' in tipo_formaingresar_b
-        ws_info_b.range('AA55').value = 'izajecongarrucha' in tipo_formaingresar_b
-        ws_info_b.range('AG55').value = 'izajecongrua' in tipo_formaingresar_b
-        
-        # Requiere grúa B
-        tipo_requerir_grua_b = normaliza_texto(row.get('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B', ''))
-        ws_info_b.range('AB67').value = 'requieregrua' in tipo_requerir_grua_b
-        ws_info_b.range('AG67').value = 'noaplicagrua' in tipo_requerir_grua_b
-        
-        # Requiere grúa (Si/No) B
-        tipo_requiere_grua_b = normaliza_texto(row.get('Requiere Grua (Si / No) B', ''))
-        ws_info_b.range('AC66').value = 'si' in tipo_requiere_grua_b
-        ws_info_b.range('AF66').value = 'no' in tipo_requiere_grua_b
-        
-        # Para la llegada al sitio B
-        tipo_llegar_b = normaliza_texto(row.get('Para la llegada al sitio con el equipo a instalar, se requiere de:', ''))
-        primer_valor_b = tipo_llegar_b.split(',')[0].strip() if ',' in tipo_llegar_b else tipo_llegar_b.strip()
-        primer_tipo_b = normaliza_texto(primer_valor_b)
-        ws_info_b.range('B72').value = (primer_tipo_b == 'pickup')
-        ws_info_b.range('G72').value = (primer_tipo_b == 'pickup4x4')
-        ws_info_b.range('M72').value = (primer_tipo_b == 'animalesdecarga')
-        
-        # Policía B
-        policia_b = normaliza_texto(row.get('Existe cerca del sitio alguna comandancia de policía o del ejercito? B', ''))
-        ws_info_b.range('AB105').value = 'si' in policia_b
-        ws_info_b.range('AE105').value = 'no' in policia_b
-        
-        if 'si' in policia_b:
-            ws_info_b.range('U106').value = row.get('Si la respuesta anterior es si, Indique a que distancia  policia B', '')
-            ws_info_b.range('U107').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: B', '')
-        else:
-            ws_info_b.range('U106').value = 'N/A'
-            ws_info_b.range('U107').value = 'N/A'
-        
-        # Cruz Roja B
-        cruzroja_b = normaliza_texto(row.get('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B', ''))
-        ws_info_b.range('AB108').value = 'si' in cruzroja_b
-        ws_info_b.range('AE108').value = 'no' in cruzroja_b
-        
-        if 'si' in cruzroja_b:
-            ws_info_b.range('U109').value = row.get('Si la respuesta anterior es si, Indique a que distancia cruz B', '')
-            ws_info_b.range('U110').value = row.get('Se cuenta con algún numero de teléfono?, indíquelo: cruz B', '')
-        else:
-            ws_info_b.range('U109').value = 'N/A'
-            ws_info_b.range('U110').value = 'N/A'
-        
-        # Mapa Nacional de Riesgos B
-        riesgo_b = normaliza_texto(row.get('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B', ''))
-        ws_info_b.range('Y111').value = 'bajo' in riesgo_b
-        ws_info_b.range('AB111').value = 'medio' in riesgo_b
-        ws_info_b.range('AE111').value = 'alto' in riesgo_b
-        
-        # Información básica del sitio B
-        ws_info_b.range('B15').value = safe_strip(row.get('LATITUD (TORRE) 2', ''))
-        ws_info_b.range('F15').value = safe_strip(row.get('LONGITUD (TORRE) 2', ''))
-        ws_info_b.range('J15').value = safe_strip(row.get('Altitud (msnm) 2', ''))
-        ws_info_b.range('B17').value = safe_strip(row.get('Nombre de contacto en sitio 2', ''))
-        ws_info_b.range('F17').value = safe_strip(row.get('Telefono 2', ''))
-        
-        # Dirección B
-        ws_info_b.range('B19').value = safe_strip(row.get('Calle 2', ''))
-        ws_info_b.range('F19').value = safe_strip(row.get('Colonia 2', ''))
-        ws_info_b.range('J19').value = safe_strip(row.get('Municipio 2', ''))
-        ws_info_b.range('N19').value = safe_strip(row.get('C.P 2', ''))
-        
-        print("✅ HOJA 2: Información General B completada")
-        
-        # ===== HOJA 3: ESPACIOS EN TORRE Y PISO A-B =====
-        print("📋 Llenando Hoja 3: Espacios en Torre y Piso A-B...")
-        
-        # Tipo de torre
-        tipo_torre = normaliza_texto(row.get('Tipo de Torre', ''))
-        ws_espacios.range('G8').value = tipo_torre == 'autosoportada'
-        ws_espacios.range('O8').value = tipo_torre == 'arriostrada'
-        ws_espacios.range('V8').value = tipo_torre == 'Monopolo'
-        ws_espacios.range('AB8').value = tipo_torre == 'Minipolo'
-        ws_espacios.range('AG8').value = tipo_torre == 'otro'
-        
-        # Espacio disponible de conexión
-        espacio_disponible = normaliza_texto(row.get('¿Espacio disponible de conexión?', ''))
-        ws_espacios.range('AH25').value = espacio_disponible == 'si'
-        ws_espacios.range('AK25').value = espacio_disponible == 'no'
-        ws_espacios.range('U14').value = espacio_disponible == 'si'
-        ws_espacios.range('Y14').value = espacio_disponible == 'no'
-        
-        # Existe breaker
-        existe_break = normaliza_texto(row.get('¿Existe algun breaker existente en sitio? ', ''))
-        ws_espacios.range('Y21').value = existe_break == 'si'
-        ws_espacios.range('AB21').value = existe_break == 'no'
-        
-        # Alimentación compatible
-        alimentacion_compatible = normaliza_texto(row.get('Alimentacion compatible con el equipamiento ', ''))
-        ws_espacios.range('Y25').value = alimentacion_compatible == 'si'
-        ws_espacios.range('AB25').value = alimentacion_compatible == 'no'
-        
-        # Sistema eléctrico
-        sistema_electrico = normaliza_texto(row.get('SISTEMA ELECTRICO', ''))
-        ws_espacios.range('AG21').value = 'monofasica' in sistema_electrico
-        ws_espacios.range('AL21').value = 'bifasica' in sistema_electrico
-        
-        # Cara propuesta
-        cara_propuesta = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre', ''))
-        ws_espacios.range('Y16').value = cara_propuesta == 'a'
-        ws_espacios.range('AC16').value = cara_propuesta == 'b'
-        ws_espacios.range('AE16').value = cara_propuesta == 'c'
-        ws_espacios.range('AN16').value = cara_propuesta == 'd'
-        
-        # Barra de tierra
-        barra_tierra = normaliza_texto(row.get('Barra de Tierra', ''))
-        ws_espacios.range('O27').value = barra_tierra == 'si'
-        ws_espacios.range('R27').value = barra_tierra == 'no'
-        
-        # Tipo de solución
-        tipo_solucion = normaliza_texto(row.get('Tipo de Solucion', ''))
-        ws_espacios.range('O29').value = tipo_solucion == 'piso'
-        ws_espacios.range('R29').value = tipo_solucion == 'torre'
-        
-        # Información de torre y sitio
-        ws_espacios.range('K8').value = safe_strip(row.get('NOMBRE DEL SITIO', ''))
-        ws_espacios.range('H33').value = safe_strip(row.get('NOMBRE DEL SITIO', ''))
-        ws_espacios.range('M117').value = safe_strip(row.get('Nombre del sitio A', ''))
-        ws_espacios.range('M139').value = safe_strip(row.get('Nombre del sitio A', ''))
-        ws_espacios.range('M162').value = safe_strip(row.get('Nombre del sitio B', ''))
-        ws_espacios.range('M184').value = safe_strip(row.get('Nombre del sitio B', ''))
-        
-        # Información técnica de torre
-        ws_espacios.range('B15').value = safe_strip(row.get('Tipo de Torre', ''))
-        ws_espacios.range('F15').value = safe_strip(row.get('Altura de la Torre', ''))
-        ws_espacios.range('J15').value = safe_strip(row.get('Dado', ''))
-        ws_espacios.range('N15').value = safe_strip(row.get('Diametro de pierna Inferior', ''))
-        ws_espacios.range('R15').value = safe_strip(row.get('Diametro de pierna superior', ''))
-        
-        # Tipo de torre 2
-        tipo_torre2 = normaliza_texto(row.get('Tipo de Torre2', ''))
-        ws_espacios.range('G32').value = tipo_torre2 == 'autosoportada'
-        ws_espacios.range('O32').value = tipo_torre2 == 'arriostrada'
-        ws_espacios.range('V32').value = tipo_torre2 == 'monopolo'
-        ws_espacios.range('AB32').value = tipo_torre2 == 'minipolo'
-        ws_espacios.range('AG32').value = tipo_torre2 == 'otro'
-        
-        # Espacio disponible 2
-        espacio_disponible2 = normaliza_texto(row.get('¿Espacio disponible de conexión?2', ''))
-        ws_espacios.range('U38').value = espacio_disponible2 == 'si'
-        ws_espacios.range('Y38').value = espacio_disponible2 == 'no'
-        
-        # Cara preparación 2
-        cara_preparacion2 = normaliza_texto(row.get('Cara de preparación para cableado vertical en torre 2', ''))
-        ws_espacios.range('Y40').value = cara_preparacion2 == 'a'
-        ws_espacios.range('AD40').value = cara_preparacion2 == 'b'
-        ws_espacios.range('AI40').value = cara_preparacion2 == 'c'
-        ws_espacios.range('AN40').value = cara_preparacion2 == 'd'
-        
-        # Existe tierra 2
-        existe_tierra2 = normaliza_texto(row.get('Existe Barra de Tierras 2', ''))
-        ws_espacios.range('O51').value = existe_tierra2 == 'si'
-        ws_espacios.range('R51').value = existe_tierra2 == 'no'
-        
-        # Tipo solución 2
-        tipo_solucion2 = normaliza_texto(row.get('Tipo de solucion 2', ''))
-        ws_espacios.range('O53').value = tipo_solucion2 == 'piso'
-        ws_espacios.range('R53').value = tipo_solucion2 == 'torre'
-        
-        # Existe breaker 2
-        existe_break2 = normaliza_texto(row.get('Existe algun breaker existente en sitio 2 ', ''))
-        ws_espacios.range('Y45').value = existe_break2 == 'si'
-        ws_espacios.range('AB45').value = existe_break2 == 'no'
-        
-        # Alimentación existente 2
-        alimenacion_existente2 = normaliza_texto(row.get('SISTEMA ELECTRICO 2', ''))
-        ws_espacios.range('AG45').value = 'monofasica' in alimenacion_existente2
-        ws_espacios.range('AL45').value = 'bifasica' in alimenacion_existente2
-        
-        # Alimentación compatible 2
-        alimenacion_compatible2 = normaliza_texto(row.get('Alimentacion compatible con el equipamiento 2', ''))
-        ws_espacios.range('Y49').value = alimenacion_compatible2 == 'si'
-        ws_espacios.range('AB49').value = alimenacion_compatible2 == 'no'
-        
-        # Espacio conexión 2
-        espacio_conexion2 = normaliza_texto(row.get('¿Espacio disponible de conexión? 2', ''))
-        ws_espacios.range('AH49').value = espacio_conexion2 == 'si'
-        ws_espacios.range('AK49').value = espacio_conexion2 == 'no'
-        
-        # Línea de vista
-        linea_vista = normaliza_texto(row.get('Linea de vista ', ''))
-        motivo = normaliza_texto(row.get('Motivo ', ''))
-        
-        ws_espacios.range('R56').value = (linea_vista == 'si')
-        ws_espacios.range('V56').value = (linea_vista == 'no')
-        ws_espacios.range('Q57').value = False
-        ws_espacios.range('V57').value = False
-        ws_espacios.range('AC57').value = False
-        ws_espacios.range('AI57').value = False
-        ws_espacios.range('C58').value = False
-        
-        if linea_vista == 'no':
-            if motivo == 'arboles':
-                ws_espacios.range('Q57').value = True
-            elif motivo == 'espectacular':
-                ws_espacios.range('V57').value = True
-            elif motivo == 'edificio':
-                ws_espacios.range('AC57').value = True
-            elif motivo == 'montaña':
-                ws_espacios.range('AI57').value = True
-            elif motivo == 'n/a':
-                ws_espacios.range('C58').value = True
-        
-        print("✅ HOJA 3: Espacios en Torre y Piso A-B completada")
-        
-        # ===== HOJA 4: PLANOS A =====
-        print("📋 Llenando Hoja 4: Planos A...")
-        
-        # Información de planos del sitio A
-        ws_planos_a.range('B15').value = safe_strip(row.get('PLANOS', ''))
-        ws_planos_a.range('F15').value = safe_strip(row.get('Tipo de Torre', ''))
-        ws_planos_a.range('J15').value = safe_strip(row.get('Altura de la Torre', ''))
-        ws_planos_a.range('N15').value = safe_strip(row.get('Dado', ''))
-        ws_planos_a.range('R15').value = safe_strip(row.get('PROPIETARIO', ''))
-        ws_planos_a.range('V15').value = safe_strip(row.get('TIPO DE SITIO ', ''))
-        
-        # Información de acceso y permisos
-        ws_planos_a.range('B20').value = safe_strip(row.get('Como o donde obtener permisos/llave/tarjeta', ''))
-        ws_planos_a.range('F20').value = safe_strip(row.get('Contacto solicitud de accesos', ''))
-        ws_planos_a.range('J20').value = safe_strip(row.get('Horario de solicitud de accesos', ''))
-        
-        print("✅ HOJA 4: Planos A completada")
-        
-        # ===== HOJA 5: PLANOS B =====
-        print("📋 Llenando Hoja 5: Planos B...")
-        
-        # Información de planos del sitio B
-        ws_planos_b.range('B15').value = safe_strip(row.get('PLANOS', ''))
-        ws_planos_b.range('F15').value = safe_strip(row.get('Tipo de Torre2', ''))
-        ws_planos_b.range('J15').value = safe_strip(row.get('Altura torre 2', ''))
-        ws_planos_b.range('N15').value = safe_strip(row.get('DADO 2', ''))
-        ws_planos_b.range('R15').value = safe_strip(row.get('PROPIETARIO 2', ''))
-        ws_planos_b.range('V15').value = safe_strip(row.get('TIPO DE SITIO 2', ''))
-        
-        print("✅ HOJA 5: Planos B completada")
-        print(f"🔍 RESUMEN HOJA 5:")
-        print(f"   - PLANOS: {ws_planos_b.range('B15').value}")
-        print(f"   - Tipo de Torre2: {ws_planos_b.range('F15').value}")
-        print(f"   - PROPIETARIO 2: {ws_planos_b.range('R15').value}")
-        
-        # ===== HOJA 6: REPORTE FOTOS A =====
-        print("📋 Llenando Hoja 6: Reporte Fotos A...")
-        
-        # Información de fotos del sitio A
-        ws_fotos_a.range('B15').value = safe_strip(row.get('NOMBRE DEL SITIO', ''))
-        ws_fotos_a.range('F15').value = safe_strip(row.get('ID', ''))
-        ws_fotos_a.range('J15').value = safe_strip(row.get('ESTADO ', ''))
-        ws_fotos_a.range('N15').value = safe_strip(row.get('CLUSTER', ''))
-        ws_fotos_a.range('R15').value = safe_strip(row.get('Fecha Site Survey', ''))
-        
-        print("✅ HOJA 6: Reporte Fotos A completada")
-        print(f"🔍 RESUMEN HOJA 6:")
-        print(f"   - NOMBRE DEL SITIO: {ws_fotos_a.range('B15').value}")
-        print(f"   - ID: {ws_fotos_a.range('F15').value}")
-        print(f"   - ESTADO: {ws_fotos_a.range('J15').value}")
-        
-        # ===== HOJA 7: REPORTE FOTOS B =====
-        print("📋 Llenando Hoja 7: Reporte Fotos B...")
-        
-        # Información de fotos del sitio B
-        ws_fotos_b.range('B15').value = safe_strip(row.get('Nombre del sitio 2', ''))
-        ws_fotos_b.range('F15').value = safe_strip(row.get('ID 2', ''))
-        ws_fotos_b.range('J15').value = safe_strip(row.get('ESTADO 2 ', ''))
-        ws_fotos_b.range('N15').value = safe_strip(row.get('CLUSTER', ''))
-        ws_fotos_b.range('R15').value = safe_strip(row.get('Fecha Site Survey', ''))
-        
-        print("✅ HOJA 7: Reporte Fotos B completada")
-        print(f"🔍 RESUMEN HOJA 7:")
-        print(f"   - Nombre del sitio 2: {ws_fotos_b.range('B15').value}")
-        print(f"   - ID 2: {ws_fotos_b.range('F15').value}")
-        print(f"   - ESTADO 2: {ws_fotos_b.range('J15').value}")
-        
-        # ===== RESUMEN FINAL =====
-        print("🎯 RESUMEN FINAL DEL LLENADO COMPLETO:")
-        print(f"✅ TODAS LAS HOJAS LLENADAS CORRECTAMENTE:")
-        print(f"   - Hoja 1: Información General A ✓")
-        print(f"   - Hoja 2: Información General B ✓")
-        print(f"   - Hoja 3: Espacios en Torre y Piso A-B ✓")
-        print(f"   - Hoja 4: Planos A ✓")
-        print(f"   - Hoja 5: Planos B ✓")
-        print(f"   - Hoja 6: Reporte Fotos A ✓")
-        print(f"   - Hoja 7: Reporte Fotos B ✓")
-        print(f"🎉 SITE SURVEY COMPLETAMENTE LLENADO PARA ID: {user_id}")
+        valores = evaluar(PLAN_SITE_SURVEY_PTP, row,
+                          nombre_a=row.get('Nombre del sitio A', ''), nombre_b=row.get('Nombre del sitio B', ''))
+        valores.pop(HOJA_CARATULA, None)
+        hojas = SimpleNamespace(sheets={
+            HOJA_INFO_A: ws_info_a, HOJA_INFO_B: ws_info_b, HOJA_ESPACIOS: ws_espacios,
+            HOJA_PLANOS_A: ws_planos_a, HOJA_PLANOS_B: ws_planos_b,
+            HOJA_FOTOS_A: ws_fotos_a, HOJA_FOTOS_B: ws_fotos_b,
+        })
+        celdas_escritas = escribir_valores(hojas, valores)
+        print(f"🎉 SITE SURVEY COMPLETAMENTE LLENADO PARA ID: {user_id} ({celdas_escritas} celdas)")
         
         return True
         
@@ -19624,8 +17533,7 @@ def handle_save_design_file():
             ruta_guardado = os.path.join(directorio_guardados, nombre_guardado)
             
             # Copiar archivo a la ubicación de guardados
-            import shutil
-            shutil.copy2(archivo_encontrado, ruta_guardado)
+            almacen_blobs().copiar(archivo_encontrado, ruta_guardado)
             
             print(f"✅ Archivo guardado exitosamente: {ruta_guardado}")
             
@@ -19676,8 +17584,7 @@ def buscar_opciones_id():
         opciones_encontradas = []
         
         # Búsqueda exacta primero
-        mask_exacto = df_db['ID'].astype(str) == str(user_id)
-        filas_exactas = df_db[mask_exacto]
+        filas_exactas = filas_por_id(df_db, user_id)
         
         if not filas_exactas.empty:
             for idx, row in filas_exactas.iterrows():
@@ -19690,23 +17597,19 @@ def buscar_opciones_id():
                 }
                 opciones_encontradas.append(opcion)
         
-        # Si no hay coincidencias exactas, buscar similares
+        # Si no hay coincidencias exactas, buscar similares en el índice de autocompletado
         if not opciones_encontradas:
-            # Buscar IDs que contengan el user_id o viceversa
-            mask_similar = df_db['ID'].astype(str).str.contains(str(user_id), case=False, na=False) | \
-                          df_db['ID'].astype(str).apply(lambda x: str(user_id) in str(x))
-            filas_similares = df_db[mask_similar]
-            
-            if not filas_similares.empty:
-                for idx, row in filas_similares.iterrows():
-                    opcion = {
-                        'user_id': str(row.get('ID', '')),
-                        'fila_idx': str(idx),
-                        'nombre_a': str(row.get('Nombre del sitio A', row.get('NOMBRE DEL SITIO', 'Sin nombre'))),
-                        'nombre_b': str(row.get('Nombre del sitio B', row.get('Nombre del sitio 2', 'Sin nombre'))),
-                        'tipo_match': 'similar'
-                    }
-                    opciones_encontradas.append(opcion)
+            similares, _ = buscar_coincidencias(df_db, user_id, limite=50, campos=('id',))
+            for item in similares:
+                row = df_db.loc[item['fila_idx']]
+                opcion = {
+                    'user_id': item['id'],
+                    'fila_idx': str(item['fila_idx']),
+                    'nombre_a': str(row.get('Nombre del sitio A', row.get('NOMBRE DEL SITIO', 'Sin nombre'))),
+                    'nombre_b': str(row.get('Nombre del sitio B', row.get('Nombre del sitio 2', 'Sin nombre'))),
+                    'tipo_match': 'similar'
+                }
+                opciones_encontradas.append(opcion)
         
         print(f"✅ Encontradas {len(opciones_encontradas)} opciones para ID: {user_id}")
         
@@ -19766,16 +17669,14 @@ def obtener_info_id():
                     row = df_db.iloc[fila_idx_int]
                 else:
                     # Si el índice no es válido, buscar por ID
-                    mask = df_db['ID'].astype(str) == str(user_id)
-                    matches = df_db[mask]
+                    matches = filas_por_id(df_db, user_id)
                     if not matches.empty:
                         row = matches.iloc[0]
                     else:
                         return jsonify({'success': False, 'error': f'No se encontró información para el ID: {user_id}'})
             else:
                 # Buscar por ID
-                mask = df_db['ID'].astype(str) == str(user_id)
-                matches = df_db[mask]
+                matches = filas_por_id(df_db, user_id)
                 if not matches.empty:
                     row = matches.iloc[0]
                 else:
@@ -19871,35 +17772,19 @@ def subir_formato_kmz():
         imagen_path = os.path.join(kmz_dir, imagen_filename)
         
         # Guardar archivos
-        archivo_kmz.save(kmz_path)
-        imagen_kmz.save(imagen_path)
+        almacen_blobs().guardar_subida(archivo_kmz, kmz_path)
+        almacen_blobs().guardar_subida(imagen_kmz, imagen_path)
         
         print(f"💾 Archivo KMZ guardado: {kmz_filename}")
         print(f"💾 Imagen guardada: {imagen_filename}")
         
-        # Buscar archivo Excel de diseño de solución
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        import glob
-        
-        # Limpiar user_id para búsqueda
-        user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
-        print(f"🔍 Buscando Excel para user_id: {user_id} (limpio: {user_id_limpio})")
-        
-        # Buscar en archivos_generados primero
-        patron_excel = f"ds_diseno_solucion_{user_id_limpio}*.xlsx"
-        archivos_excel = glob.glob(os.path.join(archivos_generados_dir, patron_excel))
-        
-        # Si no encuentra, buscar en archivos_permanentes
-        if not archivos_excel:
-            patron_permanente = f"PERMANENTE_ds_diseno_solucion_{user_id_limpio}*.xlsx"
-            archivos_excel = glob.glob(os.path.join(archivos_permanentes_dir, patron_permanente))
+        # Buscar archivo Excel de diseño de solución (generado y, si no hay, el permanente)
+        print(f"🔍 Buscando Excel para user_id: {user_id}")
+        archivo_excel = excel_diseno_solucion(user_id)
         
-        if not archivos_excel:
+        if not archivo_excel:
             return jsonify({'success': False, 'error': f'No se encontró archivo Excel de diseño de solución para el ID {user_id}'})
         
-        # Usar el archivo más reciente
-        archivo_excel = max(archivos_excel, key=os.path.getmtime)
         print(f"📊 Excel seleccionado: {os.path.basename(archivo_excel)}")
         
         # Copiar archivos junto al Excel para distribución
@@ -19909,9 +17794,8 @@ def subir_formato_kmz():
         imagen_junto_excel = os.path.join(excel_dir, f"IMG_{imagen_filename}")
         
         try:
-            import shutil
-            shutil.copy2(kmz_path, kmz_junto_excel)
-            shutil.copy2(imagen_path, imagen_junto_excel)
+            almacen_blobs().copiar(kmz_path, kmz_junto_excel)
+            almacen_blobs().copiar(imagen_path, imagen_junto_excel)
             print(f"📋 Archivos copiados junto al Excel")
         except Exception as copy_error:
             print(f"⚠️ Error copiando archivos junto al Excel: {copy_error}")
@@ -19923,11 +17807,10 @@ def subir_formato_kmz():
         print(f"📊 Insertando archivos en Excel usando xlwings...")
         
         try:
-            import xlwings as xw
             
             # Abrir Excel
             print(f"🔧 Abriendo Excel...")
-            app_excel = xw.App(visible=True, add_book=False)  # Visible para mejor estabilidad
+            app_excel = abrir_excel(visible=True, add_book=False)  # Visible para mejor estabilidad
             wb = app_excel.books.open(archivo_excel)
             
             # Verificar hoja destino
@@ -19950,11 +17833,8 @@ def subir_formato_kmz():
                 celda_kmz = ws.range('C12')
                 
                 try:
-                    # Usar API de Excel para insertar objeto embebido
-                    xl_sheet = ws.api
-                    
                     # Insertar archivo KMZ como objeto OLE embebido
-                    ole_object = xl_sheet.OLEObjects().Add(
+                    ole_object = objetos_ole(ws).Add(
                         Filename=kmz_path,  # Usar archivo original
                         Link=False,  # False = embebido (va dentro del Excel)
                         DisplayAsIcon=True,  # Mostrar como icono
@@ -20033,6 +17913,7 @@ def subir_formato_kmz():
             # Guardar Excel
             print(f"💾 Guardando Excel...")
             wb.save()
+            actualizar_artefacto(archivo_excel)
             print(f"✅ Excel guardado exitosamente")
             
             # Cerrar Excel
@@ -20140,7 +18021,7 @@ def subir_imagenes_electricas():
         # Guardar cada imagen
         for i, (nombre, imagen) in enumerate(imagenes):
             archivo_path = os.path.join(imagenes_dir, nombres_archivos[i])
-            imagen.save(archivo_path)
+            almacen_blobs().guardar_subida(imagen, archivo_path)
             imagenes_guardadas.append({
                 'nombre': nombre,
                 'archivo_original': imagen.filename,
@@ -20149,29 +18030,14 @@ def subir_imagenes_electricas():
             })
             print(f"💾 {nombre} guardada: {nombres_archivos[i]}")
         
-        # Buscar archivo Excel de diseño de solución
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        import glob
-        
-        # Limpiar user_id para búsqueda
-        user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
-        print(f"🔍 Buscando Excel para user_id: {user_id} (limpio: {user_id_limpio})")
-        
-        # Buscar en archivos_generados primero
-        patron_excel = f"ds_diseno_solucion_{user_id_limpio}*.xlsx"
-        archivos_excel = glob.glob(os.path.join(archivos_generados_dir, patron_excel))
-        
-        # Si no encuentra, buscar en archivos_permanentes
-        if not archivos_excel:
-            patron_permanente = f"PERMANENTE_ds_diseno_solucion_{user_id_limpio}*.xlsx"
-            archivos_excel = glob.glob(os.path.join(archivos_permanentes_dir, patron_permanente))
+        # Buscar archivo Excel de diseño de solución (generado y, si no hay, el permanente).
+        # La copia permanente puede ser un enlace al almacén de blobs: se separa antes de editarla
+        print(f"🔍 Buscando Excel para user_id: {user_id}")
+        archivo_excel = excel_diseno_solucion(user_id)
         
-        if not archivos_excel:
+        if not archivo_excel:
             return jsonify({'success': False, 'error': f'No se encontró archivo Excel de diseño de solución para el ID {user_id}'})
         
-        # Usar el archivo más reciente
-        archivo_excel = max(archivos_excel, key=os.path.getmtime)
         print(f"📊 Excel seleccionado: {os.path.basename(archivo_excel)}")
         
         # Copiar imágenes junto al Excel para distribución
@@ -20181,8 +18047,7 @@ def subir_imagenes_electricas():
         for i, imagen_data in enumerate(imagenes_guardadas):
             archivo_junto_excel = os.path.join(excel_dir, f"IMG_{nombres_archivos[i]}")
             try:
-                import shutil
-                shutil.copy2(imagen_data['ruta_completa'], archivo_junto_excel)
+                almacen_blobs().copiar(imagen_data['ruta_completa'], archivo_junto_excel)
                 imagenes_junto_excel.append(archivo_junto_excel)
                 print(f"📋 Imagen copiada junto al Excel: IMG_{nombres_archivos[i]}")
             except Exception as copy_error:
@@ -20193,11 +18058,10 @@ def subir_imagenes_electricas():
         print(f"📊 Insertando imágenes en Excel usando xlwings...")
         
         try:
-            import xlwings as xw
             
             # Abrir Excel
             print(f"🔧 Abriendo Excel...")
-            app_excel = xw.App(visible=True, add_book=False)  # Visible para mejor estabilidad
+            app_excel = abrir_excel(visible=True, add_book=False)  # Visible para mejor estabilidad
             wb = app_excel.books.open(archivo_excel)
             
             # Verificar hoja destino
@@ -20260,6 +18124,7 @@ def subir_imagenes_electricas():
             # Guardar Excel
             print(f"💾 Guardando Excel...")
             wb.save()
+            actualizar_artefacto(archivo_excel)
             print(f"✅ Excel guardado exitosamente")
             
             # Cerrar Excel
@@ -20352,57 +18217,18 @@ def subir_analisis_red_frecuencia():
         archivo_path = os.path.join(uploads_dir, filename_safe)
         
         # Guardar el archivo
-        archivo_word.save(archivo_path)
+        almacen_blobs().guardar_subida(archivo_word, archivo_path)
         print(f"✅ Archivo guardado en: {archivo_path}")
         
         # Buscar el archivo Excel de diseño de solución más reciente para este user_id
         # IGUAL QUE EN SITE SURVEY: buscar en archivos_generados Y archivos_permanentes
-        archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-        archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-        import glob
-        
-        # Limpiar user_id para búsqueda
-        user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
-        print(f"🔍 Buscando Excel para user_id: {user_id} (limpio: {user_id_limpio})")
-        
-        # Buscar en archivos_generados primero
-        patron_excel = f"ds_diseno_solucion_{user_id_limpio}*.xlsx"
-        ruta_completa = os.path.join(archivos_generados_dir, patron_excel)
-        print(f"🔍 Patrón de búsqueda: {ruta_completa}")
-        archivos_excel = glob.glob(ruta_completa)
-        print(f"📂 Archivos encontrados en archivos_generados: {len(archivos_excel)}")
-        
-        # Si no encuentra en archivos_generados, buscar en archivos_permanentes
-        if not archivos_excel:
-            patron_permanente = f"PERMANENTE_ds_diseno_solucion_{user_id_limpio}*.xlsx"
-            ruta_permanente = os.path.join(archivos_permanentes_dir, patron_permanente)
-            print(f"🔍 Buscando en archivos permanentes: {ruta_permanente}")
-            archivos_excel = glob.glob(ruta_permanente)
-            print(f"📂 Archivos encontrados en archivos_permanentes: {len(archivos_excel)}")
-        
-        # Si aún no encuentra, intentar patrones más amplios
-        if not archivos_excel:
-            patrones_adicionales = [
-                os.path.join(archivos_generados_dir, f"ds_{user_id_limpio}*.xlsx"),
-                os.path.join(archivos_generados_dir, f"ds_*{user_id_limpio}*.xlsx"),
-                os.path.join(archivos_permanentes_dir, f"PERMANENTE_ds_{user_id_limpio}*.xlsx")
-            ]
-            
-            for patron_adicional in patrones_adicionales:
-                print(f"🔍 Intentando patrón adicional: {patron_adicional}")
-                archivos_excel = glob.glob(patron_adicional)
-                if archivos_excel:
-                    print(f"✅ Encontrados {len(archivos_excel)} archivos con patrón adicional")
-                    break
+        print(f"🔍 Buscando Excel para user_id: {user_id}")
+        archivo_excel = excel_diseno_solucion(user_id)
         
-        if not archivos_excel:
+        if not archivo_excel:
             print(f"❌ NO SE ENCONTRARON ARCHIVOS EXCEL para {user_id}")
-            print(f"📁 Directorio archivos_generados: {archivos_generados_dir}")
-            print(f"📁 Directorio archivos_permanentes: {archivos_permanentes_dir}")
             return jsonify({'success': False, 'error': f'No se encontró archivo Excel de diseño de solución para el ID {user_id}. Primero debes generar el diseño de solución.'})
         
-        # Usar el archivo más reciente
-        archivo_excel = max(archivos_excel, key=os.path.getmtime)
         print(f"📊 ARCHIVO SELECCIONADO: {os.path.basename(archivo_excel)}")
         print(f"📊 Ruta completa: {archivo_excel}")
         
@@ -20411,8 +18237,7 @@ def subir_analisis_red_frecuencia():
         archivo_junto_excel = os.path.join(excel_dir, f"ADJUNTO_{filename_safe}")
         
         try:
-            import shutil
-            shutil.copy2(archivo_path, archivo_junto_excel)
+            almacen_blobs().copiar(archivo_path, archivo_junto_excel)
             print(f"📋 Archivo copiado junto al Excel: {archivo_junto_excel}")
             print(f"✅ Archivo disponible para hipervínculo")
         except Exception as copy_error:
@@ -20423,7 +18248,6 @@ def subir_analisis_red_frecuencia():
         print(f"📊 Integrando archivo en Excel usando xlwings (como site survey)...")
         
         try:
-            import xlwings as xw
             
             print(f"🔧 Iniciando Excel con xlwings...")
             
@@ -20440,7 +18264,7 @@ def subir_analisis_red_frecuencia():
             try:
                 # Intentar con Excel visible primero (más estable)
                 print(f"🔧 Intentando con Excel visible...")
-                app_excel = xw.App(visible=True, add_book=False)
+                app_excel = abrir_excel(visible=True, add_book=False)
                 print(f"✅ Excel iniciado correctamente")
                 
                 print(f"🔧 Abriendo archivo: {os.path.basename(archivo_excel)}")
@@ -20456,7 +18280,7 @@ def subir_analisis_red_frecuencia():
                         app_excel.quit()
                     time.sleep(2)
                     
-                    app_excel = xw.App(visible=False, add_book=False)
+                    app_excel = abrir_excel(visible=False, add_book=False)
                     wb = app_excel.books.open(archivo_excel)
                     print(f"✅ Excel invisible funcionó")
                     
@@ -20489,11 +18313,8 @@ def subir_analisis_red_frecuencia():
                 celda = ws.range(destino_celda)
                 
                 try:
-                    # Usar API de Excel para insertar objeto embebido
-                    xl_sheet = ws.api
-                    
                     # Insertar archivo como objeto OLE embebido
-                    ole_object = xl_sheet.OLEObjects().Add(
+                    ole_object = objetos_ole(ws).Add(
                         Filename=archivo_path,  # Usar archivo original
                         Link=False,  # False = embebido (va dentro del Excel), True = vinculado
                         DisplayAsIcon=True,  # Mostrar como icono
@@ -20534,10 +18355,7 @@ def subir_analisis_red_frecuencia():
                         celda = ws.range(celda_alt)
                         
                         try:
-                            # Usar API de Excel para insertar objeto embebido
-                            xl_sheet = ws.api
-                            
-                            ole_object = xl_sheet.OLEObjects().Add(
+                            ole_object = objetos_ole(ws).Add(
                                 Filename=archivo_path,
                                 Link=False,  # Embebido
                                 DisplayAsIcon=True,
@@ -20576,6 +18394,7 @@ def subir_analisis_red_frecuencia():
             # Guardar el archivo
             print(f"💾 Guardando Excel...")
             wb.save()
+            actualizar_artefacto(archivo_excel)
             print(f"✅ Excel guardado exitosamente")
             
             # Cerrar Excel
@@ -20643,6 +18462,7 @@ def subir_analisis_red_frecuencia():
                     if celda_usada_openpyxl:
                         # Guardar archivo
                         wb_openpyxl.save(archivo_excel)
+                        actualizar_artefacto(archivo_excel)
                         print(f"✅ RESPALDO EXITOSO: Hipervínculo creado con openpyxl en celda {celda_usada_openpyxl}")
                         
                         # Preparar respuesta exitosa
@@ -20694,47 +18514,116 @@ def subir_analisis_red_frecuencia():
 def buscar_archivos_excel(user_id, fila_idx=None):
     """
     Función auxiliar para buscar archivos Excel de diseño de solución
+    Regresa una lista con el libro más reciente del ID (vacía si no hay)
     """
-    # Configurar directorios
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    archivos_generados_dir = os.path.join(base_dir, 'archivos_generados')
-    archivos_permanentes_dir = os.path.join(base_dir, 'archivos_permanentes')
-    
-    # Limpiar user_id para nombres de archivo
-    user_id_limpio = re.sub(r'[<>:"/\\|?*]', '', str(user_id))
-    print(f"🔍 Buscando Excel para user_id: {user_id} (limpio: {user_id_limpio})")
-    
-    # Buscar en archivos_generados primero
-    patron_excel = f"ds_diseno_solucion_{user_id_limpio}*.xlsx"
-    ruta_completa = os.path.join(archivos_generados_dir, patron_excel)
-    print(f"🔍 Patrón de búsqueda: {ruta_completa}")
-    archivos_excel = glob.glob(ruta_completa)
-    print(f"📂 Archivos encontrados en archivos_generados: {len(archivos_excel)}")
-    
-    # Si no encuentra en archivos_generados, buscar en archivos_permanentes
-    if not archivos_excel:
-        patron_permanente = f"PERMANENTE_ds_diseno_solucion_{user_id_limpio}*.xlsx"
-        ruta_permanente = os.path.join(archivos_permanentes_dir, patron_permanente)
-        print(f"🔍 Buscando en archivos permanentes: {ruta_permanente}")
-        archivos_excel = glob.glob(ruta_permanente)
-        print(f"📂 Archivos encontrados en archivos_permanentes: {len(archivos_excel)}")
-    
-    # Si aún no encuentra, intentar patrones más amplios
-    if not archivos_excel:
-        patrones_adicionales = [
-            os.path.join(archivos_generados_dir, f"ds_{user_id_limpio}*.xlsx"),
-            os.path.join(archivos_generados_dir, f"ds_*{user_id_limpio}*.xlsx"),
-            os.path.join(archivos_permanentes_dir, f"PERMANENTE_ds_{user_id_limpio}*.xlsx")
-        ]
-        
-        for patron_adicional in patrones_adicionales:
-            print(f"🔍 Intentando patrón adicional: {patron_adicional}")
-            archivos_excel = glob.glob(patron_adicional)
-            if archivos_excel:
-                print(f"✅ Encontrados {len(archivos_excel)} archivos con patrón adicional")
-                break
+    print(f"🔍 Buscando Excel para user_id: {user_id}")
+    archivo_excel = excel_diseno_solucion(user_id)
+    return [archivo_excel] if archivo_excel else []
+
+
+def excel_diseno_solucion(user_id, para_editar=True) -> Optional[str]:
+    """
+    Diseño de solución más reciente del ID: el generado y, si no hay, su copia permanente
     
-    return archivos_excel
+    Con para_editar, una copia permanente enlazada al almacén de blobs se
+    separa antes de regresarla, porque quien la pide la va a modificar.
+    """
+    ruta = indice_artefactos().ubicar(user_id, (TIPO_DISENO, tipo_permanente(TIPO_DISENO)))
+    if ruta and para_editar:
+        almacen_blobs().separar(ruta)
+    return ruta
+
+
+def indexar_artefacto(user_id, tipo, ruta):
+    """Registra una versión en el índice de artefactos; un fallo del índice no rompe la generación"""
+    try:
+        indice_artefactos().registrar(user_id, tipo, ruta)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo indexar {ruta}: {e}")
+
+
+def actualizar_artefacto(ruta):
+    """Refresca tamaño y hash de un libro indexado que se modificó en su lugar"""
+    try:
+        indice_artefactos().actualizar(ruta)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo actualizar {ruta} en el índice: {e}")
+
+
+@app.route('/artefactos')
+def artefactos():
+    """Versiones indexadas de un ID (?user_id=...&tipo=...), o el resumen del índice"""
+    user_id = request.args.get('user_id')
+    if not user_id:
+        return jsonify({'success': True, **indice_artefactos().info()})
+    versiones = indice_artefactos().versiones(user_id, request.args.get('tipo'))
+    for version in versiones:
+        version['existe'] = os.path.exists(version['ruta'])
+        version['nombre'] = os.path.basename(version.pop('ruta'))
+    return jsonify({'success': True, 'user_id': user_id, 'versiones': versiones})
+
+
+@app.route('/almacen_blobs', methods=['GET'])
+def almacen_blobs_info():
+    """Blobs, referencias y bytes ahorrados por la deduplicación"""
+    return jsonify({'success': True, **almacen_blobs().stats()})
+
+
+@app.route('/almacen_blobs/recolectar', methods=['POST'])
+def recolectar_blobs():
+    """Descarta referencias caducas y borra los blobs que ya nadie usa"""
+    return jsonify({'success': True, **almacen_blobs().recolectar(), **almacen_blobs().stats()})
+
+
+def respuesta_subida(estado, codigo=200):
+    respuesta = jsonify({'success': True, **estado})
+    respuesta.headers['Upload-Offset'] = str(estado['offset'])
+    return respuesta, codigo
+
+
+def respuesta_subida_invalida(error):
+    cuerpo = {'success': False, 'message': str(error)}
+    respuesta = jsonify(cuerpo if error.offset is None else {**cuerpo, 'offset': error.offset})
+    if error.offset is not None:
+        respuesta.headers['Upload-Offset'] = str(error.offset)
+    return respuesta, error.codigo
+
+
+@app.route('/subidas_reanudables', methods=['POST'])
+def crear_subida_reanudable():
+    """Abre una subida por bloques: {nombre, tamano, sha256 opcional}"""
+    datos = request.get_json(silent=True) or request.form
+    try:
+        estado = subidas_reanudables().crear(datos.get('nombre'), datos.get('tamano'), datos.get('sha256'))
+    except SubidaInvalida as e:
+        return respuesta_subida_invalida(e)
+    return respuesta_subida(estado, 201)
+
+
+@app.route('/subidas_reanudables/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def subida_reanudable(upload_id):
+    """
+    GET: offset desde el que se reanuda; PUT: agrega un bloque en su offset
+    (Upload-Offset o Content-Range); DELETE: cancela la subida
+    """
+    try:
+        if request.method == 'DELETE':
+            subidas_reanudables().cancelar(upload_id)
+            return jsonify({'success': True})
+        if request.method == 'PUT':
+            offset = offset_de_peticion(request.headers)
+            if offset is None:
+                return jsonify({'success': False, 'message': 'Falta Upload-Offset o Content-Range'}), 400
+            return respuesta_subida(subidas_reanudables().escribir(upload_id, offset, request.stream))
+        return respuesta_subida(subidas_reanudables().estado(upload_id))
+    except SubidaInvalida as e:
+        return respuesta_subida_invalida(e)
+
+
+@app.route('/artefactos/reindexar', methods=['POST'])
+def reindexar_artefactos():
+    """Vuelve a indexar los libros en disco (p. ej. copiados a mano a archivos_generados)"""
+    return jsonify({'success': True, 'indexados': indice_artefactos().reindexar()})
 
 
 @app.route('/subir_estudio_informacion', methods=['POST'])
@@ -20801,7 +18690,7 @@ def subir_estudio_informacion():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"estudio_img_{i+1}_{timestamp}_{secure_filename(imagen.filename)}"
             ruta_imagen = os.path.join(imagenes_estudio_dir, nombre_archivo)
-            imagen.save(ruta_imagen)
+            almacen_blobs().guardar_subida(imagen, ruta_imagen)
             rutas_imagenes.append(ruta_imagen)
             print(f"💾 Imagen {i+1} guardada: {nombre_archivo}")
         
@@ -20810,7 +18699,7 @@ def subir_estudio_informacion():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"estudio_pdf_{i+1}_{timestamp}_{secure_filename(pdf.filename)}"
             ruta_pdf = os.path.join(pdfs_estudio_dir, nombre_archivo)
-            pdf.save(ruta_pdf)
+            almacen_blobs().guardar_subida(pdf, ruta_pdf)
             rutas_pdfs.append(ruta_pdf)
             print(f"💾 PDF {i+1} guardado: {nombre_archivo}")
         
@@ -20830,7 +18719,7 @@ def subir_estudio_informacion():
         for i, ruta_imagen in enumerate(rutas_imagenes):
             nombre_imagen = f"IMG_ESTUDIO_{i+1}_{os.path.basename(ruta_imagen)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_imagen)
-            shutil.copy2(ruta_imagen, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_imagen, ruta_junto_excel)
             rutas_imagenes_junto_excel.append(ruta_junto_excel)
             print(f"📋 Imagen {i+1} copiada junto al Excel: {nombre_imagen}")
         
@@ -20839,7 +18728,7 @@ def subir_estudio_informacion():
         for i, ruta_pdf in enumerate(rutas_pdfs):
             nombre_pdf = f"PDF_ESTUDIO_{i+1}_{os.path.basename(ruta_pdf)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_pdf)
-            shutil.copy2(ruta_pdf, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_pdf, ruta_junto_excel)
             rutas_pdfs_junto_excel.append(ruta_junto_excel)
             print(f"📋 PDF {i+1} copiado junto al Excel: {nombre_pdf}")
         
@@ -20849,7 +18738,7 @@ def subir_estudio_informacion():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -20959,10 +18848,8 @@ def subir_estudio_informacion():
                             print(f"📄 Embebiendo PDF {i+1} en celda {celda_pdf} usando método exacto de Word/KMZ")
                             
                             # MÉTODO EXACTO: Usar la misma sintaxis que funciona para Word y KMZ
-                            xl_sheet = ws.api
-                            
                             # Insertar archivo PDF como objeto OLE embebido
-                            ole_object = xl_sheet.OLEObjects().Add(
+                            ole_object = objetos_ole(ws).Add(
                                 Filename=rutas_pdfs_junto_excel[i],  # Usar archivo copiado junto al Excel
                                 Link=False,  # False = embebido (va dentro del Excel)
                                 DisplayAsIcon=True,  # Mostrar como icono
@@ -21004,7 +18891,8 @@ def subir_estudio_informacion():
                                     'destino': celda_pdf,
                                     'archivo': os.path.basename(rutas_pdfs_junto_excel[i]),
                                     'success': True,
-                                    'nota': 'Embebido como texto porque OLE falló'
+                                    'nota': ('Embebido como texto: sin Excel no hay objetos OLE'
+                                             if isinstance(ole_error, OLENoSoportado) else 'Embebido como texto porque OLE falló')
                                 })
                                 
                             except Exception as text_error:
@@ -21141,13 +19029,13 @@ def subir_excel_imagen():
         # Guardar imagen
         nombre_imagen = f"excel_img_{timestamp}_{secure_filename(imagen_excel.filename)}"
         ruta_imagen = os.path.join(imagen_excel_dir, nombre_imagen)
-        imagen_excel.save(ruta_imagen)
+        almacen_blobs().guardar_subida(imagen_excel, ruta_imagen)
         print(f"💾 Imagen guardada: {nombre_imagen}")
         
         # Guardar Excel
         nombre_excel = f"excel_file_{timestamp}_{secure_filename(archivo_excel.filename)}"
         ruta_excel = os.path.join(archivo_excel_dir, nombre_excel)
-        archivo_excel.save(ruta_excel)
+        almacen_blobs().guardar_subida(archivo_excel, ruta_excel)
         print(f"💾 Excel guardado: {nombre_excel}")
         
         # Buscar el archivo Excel de diseño más reciente
@@ -21164,13 +19052,13 @@ def subir_excel_imagen():
         # Copiar imagen junto al Excel
         nombre_imagen_junto_excel = f"IMG_EXCEL_{os.path.basename(ruta_imagen)}"
         ruta_imagen_junto_excel = os.path.join(excel_dir, nombre_imagen_junto_excel)
-        shutil.copy2(ruta_imagen, ruta_imagen_junto_excel)
+        almacen_blobs().copiar(ruta_imagen, ruta_imagen_junto_excel)
         print(f"📋 Imagen copiada junto al Excel: {nombre_imagen_junto_excel}")
         
         # Copiar Excel junto al Excel de diseño
         nombre_excel_junto_excel = f"EXCEL_EMBEBIDO_{os.path.basename(ruta_excel)}"
         ruta_excel_junto_excel = os.path.join(excel_dir, nombre_excel_junto_excel)
-        shutil.copy2(ruta_excel, ruta_excel_junto_excel)
+        almacen_blobs().copiar(ruta_excel, ruta_excel_junto_excel)
         print(f"📋 Excel copiado junto al Excel de diseño: {nombre_excel_junto_excel}")
         
         # INTEGRAR CON EXCEL usando xlwings
@@ -21179,7 +19067,7 @@ def subir_excel_imagen():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -21270,10 +19158,8 @@ def subir_excel_imagen():
                 print(f"📊 Embebiendo Excel en celda N52")
                 
                 # MÉTODO EXACTO: Usar la misma sintaxis que funciona para Word, KMZ y PDFs
-                xl_sheet = ws.api
-                
                 # Insertar archivo Excel como objeto OLE embebido
-                ole_object = xl_sheet.OLEObjects().Add(
+                ole_object = objetos_ole(ws).Add(
                     Filename=ruta_excel_junto_excel,  # Usar archivo copiado junto al Excel
                     Link=False,  # False = embebido (va dentro del Excel)
                     DisplayAsIcon=True,  # Mostrar como icono
@@ -21315,7 +19201,8 @@ def subir_excel_imagen():
                         'destino': 'N52',
                         'archivo': os.path.basename(ruta_excel_junto_excel),
                         'success': True,
-                        'nota': 'Embebido como texto porque OLE falló'
+                        'nota': ('Embebido como texto: sin Excel no hay objetos OLE'
+                                 if isinstance(excel_error, OLENoSoportado) else 'Embebido como texto porque OLE falló')
                     })
                     
                 except Exception as text_error:
@@ -21430,7 +19317,7 @@ def subir_torres_antenas():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"torres_img_{i+1}_{timestamp}_{secure_filename(imagen.filename)}"
             ruta_imagen = os.path.join(imagenes_torres_dir, nombre_archivo)
-            imagen.save(ruta_imagen)
+            almacen_blobs().guardar_subida(imagen, ruta_imagen)
             rutas_imagenes.append(ruta_imagen)
             print(f"💾 Imagen {i+1} guardada: {nombre_archivo}")
         
@@ -21450,7 +19337,7 @@ def subir_torres_antenas():
         for i, ruta_imagen in enumerate(rutas_imagenes):
             nombre_imagen = f"IMG_TORRES_{i+1}_{os.path.basename(ruta_imagen)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_imagen)
-            shutil.copy2(ruta_imagen, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_imagen, ruta_junto_excel)
             rutas_imagenes_junto_excel.append(ruta_junto_excel)
             print(f"📋 Imagen {i+1} copiada junto al Excel: {nombre_imagen}")
         
@@ -21460,7 +19347,7 @@ def subir_torres_antenas():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -21654,7 +19541,7 @@ def subir_torres_antenas_b():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"torres_b_img_{i+1}_{timestamp}_{secure_filename(imagen.filename)}"
             ruta_imagen = os.path.join(imagenes_torres_b_dir, nombre_archivo)
-            imagen.save(ruta_imagen)
+            almacen_blobs().guardar_subida(imagen, ruta_imagen)
             rutas_imagenes.append(ruta_imagen)
             print(f"💾 Imagen {i+1} guardada: {nombre_archivo}")
         
@@ -21674,7 +19561,7 @@ def subir_torres_antenas_b():
         for i, ruta_imagen in enumerate(rutas_imagenes):
             nombre_imagen = f"IMG_TORRES_B_{i+1}_{os.path.basename(ruta_imagen)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_imagen)
-            shutil.copy2(ruta_imagen, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_imagen, ruta_junto_excel)
             rutas_imagenes_junto_excel.append(ruta_junto_excel)
             print(f"📋 Imagen {i+1} copiada junto al Excel: {nombre_imagen}")
         
@@ -21684,7 +19571,7 @@ def subir_torres_antenas_b():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -21878,7 +19765,7 @@ def subir_factibilidad_fotos_a():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"factibilidad_a_img_{i+1}_{timestamp}_{secure_filename(imagen.filename)}"
             ruta_imagen = os.path.join(imagenes_factibilidad_a_dir, nombre_archivo)
-            imagen.save(ruta_imagen)
+            almacen_blobs().guardar_subida(imagen, ruta_imagen)
             rutas_imagenes.append(ruta_imagen)
             print(f"💾 Imagen {i+1} guardada: {nombre_archivo}")
         
@@ -21898,7 +19785,7 @@ def subir_factibilidad_fotos_a():
         for i, ruta_imagen in enumerate(rutas_imagenes):
             nombre_imagen = f"IMG_FACTIBILIDAD_A_{i+1}_{os.path.basename(ruta_imagen)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_imagen)
-            shutil.copy2(ruta_imagen, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_imagen, ruta_junto_excel)
             rutas_imagenes_junto_excel.append(ruta_junto_excel)
             print(f"📋 Imagen {i+1} copiada junto al Excel: {nombre_imagen}")
         
@@ -21908,7 +19795,7 @@ def subir_factibilidad_fotos_a():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
@@ -22149,7 +20036,7 @@ def subir_reporte_fotos_b():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             nombre_archivo = f"reporte_b_img_{i+1}_{timestamp}_{secure_filename(imagen.filename)}"
             ruta_imagen = os.path.join(imagenes_reporte_b_dir, nombre_archivo)
-            imagen.save(ruta_imagen)
+            almacen_blobs().guardar_subida(imagen, ruta_imagen)
             rutas_imagenes.append(ruta_imagen)
             print(f"💾 Imagen {i+1} guardada: {nombre_archivo}")
         
@@ -22169,7 +20056,7 @@ def subir_reporte_fotos_b():
         for i, ruta_imagen in enumerate(rutas_imagenes):
             nombre_imagen = f"IMG_REPORTE_B_{i+1}_{os.path.basename(ruta_imagen)}"
             ruta_junto_excel = os.path.join(excel_dir, nombre_imagen)
-            shutil.copy2(ruta_imagen, ruta_junto_excel)
+            almacen_blobs().copiar(ruta_imagen, ruta_junto_excel)
             rutas_imagenes_junto_excel.append(ruta_junto_excel)
             print(f"📋 Imagen {i+1} copiada junto al Excel: {nombre_imagen}")
         
@@ -22179,7 +20066,7 @@ def subir_reporte_fotos_b():
         try:
             # Abrir Excel con xlwings
             print(f"📂 Abriendo Excel con xlwings...")
-            app_excel = xw.App(visible=False, add_book=False)
+            app_excel = abrir_excel(visible=False, add_book=False)
             app_excel.display_alerts = False
             app_excel.screen_updating = False
             
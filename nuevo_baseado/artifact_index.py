@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice de artefactos generados
+Mapea (user_id, tipo de documento) a la lista ordenada de versiones del libro
+(ruta, tamaño, sha256, fecha). Cada escritura (generación, almacenamiento
+permanente, archivos agregados a un libro) registra su versión, así que "el
+libro más reciente de este ID" es una búsqueda por índice en vez de un glob
+sobre archivos_generados ordenado por getctime, que además con patrones como
+ds_*{user_id}*.xlsx podía devolver el libro de otro ID.
+
+Los libros que ya existían se indexan una sola vez al abrir el índice,
+leyendo el ID de su nombre. Si un archivo del índice ya no está en disco se
+descarta al consultarlo y se devuelve la versión anterior.
+
+FANGIO_INDICE_ARTEFACTOS = ruta del archivo SQLite
+"""
+
+import os
+import re
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUTA_INDICE = os.environ.get('FANGIO_INDICE_ARTEFACTOS', os.path.join(BASE_DIR, 'Temp', 'indice_artefactos.db'))
+
+TIPO_DISENO = 'diseno_solucion'
+TIPO_SITE_SURVEY = 'site_survey'
+TIPO_SITE_SURVEY_PTMP = 'site_survey_ptmp'
+
+# (carpeta, patrón del nombre, tipo) de los libros que ya existen en disco
+_NOMBRES_CONOCIDOS = (
+    ('archivos_generados', re.compile(r'^ds_diseno_solucion_(?P<id>.+)_\d{8}_\d{6}\.xlsx$'), TIPO_DISENO),
+    ('site_survey', re.compile(r'^ss_(?P<id>.+?)(?:_\d{10})?\.xlsx$'), TIPO_SITE_SURVEY),
+    ('ptmp_site_survey', re.compile(r'^ss_ptmp_(?P<id>.+)\.xlsx$'), TIPO_SITE_SURVEY_PTMP),
+    ('archivos_permanentes',
+     re.compile(r'^PERMANENTE_ds_diseno_solucion_(?P<id>.+)_\d{8}_\d{6}_\d{8}_\d{6}\.xlsx$'),
+     f'permanente_{TIPO_DISENO}'),
+)
+
+_ESQUEMA = (
+    'CREATE TABLE IF NOT EXISTS versiones ('
+    'ruta TEXT PRIMARY KEY, user_id TEXT NOT NULL, tipo TEXT NOT NULL, '
+    'tamano_bytes INTEGER, sha256 TEXT, registrado REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS ix_versiones_id_tipo ON versiones (user_id, tipo, registrado)',
+    'CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)',
+)
+
+
+def clave_id(user_id) -> str:
+    """ID normalizado: igual para todos los endpoints sin importar cómo limpian el nombre"""
+    return re.sub(r'[^a-zA-Z0-9_-]', '', str(user_id))
+
+
+def tipo_permanente(tipo: str) -> str:
+    """Tipo con el que se indexa la copia permanente de un libro"""
+    return f'permanente_{tipo}'
+
+
+def sha256_archivo(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class IndiceArtefactos:
+    """Versiones de libros por (user_id, tipo) en SQLite (WAL)"""
+
+    def __init__(self, ruta: str = RUTA_INDICE, base_dir: str = BASE_DIR):
+        self.ruta = ruta
+        self.base_dir = base_dir
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as conn:
+            for sentencia in _ESQUEMA:
+                conn.execute(sentencia)
+        self._indexar_existentes()
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def registrar(self, user_id, tipo: str, ruta: str, registrado: Optional[float] = None) -> Dict:
+        """
+        Registra (o actualiza, si la ruta ya estaba) la versión de un libro
+
+        Se llama después de cada escritura; un libro modificado en su lugar
+        pasa a ser la versión más reciente con su nuevo tamaño y hash.
+        """
+        ruta = os.path.abspath(ruta)
+        version = {
+            'ruta': ruta,
+            'user_id': clave_id(user_id),
+            'tipo': tipo,
+            'tamano_bytes': os.path.getsize(ruta),
+            'sha256': sha256_archivo(ruta),
+            'registrado': time.time() if registrado is None else registrado,
+        }
+        with self._conexion() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO versiones (ruta, user_id, tipo, tamano_bytes, sha256, registrado) '
+                'VALUES (:ruta, :user_id, :tipo, :tamano_bytes, :sha256, :registrado)', version
+            )
+        return version
+
+    def actualizar(self, ruta: str) -> Optional[Dict]:
+        """Vuelve a registrar un libro ya indexado que se modificó en su lugar; None si no estaba"""
+        fila = self._conexion().execute(
+            'SELECT user_id, tipo FROM versiones WHERE ruta = ?', (os.path.abspath(ruta),)
+        ).fetchone()
+        if fila is None:
+            return None
+        return self.registrar(fila['user_id'], fila['tipo'], ruta)
+
+    def olvidar(self, ruta: str):
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM versiones WHERE ruta = ?', (os.path.abspath(ruta),))
+
+    def ultimo(self, user_id, tipo: str) -> Optional[str]:
+        """Ruta de la versión más reciente que sigue en disco, o None"""
+        conn = self._conexion()
+        while True:
+            fila = conn.execute(
+                'SELECT ruta FROM versiones WHERE user_id = ? AND tipo = ? ORDER BY registrado DESC LIMIT 1',
+                (clave_id(user_id), tipo)
+            ).fetchone()
+            if fila is None:
+                return None
+            if os.path.exists(fila['ruta']):
+                return fila['ruta']
+            self.olvidar(fila['ruta'])
+
+    def ubicar(self, user_id, tipos: Iterable[str]) -> Optional[str]:
+        """Versión más reciente del primer tipo que tenga alguna (p. ej. generado y luego permanente)"""
+        for tipo in tipos:
+            ruta = self.ultimo(user_id, tipo)
+            if ruta:
+                return ruta
+        return None
+
+    def versiones(self, user_id, tipo: Optional[str] = None) -> List[Dict]:
+        """Versiones del ID (de un tipo o de todos), más recientes primero"""
+        consulta = 'SELECT * FROM versiones WHERE user_id = ?'
+        parametros = [clave_id(user_id)]
+        if tipo:
+            consulta += ' AND tipo = ?'
+            parametros.append(tipo)
+        filas = self._conexion().execute(consulta + ' ORDER BY registrado DESC', parametros).fetchall()
+        return [dict(fila) for fila in filas]
+
+    def reindexar(self) -> int:
+        """Indexa los libros en disco que siguen las convenciones de nombre (con su mtime como fecha)"""
+        indexados = 0
+        for carpeta, patron, tipo in _NOMBRES_CONOCIDOS:
+            directorio = os.path.join(self.base_dir, carpeta)
+            if not os.path.isdir(directorio):
+                continue
+            for entrada in os.scandir(directorio):
+                coincidencia = patron.match(entrada.name)
+                if not coincidencia or not entrada.is_file():
+                    continue
+                try:
+                    self.registrar(coincidencia.group('id'), tipo, entrada.path, entrada.stat().st_mtime)
+                    indexados += 1
+                except OSError as e:
+                    logger.warning(f"⚠️ No se pudo indexar {entrada.name}: {e}")
+        logger.info(f"🗂️ {indexados} libros indexados en el índice de artefactos")
+        return indexados
+
+    def _indexar_existentes(self):
+        """Primera apertura: indexa lo que ya hay en disco (una sola vez entre todos los workers)"""
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE clave = 'indexado'").fetchone():
+                conn.rollback()
+                return
+            conn.execute("INSERT INTO meta (clave, valor) VALUES ('indexado', ?)", (str(time.time()),))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.reindexar()
+
+    def info(self) -> Dict:
+        conn = self._conexion()
+        por_tipo = {fila['tipo']: fila['n'] for fila in conn.execute(
+            'SELECT tipo, COUNT(*) AS n FROM versiones GROUP BY tipo')}
+        return {'versiones': sum(por_tipo.values()), 'por_tipo': por_tipo, 'ruta': self.ruta}
+
+
+_indice: Optional[IndiceArtefactos] = None
+_indice_lock = threading.Lock()
+
+
+def indice_artefactos() -> IndiceArtefactos:
+    """Índice global; se abre (e indexa lo existente) en el primer uso"""
+    global _indice
+    if _indice is None:
+        with _indice_lock:
+            if _indice is None:
+                _indice = IndiceArtefactos()
+    return _indice
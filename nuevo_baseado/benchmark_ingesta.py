@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de ingesta del CSV de la hoja de enlaces
+Compara el parseo anterior (pandas C, dos variantes) contra leer_hoja_csv
+con hojas sintéticas de 1k, 10k y 100k filas.
+
+Uso: python benchmark_ingesta.py [filas ...]
+"""
+
+import io
+import sys
+import time
+import random
+
+import pandas as pd
+
+from sheet_ingest import HAS_PYARROW, leer_hoja_csv
+from sheet_compact import columnas_en_uso
+
+ESTADOS = ['Jalisco', 'CDMX', 'Puebla', 'Nuevo León', 'Yucatán', 'N/A']
+ZONAS = ['Urbana', 'Suburbana', 'Rural', 'Ejidal', 'Pueblo Mágico']
+CAMINOS = ['Terracería', 'Pavimentado', 'Empedrado', 'Mixto', '']
+
+
+def hoja_sintetica(filas: int, columnas_extra: int = 150, semilla: int = 7) -> bytes:
+    """CSV con la forma de la hoja real: IDs, categóricas, números, texto libre y columnas sin uso"""
+    azar = random.Random(semilla)
+    datos = {
+        'ID': [f'MX-{i:06d}' for i in range(filas)],
+        'ID 2': [f'MX-{i + 1:06d}' for i in range(filas)],
+        'Nombre del sitio A': [f'Sitio {azar.randint(1, 99999)} Norte' for _ in range(filas)],
+        'Nombre del sitio B': [f'Sitio {azar.randint(1, 99999)} Sur' for _ in range(filas)],
+        'ESTADO ': [azar.choice(ESTADOS) for _ in range(filas)],
+        'Tipo de Zona': [azar.choice(ZONAS) for _ in range(filas)],
+        ' Tipo de Camino 2 ': [azar.choice(CAMINOS) for _ in range(filas)],
+        'Altitud (msnm)': [str(azar.randint(0, 3000)) for _ in range(filas)],
+        'LATITUD (TORRE)': [f'{azar.uniform(14, 32):.6f}' for _ in range(filas)],
+        'Fecha Inicio Site Survey': [f'2024-{azar.randint(1, 12):02d}-{azar.randint(1, 28):02d}' for _ in range(filas)],
+        'Motivo ': [azar.choice(['', 'n/a', 'Obstrucción por edificio', 'Sin línea de vista']) for _ in range(filas)],
+    }
+    for i in range(columnas_extra):
+        datos[f'Columna sin uso {i}'] = [azar.choice(['x', 'y', '', 'texto libre largo de comentario']) for _ in range(filas)]
+    return pd.DataFrame(datos).to_csv(index=False).encode('utf-8')
+
+
+def medir(funcion, repeticiones: int = 3) -> float:
+    """Mejor tiempo en milisegundos"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def main(tamanos):
+    usadas = columnas_en_uso()
+    print(f"pyarrow: {'sí' if HAS_PYARROW else 'no'}")
+    print(f"{'filas':>8} {'MB':>6} {'pandas':>9} {'pandas txt':>11} {'ingesta':>9} {'proyect.':>9} {'proy. txt':>10}")
+    for filas in tamanos:
+        raw = hoja_sintetica(filas)
+        tiempos = [
+            medir(lambda: pd.read_csv(io.BytesIO(raw))),
+            medir(lambda: pd.read_csv(io.BytesIO(raw), keep_default_na=False, na_values=[])),
+            medir(lambda: leer_hoja_csv(raw)),
+            medir(lambda: leer_hoja_csv(raw, usadas)),
+            medir(lambda: leer_hoja_csv(raw, usadas, texto=True)),
+        ]
+        print(f"{filas:>8} {len(raw) / 1024 / 1024:>6.1f} " + ' '.join(f"{t:>8.0f}ms" for t in tiempos))
+
+
+if __name__ == '__main__':
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén de contenido deduplicado (SHA-256) para subidas y adjuntos
+El mismo KMZ, reporte Word o foto se guardaba varias veces: en
+archivos_permanentes/... y otra vez junto al Excel como KMZ_*/ADJUNTO_*/IMG_*.
+Ahora cada contenido se guarda una sola vez como blob (almacen_blobs/ab/abcd...)
+y las rutas que lo usan son hardlinks a ese blob; si el sistema de archivos no
+permite hardlinks se copia como antes.
+
+Cada ruta enlazada es una referencia; recolectar() descarta las referencias
+cuyo archivo ya no existe (o fue reemplazado) y borra los blobs sin
+referencias. Un archivo enlazado que se va a modificar en su lugar (p. ej. un
+libro permanente que se edita) se separa antes con separar(), para no
+alterar el blob ni las demás rutas.
+
+FANGIO_BLOBS_DIR = carpeta del almacén (debe estar en el mismo disco que
+archivos_generados y archivos_permanentes para poder enlazar)
+"""
+
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_BLOBS = os.environ.get(
+    'FANGIO_BLOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'almacen_blobs')
+)
+
+_BLOQUE = 1 << 20
+
+_ESQUEMA = (
+    'CREATE TABLE IF NOT EXISTS blobs ('
+    'sha256 TEXT PRIMARY KEY, tamano_bytes INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, creado REAL NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS referencias ('
+    'ruta TEXT PRIMARY KEY, sha256 TEXT NOT NULL, enlazada INTEGER NOT NULL, creado REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS ix_referencias_sha ON referencias (sha256)',
+)
+
+
+def _tamano_legible(n: int) -> str:
+    return f"{n / (1024 * 1024):.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.1f} KB"
+
+
+class AlmacenBlobs:
+    """Blobs por SHA-256 con referencias (hardlinks) contadas en SQLite"""
+
+    def __init__(self, raiz: str = DIRECTORIO_BLOBS):
+        self.raiz = raiz
+        os.makedirs(raiz, exist_ok=True)
+        self.ruta_db = os.path.join(raiz, 'blobs.db')
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        with self._conexion() as conn:
+            for sentencia in _ESQUEMA:
+                conn.execute(sentencia)
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta_db, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def ruta_blob(self, sha: str) -> str:
+        return os.path.join(self.raiz, sha[:2], sha)
+
+    def _temporal(self) -> str:
+        return os.path.join(self.raiz, f".entrada_{uuid.uuid4().hex}.tmp")
+
+    # ----- blobs -----
+
+    def _blob_vigente(self, sha: str) -> bool:
+        """
+        ¿El blob existe y sigue intacto?
+
+        Si alguien modificó en su lugar una ruta enlazada, el blob cambió de
+        tamaño o mtime: se saca del almacén (las rutas conservan su contenido
+        actual) para no enlazar archivos nuevos a un contenido equivocado.
+        """
+        fila = self._conexion().execute(
+            'SELECT tamano_bytes, mtime_ns FROM blobs WHERE sha256 = ?', (sha,)
+        ).fetchone()
+        if fila is None:
+            return False
+        try:
+            st = os.stat(self.ruta_blob(sha))
+        except OSError:
+            st = None
+        if st is not None and st.st_size == fila['tamano_bytes'] and st.st_mtime_ns == fila['mtime_ns']:
+            return True
+        logger.warning(f"⚠️ Blob {sha[:12]} modificado o ausente; se descarta del almacén")
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM referencias WHERE sha256 = ?', (sha,))
+            conn.execute('DELETE FROM blobs WHERE sha256 = ?', (sha,))
+        if st is not None:
+            try:
+                os.remove(self.ruta_blob(sha))
+            except OSError:
+                pass
+        return False
+
+    def _ingresar(self, temporal: str, sha: str) -> bool:
+        """Mueve el temporal al blob sha; True si el contenido ya estaba (deduplicado)"""
+        if self._blob_vigente(sha):
+            os.remove(temporal)
+            return True
+        destino = self.ruta_blob(sha)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        os.replace(temporal, destino)
+        st = os.stat(destino)
+        with self._conexion() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO blobs (sha256, tamano_bytes, mtime_ns, creado) VALUES (?, ?, ?, ?)',
+                (sha, st.st_size, st.st_mtime_ns, time.time())
+            )
+        return False
+
+    def _enlazar(self, sha: str, destino: str) -> bool:
+        """Hace de destino una referencia al blob; True si quedó como hardlink (sin copiar)"""
+        destino = os.path.abspath(destino)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporal = f"{destino}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.link(self.ruta_blob(sha), temporal)
+            enlazada = True
+        except OSError:
+            # Otro disco o sistema de archivos sin hardlinks: copia normal
+            shutil.copyfile(self.ruta_blob(sha), temporal)
+            enlazada = False
+        os.replace(temporal, destino)
+        with self._conexion() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO referencias (ruta, sha256, enlazada, creado) VALUES (?, ?, ?, ?)',
+                (destino, sha, int(enlazada), time.time())
+            )
+        return enlazada
+
+    def _referencia(self, ruta: str) -> Optional[str]:
+        """sha de la ruta si es un hardlink vigente a un blob del almacén"""
+        ruta = os.path.abspath(ruta)
+        fila = self._conexion().execute(
+            'SELECT sha256 FROM referencias WHERE ruta = ? AND enlazada = 1', (ruta,)
+        ).fetchone()
+        if fila is None:
+            return None
+        try:
+            if os.path.samefile(ruta, self.ruta_blob(fila['sha256'])):
+                return fila['sha256']
+        except OSError:
+            pass
+        return None
+
+    # ----- API -----
+
+    def guardar_subida(self, archivo, destino: str) -> Tuple[str, bool]:
+        """
+        Guarda un FileStorage en destino a través del almacén
+
+        Regresa (sha256, deduplicado). El contenido se hashea mientras se
+        escribe, así que la subida se lee una sola vez; si llegó con
+        PeticionStreaming ya está en disco y hasheada, y solo se mueve.
+        """
+        flujo = archivo.stream
+        ruta_almacen = getattr(flujo, 'ruta_almacen', None)
+        if ruta_almacen:
+            # Subida reanudable ya ensamblada en el almacén: solo se enlaza
+            resultado = self.copiar(ruta_almacen, destino)
+            flujo.reubicado(destino)
+            return resultado
+        temporal = self._temporal()
+        if hasattr(flujo, 'entregar'):
+            resultado = self._registrar(temporal, flujo.entregar(temporal)['sha256'], destino)
+            flujo.reubicado(destino)
+            return resultado
+        h = hashlib.sha256()
+        try:
+            flujo.seek(0)
+        except (AttributeError, OSError):
+            pass
+        with open(temporal, 'wb') as f:
+            for bloque in iter(lambda: flujo.read(_BLOQUE), b''):
+                h.update(bloque)
+                f.write(bloque)
+        return self._registrar(temporal, h.hexdigest(), destino)
+
+    def copiar(self, origen: str, destino: str) -> Tuple[str, bool]:
+        """
+        Reemplazo de shutil.copy2 para archivos que no se modifican (adjuntos)
+
+        Si origen ya es una referencia del almacén, destino se enlaza al mismo
+        blob sin leer el archivo; si no, el contenido entra al almacén y destino
+        queda como referencia (origen sigue siendo un archivo propio, así que
+        puede ser un libro que después se edite).
+        """
+        with self._lock:
+            sha = self._referencia(origen)
+            if sha and self._blob_vigente(sha):
+                self._enlazar(sha, destino)
+                return sha, True
+        temporal = self._temporal()
+        h = hashlib.sha256()
+        with open(origen, 'rb') as entrada, open(temporal, 'wb') as salida:
+            for bloque in iter(lambda: entrada.read(_BLOQUE), b''):
+                h.update(bloque)
+                salida.write(bloque)
+        return self._registrar(temporal, h.hexdigest(), destino)
+
+    def guardar_archivo(self, temporal: str, destino: str, sha: Optional[str] = None) -> Tuple[str, bool]:
+        """
+        Mete al almacén un archivo ya escrito (se mueve, no se copia) y deja destino como referencia
+
+        Si no se conoce el sha se calcula leyendo el archivo una vez.
+        """
+        if sha is None:
+            h = hashlib.sha256()
+            with open(temporal, 'rb') as f:
+                for bloque in iter(lambda: f.read(_BLOQUE), b''):
+                    h.update(bloque)
+            sha = h.hexdigest()
+        entrada = self._temporal()
+        try:
+            os.replace(temporal, entrada)
+        except OSError:
+            shutil.move(temporal, entrada)
+        return self._registrar(entrada, sha, destino)
+
+    def _registrar(self, temporal: str, sha: str, destino: str) -> Tuple[str, bool]:
+        with self._lock:
+            deduplicado = self._ingresar(temporal, sha)
+            enlazada = self._enlazar(sha, destino)
+        if deduplicado and enlazada:
+            logger.info(f"♻️ {os.path.basename(destino)} ya estaba en el almacén "
+                        f"(ahorro {_tamano_legible(os.path.getsize(destino))})")
+        return sha, deduplicado
+
+    def separar(self, ruta: str) -> bool:
+        """
+        Convierte una referencia en un archivo propio antes de modificarlo en su lugar
+
+        Copia el contenido junto a la ruta y la reemplaza con os.replace; el
+        blob y las demás referencias no cambian. False si no era referencia.
+        """
+        with self._lock:
+            if self._referencia(ruta) is None:
+                return False
+            ruta = os.path.abspath(ruta)
+            temporal = f"{ruta}.{uuid.uuid4().hex[:8]}.tmp"
+            shutil.copy2(ruta, temporal)
+            os.replace(temporal, ruta)
+            with self._conexion() as conn:
+                conn.execute('DELETE FROM referencias WHERE ruta = ?', (ruta,))
+        return True
+
+    def recolectar(self) -> Dict:
+        """
+        Recolección de basura por conteo de referencias
+
+        Descarta referencias cuyo archivo ya no existe o ya no es el blob
+        (borrado, reemplazado o separado) y borra los blobs sin referencias.
+        """
+        with self._lock:
+            conn = self._conexion()
+            caducas = []
+            for fila in conn.execute('SELECT ruta, sha256, enlazada FROM referencias').fetchall():
+                try:
+                    vigente = (os.path.samefile(fila['ruta'], self.ruta_blob(fila['sha256']))
+                               if fila['enlazada'] else os.path.exists(fila['ruta']))
+                except OSError:
+                    vigente = False
+                if not vigente:
+                    caducas.append((fila['ruta'],))
+            with conn:
+                conn.executemany('DELETE FROM referencias WHERE ruta = ?', caducas)
+            huerfanos = conn.execute(
+                'SELECT sha256, tamano_bytes FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM referencias)'
+            ).fetchall()
+            liberados = 0
+            for fila in huerfanos:
+                try:
+                    os.remove(self.ruta_blob(fila['sha256']))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logger.warning(f"⚠️ No se pudo borrar el blob {fila['sha256'][:12]}: {e}")
+                    continue
+                liberados += fila['tamano_bytes']
+                with conn:
+                    conn.execute('DELETE FROM blobs WHERE sha256 = ?', (fila['sha256'],))
+        resultado = {'referencias_caducas': len(caducas), 'blobs_borrados': len(huerfanos),
+                     'bytes_liberados': liberados}
+        logger.info(f"🧹 Almacén de blobs: {resultado}")
+        return resultado
+
+    def stats(self) -> Dict:
+        """Ocupación real vs. lo que ocuparían las copias: el ahorro de la deduplicación"""
+        conn = self._conexion()
+        blobs, almacenados = conn.execute('SELECT COUNT(*), COALESCE(SUM(tamano_bytes), 0) FROM blobs').fetchone()
+        fila = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(b.tamano_bytes), 0), COALESCE(SUM(r.enlazada), 0) '
+            'FROM referencias r JOIN blobs b ON b.sha256 = r.sha256'
+        ).fetchone()
+        referencias, referenciados, enlazadas = fila
+        # Lo que ocupan los blobs con alguna referencia enlazada (las copias no ahorran)
+        fisicos_enlazados = conn.execute(
+            'SELECT COALESCE(SUM(tamano_bytes), 0) FROM blobs WHERE sha256 IN '
+            '(SELECT sha256 FROM referencias WHERE enlazada = 1)'
+        ).fetchone()[0]
+        logicos_enlazados = conn.execute(
+            'SELECT COALESCE(SUM(b.tamano_bytes), 0) FROM referencias r JOIN blobs b ON b.sha256 = r.sha256 '
+            'WHERE r.enlazada = 1'
+        ).fetchone()[0]
+        ahorro = max(0, logicos_enlazados - fisicos_enlazados)
+        return {
+            'blobs': blobs,
+            'referencias': referencias,
+            'referencias_enlazadas': enlazadas,
+            'bytes_almacenados': almacenados,
+            'bytes_referenciados': referenciados,
+            'bytes_ahorrados': ahorro,
+            'ahorro': _tamano_legible(ahorro),
+        }
+
+
+_almacen: Optional[AlmacenBlobs] = None
+_almacen_lock = threading.Lock()
+
+
+def almacen_blobs() -> AlmacenBlobs:
+    """Almacén global; se abre en el primer uso"""
+    global _almacen
+    if _almacen is None:
+        with _almacen_lock:
+            if _almacen is None:
+                _almacen = AlmacenBlobs()
+    return _almacen
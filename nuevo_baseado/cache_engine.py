@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de caché LRU/TTL acotado por memoria para Fangio Telecom
+Primer nivel en memoria (thread-safe, desalojo O(1)) y segundo nivel opcional
+compartido entre procesos (Redis vía cache_optimizer.RedisCache o SQLite local)
+"""
+
+import os
+import sys
+import time
+import base64
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+_SIN_VALOR = object()
+
+
+def estimar_tamano(valor: Any) -> int:
+    """Tamaño aproximado en bytes de un valor cacheado"""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, pd.Series):
+        return int(valor.memory_usage(index=True, deep=True))
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    if isinstance(valor, str):
+        return sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(estimar_tamano(k) + estimar_tamano(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(estimar_tamano(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class _Entrada:
+    __slots__ = ('valor', 'tamano', 'expira')
+
+    def __init__(self, valor, tamano, expira):
+        self.valor = valor
+        self.tamano = tamano
+        self.expira = expira
+
+
+class SegundoNivelSQLite:
+    """Segundo nivel en un archivo SQLite (WAL) compartido por los workers de la máquina"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)'
+            )
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, clave: str) -> Any:
+        fila = self._conexion().execute(
+            'SELECT valor, expira FROM cache WHERE clave = ?', (clave,)
+        ).fetchone()
+        if fila is None or fila[1] < time.time():
+            return _SIN_VALOR
+        return pickle.loads(fila[0])
+
+    def set(self, clave: str, valor: Any, ttl: float):
+        with self._conexion() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+                (clave, sqlite3.Binary(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)), time.time() + ttl)
+            )
+
+    def delete(self, clave: str):
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM cache WHERE clave = ?', (clave,))
+
+    def clear(self):
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM cache')
+
+
+class SegundoNivelRedis:
+    """Segundo nivel sobre cache_optimizer.RedisCache (valores pickle en base64)"""
+
+    PREFIJO = 'fangio:cache:'
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None):
+        from cache_optimizer import RedisCache
+        self.redis = RedisCache(host=host, port=port, db=db, password=password)
+        if not self.redis.connected:
+            raise ConnectionError(f"Redis no disponible en {host}:{port}")
+
+    def get(self, clave: str) -> Any:
+        valor = self.redis.get(self.PREFIJO + clave)
+        if valor is None:
+            return _SIN_VALOR
+        return pickle.loads(base64.b64decode(valor))
+
+    def set(self, clave: str, valor: Any, ttl: float):
+        codificado = base64.b64encode(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)).decode('ascii')
+        self.redis.set(self.PREFIJO + clave, codificado, timeout=max(1, int(ttl)))
+
+    def delete(self, clave: str):
+        self.redis.delete(self.PREFIJO + clave)
+
+    def clear(self):
+        self.redis.clear_pattern(self.PREFIJO + '*')
+
+
+def crear_segundo_nivel(config: Optional[str]):
+    """
+    Crea el segundo nivel a partir de una cadena de configuración:
+    'redis://host:puerto/db', 'sqlite:///ruta/cache.db' o vacío (sin segundo nivel)
+    """
+    if not config:
+        return None
+    try:
+        if config.startswith('redis://'):
+            from urllib.parse import urlparse
+            url = urlparse(config)
+            db = int(url.path.lstrip('/') or 0)
+            return SegundoNivelRedis(host=url.hostname or 'localhost', port=url.port or 6379,
+                                     db=db, password=url.password)
+        if config.startswith('sqlite:///'):
+            return SegundoNivelSQLite(config[len('sqlite:///'):])
+        logger.warning(f"⚠️ Segundo nivel de caché desconocido: {config}")
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo crear el segundo nivel de caché ({config}): {e}")
+    return None
+
+
+class CacheLRU:
+    """
+    Caché LRU thread-safe con presupuesto en bytes y TTL por entrada
+
+    - get/set/delete en O(1) (OrderedDict); el desalojo saca la entrada menos
+      usada hasta quedar dentro de `max_bytes`
+    - las entradas vencidas se descartan al leerlas
+    - con `segundo_nivel` los fallos de memoria se buscan ahí y cada set se
+      escribe también ahí, para que otros procesos encuentren el valor caliente
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl: float = 300,
+                 max_entradas: Optional[int] = None, segundo_nivel=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self.segundo_nivel = segundo_nivel
+        self._datos: 'OrderedDict[Hashable, _Entrada]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._vuelo = SingleFlight()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'desalojos': 0,
+            'expiradas': 0,
+            'hits_segundo_nivel': 0,
+            'errores_segundo_nivel': 0
+        }
+
+    def get(self, clave: Hashable, default=None):
+        """Obtiene un valor vigente o `default`"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                if entrada.expira > time.time():
+                    self._datos.move_to_end(clave)
+                    self._stats['hits'] += 1
+                    return entrada.valor
+                self._quitar(clave)
+                self._stats['expiradas'] += 1
+
+        if self.segundo_nivel is not None:
+            try:
+                valor = self.segundo_nivel.get(str(clave))
+            except Exception as e:
+                self._stats['errores_segundo_nivel'] += 1
+                logger.warning(f"⚠️ Error leyendo segundo nivel de caché: {e}")
+                valor = _SIN_VALOR
+            if valor is not _SIN_VALOR:
+                self._stats['hits_segundo_nivel'] += 1
+                self._guardar_local(clave, valor, self.ttl)
+                return valor
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return default
+
+    def set(self, clave: Hashable, valor: Any, ttl: Optional[float] = None, tamano: Optional[int] = None):
+        """Guarda un valor con TTL propio (o el TTL por defecto)"""
+        ttl = self.ttl if ttl is None else ttl
+        self._guardar_local(clave, valor, ttl, tamano)
+        if self.segundo_nivel is not None:
+            try:
+                self.segundo_nivel.set(str(clave), valor, ttl)
+            except Exception as e:
+                self._stats['errores_segundo_nivel'] += 1
+                logger.warning(f"⚠️ Error escribiendo segundo nivel de caché: {e}")
+
+    def get_or_load(self, clave: Hashable, cargar: Callable[[], Any], ttl: Optional[float] = None):
+        """Obtiene el valor o lo carga una sola vez aunque lo pidan varios hilos a la vez"""
+        valor = self.get(clave, _SIN_VALOR)
+        if valor is not _SIN_VALOR:
+            return valor
+
+        def cargar_y_guardar():
+            nuevo = cargar()
+            self.set(clave, nuevo, ttl=ttl)
+            return nuevo
+
+        return self._vuelo.do(clave, cargar_y_guardar)
+
+    def delete(self, clave: Hashable):
+        with self._lock:
+            self._quitar(clave)
+        if self.segundo_nivel is not None:
+            try:
+                self.segundo_nivel.delete(str(clave))
+            except Exception as e:
+                logger.warning(f"⚠️ Error borrando en segundo nivel de caché: {e}")
+
+    def clear(self):
+        """Limpia todo el cache (ambos niveles)"""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+        if self.segundo_nivel is not None:
+            try:
+                self.segundo_nivel.clear()
+            except Exception as e:
+                logger.warning(f"⚠️ Error limpiando segundo nivel de caché: {e}")
+
+    def stats(self) -> Dict:
+        """Estadísticas de uso del cache"""
+        with self._lock:
+            consultas = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entradas': len(self._datos),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(self._stats['hits'] / consultas * 100, 1) if consultas else 0,
+                'segundo_nivel': type(self.segundo_nivel).__name__ if self.segundo_nivel is not None else None
+            }
+
+    def __len__(self):
+        return len(self._datos)
+
+    def __contains__(self, clave):
+        return self.get(clave, _SIN_VALOR) is not _SIN_VALOR
+
+    # ----- Internos -----
+
+    def _guardar_local(self, clave, valor, ttl, tamano=None):
+        tamano = estimar_tamano(valor) if tamano is None else tamano
+        if tamano > self.max_bytes:
+            logger.warning(f"⚠️ Valor de {tamano} bytes excede el presupuesto del cache; no se guarda en memoria")
+            return
+        with self._lock:
+            self._quitar(clave)
+            self._datos[clave] = _Entrada(valor, tamano, time.time() + ttl)
+            self._bytes += tamano
+            while self._datos and (self._bytes > self.max_bytes or
+                                   (self.max_entradas and len(self._datos) > self.max_entradas)):
+                _, entrada = self._datos.popitem(last=False)
+                self._bytes -= entrada.tamano
+                self._stats['desalojos'] += 1
+
+    def _quitar(self, clave):
+        entrada = self._datos.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada.tamano
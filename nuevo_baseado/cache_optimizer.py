@@ -18,6 +18,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from datetime import datetime, timedelta
 
+try:
+    from upload_stream import metadatos_archivo
+except ImportError:
+    metadatos_archivo = None
+
 # Configuración de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -321,6 +326,10 @@ class FileCache:
     
     def _get_file_hash(self, file_path: str):
         """Genera hash único para un archivo"""
+        # Subidas recién guardadas: el md5 se calculó al recibirlas
+        metadatos = metadatos_archivo(file_path) if metadatos_archivo else None
+        if metadatos and metadatos.get('md5'):
+            return metadatos['md5']
         try:
             hash_md5 = hashlib.md5()
             with open(file_path, "rb") as f:
@@ -27,7 +27,7 @@ CAMPOS_A_CELDAS = {
     'NOMBRE DEL SITIO': 'J9',
     'PROPIETARIO': 'M10',
     'ID': 'AF9',
-    'ESTADO ': 'AC15',
+    'ESTADO': 'AC15',
     'Calle': 'D14',
     'Colonia': 'D15',
     'Municipio': 'E16',
@@ -101,11 +101,47 @@ CAMPOS_ESPACIOS_TORRE = {
     'Nivel inferior de franja disponible': 'U37',
     'Nivel superior de franja disponible': 'AI37',
     'Altura de MW conforme a topologia': 'C40',
-    'Azimut RB ': 'N40',
+    'Azimut RB': 'N40',
     'Propuesta de altura de antena de MW1': 'AC40',
     'Propuesta de altura de antena de MW (SD)1': 'AH40'
 }
 
+# ===== REGIÓN POR ESTADO =====
+ESTADO_A_REGION = {
+    'Aguascalientes': 'CENTRO',
+    'Baja California': 'NORTE',
+    'Baja California Sur': 'NORTE',
+    'Campeche': 'SURESTE',
+    'Chiapas': 'SUR',
+    'Chihuahua': 'NORTE',
+    'Ciudad de México': 'CENTRO',
+    'Coahuila': 'NORTE',
+    'Colima': 'OCCIDENTE',
+    'Durango': 'NORTE',
+    'Estado de México': 'CENTRO',
+    'Guanajuato': 'CENTRO',
+    'Guerrero': 'SUR',
+    'Hidalgo': 'CENTRO',
+    'Jalisco': 'OCCIDENTE',
+    'Michoacán': 'OCCIDENTE',
+    'Morelos': 'CENTRO',
+    'Nayarit': 'OCCIDENTE',
+    'Nuevo León': 'NORESTE',
+    'Oaxaca': 'SUR',
+    'Puebla': 'CENTRO',
+    'Querétaro': 'CENTRO',
+    'Quintana Roo': 'SURESTE',
+    'San Luis Potosí': 'CENTRO',
+    'Sinaloa': 'NORTE',
+    'Sonora': 'NORTE',
+    'Tabasco': 'SURESTE',
+    'Tamaulipas': 'NORESTE',
+    'Tlaxcala': 'CENTRO',
+    'Veracruz': 'GOLFO',
+    'Yucatán': 'SURESTE',
+    'Zacatecas': 'NORTE'
+}
+
 # ===== CONFIGURACIÓN DE SALIDA =====
 PREFIJO_ARCHIVO_SALIDA = "DISENO_SOLUCION_"
 EXTENSION_ARCHIVO = ".xlsx"
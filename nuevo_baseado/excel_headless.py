@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Motor de llenado sin Excel (openpyxl) con la misma interfaz que usa app.py de xlwings
+App -> books.open -> sheets[nombre] -> range('A1').value / pictures.add(...)
+Las rutas de llenado existentes funcionan igual en Linux y sin una instancia de Excel.
+Con AppHeadless(parche=True) los libros se llenan parcheando el XML (xlsx_patch)
+y solo pasan a openpyxl si el llenado necesita imágenes, geometría o formato.
+"""
+
+import io
+import os
+import math
+import zipfile
+import logging
+import datetime as dt
+from typing import Any, Dict, List, Optional, Tuple
+
+import openpyxl
+from openpyxl.drawing.image import Image as ImagenXL
+from openpyxl.drawing.spreadsheet_drawing import AnchorMarker, OneCellAnchor
+from openpyxl.drawing.xdr import XDRPositiveSize2D
+from openpyxl.styles import Alignment, PatternFill
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.utils.units import pixels_to_EMU
+
+from template_registry import registro_plantillas
+from xlsx_patch import PlantillaNoParcheable, PlantillaXlsx, referencia_celda
+
+logger = logging.getLogger(__name__)
+
+# Ancho de columna por defecto de Excel (8.43 caracteres = 64px, guardado con el
+# relleno como 9.140625) y alto de fila (puntos)
+ANCHO_COLUMNA_DEFECTO = 9.140625
+ALTO_FILA_DEFECTO = 15.0
+
+# Constantes de alineación de Excel (xlCenter, xlLeft, xlRight, xlTop, xlBottom)
+_ALINEACION_H = {-4108: 'center', -4131: 'left', -4152: 'right', 1: 'general'}
+_ALINEACION_V = {-4108: 'center', -4160: 'top', -4107: 'bottom'}
+
+
+def _ancho_columna_puntos(ancho_caracteres: float) -> float:
+    """Ancho de columna en puntos (fórmula de Excel con dígito de 7px a 96 dpi)"""
+    pixeles = math.trunc(((256 * ancho_caracteres + math.trunc(128 / 7)) / 256) * 7)
+    return pixeles * 0.75
+
+
+def _color_hex(valor) -> str:
+    """(r, g, b) o '#RRGGBB' de xlwings -> 'RRGGBB' de openpyxl"""
+    if isinstance(valor, (tuple, list)):
+        return '{:02X}{:02X}{:02X}'.format(*valor)
+    return str(valor).lstrip('#').upper()
+
+
+def _valor_celda(valor):
+    """Convierte valores de pandas/numpy a lo que openpyxl escribe (NaN -> vacío, como xlwings)"""
+    if valor is None:
+        return None
+    try:
+        if valor != valor:  # NaN / NaT
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(valor, 'to_pydatetime'):
+        return valor.to_pydatetime()
+    if hasattr(valor, 'item') and not isinstance(valor, (str, bytes, dt.date)):
+        return valor.item()
+    return valor
+
+
+class _Fuente:
+    """Subconjunto de Range.font (xlwings) y Range.api.Font (COM)"""
+
+    _ATRIBUTOS = {
+        'size': 'size', 'Size': 'size', 'bold': 'bold', 'Bold': 'bold',
+        'italic': 'italic', 'Italic': 'italic', 'name': 'name', 'Name': 'name',
+        'color': 'color',
+    }
+
+    def __init__(self, rango: 'RangoHeadless'):
+        object.__setattr__(self, '_rango', rango)
+
+    def __getattr__(self, nombre):
+        atributo = self._ATRIBUTOS.get(nombre)
+        if atributo is None:
+            raise AttributeError(nombre)
+        celda = self._rango.hoja.ws.cell(row=self._rango.min_row, column=self._rango.min_col)
+        return getattr(celda.font, atributo)
+
+    def __setattr__(self, nombre, valor):
+        atributo = self._ATRIBUTOS.get(nombre)
+        if atributo is None:
+            logger.debug(f"Font.{nombre} no soportado sin Excel; se ignora")
+            return
+        if atributo == 'color' and isinstance(valor, (tuple, list)):
+            # xlwings recibe (r, g, b); openpyxl espera 'RRGGBB'
+            valor = _color_hex(valor)
+        for celda in self._rango._celdas():
+            if type(celda).__name__ == 'MergedCell':
+                continue
+            celda.font = celda.font.copy(**{atributo: valor})
+
+
+class _ApiRango:
+    """Subconjunto de Range.api (COM) usado por el llenado: fuente, alineación y ajuste de texto"""
+
+    def __init__(self, rango: 'RangoHeadless'):
+        object.__setattr__(self, '_rango', rango)
+        object.__setattr__(self, 'Font', _Fuente(rango))
+
+    def __setattr__(self, nombre, valor):
+        if nombre == 'WrapText':
+            for celda in self._rango._celdas():
+                if type(celda).__name__ != 'MergedCell':
+                    celda.alignment = celda.alignment.copy(wrap_text=bool(valor))
+            return
+        if nombre in ('HorizontalAlignment', 'VerticalAlignment'):
+            clave = 'horizontal' if nombre == 'HorizontalAlignment' else 'vertical'
+            tabla = _ALINEACION_H if clave == 'horizontal' else _ALINEACION_V
+            for celda in self._rango._celdas():
+                if type(celda).__name__ == 'MergedCell':
+                    continue
+                actual = celda.alignment
+                celda.alignment = Alignment(
+                    horizontal=tabla.get(valor, actual.horizontal) if clave == 'horizontal' else actual.horizontal,
+                    vertical=tabla.get(valor, actual.vertical) if clave == 'vertical' else actual.vertical,
+                    wrap_text=actual.wrap_text, shrink_to_fit=actual.shrink_to_fit, indent=actual.indent,
+                    text_rotation=actual.text_rotation
+                )
+            return
+        logger.debug(f"Range.api.{nombre} no soportado sin Excel; se ignora")
+
+
+class RangoHeadless:
+    """Rango de celdas con .value y geometría en puntos (left/top/width/height)"""
+
+    def __init__(self, hoja: 'HojaHeadless', direccion: str):
+        self.hoja = hoja
+        self.address = direccion.replace('$', '').upper()
+        self.min_col, self.min_row, self.max_col, self.max_row = range_boundaries(
+            self.address if ':' in self.address else f"{self.address}:{self.address}"
+        )
+
+    def _celdas(self):
+        ws = self.hoja.ws
+        for fila in range(self.min_row, self.max_row + 1):
+            for columna in range(self.min_col, self.max_col + 1):
+                yield ws.cell(row=fila, column=columna)
+
+    def _escribir(self, fila: int, columna: int, valor):
+        celda = self.hoja.ws.cell(row=fila, column=columna)
+        if type(celda).__name__ == 'MergedCell':
+            # Excel ignora escrituras dentro de una celda combinada que no es la de arriba a la izquierda
+            logger.debug(f"{self.hoja.name}!{celda.coordinate} está combinada; se ignora la escritura")
+            return
+        celda.value = _valor_celda(valor)
+
+    @property
+    def value(self):
+        ws = self.hoja.ws
+        if self.min_row == self.max_row and self.min_col == self.max_col:
+            return ws.cell(row=self.min_row, column=self.min_col).value
+        filas = [
+            [ws.cell(row=f, column=c).value for c in range(self.min_col, self.max_col + 1)]
+            for f in range(self.min_row, self.max_row + 1)
+        ]
+        if len(filas) == 1:
+            return filas[0]
+        if self.min_col == self.max_col:
+            return [fila[0] for fila in filas]
+        return filas
+
+    @value.setter
+    def value(self, valor):
+        if isinstance(valor, (list, tuple)):
+            filas = valor if valor and isinstance(valor[0], (list, tuple)) else [valor]
+            for i, fila in enumerate(filas):
+                for j, v in enumerate(fila):
+                    self._escribir(self.min_row + i, self.min_col + j, v)
+            return
+        # Un escalar en un rango de varias celdas llena todas (igual que xlwings)
+        for fila in range(self.min_row, self.max_row + 1):
+            for columna in range(self.min_col, self.max_col + 1):
+                self._escribir(fila, columna, valor)
+
+    @property
+    def left(self) -> float:
+        return self.hoja.izquierda_columna(self.min_col)
+
+    @property
+    def top(self) -> float:
+        return self.hoja.arriba_fila(self.min_row)
+
+    @property
+    def width(self) -> float:
+        return self.hoja.izquierda_columna(self.max_col + 1) - self.left
+
+    @property
+    def height(self) -> float:
+        return self.hoja.arriba_fila(self.max_row + 1) - self.top
+
+    @property
+    def color(self):
+        """Relleno de la primera celda como (r, g, b), o None sin relleno"""
+        relleno = self.hoja.ws.cell(row=self.min_row, column=self.min_col).fill
+        if relleno is None or relleno.fill_type != 'solid' or not isinstance(relleno.fgColor.rgb, str):
+            return None
+        rgb = relleno.fgColor.rgb[-6:]
+        return tuple(int(rgb[i:i + 2], 16) for i in (0, 2, 4))
+
+    @color.setter
+    def color(self, valor):
+        relleno = PatternFill(fill_type=None) if valor is None else PatternFill(
+            fill_type='solid', fgColor=_color_hex(valor), bgColor=_color_hex(valor))
+        for celda in self._celdas():
+            if type(celda).__name__ != 'MergedCell':
+                celda.fill = relleno
+
+    @property
+    def font(self) -> _Fuente:
+        return _Fuente(self)
+
+    @property
+    def api(self) -> _ApiRango:
+        return _ApiRango(self)
+
+
+class ImagenHeadless:
+    """Imagen insertada (equivalente a xlwings Picture)"""
+
+    def __init__(self, hoja: 'HojaHeadless', imagen: ImagenXL, nombre: str):
+        self.hoja = hoja
+        self.imagen = imagen
+        self.name = nombre
+
+    @property
+    def width(self) -> float:
+        return self.imagen.width * 0.75
+
+    @property
+    def height(self) -> float:
+        return self.imagen.height * 0.75
+
+    def delete(self):
+        if self.imagen in self.hoja.ws._images:
+            self.hoja.ws._images.remove(self.imagen)
+
+
+class ImagenesHeadless:
+    """Colección ws.pictures: add, count, iteración"""
+
+    def __init__(self, hoja: 'HojaHeadless'):
+        self.hoja = hoja
+
+    def _lista(self) -> List[ImagenHeadless]:
+        return [ImagenHeadless(self.hoja, img, f"Picture {i + 1}") for i, img in enumerate(self.hoja.ws._images)]
+
+    def __iter__(self):
+        # Copia: permite borrar mientras se itera (for pic in ws.pictures: pic.delete())
+        return iter(self._lista())
+
+    def __len__(self):
+        return len(self.hoja.ws._images)
+
+    @property
+    def count(self) -> int:
+        return len(self)
+
+    def add(self, imagen, left: Optional[float] = None, top: Optional[float] = None,
+            width: Optional[float] = None, height: Optional[float] = None,
+            name: Optional[str] = None, **_) -> ImagenHeadless:
+        """Inserta una imagen en la posición indicada en puntos (como xlwings)"""
+        img = ImagenXL(os.fspath(imagen))
+        ancho_px, alto_px = img.width, img.height
+        if width is not None and height is not None:
+            ancho_px, alto_px = width / 0.75, height / 0.75
+        elif width is not None:
+            alto_px = alto_px * (width / 0.75) / ancho_px
+            ancho_px = width / 0.75
+        elif height is not None:
+            ancho_px = ancho_px * (height / 0.75) / alto_px
+            alto_px = height / 0.75
+        img.width, img.height = ancho_px, alto_px
+
+        columna, desplazamiento_x = self.hoja.columna_en(left or 0)
+        fila, desplazamiento_y = self.hoja.fila_en(top or 0)
+        img.anchor = OneCellAnchor(
+            _from=AnchorMarker(col=columna - 1, colOff=pixels_to_EMU(desplazamiento_x / 0.75),
+                               row=fila - 1, rowOff=pixels_to_EMU(desplazamiento_y / 0.75)),
+            ext=XDRPositiveSize2D(pixels_to_EMU(ancho_px), pixels_to_EMU(alto_px))
+        )
+        self.hoja.ws.add_image(img)
+        return ImagenHeadless(self.hoja, img, name or f"Picture {len(self)}")
+
+
+class _GeometriaHoja:
+    """
+    Posiciones en puntos a partir de anchos de columna y altos de fila
+    (las subclases definen _ancho_columna, _alto_fila y _extension)
+    """
+
+    _izquierdas: Optional[List[float]] = None
+    _arribas: Optional[List[float]] = None
+
+    def izquierda_columna(self, columna: int) -> float:
+        """Distancia en puntos del borde izquierdo de la hoja a la columna (1-based)"""
+        if self._izquierdas is None or columna >= len(self._izquierdas):
+            self._izquierdas = self._acumulados(self._ancho_columna, max(columna, self._extension()[0]) + 1)
+        return self._izquierdas[columna - 1]
+
+    def arriba_fila(self, fila: int) -> float:
+        """Distancia en puntos del borde superior de la hoja a la fila (1-based)"""
+        if self._arribas is None or fila >= len(self._arribas):
+            self._arribas = self._acumulados(self._alto_fila, max(fila, self._extension()[1]) + 1)
+        return self._arribas[fila - 1]
+
+    @staticmethod
+    def _acumulados(medida, n: int) -> List[float]:
+        acumulados = [0.0]
+        for i in range(1, n + 1):
+            acumulados.append(acumulados[-1] + medida(i))
+        return acumulados
+
+    def columna_en(self, puntos: float) -> Tuple[int, float]:
+        """(columna 1-based, desplazamiento en puntos) que contiene la posición horizontal"""
+        columna = 1
+        while self.izquierda_columna(columna + 1) <= puntos + 1e-6:
+            columna += 1
+        return columna, puntos - self.izquierda_columna(columna)
+
+    def fila_en(self, puntos: float) -> Tuple[int, float]:
+        """(fila 1-based, desplazamiento en puntos) que contiene la posición vertical"""
+        fila = 1
+        while self.arriba_fila(fila + 1) <= puntos + 1e-6:
+            fila += 1
+        return fila, puntos - self.arriba_fila(fila)
+
+
+class HojaHeadless(_GeometriaHoja):
+    """Hoja de cálculo con la interfaz de xlwings Sheet"""
+
+    def __init__(self, libro: 'LibroHeadless', ws):
+        self.book = libro
+        self.ws = ws
+        self.pictures = ImagenesHeadless(self)
+
+    @property
+    def name(self) -> str:
+        return self.ws.title
+
+    def range(self, celda1: str, celda2: Optional[str] = None) -> RangoHeadless:
+        return RangoHeadless(self, f"{celda1}:{celda2}" if celda2 else celda1)
+
+    def __getitem__(self, direccion: str) -> RangoHeadless:
+        return self.range(direccion)
+
+    # ----- Geometría (puntos) -----
+
+    def _ancho_columna(self, columna: int) -> float:
+        dimension = self.ws.column_dimensions.get(get_column_letter(columna))
+        if dimension is not None and dimension.hidden:
+            return 0.0
+        if dimension is not None and dimension.width:
+            return _ancho_columna_puntos(dimension.width)
+        defecto = self.ws.sheet_format.defaultColWidth
+        if defecto:
+            return _ancho_columna_puntos(float(defecto))
+        return _ancho_columna_puntos(ANCHO_COLUMNA_DEFECTO)
+
+    def _alto_fila(self, fila: int) -> float:
+        dimension = self.ws.row_dimensions.get(fila)
+        if dimension is not None and dimension.hidden:
+            return 0.0
+        if dimension is not None and dimension.ht:
+            return float(dimension.ht)
+        defecto = self.ws.sheet_format.defaultRowHeight
+        return float(defecto) if defecto else ALTO_FILA_DEFECTO
+
+    def _extension(self) -> Tuple[int, int]:
+        return self.ws.max_column, self.ws.max_row
+
+class HojasHeadless:
+    """Colección wb.sheets: por nombre o índice, iteración y add"""
+
+    def __init__(self, libro: 'LibroHeadless'):
+        self.book = libro
+        self._hojas = {}
+
+    def _hoja(self, ws) -> HojaHeadless:
+        if ws.title not in self._hojas or self._hojas[ws.title].ws is not ws:
+            self._hojas[ws.title] = HojaHeadless(self.book, ws)
+        return self._hojas[ws.title]
+
+    def __getitem__(self, clave) -> HojaHeadless:
+        wb = self.book.wb
+        if isinstance(clave, int):
+            return self._hoja(wb.worksheets[clave])
+        if clave not in wb.sheetnames:
+            raise KeyError(f"No existe la hoja '{clave}'")
+        return self._hoja(wb[clave])
+
+    def __iter__(self):
+        return iter([self._hoja(ws) for ws in self.book.wb.worksheets])
+
+    def __len__(self):
+        return len(self.book.wb.worksheets)
+
+    def __contains__(self, nombre) -> bool:
+        return nombre in self.book.wb.sheetnames
+
+    @property
+    def count(self) -> int:
+        return len(self)
+
+    def add(self, name: Optional[str] = None, before=None, after=None) -> HojaHeadless:
+        wb = self.book.wb
+        if before is not None:
+            indice = wb.worksheets.index(before.ws)
+        elif after is not None:
+            indice = wb.worksheets.index(after.ws) + 1
+        else:
+            # xlwings agrega antes de la hoja activa; al final es lo más cercano sin ventana
+            indice = len(wb.worksheets)
+        return self._hoja(wb.create_sheet(title=name, index=indice))
+
+
+class LibroHeadless:
+    """Libro abierto con openpyxl (equivalente a xlwings Book)"""
+
+    def __init__(self, app: 'AppHeadless', ruta: str, contenido: Optional[bytes] = None):
+        self.app = app
+        self.fullname = os.path.abspath(ruta)
+        origen = io.BytesIO(contenido) if contenido is not None else self.fullname
+        self.wb = openpyxl.load_workbook(origen)
+        self.sheets = HojasHeadless(self)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.fullname)
+
+    def save(self, ruta: Optional[str] = None):
+        destino = os.path.abspath(ruta) if ruta else self.fullname
+        self.wb.save(destino)
+        self.fullname = destino
+
+    def close(self):
+        if self in self.app.books._libros:
+            self.app.books._libros.remove(self)
+        self.wb.close()
+
+
+class RangoParche:
+    """
+    Rango de un LibroParche: los valores se acumulan en memoria; lo que
+    requiere el modelo completo (geometría, fuente) pasa el libro a openpyxl
+    """
+
+    def __init__(self, hoja: 'HojaParche', direccion: str):
+        self.hoja = hoja
+        self.address = direccion.replace('$', '').upper()
+        self.min_col, self.min_row, self.max_col, self.max_row = range_boundaries(
+            self.address if ':' in self.address else f"{self.address}:{self.address}"
+        )
+
+    def _openpyxl(self) -> RangoHeadless:
+        return self.hoja._openpyxl().range(self.address)
+
+    def _referencias(self):
+        for fila in range(self.min_row, self.max_row + 1):
+            yield [f"{get_column_letter(c)}{fila}" for c in range(self.min_col, self.max_col + 1)]
+
+    @property
+    def value(self):
+        if self.hoja.libro.modelo is not None:
+            return self._openpyxl().value
+        filas = [[self.hoja.leer(ref) for ref in fila] for fila in self._referencias()]
+        if len(filas) == 1 and len(filas[0]) == 1:
+            return filas[0][0]
+        if len(filas) == 1:
+            return filas[0]
+        if self.min_col == self.max_col:
+            return [fila[0] for fila in filas]
+        return filas
+
+    @value.setter
+    def value(self, valor):
+        if self.hoja.libro.modelo is not None:
+            self._openpyxl().value = valor
+            return
+        referencias = list(self._referencias())
+        if isinstance(valor, (list, tuple)):
+            filas = valor if valor and isinstance(valor[0], (list, tuple)) else [valor]
+            for i, fila in enumerate(filas):
+                for j, v in enumerate(fila):
+                    fila_ref, columna = self.min_row + i, self.min_col + j
+                    self.hoja.escribir(f"{get_column_letter(columna)}{fila_ref}", v)
+            return
+        for fila in referencias:
+            for ref in fila:
+                self.hoja.escribir(ref, valor)
+
+    # La geometría sale de los metadatos de la plantilla mientras no haya openpyxl
+
+    @property
+    def left(self) -> float:
+        return self._geometria().izquierda_columna(self.min_col)
+
+    @property
+    def top(self) -> float:
+        return self._geometria().arriba_fila(self.min_row)
+
+    @property
+    def width(self) -> float:
+        return self._geometria().izquierda_columna(self.max_col + 1) - self.left
+
+    @property
+    def height(self) -> float:
+        return self._geometria().arriba_fila(self.max_row + 1) - self.top
+
+    def _geometria(self) -> _GeometriaHoja:
+        return self.hoja if self.hoja.libro.modelo is None else self.hoja._openpyxl()
+
+    @property
+    def color(self):
+        return self._openpyxl().color
+
+    @color.setter
+    def color(self, valor):
+        self._openpyxl().color = valor
+
+    @property
+    def font(self) -> _Fuente:
+        return self._openpyxl().font
+
+    @property
+    def api(self) -> _ApiRango:
+        return self._openpyxl().api
+
+
+class HojaParche(_GeometriaHoja):
+    """Hoja de un LibroParche con la interfaz de xlwings Sheet"""
+
+    def __init__(self, libro: 'LibroParche', nombre: str):
+        self.libro = libro
+        self.name = nombre
+        self.metadatos = libro.plantilla.hoja(nombre)
+
+    def _ancho_columna(self, columna: int) -> float:
+        ancho, oculta = self.metadatos.columnas.get(columna, (None, False))
+        if oculta:
+            return 0.0
+        return _ancho_columna_puntos(ancho or self.metadatos.ancho_defecto or ANCHO_COLUMNA_DEFECTO)
+
+    def _alto_fila(self, fila: int) -> float:
+        alto, oculta = self.metadatos.alturas.get(fila, (None, False))
+        if oculta:
+            return 0.0
+        return alto or self.metadatos.alto_defecto or ALTO_FILA_DEFECTO
+
+    def _extension(self) -> Tuple[int, int]:
+        return max(self.metadatos.columnas, default=1), max(self.metadatos.numeros_filas, default=1)
+
+    def _openpyxl(self) -> HojaHeadless:
+        return self.libro.a_openpyxl('geometría/imágenes/formato').sheets[self.name]
+
+    def range(self, celda1: str, celda2: Optional[str] = None) -> RangoParche:
+        return RangoParche(self, f"{celda1}:{celda2}" if celda2 else celda1)
+
+    def __getitem__(self, direccion: str) -> RangoParche:
+        return self.range(direccion)
+
+    @property
+    def pictures(self) -> ImagenesHeadless:
+        return self._openpyxl().pictures
+
+    def leer(self, referencia: str):
+        escrituras = self.libro.escrituras.get(self.name, {})
+        if referencia in escrituras:
+            return _valor_celda(escrituras[referencia])
+        return self.libro.plantilla.valor(self.name, referencia)
+
+    def escribir(self, referencia: str, valor):
+        combinada = self.metadatos.combinadas.get(referencia_celda(referencia))
+        if combinada is not None:
+            logger.debug(f"{self.name}!{referencia} está combinada ({combinada}); se ignora la escritura")
+            return
+        if isinstance(valor, (dt.date, dt.time)) and not self.libro.plantilla.admite_fechas:
+            # Sin cellXfs no hay formato de fecha que asignar en el XML: la celda la escribe openpyxl
+            self.libro.a_openpyxl('fecha sin estilos').sheets[self.name].range(referencia).value = valor
+            return
+        self.libro.escrituras.setdefault(self.name, {})[referencia] = valor
+
+
+class HojasParche:
+    """Colección wb.sheets de un LibroParche"""
+
+    def __init__(self, libro: 'LibroParche'):
+        self.book = libro
+        self._hojas = {nombre: HojaParche(libro, nombre) for nombre in libro.plantilla.hojas}
+
+    def __getitem__(self, clave) -> HojaParche:
+        if isinstance(clave, int):
+            clave = list(self._hojas)[clave]
+        if clave not in self._hojas:
+            raise KeyError(f"No existe la hoja '{clave}'")
+        return self._hojas[clave]
+
+    def __iter__(self):
+        return iter(list(self._hojas.values()))
+
+    def __len__(self):
+        return len(self._hojas)
+
+    def __contains__(self, nombre) -> bool:
+        return nombre in self._hojas
+
+    @property
+    def count(self) -> int:
+        return len(self)
+
+    def add(self, name: Optional[str] = None, before=None, after=None) -> HojaHeadless:
+        modelo = self.book.a_openpyxl('hoja nueva')
+        before = modelo.sheets[before.name] if before is not None else None
+        after = modelo.sheets[after.name] if after is not None else None
+        hoja = modelo.sheets.add(name, before=before, after=after)
+        self._hojas[hoja.name] = HojaParche(self.book, hoja.name)
+        return hoja
+
+
+class LibroParche:
+    """
+    Libro que se llena parcheando el XML de la plantilla (xlsx_patch)
+
+    Mientras solo se escriben valores, el guardado reescribe únicamente las
+    hojas tocadas y sharedStrings. Si el llenado pide algo que necesita el
+    modelo completo (imágenes, geometría, formato, hojas nuevas), se aplican
+    los valores acumulados y el libro sigue con openpyxl.
+    """
+
+    def __init__(self, app: 'AppHeadless', ruta: str, plantilla: PlantillaXlsx):
+        self.app = app
+        self.fullname = os.path.abspath(ruta)
+        self.plantilla = plantilla
+        self.escrituras: Dict[str, Dict[str, Any]] = {}
+        self.modelo: Optional[LibroHeadless] = None
+        self.sheets = HojasParche(self)
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.fullname)
+
+    def a_openpyxl(self, motivo: str) -> LibroHeadless:
+        """Pasa el libro a openpyxl con los valores ya escritos"""
+        if self.modelo is None:
+            logger.info(f"📗 {self.name}: {motivo} requiere openpyxl; se cargan {self._total()} celdas escritas")
+            self.modelo = LibroHeadless(self.app, self.fullname, contenido=self.plantilla.llenar(self.escrituras))
+        return self.modelo
+
+    def _total(self) -> int:
+        return sum(len(celdas) for celdas in self.escrituras.values())
+
+    def save(self, ruta: Optional[str] = None):
+        destino = os.path.abspath(ruta) if ruta else self.fullname
+        if self.modelo is not None:
+            self.modelo.save(destino)
+        else:
+            self.plantilla.llenar(self.escrituras, destino)
+        self.fullname = destino
+
+    def close(self):
+        if self in self.app.books._libros:
+            self.app.books._libros.remove(self)
+        if self.modelo is not None:
+            self.modelo.wb.close()
+
+
+class LibrosHeadless:
+    """Colección app.books"""
+
+    def __init__(self, app: 'AppHeadless'):
+        self.app = app
+        self._libros: List = []
+
+    def open(self, ruta: str, **_):
+        libro = None
+        if self.app.parche:
+            try:
+                # Plantilla registrada o clon reciente: ya está analizada en memoria
+                plantilla = registro_plantillas.parche_para(ruta) or PlantillaXlsx(ruta)
+                libro = LibroParche(self.app, ruta, plantilla)
+            except (PlantillaNoParcheable, KeyError, zipfile.BadZipFile) as e:
+                logger.warning(f"⚠️ {os.path.basename(ruta)} no se puede parchear directo ({e}); se usa openpyxl")
+        if libro is None:
+            libro = LibroHeadless(self.app, ruta)
+        self._libros.append(libro)
+        return libro
+
+    def __iter__(self):
+        return iter(list(self._libros))
+
+    def __len__(self):
+        return len(self._libros)
+
+
+class AppHeadless:
+    """
+    Sustituto de xlwings.App sin Excel
+
+    Acepta y descarta las propiedades de la aplicación (display_alerts,
+    screen_updating, calculation, ...) que no tienen sentido sin ventana.
+    Con parche=True los libros se llenan parcheando el XML (LibroParche).
+    """
+
+    def __init__(self, visible: bool = False, add_book: bool = False, parche: bool = False, **_):
+        self.books = LibrosHeadless(self)
+        self.visible = visible
+        self.parche = parche
+
+    def quit(self):
+        for libro in list(self.books):
+            libro.close()
+
+    def kill(self):
+        self.quit()
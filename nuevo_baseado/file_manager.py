@@ -5,6 +5,11 @@ from datetime import datetime
 from pathlib import Path
 import hashlib
 
+try:
+    from upload_stream import metadatos_archivo
+except ImportError:
+    metadatos_archivo = None
+
 class FileManager:
     """Sistema de gestión de archivos generados y plantillas"""
     
@@ -136,10 +141,16 @@ class FileManager:
     
     def generate_file_hash(self, file_path):
         """Genera un hash único para el archivo"""
+        # Subidas recién guardadas: el md5 se calculó al recibirlas
+        metadatos = metadatos_archivo(file_path) if metadatos_archivo else None
+        if metadatos and metadatos.get('md5'):
+            return metadatos['md5']
         try:
+            hash_md5 = hashlib.md5()
             with open(file_path, 'rb') as f:
-                content = f.read()
-                return hashlib.md5(content).hexdigest()
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    hash_md5.update(chunk)
+            return hash_md5.hexdigest()
         except:
             return hashlib.md5(str(datetime.now()).encode()).hexdigest()
     
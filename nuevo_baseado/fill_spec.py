@@ -0,0 +1,871 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Especificación declarativa del llenado de plantillas
+Cada hoja se describe con bloques (campo -> celdas, grupos de casillas,
+condicionales) y se compila una sola vez a un plan plano de pasos
+(hoja, celda, valor(fila)). El plan se evalúa por fila y se escribe en una
+sola pasada por hoja con cualquier motor (xlwings, parche XML, openpyxl).
+
+Los bloques de sitio aceptan columnas ('col A', 'col B'): Sitios() los
+compila dos veces, una por hoja, para que A y B no se escriban por separado.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple, Union
+
+from sheet_normalization import normaliza_na, plegar_texto, texto_normalizado
+from config_diseno_solucion import (
+    CAMPOS_A_CELDAS, CAMPOS_B_CELDAS, CHECKBOXES_TIPO_CAMINO, CHECKBOXES_TIPO_ZONA, CHECKBOXES_VISIBILIDAD
+)
+
+logger = logging.getLogger(__name__)
+
+# Valor que un paso condicional regresa cuando no le toca escribir
+OMITIR = object()
+
+Columna = Union[str, Tuple[str, str]]
+Celdas = Union[str, Sequence[str]]
+
+
+class ContextoFila:
+    """Fila que se está llenando más los valores extra del llenado (nombres, ids)"""
+
+    def __init__(self, fila, **extras):
+        self.fila = fila
+        self.extras = extras
+        self._plegados: Dict[str, str] = {}
+        self._primeros: Dict[str, str] = {}
+
+    def valor(self, columna: str, defecto: Any = 'N/A'):
+        return self.fila.get(columna, defecto)
+
+    def plegado(self, columna: str) -> str:
+        """texto_normalizado memorizado: A y B suelen consultar la misma columna varias veces"""
+        if columna not in self._plegados:
+            self._plegados[columna] = texto_normalizado(self.fila, columna)
+        return self._plegados[columna]
+
+    def primer_valor(self, columna: str) -> str:
+        """Primera opción (antes de la primera coma) de una respuesta múltiple, plegada"""
+        if columna not in self._primeros:
+            valor = self.fila.get(columna, '')
+            self._primeros[columna] = plegar_texto(valor.split(',')[0]) if isinstance(valor, str) else ''
+        return self._primeros[columna]
+
+
+class Paso(NamedTuple):
+    hoja: str
+    celda: str
+    valor: Callable[[ContextoFila], Any]
+    condicional: bool = False
+
+
+def _columna(columna: Columna, lado: int) -> str:
+    return columna[lado] if isinstance(columna, tuple) else columna
+
+
+def _celdas(celdas: Celdas) -> List[str]:
+    return [celdas] if isinstance(celdas, str) else list(celdas)
+
+
+class Bloque:
+    """Parte de la especificación de una hoja; lado 0 = sitio A, 1 = sitio B"""
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        raise NotImplementedError
+
+
+class Campo(Bloque):
+    """
+    Valor de una columna en una o varias celdas
+
+    na=True aplica normaliza_na (vacíos y 'n/a' -> 'N/A'); reemplazar_vacio
+    cambia un valor vacío/None por el defecto (row.get(col, 'N/A') or 'N/A').
+    """
+
+    def __init__(self, columna: Columna, celdas: Celdas, defecto: Any = 'N/A',
+                 na: bool = False, reemplazar_vacio: bool = False):
+        self.columna = columna
+        self.celdas = _celdas(celdas)
+        self.defecto = defecto
+        self.na = na
+        self.reemplazar_vacio = reemplazar_vacio
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        columna, defecto = _columna(self.columna, lado), self.defecto
+        if self.na:
+            def valor(ctx, columna=columna):
+                return normaliza_na(ctx.valor(columna, ''))
+        elif self.reemplazar_vacio:
+            def valor(ctx, columna=columna, defecto=defecto):
+                return ctx.valor(columna, defecto) or defecto
+        else:
+            def valor(ctx, columna=columna, defecto=defecto):
+                return ctx.valor(columna, defecto)
+        return [Paso(hoja, celda, valor) for celda in self.celdas]
+
+
+class Mapeo(Bloque):
+    """Diccionario columna -> celda(s), como CAMPOS_A_CELDAS"""
+
+    def __init__(self, campos_celdas: Dict[Columna, Celdas], defecto: Any = 'N/A', na: bool = False):
+        self.campos = [Campo(columna, celdas, defecto=defecto, na=na) for columna, celdas in campos_celdas.items()]
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        return [paso for campo in self.campos for paso in campo.pasos(hoja, lado)]
+
+
+class Fijo(Bloque):
+    """Valor constante"""
+
+    def __init__(self, celda: str, valor: Any):
+        self.celda = celda
+        self.valor = valor
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        return [Paso(hoja, self.celda, lambda ctx, valor=self.valor: valor)]
+
+
+class Texto(Bloque):
+    """Texto armado con los extras del llenado: Texto('A43', '{nombre_a} - {nombre_b}')"""
+
+    def __init__(self, celda: str, formato: str):
+        self.celda = celda
+        self.formato = formato
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        return [Paso(hoja, self.celda, lambda ctx, formato=self.formato: formato.format(**ctx.extras))]
+
+
+# Cómo se compara la respuesta plegada con cada opción del grupo
+_COMPARACIONES: Dict[str, Callable[[ContextoFila, str, str], bool]] = {
+    'contiene': lambda ctx, columna, opcion: opcion in ctx.plegado(columna),
+    'igual': lambda ctx, columna, opcion: ctx.plegado(columna) == opcion,
+    'primero': lambda ctx, columna, opcion: ctx.primer_valor(columna) == opcion,
+}
+
+
+def _predicado(columna: str, opciones: Iterable[str], comparar: str) -> Callable[[ContextoFila], bool]:
+    """True si la respuesta coincide con alguna de las opciones (ya plegadas)"""
+    comparacion = _COMPARACIONES[comparar]
+    opciones = tuple(plegar_texto(opcion) for opcion in opciones)
+    return lambda ctx: any(comparacion(ctx, columna, opcion) for opcion in opciones)
+
+
+class Casillas(Bloque):
+    """
+    Grupo de casillas de una pregunta: {opción: celda}, como CHECKBOXES_TIPO_ZONA
+
+    Cada celda recibe True/False. Las opciones se pliegan igual que la
+    respuesta ('pueblo mágico' -> 'pueblomagico').
+    """
+
+    def __init__(self, columna: Columna, opciones: Dict[str, Celdas], comparar: str = 'contiene'):
+        if comparar not in _COMPARACIONES:
+            raise ValueError(f"Comparación desconocida: {comparar}")
+        self.columna = columna
+        self.opciones = opciones
+        self.comparar = comparar
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        columna = _columna(self.columna, lado)
+        pasos = []
+        for opcion, celdas in self.opciones.items():
+            marcada = _predicado(columna, (opcion,), self.comparar)
+            pasos.extend(Paso(hoja, celda, marcada) for celda in _celdas(celdas))
+        return pasos
+
+
+class Cuando(Bloque):
+    """
+    Bloques que dependen de la respuesta de una pregunta
+
+    Si la respuesta coincide con alguna opción se escriben los pasos de
+    `entonces`; si no, los de `si_no`. Una celda que solo aparece en una rama
+    no se toca en la otra.
+    """
+
+    def __init__(self, columna: Columna, opciones: Iterable[str], entonces: Iterable[Bloque] = (),
+                 si_no: Iterable[Bloque] = (), comparar: str = 'contiene'):
+        self.columna = columna
+        self.opciones = tuple(opciones)
+        self.entonces = list(entonces)
+        self.si_no = list(si_no)
+        self.comparar = comparar
+
+    def pasos(self, hoja: str, lado: int) -> List[Paso]:
+        condicion = _predicado(_columna(self.columna, lado), self.opciones, self.comparar)
+        # La última escritura de cada celda en cada rama es la que cuenta
+        entonces = {p.celda: p.valor for b in self.entonces for p in b.pasos(hoja, lado)}
+        si_no = {p.celda: p.valor for b in self.si_no for p in b.pasos(hoja, lado)}
+        pasos = []
+        for celda in list(entonces) + [c for c in si_no if c not in entonces]:
+            def valor(ctx, si=entonces.get(celda), no=si_no.get(celda)):
+                rama = si if condicion(ctx) else no
+                return OMITIR if rama is None else rama(ctx)
+            pasos.append(Paso(hoja, celda, valor, condicional=True))
+        return pasos
+
+
+class Hoja:
+    """Bloques de una hoja"""
+
+    def __init__(self, nombre: str, bloques: Iterable[Bloque]):
+        self.nombre = nombre
+        self.bloques = list(bloques)
+
+    def pasos(self) -> List[Paso]:
+        return [paso for bloque in self.bloques for paso in bloque.pasos(self.nombre, 0)]
+
+
+class Sitios:
+    """Los mismos bloques en la hoja del sitio A y en la del sitio B"""
+
+    def __init__(self, hoja_a: str, hoja_b: str, bloques: Iterable[Bloque]):
+        self.hojas = (hoja_a, hoja_b)
+        self.bloques = list(bloques)
+
+    def pasos(self) -> List[Paso]:
+        return [paso for lado, hoja in enumerate(self.hojas)
+                for bloque in self.bloques for paso in bloque.pasos(hoja, lado)]
+
+
+Plan = Tuple[Paso, ...]
+
+
+def compilar(especificacion: Iterable[Union[Hoja, Sitios]]) -> Plan:
+    """
+    Plan plano de la especificación
+
+    Se descartan los pasos que una escritura posterior incondicional de la
+    misma celda haría inútiles.
+    """
+    pasos = [paso for parte in especificacion for paso in parte.pasos()]
+    finales = set()
+    plan = []
+    for paso in reversed(pasos):
+        clave = (paso.hoja, paso.celda)
+        if clave in finales:
+            continue
+        if not paso.condicional:
+            finales.add(clave)
+        plan.append(paso)
+    plan.reverse()
+    return tuple(plan)
+
+
+def evaluar(plan: Plan, fila, **extras) -> Dict[str, Dict[str, Any]]:
+    """{hoja: {celda: valor}} de una fila; gana la última escritura de cada celda"""
+    ctx = ContextoFila(fila, **extras)
+    valores: Dict[str, Dict[str, Any]] = {}
+    for paso in plan:
+        valor = paso.valor(ctx)
+        if valor is not OMITIR:
+            valores.setdefault(paso.hoja, {})[paso.celda] = valor
+    return valores
+
+
+def escribir_valores(wb, valores: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Escribe {hoja: {celda: valor}} en un libro de cualquier motor
+
+    Con el parche XML los valores van directo al buffer del libro, sin crear
+    un rango por celda.
+    """
+    total = 0
+    for nombre_hoja, celdas in valores.items():
+        ws = wb.sheets[nombre_hoja]
+        directo = hasattr(ws, 'escribir') and getattr(ws.libro, 'modelo', None) is None
+        for celda, valor in celdas.items():
+            try:
+                if directo:
+                    ws.escribir(celda, valor)
+                else:
+                    ws.range(celda).value = valor
+                total += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Error llenando {nombre_hoja}!{celda}: {e}")
+    return total
+
+
+def ejecutar_plan(plan: Plan, wb, fila, **extras) -> int:
+    """Evalúa el plan para `fila` y lo escribe en `wb`; regresa las celdas escritas"""
+    return escribir_valores(wb, evaluar(plan, fila, **extras))
+
+
+# ===== SITE SURVEY PTP =====
+
+HOJA_CARATULA = '0. Carátula'
+HOJA_INFO_A = '1. Información General A'
+HOJA_INFO_B = '2. Información General B'
+HOJA_ESPACIOS = '3. Espacios en Torre y Piso A-B'
+HOJA_PLANOS_A = '4. Planos A'
+HOJA_PLANOS_B = '5. Planos B'
+HOJA_FOTOS_A = '6. Reporte Fotos A'
+HOJA_FOTOS_B = '7. Reporte Fotos B'
+
+COMENTARIO_GRUA = 'comentario:En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.'
+
+# Campos de texto de las hojas 1 y 2 (se escriben con normaliza_na)
+CAMPOS_INFO_A = {
+    'Fecha Inicio Site Survey': 'G8',
+    'Fecha final Site Survey': 'AF8',
+    **CAMPOS_A_CELDAS,
+    'Horario de solicitud de accesos': 'Q50',
+    'Contacto solicitud de accesos': 'B52',
+    'Como o donde obtener permisos/llave/tarjeta': 'O49',
+    'Comentario:Forma de ingresar el equipo al sitio es con:': 'B57',
+    COMENTARIO_GRUA: 'B63',
+    'Si la respuesta anterior es si, Indique a que distancia': 'AD72',
+}
+
+CAMPOS_INFO_B = {
+    'Fecha Inicio Site Survey B': 'G8',
+    'Fecha final Site Survey B': 'AF8',
+    **CAMPOS_B_CELDAS,
+    'Horario de solicitud de accesos B': 'Q50',
+    'Contacto solicitud de accesos B': 'B52',
+    'Como o donde obtener permisos/llave/tarjeta B': 'O49',
+    'Comentario:Forma de ingresar el equipo al sitio es con: B': 'B57',
+    COMENTARIO_GRUA: 'B63',
+    'Si la respuesta anterior es si, Indique a que distancia B': 'AD72',
+    # En la hoja 2 de la plantilla PtP estas celdas están desplazadas respecto a la hoja 1
+    'Referencias 2': 'K16',
+    'LATITUD (TORRE) 2': 'L29',
+    'LONGITUD (TORRE) 2': 'AB29',
+    'LATITUD (FACHADA) 2': 'L26',
+    'LONGITUD (FACHADA) 2': 'AB26',
+    'Altitud (msnm) 2': 'N30',
+    'Nombre de contacto en sitio 2': 'I18',
+    'Telefono 2': 'AC18',
+    'PROPIETARIO 2': 'N9',
+    'ESTADO 2': 'AD14',
+}
+
+CAMPOS_ESPACIOS_PTP = {
+    'NOMBRE DEL SITIO': 'G7',
+    'Diametro de pierna superior': 'K9',
+    'Diametro de pierna Inferior': 'U9',
+    'NCRA RB': 'AC9',
+    'Franja2RB': 'AM9',
+    'Altura de la Torre': 'K10',
+    'Dado': 'U10',
+    'Altura Edificio1': 'AE10',
+    'Nivel inferior de franja disponible': 'T11',
+    'Nivel superior de franja disponible': 'AK11',
+    'Altura de MW conforme a topologia': 'B14',
+    'Azimut RB': 'M14',
+    'Propuesta de altura de antena de MW1': 'AB14',
+    'Propuesta de altura de antena de MW (SD)1': 'AJ14',
+    'Altura de soporte para OMB propuesto': 'O19',
+    'Longitud del cable de tierra nuevo OMB': 'O20',
+    'Longitud del cable de tierra ODU': 'O21',
+    'Longitud de cable IF': 'O22',
+    'Tipo de soporte para antena MW propuesto': 'O23',
+    'Longitud de cable ACDB-Nuevo OMB': 'O24',
+    'Longitud de cable RTN - Router': 'O25',
+    'Longitud de cable RTN - BBU SITE 1': 'O26',
+    'MEDICION DE BARRA DE TIERRA (Ohms)': 'O28',
+    'Nombre del sitio 2': 'G31',
+    'Diámetro de Pierna superio2': 'K33',
+    'Diámetro de Pierna inferior2': 'U33',
+    'NCRA2': 'AC33',
+    'Franja2-2': 'AM33',
+    'Altura torre 2': 'K34',
+    'DADO 2': 'U34',
+    'Altura edificio 2': 'AE34',
+    'Nivel inferior de franja disponible 2': 'T35',
+    'Nivel superior de franja disponible 2': 'AK35',
+    'Altura de MW conforme a topologia 2': 'B38',
+    'Azimut 2': 'M38',
+    'Propuesta de altura de antena de MW2': 'AB38',
+    'Propuesta de altura de antena de MW (SD)2': 'AJ38',
+    'Altura de soporte para OMB propuesto2': 'O43',
+    'Longitud del cable de tierra nuevo OMB 2': 'O44',
+    'Longitud del cable de tierra ODU 2': 'O45',
+    'Longitud de cable IF 2': 'O46',
+    'Tipo de soporte para antena MW propuesto 2': 'O47',
+    'Longitud de cable ACDB-Nuevo OMB 2': 'O48',
+    'Longitud de cable RTN - Router 2': 'O49',
+    'Longitud de cable RTN - BBU 2': 'O50',
+    'Medición del Sistema de Tierras 2': 'O52',
+}
+
+CHECKBOXES_PROPIETARIO = {
+    'telesite': 'K34', 'ctwr': 'P34', 'mtp': 'V34', 'intelesites': 'Z34', 'even': 'AE34',
+    'atc': 'A35', 'temm': 'F35', 'renta tower': 'K35', 'torrecom': 'P35', 'uniti': 'V35',
+    'tower one': 'A36', 'iimt': 'F36', 'servicom': 'K36',
+    'canadian tower': 'A37', 'mx tower': 'F37', 'cfe': 'K37',
+}
+
+CHECKBOXES_TIPO_ACCESO = {
+    'llave': 'B47',
+    'permiso/memorandum': 'H47',
+    'candado de combinación': 'R47',
+    'tarjeta electrónica': 'B48',
+    'otro': 'J48',
+}
+
+CHECKBOXES_MOTIVO_SIN_VISTA = {
+    'arboles': 'Q57',
+    'espectacular': 'V57',
+    'edificio': 'AC57',
+    'montaña': 'AI57',
+    'n/a': 'C58',
+}
+
+def _si_no(celda_si: str, celda_no: str) -> Dict[str, str]:
+    return {'si': celda_si, 'no': celda_no}
+
+
+SITE_SURVEY_PTP = [
+    Hoja(HOJA_CARATULA, [
+        Texto('A43', '{nombre_a} - {nombre_b}'),
+        Mapeo({
+            'Margen de desvanecimiento': 'B45',
+            'Disponibilidad anual (%)': 'F45',
+            'Tamaño de la antena (m)': 'J45',
+            'Potencia de Transmisión (dBm)': 'N45',
+            'Potencia de Recepción (dBm)': 'R45',
+            'Banda': 'V45',
+            'Frecuencia (MHz)': 'Z45',
+            '#1 Canal ID S1': 'B47',
+            '#1 Frecuencia de Diseño S1': 'F47',
+            '#2 Frecuencia de Diseño S1': 'J47',
+            '#1 Canal ID S2': 'N47',
+            '#1 Frecuencia de Diseño S2': 'R47',
+            '#2 Frecuencia de Diseño S2': 'V47',
+            'Ancho de Banda (MHz)': 'Z47',
+        }),
+    ]),
+    Sitios(HOJA_INFO_A, HOJA_INFO_B, [
+        Casillas(('Tipo de Zona', 'Tipo de Zona 2'), CHECKBOXES_TIPO_ZONA),
+        Casillas(('El sitio es visible de día y de noche (libre de maleza y arboles):',
+                  'El sitio es visible de día y de noche (libre de maleza y arboles): 2'), CHECKBOXES_VISIBILIDAD),
+        Casillas(('Tipo de Camino', 'Tipo de Camino 2'), CHECKBOXES_TIPO_CAMINO),
+        Casillas(('En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción.',
+                  'En caso de requerirse grúa, identifique si es factible el uso de la misma y que no se tenga una posible obstrucción2.'),
+                 {'izaje libre': 'B61', 'izaje con obstaculos': 'J61', 'requiere visita del especialista': 'S61'}),
+        Casillas(('Propietario_Administrador', 'Propietario_Administrador B'), CHECKBOXES_PROPIETARIO),
+        Casillas(('Tipo de sitio', 'Tipo de sitio B'),
+                 {'terreno greenfield': 'D39', 'sobre suelo rawland': 'M39', 'sobre azotea': 'U39'}),
+        Casillas(('Riesgo', 'Riesgo B'), {
+            'delito común robo a transeúntes': 'Y40',
+            'inconformidad vecinal con bloqueo': 'P41',
+            'delincuencia organizada': 'AA41',
+        }),
+        Casillas(('Considera accesible el sitio de día y de noche?', 'Considera accesible el sitio de día y de noche? B'),
+                 {'solo de día': 'S43', 'solo de noche': 'W43', 'sin problema de hora': 'AB43'}),
+        Casillas(('El sitio se encuentra construido en zona segura (De NO derrumbes):',
+                  'El sitio se encuentra construido en zona segura (De NO derrumbes) B:'), _si_no('S44', 'W44')),
+        Casillas(('Horario Controlado', 'Horario Controlado B'), _si_no('B50', 'F50')),
+        Casillas(('TIPO DE ACCESO A SITIO', 'TIPO DE ACCESO A SITIO B'), CHECKBOXES_TIPO_ACCESO),
+        Cuando(('TIPO DE ACCESO A SITIO', 'TIPO DE ACCESO A SITIO B'), ['candado de combinación'], entonces=[
+            Campo(('Candado de Combinación', 'Candado de Combinación B'), 'AF47', defecto=''),
+            Fijo('Q48', 'N/A'),
+        ], si_no=[
+            Cuando(('TIPO DE ACCESO A SITIO', 'TIPO DE ACCESO A SITIO B'),
+                   ['llave', 'permiso/memorandum', 'tarjeta electrónica'], entonces=[
+                Campo(('Dónde recoger llave/permiso/tarjeta', 'Dónde recoger llave/permiso/tarjeta B'), 'Q49', defecto=''),
+            ]),
+        ]),
+        Casillas(('Forma de ingresar el equipo al sitio es con:', 'Forma de ingresar el equipo al sitio es con: B'),
+                 {'maniobra': 'U55', 'izaje con garrucha': 'AA55', 'izaje con grúa': 'AG55'}),
+        Casillas(('Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales:',
+                  'Para instalación de grúa, considera necesario que se requiera tramitar permiso con las autoridades locales: B'),
+                 {'requiere grúa': 'AB67', 'no aplica grúa': 'AG67'}),
+        Casillas(('Requiere Grua (Si / No)', 'Requiere Grua (Si / No) B'), _si_no('AC66', 'AF66')),
+        Casillas(('Para la llegada al sitio con el equipo a instalar, se requiere de:',
+                  'Para la llegada al sitio con el equipo a instalar, se requiere de: B'),
+                 {'pickup': 'B72', 'pickup 4x4': 'G72', 'animales de carga': 'M72'}, comparar='primero'),
+        Casillas(('Existe cerca del sitio alguna comandancia de policía o del ejercito?',
+                  'Existe cerca del sitio alguna comandancia de policía o del ejercito? B'), _si_no('AB105', 'AE105')),
+        Cuando(('Existe cerca del sitio alguna comandancia de policía o del ejercito?',
+                'Existe cerca del sitio alguna comandancia de policía o del ejercito? B'), ['si'], entonces=[
+            Campo(('Si la respuesta anterior es si, Indique a que distancia policia',
+                   'Si la respuesta anterior es si, Indique a que distancia policia B'), 'U106'),
+            Campo(('Se cuenta con algún número de teléfono?, indíquelo',
+                   'Se cuenta con algún numero de teléfono?, indíquelo: B'), 'U107', reemplazar_vacio=True),
+        ], si_no=[Fijo('U106', 'N/A'), Fijo('U107', 'N/A')]),
+        Casillas(('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.',
+                  'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B'), _si_no('AB108', 'AE108')),
+        Cuando(('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.',
+                'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B'), ['si'], entonces=[
+            Campo(('Si la respuesta anterior es si, Indique a que distancia cruz',
+                   'Si la respuesta anterior es si, Indique a que distancia cruz B'), 'U109'),
+            Campo(('Se cuenta con algún numero de teléfono?, indíquelo: cruz',
+                   'Se cuenta con algún numero de teléfono?, indíquelo: cruz B'), 'U110', reemplazar_vacio=True),
+        ], si_no=[Fijo('U109', 'N/A'), Fijo('U110', 'N/A')]),
+        Casillas(('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:',
+                  'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B'),
+                 {'bajo': 'Y111', 'medio': 'AB111', 'alto': 'AE111'}),
+    ]),
+    Hoja(HOJA_INFO_A, [
+        Casillas('Alimentacion compatible con el equipamiento', _si_no('Y25', 'AB25')),
+        Casillas('Barra de Tierra', _si_no('O27', 'R27')),
+        Casillas('Tipo de solución', {'piso': 'O29', 'torre': 'R29'}),
+        Mapeo({
+            'LATITUD (TORRE)': 'B15',
+            'LONGITUD (TORRE)': 'F15',
+            'Altitud (msnm)': 'J15',
+            'Nombre de contacto en sitio': 'B17',
+            'Telefono': 'F17',
+            'Calle': 'B19',
+            'Colonia': 'F19',
+            'Municipio': 'J19',
+            'C.P': 'N19',
+        }),
+        Mapeo(CAMPOS_INFO_A, na=True),
+    ]),
+    Hoja(HOJA_INFO_B, [Mapeo(CAMPOS_INFO_B, na=True)]),
+    Hoja(HOJA_ESPACIOS, [
+        Campo('Nivel superior de franja disponible 2', 'K35'),
+        Mapeo(CAMPOS_ESPACIOS_PTP, na=True),
+        Casillas('SISTEMA ELECTRICO', {'monofásica': 'AG21', 'bifásica': 'AL21'}),
+        Casillas('Cara de preparación para cableado vertical en torre', {'a': 'Y16', 'b': 'AC16', 'c': 'AE16', 'd': 'AN16'}),
+        # Sitio B: respuestas de opción única
+        Casillas('Tipo de Torre2', {
+            'autosoportada': 'G32', 'arriostrada': 'O32', 'monopolo': 'V32', 'minipolo': 'AB32', 'otro': 'AG32'
+        }, comparar='igual'),
+        Casillas('¿Espacio disponible de conexión?2', _si_no('U38', 'Y38'), comparar='igual'),
+        Casillas('Cara de preparación para cableado vertical en torre 2',
+                 {'a': 'Y40', 'b': 'AD40', 'c': 'AI40', 'd': 'AN40'}, comparar='igual'),
+        Casillas('Existe Barra de Tierras 2', _si_no('O51', 'R51'), comparar='igual'),
+        Casillas('Tipo de solucion 2', {'piso': 'O53', 'torre': 'R53'}, comparar='igual'),
+        Casillas('Existe algun breaker existente en sitio 2', _si_no('Y45', 'AB45'), comparar='igual'),
+        Casillas('SISTEMA ELECTRICO 2', {'monofásica': 'AG45', 'bifásica': 'AL45'}),
+        Casillas('Alimentacion compatible con el equipamiento 2', _si_no('Y49', 'AB49'), comparar='igual'),
+        Casillas('¿Espacio disponible de conexión? 2', _si_no('AH49', 'AK49'), comparar='igual'),
+        Casillas('Linea de vista', _si_no('R56', 'V56'), comparar='igual'),
+        Cuando('Linea de vista', ['no'], comparar='igual', entonces=[
+            Casillas('Motivo', CHECKBOXES_MOTIVO_SIN_VISTA, comparar='igual'),
+        ], si_no=[Fijo(celda, False) for celda in CHECKBOXES_MOTIVO_SIN_VISTA.values()]),
+    ]),
+    Sitios(HOJA_PLANOS_A, HOJA_PLANOS_B, [Mapeo({
+        'PLANOS': 'B15',
+        ('Tipo de Torre', 'Tipo de Torre2'): 'F15',
+        ('Altura de la Torre', 'Altura torre 2'): 'J15',
+        ('Dado', 'DADO 2'): 'N15',
+        ('PROPIETARIO', 'PROPIETARIO 2'): 'R15',
+        ('TIPO DE SITIO', 'TIPO DE SITIO 2'): 'V15',
+        ('Como o donde obtener permisos/llave/tarjeta', 'Como o donde obtener permisos/llave/tarjeta B'): 'B20',
+        ('Contacto solicitud de accesos', 'Contacto solicitud de accesos B'): 'F20',
+        ('Horario de solicitud de accesos', 'Horario de solicitud de accesos B'): 'J20',
+        ('Requiere Grua (Si / No)', 'Requiere Grua (Si / No) B'): 'B25',
+        ('Para la llegada al sitio con el equipo a instalar, se requiere de:',
+         'Para la llegada al sitio con el equipo a instalar, se requiere de: B'): 'F25',
+        ('Si la respuesta anterior es si, Indique a que distancia',
+         'Si la respuesta anterior es si, Indique a que distancia B'): 'J25',
+        ('Existe cerca del sitio alguna comandancia de policía o del ejercito?',
+         'Existe cerca del sitio alguna comandancia de policía o del ejercito? B'): 'B30',
+        ('Si la respuesta anterior es si, Indique a que distancia policia',
+         'Si la respuesta anterior es si, Indique a que distancia policia B'): 'F30',
+        ('Se cuenta con algún numero de teléfono?, indíquelo:',
+         'Se cuenta con algún numero de teléfono?, indíquelo: B'): 'J30',
+        ('Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio.',
+         'Existe Cruz Roja, Hospital u otro tipo de asistencia medica cerca del sitio. B'): 'B35',
+        ('Si la respuesta anterior es si, Indique a que distancia cruz',
+         'Si la respuesta anterior es si, Indique a que distancia cruz B'): 'F35',
+        ('Se cuenta con algún numero de teléfono?, indíquelo: cruz',
+         'Se cuenta con algún numero de teléfono?, indíquelo: cruz B'): 'J35',
+        ('Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio:',
+         'Según el Mapa Nacional de Riesgos, indique en que zona se ubica el sitio: B'): 'B40',
+    })]),
+    Hoja(HOJA_FOTOS_A, [Mapeo({
+        'NOMBRE DEL SITIO': 'B15',
+        'ID': 'F15',
+        'ESTADO': 'J15',
+        'CLUSTER': 'N15',
+        'Fecha Site Survey': 'R15',
+        'Linea de vista': 'B25',
+        'Motivo': 'F25',
+        'Nombres Enlaces': 'B30',
+        'Fecha Inicio Site Survey': 'F30',
+        'Fecha final Site Survey': 'J30',
+    })]),
+    Hoja(HOJA_FOTOS_B, [Mapeo({
+        'Nombre del sitio 2': 'B15',
+        'ID 2': 'F15',
+        'ESTADO 2': 'J15',
+        'CLUSTER': 'N15',
+        'Fecha Inicio Site Survey B': ['R15', 'F25'],
+        'Linea de vista': 'B25',
+        'Nombres Enlaces': 'B30',
+        'Fecha final Site Survey B': 'J30',
+    })]),
+]
+
+# Plan compilado al importar: cada llenado solo lo evalúa
+PLAN_SITE_SURVEY_PTP = compilar(SITE_SURVEY_PTP)
+
+# Solo los campos de texto de las hojas 1-3, para el llenado por Excel de
+# redirigir_tipo_llenado (las casillas de ese flujo se escriben aparte)
+PLAN_DATOS_SITE_SURVEY_PTP = compilar([
+    Hoja(HOJA_INFO_A, [Mapeo(CAMPOS_INFO_A, na=True)]),
+    Hoja(HOJA_INFO_B, [Mapeo(CAMPOS_INFO_B, na=True)]),
+    Hoja(HOJA_ESPACIOS, [Mapeo(CAMPOS_ESPACIOS_PTP, na=True)]),
+])
+
+
+# ===== SITE SURVEY PTMP =====
+
+HOJA_SECTOR = '1. Información General SECTOR'
+HOJA_CPE = '2. Información General CPE'
+
+CAMPOS_SECTOR_PTMP = {
+    'Fecha Inicio Site Survey': 'C9',
+    'Fecha final Site Survey': 'I9',
+    'NOMBRE DEL SITIO': 'C10',
+    'PROPIETARIO': 'E11',
+    'ID': 'I10',
+    'ESTADO': 'I16',
+    'Calle': 'B15',
+    'Colonia': 'B16',
+    'Municipio': 'B17',
+    'C.P': 'I15',
+    'Referencias': 'C18',
+    'Nombre de contacto en sitio': 'C20',
+    'Telefono': 'H20',
+    'LATITUD (TORRE)': 'D31',
+    'LONGITUD (TORRE)': 'H31',
+    'LATITUD (FACHADA)': 'D28',
+    'LONGITUD (FACHADA)': 'H28',
+    'Altitud (msnm)': 'E33',
+    'Horario de solicitud de accesos': 'C53',
+    'Contacto solicitud de accesos': 'B55',
+    'Como o donde obtener permisos/llave/tarjeta': 'O49',
+    'Comentario:Forma de ingresar el equipo al sitio es con:': 'B57',
+    COMENTARIO_GRUA: 'B63',
+    'Si la respuesta anterior es si, Indique a que distancia': 'H83',
+}
+
+CAMPOS_CPE_PTMP = {
+    'Fecha Inicio Site Survey B': 'C9',
+    'Fecha final Site Survey B': 'I9',
+    'Nombre del sitio 2': 'C10',
+    'ID 2': 'I10',
+    'ESTADO 2': 'I16',
+    'Calle 2': 'B15',
+    'Colonia 2': 'B16',
+    'Municipio 2': 'B17',
+    'C.P 2': 'I15',
+    'Referencias 2': 'C18',
+    'Nombre de contacto en sitio 2': 'C20',
+    'Telefono 2': 'H20',
+    'LATITUD (TORRE) 2': 'D31',
+    'LONGITUD (TORRE) 2': 'H31',
+    'LATITUD (FACHADA) 2': 'D28',
+    'LONGITUD (FACHADA) 2': 'H28',
+    'Altitud (msnm) 2': 'E33',
+    'Horario de solicitud de accesos B': 'C53',
+    'Contacto solicitud de accesos B': 'B55',
+    'Como o donde obtener permisos/llave/tarjeta B': 'C49',
+    'Comentario:Forma de ingresar el equipo al sitio es con: B': 'B57',
+    COMENTARIO_GRUA: 'B63',
+    'Si la respuesta anterior es si, Indique a que distancia B': 'H83',
+}
+
+# Misma hoja 3 que PtP; en la plantilla PtMP la altura del edificio A va en EA10
+CAMPOS_ESPACIOS_PTMP = {**CAMPOS_ESPACIOS_PTP, 'Altura Edificio1': 'EA10'}
+
+PLAN_DATOS_SITE_SURVEY_PTMP = compilar([
+    Hoja(HOJA_SECTOR, [Mapeo(CAMPOS_SECTOR_PTMP, na=True)]),
+    Hoja(HOJA_CPE, [Mapeo(CAMPOS_CPE_PTMP, na=True)]),
+    Hoja(HOJA_ESPACIOS, [Mapeo(CAMPOS_ESPACIOS_PTMP, na=True)]),
+])
+
+# Casillas de las hojas SECTOR y CPE (mismas celdas que el llenado por Excel de
+# redirigir_tipo_llenado); la plantilla PtMP no tiene las hojas de acceso,
+# grúa y servicios cercanos del PtP
+SITE_SURVEY_PTMP = [
+    Hoja(HOJA_CARATULA, [Texto('A37', '{nombre_a} - {nombre_b}')]),
+    Hoja(HOJA_SECTOR, [
+        Casillas('Tipo de Zona', {'urbana': 'C22', 'suburbana': 'D21', 'rural': 'E21', 'ejidal': 'F21',
+                                  'pueblo mágico': 'H22'}),
+        Casillas('El sitio es visible de día y de noche (libre de maleza y arboles):', _si_no('E23', 'G21')),
+        Casillas('Tipo de Camino', {'terracería': 'B25', 'pavimentado': 'D25', 'empedrado': 'F25', 'mixto': 'H25'}),
+        Casillas('Propietario_Administrador', {
+            'telesite': 'A34', 'ctwr': 'D36', 'mtp': 'E34', 'intelesites': 'G36', 'even': 'H34',
+            'atc': 'A37', 'temm': 'B38', 'renta tower': 'C38', 'torrecom': 'E38', 'uniti': 'F38',
+            'tower one': 'A40', 'iimt': 'B40', 'servicom': 'C40',
+            'canadian tower': 'A42', 'mx tower': 'B42', 'cfe': 'C42',
+        }),
+        Casillas('Tipo de sitio', {'terreno greenfield': 'A45', 'sobre suelo rawland': 'C45', 'sobre azotea': 'E45'}),
+        Casillas('Riesgo', {
+            'delito común robo a transeúntes': 'F46',
+            'inconformidad vecinal con bloqueo': 'C46',
+            'delincuencia organizada': 'G47',
+        }),
+        Casillas('Considera accesible el sitio de día y de noche?',
+                 {'solo de día': 'C48', 'solo de noche': 'D48', 'sin problema de hora': 'F47'}),
+        Casillas('El sitio se encuentra construido en zona segura (De NO derrumbes):', _si_no('G50', 'H50')),
+        # 'Horario Controlado' (B55) lo sobrescribe 'Contacto solicitud de accesos'
+        Mapeo(CAMPOS_SECTOR_PTMP, na=True),
+    ]),
+    Hoja(HOJA_CPE, [
+        Casillas('Tipo de Zona 2', {'urbana': 'C22', 'suburbana': 'D21', 'rural': 'F21', 'ejidal': 'G21',
+                                    'pueblo mágico': 'H21'}),
+        Casillas('El sitio es visible de día y de noche (libre de maleza y arboles): 2', _si_no('E23', 'F20')),
+        Casillas('Tipo de Camino 2', {'terracería': 'B25', 'pavimentado': 'D25', 'empedrado': 'F25', 'mixto': 'H25'}),
+        Casillas('Propietario_Administrador B', {
+            'banbien': 'B37', 'sepomex': 'C37', 'cac cfe': 'D37', 'telecom': 'E37', 'ubbj': 'F37',
+            'sedena': 'F38', 'cuartel guardia nacional': 'G38',
+            'unidad medico rural': 'A39', 'hospital rural': 'B39', 'centro de salud': 'C39',
+            'unidad medico familiar': 'A41', 'telesecundaria': 'B41',
+        }),
+        Casillas('Tipo de sitio B', {'terreno greenfield': 'A44', 'sobre suelo rawland': 'C44', 'sobre azotea': 'E44'}),
+        Casillas('Riesgo B', {
+            'delito común robo a transeúntes': 'F45',
+            'inconformidad vecinal con bloqueo': 'C45',
+            'delincuencia organizada': 'G46',
+        }),
+        Casillas('Considera accesible el sitio de día y de noche? B',
+                 {'solo de día': 'C47', 'solo de noche': 'D47', 'sin problema de hora': 'F48'}),
+        Casillas('El sitio se encuentra construido en zona segura (De NO derrumbes) B:', _si_no('G49', 'H49')),
+        Casillas('Horario Controlado B', {'si': 'B54'}),
+        Mapeo(CAMPOS_CPE_PTMP, na=True),
+    ]),
+    Hoja(HOJA_ESPACIOS, [Mapeo(CAMPOS_ESPACIOS_PTMP, na=True)]),
+]
+
+PLAN_SITE_SURVEY_PTMP = compilar(SITE_SURVEY_PTMP)
+
+
+# ===== DISEÑO DE SOLUCIÓN (llenadoauto.xlsx) =====
+
+HOJA_DISENO_ELECTRICAS = '2. Electricas - Diseño log- Fis'
+HOJA_DISENO_ESTUDIO_A = '4. Estudio de informacion A'
+HOJA_DISENO_ESTUDIO_B = '5. Estudio de informacion B'
+
+CAMPOS_ELECTRICAS_DISENO = {
+    'Nombres Enlaces': 'B9',
+    'Configuración MW:': ['D9', 'B14', 'C28', 'F28'],
+    'Tamaño de la antena (m)': ['C27', 'F27'],
+    'Potencia de Transmisión (dBm)': ['C29', 'F29'],
+    'Frecuencia (MHz)': ['C32', 'F32'],
+    'Nombre del sitio A': 'C33',
+    'Nombre del sitio B': 'F33',
+    'ID del sitio A': 'C44',
+    'ID del sitio B': 'F44',
+    'Potencia de Recepción (dBm)': ['C30', 'F30'],
+    'Banda': ['C31', 'F31'],
+    'NOMBRE DEL SITIO': 'C33',
+    'Nombre del sitio 2': 'F33',
+    'ID': 'C34',
+    'ID 2': 'F34',
+    'consumo de potencia': 'F9',
+}
+
+CAMPOS_ESTUDIO_A_DISENO = {
+    'NOMBRE DEL SITIO': ['K8', 'H33'],
+    'PROPIETARIO': 'N9',
+    'ESTADO': 'AD14',
+    'Calle': 'E13',
+    'Colonia': 'E14',
+    'Municipio': 'F15',
+    'C.P': 'AD13',
+    'Referencias': 'K16',
+    'Nombre de contacto en sitio': 'I18',
+    'Telefono': 'AC18',
+    'Tipo de Zona': 'E16',
+    'Tipo de Camino': 'E17',
+    'LATITUD (TORRE)': 'L29',
+    'LONGITUD (TORRE)': 'AB29',
+    'LATITUD (FACHADA)': 'L26',
+    'LONGITUD (FACHADA)': 'AB26',
+    'Altitud (msnm)': 'N30',
+    'Diametro de pierna superior': 'L35',
+    'Diametro de pierna Inferior': 'V35',
+    'NCRA RB': 'AC35',
+    'Franja2RB': 'AI35',
+    'Altura de la Torre': 'L36',
+    'Dado': 'V36',
+    'Altura Edificio1': 'AF36',
+    'Nivel inferior de franja disponible': 'U37',
+    'Nivel superior de franja disponible': 'AI37',
+    'Altura de MW conforme a topologia': 'C40',
+    'Azimut RB': 'N40',
+    'Propuesta de altura de antena de MW1': 'AC40',
+    'Propuesta de altura de antena de MW (SD)1': 'AH40',
+    'Altura de soporte para OMB propuesto': 'P45',
+    'Longitud del cable de tierra nuevo OMB': 'P46',
+    'Longitud del cable de tierra ODU': 'P47',
+    'Longitud de cable IF': 'P48',
+    'Tipo de soporte para antena MW propuesto': 'P49',
+    'Longitud de cable ACDB-Nuevo OMB': 'P50',
+    'Longitud de cable RTN - Router': 'P51',
+    'Longitud de cable RTN - BBU SITE 1': 'P52',
+    'MEDICION DE BARRA DE TIERRA (Ohms)': 'P54',
+    'Nombre del sitio 2': 'H57',
+    'Diámetro de Pierna superio2': 'L59',
+    'Diámetro de Pierna inferior2': 'V59',
+    'NCRA2': 'AC59',
+    'Franja2-2': 'AI59',
+    'Altura torre 2': 'L60',
+    'DADO 2': 'V60',
+    'Altura edificio 2': 'AF60',
+    'Nivel inferior de franja disponible 2': 'U61',
+    'Nivel superior de franja disponible 2': 'AI61',
+    'Altura de MW conforme a topologia 2': 'C64',
+    'Azimut 2': 'N64',
+    'Propuesta de altura de antena de MW2': 'AC64',
+    'Propuesta de altura de antena de MW (SD)2': 'AH64',
+    'Altura de soporte para OMB propuesto2': 'P69',
+    'Longitud del cable de tierra nuevo OMB 2': 'P70',
+    'Longitud del cable de tierra ODU 2': 'P71',
+    'Longitud de cable IF 2': 'P72',
+    'Tipo de soporte para antena MW propuesto 2': 'P73',
+    'Longitud de cable ACDB-Nuevo OMB 2': 'P74',
+    'Longitud de cable RTN - Router 2': 'P75',
+    'Longitud de cable RTN - BBU 2': 'P76',
+    'Medición del Sistema de Tierras 2': 'P78',
+    'Nombre del sitio A': ['M117', 'M139'],
+    'Nombre del sitio B': ['M162', 'M184'],
+}
+
+CAMPOS_ESTUDIO_B_DISENO = {
+    'Nombre del sitio 2': 'K8',
+    'ID 2': 'AG8',
+    'PROPIETARIO 2': 'N9',
+    'ESTADO 2': 'AD14',
+    'Calle 2': 'E13',
+    'Colonia 2': 'E14',
+    'Municipio 2': 'F15',
+    'C.P 2': 'AD13',
+    'Referencias 2': 'K16',
+    'Nombre de contacto en sitio 2': 'I18',
+    'Telefono 2': 'AC18',
+    'LATITUD (TORRE) 2': 'L29',
+    'LONGITUD (TORRE) 2': 'AB29',
+    'LATITUD (FACHADA) 2': 'L26',
+    'LONGITUD (FACHADA) 2': 'AB26',
+    'Altitud (msnm) 2': 'N30',
+}
+
+# Un plan por hoja: _procesar_en_espacio lee AD14 de la hoja A y copia celdas
+# a factibilidad entre una escritura y otra
+PLAN_DISENO_ELECTRICAS = compilar([Hoja(HOJA_DISENO_ELECTRICAS, [Mapeo(CAMPOS_ELECTRICAS_DISENO, na=True)])])
+PLAN_DISENO_ESTUDIO_A = compilar([Hoja(HOJA_DISENO_ESTUDIO_A, [Mapeo(CAMPOS_ESTUDIO_A_DISENO, na=True)])])
+PLAN_DISENO_ESTUDIO_B = compilar([Hoja(HOJA_DISENO_ESTUDIO_B, [Mapeo(CAMPOS_ESTUDIO_B_DISENO, na=True)])])
+
+
+def _congelar(celdas: Celdas) -> Celdas:
+    return celdas if isinstance(celdas, str) else tuple(celdas)
+
+
+@lru_cache(maxsize=256)
+def _plan_mapeo(nombre_hoja: str, campos: Tuple[Tuple[Columna, Celdas], ...], na: bool) -> Plan:
+    return compilar([Hoja(nombre_hoja, [Mapeo(dict(campos), na=na)])])
+
+
+def plan_mapeo(nombre_hoja: str, campos_celdas: Dict[Columna, Celdas], na: bool = True) -> Plan:
+    """
+    Plan de un mapeo campo -> celda(s) suelto (LlenadoParalelo, mapeos ad hoc)
+
+    Se compila una vez por (hoja, mapeo): llamadas repetidas con el mismo
+    mapeo reutilizan el plan.
+    """
+    campos = tuple((columna, _congelar(celdas)) for columna, celdas in campos_celdas.items())
+    return _plan_mapeo(nombre_hoja, campos, na)
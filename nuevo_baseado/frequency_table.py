@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tabla horizontal de frecuencia de la hoja "1. Analisis de Red y Frecuencia"
+Se escribe como celdas nativas con estilo (encabezado azul, valores azul
+claro) en lugar de renderizar un PNG con matplotlib en cada llenado. Si se
+pide la imagen, sale de una caché en disco indexada por los valores de la
+tabla. Los archivos de depuración (debug_tabla.csv/.xlsx) son opcionales.
+
+FANGIO_TABLA_FRECUENCIA = celdas | imagen   (celdas por defecto)
+FANGIO_DEBUG_TABLA = 1 para escribir debug_tabla.csv y debug_tabla.xlsx
+"""
+
+import os
+import json
+import hashlib
+import logging
+import textwrap
+from typing import List, Optional, Tuple
+
+from openpyxl.utils import coordinate_to_tuple, get_column_letter
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_TABLA_FRECUENCIA = [
+    "Tamaño de la antena (m)",
+    "Potencia de Transmisión (dBm)",
+    "Potencia de Recepción (dBm)",
+    "Banda",
+    "Frecuencia (MHz)",
+    "#1 Canal ID S1",
+    "#1 Frecuencia de Diseño S1",
+    "#2 Frecuencia de Diseño S1",
+    "#1 Canal ID S2",
+    "#1 Frecuencia de Diseño S2",
+    "#2 Frecuencia de Diseño S2",
+]
+
+# Rango que ocupaba la imagen; las celdas se acomodan en bandas de encabezado + valores
+RANGO_TABLA = 'A23:G28'
+CELDA_INICIO = 'A23'
+COLUMNAS_POR_BANDA = 6
+
+COLOR_ENCABEZADO = (0x00, 0x74, 0xD9)
+COLOR_VALORES = (0xD9, 0xEA, 0xF7)
+BLANCO = (0xFF, 0xFF, 0xFF)
+
+MODO_TABLA = os.environ.get('FANGIO_TABLA_FRECUENCIA', 'celdas').strip().lower()
+DEBUG_TABLA = os.environ.get('FANGIO_DEBUG_TABLA', '0') == '1'
+CACHE_IMAGENES_TABLA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Temp', 'tablas_frecuencia')
+
+# Alineación centrada de Excel (xlCenter)
+XL_CENTRO = -4108
+
+
+def valores_tabla(datos) -> List[Tuple[str, str]]:
+    """(encabezado, valor) de la tabla para una fila de la hoja"""
+    return [(campo, datos.get(campo, "")) for campo in CAMPOS_TABLA_FRECUENCIA]
+
+
+def escribir_tabla_celdas(ws, valores: List[Tuple[str, str]], inicio: str = CELDA_INICIO,
+                          columnas: int = COLUMNAS_POR_BANDA):
+    """
+    Escribe la tabla en la hoja como celdas con estilo
+
+    Cada banda ocupa dos filas (encabezados y valores) de hasta `columnas`
+    campos, para que la tabla quepa en el mismo rango que la imagen.
+    """
+    fila, columna = coordinate_to_tuple(inicio)
+    primera = get_column_letter(columna)
+    for i in range(0, len(valores), columnas):
+        banda = valores[i:i + columnas]
+        ultima = get_column_letter(columna + len(banda) - 1)
+        encabezados = ws.range(f"{primera}{fila}:{ultima}{fila}")
+        celdas_valores = ws.range(f"{primera}{fila + 1}:{ultima}{fila + 1}")
+        encabezados.value = [encabezado for encabezado, _ in banda]
+        celdas_valores.value = [valor for _, valor in banda]
+        encabezados.color = COLOR_ENCABEZADO
+        encabezados.font.color = BLANCO
+        encabezados.font.bold = True
+        celdas_valores.color = COLOR_VALORES
+        for rango in (encabezados, celdas_valores):
+            rango.api.HorizontalAlignment = XL_CENTRO
+            rango.api.VerticalAlignment = XL_CENTRO
+            rango.api.WrapText = True
+        fila += 2
+
+
+def _renderizar_png(valores: List[Tuple[str, str]], ruta: str):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    etiquetas = ['\n'.join(textwrap.wrap(str(campo), width=14, break_long_words=False)) for campo, _ in valores]
+    fig, ax = plt.subplots(figsize=(12, 2.2))
+    try:
+        ax.axis('off')
+        tabla = ax.table(cellText=[[valor for _, valor in valores]], colLabels=etiquetas,
+                         loc='center', cellLoc='center')
+        # Estilo: encabezado azul, fila datos azul clarito
+        for (fila, _), celda in tabla.get_celld().items():
+            if fila == 0:
+                celda.set_facecolor('#0074D9')
+                celda.set_text_props(color='white', weight='bold')
+            else:
+                celda.set_facecolor('#D9EAF7')
+                celda.set_text_props(color='black')
+        tabla.auto_set_font_size(False)
+        tabla.set_fontsize(10)
+        tabla.scale(1.5, 2.8)
+        temporal = f"{ruta}.{os.getpid()}.tmp.png"
+        fig.savefig(temporal, bbox_inches='tight', pad_inches=0, dpi=200)
+        os.replace(temporal, ruta)
+    finally:
+        plt.close(fig)
+
+
+def imagen_tabla(valores: List[Tuple[str, str]], directorio: str = CACHE_IMAGENES_TABLA) -> str:
+    """PNG de la tabla; se renderiza solo la primera vez que aparecen esos valores"""
+    clave = hashlib.sha256(json.dumps(valores, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+    ruta = os.path.join(directorio, f"{clave}.png")
+    if not os.path.exists(ruta):
+        os.makedirs(directorio, exist_ok=True)
+        _renderizar_png(valores, ruta)
+    return ruta
+
+
+def insertar_tabla_frecuencia(ws, datos, directorio_depuracion: Optional[str] = None, modo: str = MODO_TABLA):
+    """Escribe la tabla de frecuencia de la fila en la hoja (celdas o imagen cacheada)"""
+    valores = valores_tabla(datos)
+    if modo == 'imagen':
+        rango = ws.range(RANGO_TABLA)
+        ws.pictures.add(imagen_tabla(valores), left=rango.left, top=rango.top,
+                        width=rango.width, height=rango.height)
+    else:
+        escribir_tabla_celdas(ws, valores)
+    if DEBUG_TABLA and directorio_depuracion:
+        guardar_depuracion(valores, directorio_depuracion)
+
+
+def guardar_depuracion(valores: List[Tuple[str, str]], directorio: str):
+    """debug_tabla.csv y debug_tabla.xlsx (solo con FANGIO_DEBUG_TABLA=1)"""
+    import pandas as pd
+
+    df_tabla = pd.DataFrame([dict(valores)])
+    df_tabla.to_csv(os.path.join(directorio, "debug_tabla.csv"), index=False)
+    try:
+        df_tabla.to_excel(os.path.join(directorio, "debug_tabla.xlsx"), index=False)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo guardar debug_tabla.xlsx: {e}")
+    logger.info("🐞 Tabla horizontal guardada en debug_tabla.csv y debug_tabla.xlsx")
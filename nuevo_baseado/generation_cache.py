@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Caché de libros generados, direccionada por contenido
+La clave combina la huella de la plantilla, la fila normalizada, los archivos
+adjuntos (imágenes, KMZ, Word...) y la versión del motor de llenado. Si nada
+cambió, regenerar el mismo ID regresa el artefacto guardado sin abrir la
+plantilla. Los artefactos viven en disco con desalojo LRU acotado por bytes.
+
+FANGIO_CACHE_GENERACIONES_MB = presupuesto en disco (0 = desactivada)
+FANGIO_CACHE_GENERACIONES_DIR = carpeta de los artefactos
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Subir cuando cambie cualquier llenado (plan, celdas, inserción de imágenes)
+VERSION_GENERACION = '1'
+
+EXTENSION = '.xlsx'
+BLOQUE_HASH = 1024 * 1024
+
+
+def _valor_plano(valor):
+    """Valor de la fila comparable entre snapshots (NaN/NA -> None)"""
+    if valor is None or (pd.api.types.is_scalar(valor) and pd.isna(valor)):
+        return None
+    return str(valor)
+
+
+def huella_fila(datos) -> str:
+    """
+    sha256 de una fila de la hoja (Series o dict)
+
+    Las columnas derivadas (__norm) se omiten: salen de las demás.
+    """
+    items = datos.items() if hasattr(datos, 'items') else dict(datos).items()
+    pares = [(str(col), _valor_plano(val)) for col, val in items if not str(col).endswith('__norm')]
+    return hashlib.sha256(json.dumps(pares, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def huella_archivos(archivos) -> str:
+    """
+    sha256 de los archivos subidos (MultiDict de FileStorage)
+
+    Cada archivo aporta campo, nombre y el sha256 de su contenido. Si la
+    subida llegó con PeticionStreaming el hash ya se calculó al recibirla y
+    no se vuelve a leer; si no, el stream se rebobina antes y después de
+    leerlo, así que se puede llamar antes o después de guardar los archivos.
+    """
+    h = hashlib.sha256()
+    for campo in sorted(archivos.keys()):
+        for archivo in archivos.getlist(campo):
+            if not archivo or not archivo.filename:
+                continue
+            h.update(f'{campo}\x1f{archivo.filename}\x1f'.encode('utf-8'))
+            stream = archivo.stream
+            if hasattr(stream, 'metadatos'):
+                sha = stream.metadatos()['sha256']
+            else:
+                contenido = hashlib.sha256()
+                stream.seek(0)
+                for bloque in iter(lambda: stream.read(BLOQUE_HASH), b''):
+                    contenido.update(bloque)
+                stream.seek(0)
+                sha = contenido.hexdigest()
+            h.update(sha.encode('ascii'))
+            h.update(b'\x1e')
+    return h.hexdigest()
+
+
+def clave_generacion(*partes) -> str:
+    """Clave de caché a partir de sus componentes (huellas, tipo, versión)"""
+    return hashlib.sha256('\x1f'.join(str(p) for p in partes).encode('utf-8')).hexdigest()
+
+
+class CacheGeneraciones:
+    """
+    Artefactos generados en disco, indexados por clave, con desalojo LRU
+
+    El índice se reconstruye de la carpeta al arrancar (orden por mtime) y
+    un acierto actualiza el mtime, así que el orden LRU sobrevive reinicios.
+    Varios workers pueden compartir la carpeta: un artefacto guardado por
+    otro proceso se reconoce al buscarlo y uno desalojado por otro se
+    trata como fallo.
+    """
+
+    def __init__(self, directorio: str, max_bytes: int):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas: 'OrderedDict[str, int]' = OrderedDict()  # clave -> bytes
+        self._bytes = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.guardados = 0
+        self.desalojos = 0
+        if self.activa:
+            os.makedirs(directorio, exist_ok=True)
+            self._cargar_indice()
+
+    @property
+    def activa(self) -> bool:
+        return self.max_bytes > 0
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave + EXTENSION)
+
+    def _cargar_indice(self):
+        encontrados = []
+        for nombre in os.listdir(self.directorio):
+            if not nombre.endswith(EXTENSION):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directorio, nombre))
+            except OSError:
+                continue
+            encontrados.append((st.st_mtime, nombre[:-len(EXTENSION)], st.st_size))
+        for _, clave, tamano in sorted(encontrados):
+            self._entradas[clave] = tamano
+            self._bytes += tamano
+        self._desalojar()
+        if self._entradas:
+            logger.info(f"🗃️ Caché de generaciones: {len(self._entradas)} artefactos, {self._bytes / 1024 / 1024:.1f}MB")
+
+    def _quitar(self, clave: str):
+        self._bytes -= self._entradas.pop(clave, 0)
+
+    def _desalojar(self):
+        while self._bytes > self.max_bytes and self._entradas:
+            clave, _ = next(iter(self._entradas.items()))
+            self._quitar(clave)
+            self.desalojos += 1
+            try:
+                os.remove(self._ruta(clave))
+            except OSError:
+                # Ya lo borró otro worker, o Windows lo tiene abierto en una descarga
+                pass
+
+    def obtener(self, clave: str) -> Optional[str]:
+        """Ruta del artefacto guardado para la clave, o None"""
+        if not self.activa:
+            return None
+        ruta = self._ruta(clave)
+        with self._lock:
+            try:
+                tamano = os.path.getsize(ruta)
+                os.utime(ruta)
+            except OSError:
+                self._quitar(clave)
+                self.fallos += 1
+                return None
+            if clave not in self._entradas:
+                self._bytes += tamano
+            self._entradas[clave] = tamano
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+        return ruta
+
+    def guardar(self, clave: str, origen: str) -> Optional[str]:
+        """
+        Copia un libro recién generado a la caché (escritura atómica)
+
+        Un artefacto más grande que todo el presupuesto no se guarda.
+        """
+        if not self.activa or not os.path.exists(origen):
+            return None
+        tamano = os.path.getsize(origen)
+        if tamano > self.max_bytes:
+            return None
+        ruta = self._ruta(clave)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            shutil.copyfile(origen, temporal)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar en la caché de generaciones: {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            return None
+        with self._lock:
+            self._quitar(clave)
+            self._entradas[clave] = tamano
+            self._bytes += tamano
+            self.guardados += 1
+            self._desalojar()
+        return ruta
+
+    def copiar_a(self, clave: str, destino: str) -> bool:
+        """Copia el artefacto de la clave a destino; False si no está en caché"""
+        ruta = self.obtener(clave)
+        if ruta is None:
+            return False
+        try:
+            shutil.copyfile(ruta, destino)
+        except OSError as e:
+            logger.warning(f"⚠️ Artefacto en caché no disponible ({e}); se regenera")
+            return False
+        return True
+
+    def limpiar(self) -> int:
+        """Borra todos los artefactos; regresa cuántos había"""
+        with self._lock:
+            claves = list(self._entradas)
+            for clave in claves:
+                try:
+                    os.remove(self._ruta(clave))
+                except OSError:
+                    pass
+            self._entradas.clear()
+            self._bytes = 0
+        return len(claves)
+
+    def stats(self) -> Dict:
+        consultas = self.aciertos + self.fallos
+        return {
+            'activa': self.activa,
+            'directorio': self.directorio,
+            'entradas': len(self._entradas),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else None,
+            'guardados': self.guardados,
+            'desalojos': self.desalojos,
+        }
+
+
+cache_generaciones = CacheGeneraciones(
+    os.environ.get('FANGIO_CACHE_GENERACIONES_DIR',
+                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_generaciones')),
+    int(os.environ.get('FANGIO_CACHE_GENERACIONES_MB', '512')) * 1024 * 1024
+)
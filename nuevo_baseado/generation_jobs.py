@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Trabajos de generación asíncronos con progreso real
+Enviar un llenado regresa un ID de trabajo de inmediato; el llenado corre en
+un pool de hilos y cada fase (datos, archivos, llenado, imágenes, guardado)
+actualiza el registro del trabajo. El estado se consulta en el registro, no
+adivinando por archivos en disco.
+
+El código de llenado reporta con reportar_fase()/registrar_artefacto(); fuera
+de un trabajo (una petición /procesar normal) esas llamadas no hacen nada.
+
+Los registros viven en memoria del proceso que recibió el envío.
+
+FANGIO_TRABAJOS_WORKERS = llenados simultáneos
+FANGIO_TRABAJOS_RETENCION_MIN = minutos que se conserva un trabajo terminado
+FANGIO_TRABAJOS_LATIDO_SEG = segundos entre latidos del flujo de eventos (SSE)
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_TRABAJOS = int(os.environ.get('FANGIO_TRABAJOS_WORKERS', '4'))
+RETENCION_TRABAJOS = float(os.environ.get('FANGIO_TRABAJOS_RETENCION_MIN', '60')) * 60
+LATIDO_EVENTOS = float(os.environ.get('FANGIO_TRABAJOS_LATIDO_SEG', '15'))
+DIRECTORIO_RESULTADOS = os.environ.get(
+    'FANGIO_RESULTADOS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Temp', 'resultados')
+)
+
+# Fase -> (porcentaje al iniciarla, descripción)
+FASES = OrderedDict([
+    ('en_cola', (0, 'En cola')),
+    ('datos', (5, 'Descargando datos del enlace')),
+    ('archivos', (15, 'Guardando archivos subidos')),
+    ('llenado', (30, 'Llenando plantilla')),
+    ('imagenes', (60, 'Insertando imágenes')),
+    ('guardado', (85, 'Guardando libro')),
+    ('terminado', (100, 'Llenado completado')),
+])
+
+ESTADOS_FINALES = ('completado', 'error')
+
+_actual = threading.local()
+
+
+class Trabajo:
+    """Registro de un trabajo de generación"""
+
+    def __init__(self, tipo: str, user_id=None, fila_idx=None):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.user_id = None if user_id is None else str(user_id)
+        self.fila_idx = fila_idx
+        self.estado = 'en_cola'
+        self.fase = 'en_cola'
+        self.porcentaje = 0
+        self.mensaje = FASES['en_cola'][1]
+        self.creado = time.time()
+        self.iniciado: Optional[float] = None
+        self.terminado: Optional[float] = None
+        self.artefacto: Optional[str] = None
+        self.nombre_descarga: Optional[str] = None
+        self.error: Optional[str] = None
+        self.fases: List[Dict] = []
+        self.version = 0
+        self._evento = threading.Event()
+        self._cambio = threading.Condition()
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in ESTADOS_FINALES
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Bloquea hasta que el trabajo termine; False si se venció el timeout"""
+        return self._evento.wait(timeout)
+
+    def notificar(self):
+        """Despierta a quien espera un cambio de fase, porcentaje o estado"""
+        with self._cambio:
+            self.version += 1
+            self._cambio.notify_all()
+
+    def esperar_cambio(self, version: int, timeout: Optional[float] = None) -> int:
+        """Bloquea hasta que la versión del registro sea distinta de version; regresa la actual"""
+        with self._cambio:
+            self._cambio.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def a_dict(self) -> Dict:
+        ahora = time.time()
+        return {
+            'trabajo_id': self.id,
+            'tipo': self.tipo,
+            'user_id': self.user_id,
+            'fila_idx': self.fila_idx,
+            'estado': self.estado,
+            'completado': self.estado == 'completado',
+            'fase': self.fase,
+            'porcentaje': self.porcentaje,
+            'progreso': self.mensaje,
+            'error': self.error,
+            'archivo': self.nombre_descarga,
+            'creado': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.creado)),
+            'segundos': round((self.terminado or ahora) - (self.iniciado or self.creado), 2),
+            'fases': [{k: v for k, v in fase.items() if not k.startswith('_')} for fase in self.fases],
+        }
+
+
+def trabajo_actual() -> Optional[Trabajo]:
+    """Trabajo que está corriendo en este hilo, o None"""
+    return getattr(_actual, 'trabajo', None)
+
+
+def reportar_fase(fase: str, mensaje: Optional[str] = None, avance: float = 0.0):
+    """
+    Marca la fase en curso del trabajo de este hilo
+
+    avance (0-1) ubica el porcentaje entre esta fase y la siguiente.
+    """
+    trabajo = trabajo_actual()
+    if trabajo is None:
+        return
+    fases = list(FASES)
+    inicio = FASES[fase][0]
+    siguiente = FASES[fases[fases.index(fase) + 1]][0] if fase != fases[-1] else 100
+    if fase != trabajo.fase:
+        ahora = time.time()
+        if trabajo.fases:
+            trabajo.fases[-1]['segundos'] = round(ahora - trabajo.fases[-1]['_inicio'], 3)
+        trabajo.fases.append({'fase': fase, '_inicio': ahora})
+    trabajo.fase = fase
+    trabajo.porcentaje = max(trabajo.porcentaje, int(inicio + (siguiente - inicio) * min(max(avance, 0.0), 1.0)))
+    trabajo.mensaje = mensaje or FASES[fase][1]
+    trabajo.notificar()
+
+
+def registrar_artefacto(ruta: str, nombre_descarga: Optional[str] = None):
+    """Registra el libro que produjo el trabajo de este hilo"""
+    trabajo = trabajo_actual()
+    if trabajo is None:
+        return
+    trabajo.artefacto = ruta
+    trabajo.nombre_descarga = nombre_descarga or os.path.basename(ruta)
+
+
+def _evento_sse(evento: str, datos: Dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def eventos_trabajo(trabajo: Trabajo, datos_finales: Optional[Callable[[Trabajo], Dict]] = None,
+                    latido: float = LATIDO_EVENTOS) -> Iterator[str]:
+    """
+    Flujo Server-Sent Events del avance de un trabajo
+
+    Emite 'progreso' en cada cambio de fase/porcentaje y un 'fin' con el
+    estado final (más datos_finales(trabajo), p. ej. la URL de descarga);
+    entre cambios manda un comentario de latido para que proxies y
+    navegadores no cierren la conexión.
+    """
+    version = -1
+    while True:
+        actual = trabajo.esperar_cambio(version, latido)
+        if actual == version:
+            yield ': latido\n\n'
+            continue
+        version = actual
+        estado = trabajo.a_dict()
+        if trabajo.finalizado:
+            if datos_finales is not None:
+                estado.update(datos_finales(trabajo))
+            yield _evento_sse('fin', estado)
+            return
+        yield _evento_sse('progreso', estado)
+
+
+class GestorTrabajos:
+    """Pool de hilos y registro de trabajos de generación"""
+
+    def __init__(self, max_workers: int = MAX_TRABAJOS, retencion: float = RETENCION_TRABAJOS,
+                 directorio_resultados: str = DIRECTORIO_RESULTADOS):
+        self.max_workers = max(1, max_workers)
+        self.retencion = retencion
+        self.directorio_resultados = directorio_resultados
+        self._pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._trabajos: 'OrderedDict[str, Trabajo]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='trabajo_generacion'
+            )
+        return self._pool
+
+    def enviar(self, funcion, tipo: str, user_id=None, fila_idx=None, *args, **kwargs) -> Trabajo:
+        """
+        Encola funcion(trabajo, *args, **kwargs) y regresa el registro
+
+        La función produce el libro y lo anuncia con registrar_artefacto();
+        si termina sin artefacto, su valor de retorno se usa como mensaje de error.
+        """
+        trabajo = Trabajo(tipo, user_id, fila_idx)
+        with self._lock:
+            self._purgar()
+            self._trabajos[trabajo.id] = trabajo
+        self._executor().submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        logger.info(f"🧾 Trabajo {trabajo.id[:8]} en cola: {tipo} {user_id}")
+        return trabajo
+
+    def _ejecutar(self, trabajo: Trabajo, funcion, args, kwargs):
+        _actual.trabajo = trabajo
+        trabajo.iniciado = time.time()
+        trabajo.estado = 'en_proceso'
+        trabajo.notificar()
+        try:
+            resultado = funcion(trabajo, *args, **kwargs)
+            if trabajo.artefacto and os.path.exists(trabajo.artefacto):
+                reportar_fase('terminado')
+                trabajo.estado = 'completado'
+            else:
+                trabajo.estado = 'error'
+                trabajo.error = str(resultado or 'El llenado terminó sin generar el libro')[:500]
+                trabajo.mensaje = trabajo.error
+        except Exception as e:
+            logger.exception(f"❌ Trabajo {trabajo.id[:8]} falló")
+            trabajo.estado = 'error'
+            trabajo.error = str(e)
+            trabajo.mensaje = f"Error: {e}"
+        finally:
+            trabajo.terminado = time.time()
+            if trabajo.fases and 'segundos' not in trabajo.fases[-1]:
+                trabajo.fases[-1]['segundos'] = round(trabajo.terminado - trabajo.fases[-1]['_inicio'], 3)
+            _actual.trabajo = None
+            trabajo._evento.set()
+            trabajo.notificar()
+            logger.info(f"🧾 Trabajo {trabajo.id[:8]} {trabajo.estado} en "
+                        f"{trabajo.terminado - trabajo.iniciado:.1f}s")
+
+    def conservar_resultado(self, trabajo: Trabajo, origen: str) -> str:
+        """Copia el libro del trabajo fuera de su espacio temporal para descargarlo después"""
+        os.makedirs(self.directorio_resultados, exist_ok=True)
+        destino = os.path.join(self.directorio_resultados, f"{trabajo.id}_{os.path.basename(origen)}")
+        temporal = f"{destino}.tmp"
+        shutil.copyfile(origen, temporal)
+        os.replace(temporal, destino)
+        return destino
+
+    def _purgar(self):
+        """Olvida trabajos terminados hace más de la retención (y borra sus resultados)"""
+        limite = time.time() - self.retencion
+        for trabajo_id in [t.id for t in self._trabajos.values() if t.terminado and t.terminado < limite]:
+            trabajo = self._trabajos.pop(trabajo_id)
+            if trabajo.artefacto and trabajo.artefacto.startswith(self.directorio_resultados):
+                try:
+                    os.remove(trabajo.artefacto)
+                except OSError:
+                    pass
+
+    def obtener(self, trabajo_id: str) -> Optional[Trabajo]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def ultimo_para(self, user_id, tipo: Optional[str] = None) -> Optional[Trabajo]:
+        """Trabajo más reciente de un ID (opcionalmente de un tipo)"""
+        with self._lock:
+            for trabajo in reversed(self._trabajos.values()):
+                if trabajo.user_id == str(user_id) and (tipo is None or trabajo.tipo == tipo):
+                    return trabajo
+        return None
+
+    def info(self) -> Dict:
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        por_estado: Dict[str, int] = {}
+        for trabajo in trabajos:
+            por_estado[trabajo.estado] = por_estado.get(trabajo.estado, 0) + 1
+        return {'workers': self.max_workers, 'trabajos': len(trabajos), 'por_estado': por_estado}
+
+
+gestor_trabajos = GestorTrabajos()
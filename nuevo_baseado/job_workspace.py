@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Espacios de trabajo aislados por generación
+Cada llenado guarda sus subidas, intermedios (tabla de frecuencias, depuración)
+y el libro en su propia carpeta, así que dos usuarios generando a la vez no se
+pisan archivos. El artefacto final se publica con rename atómico y la carpeta
+se borra al terminar; las que deja un proceso caído se barren por antigüedad.
+
+FANGIO_TRABAJOS_DIR = carpeta raíz de los espacios de trabajo
+FANGIO_TRABAJOS_MAX_HORAS = antigüedad a partir de la cual se barre un espacio huérfano
+"""
+
+import os
+import re
+import time
+import uuid
+import shutil
+import logging
+import tempfile
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_TRABAJOS = os.environ.get(
+    'FANGIO_TRABAJOS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Temp', 'trabajos')
+)
+MAX_HORAS_TRABAJO = float(os.environ.get('FANGIO_TRABAJOS_MAX_HORAS', '6'))
+
+PREFIJO = 'trabajo_'
+
+
+def _limpiar_etiqueta(etiqueta) -> str:
+    return re.sub(r'[^a-zA-Z0-9_-]', '', str(etiqueta or ''))[:40]
+
+
+class EspacioTrabajo:
+    """
+    Carpeta temporal de una generación
+
+    Uso:
+        trabajo = EspacioTrabajo(etiqueta=user_id)
+        ruta = trabajo.ruta('LLENADO.xlsx')
+        ...
+        trabajo.publicar(ruta, destino_final)
+        trabajo.cerrar()
+
+    También funciona como context manager.
+    """
+
+    def __init__(self, raiz: str = DIRECTORIO_TRABAJOS, etiqueta=None):
+        os.makedirs(raiz, exist_ok=True)
+        self.id = uuid.uuid4().hex[:12]
+        prefijo = f"{PREFIJO}{_limpiar_etiqueta(etiqueta)}_{self.id}_" if etiqueta else f"{PREFIJO}{self.id}_"
+        self.directorio = tempfile.mkdtemp(prefix=prefijo, dir=raiz)
+        self._cerrado = False
+        self._lock = threading.Lock()
+
+    def ruta(self, nombre: str) -> str:
+        """Ruta dentro del espacio de trabajo (solo el nombre base: no se sale de la carpeta)"""
+        return os.path.join(self.directorio, os.path.basename(nombre))
+
+    def publicar(self, origen: str, destino: str) -> str:
+        """
+        Publica un archivo del espacio de trabajo en su destino final
+
+        Se copia junto al destino y se renombra con os.replace, así que quien
+        lea el destino ve el archivo anterior o el nuevo completo, nunca uno
+        a medias (aunque la carpeta de trabajo esté en otro disco).
+        """
+        carpeta = os.path.dirname(os.path.abspath(destino))
+        os.makedirs(carpeta, exist_ok=True)
+        temporal = os.path.join(carpeta, f".{os.path.basename(destino)}.{self.id}.tmp")
+        try:
+            shutil.copyfile(origen, temporal)
+            os.replace(temporal, destino)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+            raise
+        return destino
+
+    def cerrar(self):
+        """Borra la carpeta; si Windows tiene algún archivo abierto se barre después"""
+        with self._lock:
+            if self._cerrado:
+                return
+            self._cerrado = True
+        shutil.rmtree(self.directorio, ignore_errors=True)
+        if os.path.exists(self.directorio):
+            logger.warning(f"⚠️ Espacio de trabajo {self.directorio} no se pudo borrar; se barrerá después")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+
+def barrer_huerfanos(raiz: str = DIRECTORIO_TRABAJOS, max_horas: Optional[float] = None) -> int:
+    """Borra espacios de trabajo más viejos que max_horas (procesos caídos, archivos que estaban abiertos)"""
+    if not os.path.isdir(raiz):
+        return 0
+    limite = time.time() - (MAX_HORAS_TRABAJO if max_horas is None else max_horas) * 3600
+    borrados = 0
+    for nombre in os.listdir(raiz):
+        ruta = os.path.join(raiz, nombre)
+        if not nombre.startswith(PREFIJO) or not os.path.isdir(ruta):
+            continue
+        try:
+            if os.path.getmtime(ruta) >= limite:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(ruta, ignore_errors=True)
+        if not os.path.exists(ruta):
+            borrados += 1
+    if borrados:
+        logger.info(f"🧹 {borrados} espacios de trabajo huérfanos borrados")
+    return borrados
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Selección del motor de llenado de plantillas Excel
+- xlwings: automatiza Excel (Windows/macOS); conserva OLE y controles de formulario
+- xml: sin Excel; parchea el XML de la plantilla (xlsx_patch) y solo pasa a
+  openpyxl si el llenado inserta imágenes o cambia formato
+- openpyxl: sin Excel; carga y reescribe el libro completo
+Sin Excel los llenados corren en procesos paralelos.
+
+FANGIO_LLENADO_BACKEND = auto | xlwings | xml | openpyxl  (auto: xlwings si Excel está disponible, si no xml)
+FANGIO_LLENADO_PROCESOS = número de procesos para llenados sin Excel (0 = en el mismo proceso)
+"""
+
+import os
+import sys
+import time
+import logging
+import pickle
+import importlib
+import subprocess
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+from excel_headless import AppHeadless
+from template_registry import registro_plantillas
+
+# Importación condicional: xlwings solo funciona donde hay Excel instalado
+try:
+    import xlwings as xw
+    HAS_XLWINGS = sys.platform in ('win32', 'darwin')
+except ImportError:
+    HAS_XLWINGS = False
+
+logger = logging.getLogger(__name__)
+
+BACKEND_SOLICITADO = os.environ.get('FANGIO_LLENADO_BACKEND', 'auto').strip().lower()
+PROCESOS_LLENADO = int(os.environ.get('FANGIO_LLENADO_PROCESOS', str(min(4, os.cpu_count() or 1))))
+
+
+def _resolver_backend(solicitado: str) -> str:
+    if solicitado == 'xlwings' and not HAS_XLWINGS:
+        logger.warning("⚠️ FANGIO_LLENADO_BACKEND=xlwings pero Excel/xlwings no está disponible; se usa xml")
+        return 'xml'
+    if solicitado in ('xlwings', 'xml', 'openpyxl'):
+        return solicitado
+    return 'xlwings' if HAS_XLWINGS else 'xml'
+
+
+BACKEND = _resolver_backend(BACKEND_SOLICITADO)
+logger.info(f"📗 Motor de llenado Excel: {BACKEND}")
+
+
+def es_headless() -> bool:
+    """True si los llenados no usan una instancia de Excel"""
+    return BACKEND != 'xlwings'
+
+
+class OLENoSoportado(RuntimeError):
+    """El motor de llenado no tiene Excel: no se pueden embeber objetos OLE"""
+
+
+def objetos_ole(ws):
+    """
+    Sheet.api.OLEObjects() de una hoja abierta con abrir_excel
+
+    Raises:
+        OLENoSoportado: si el motor no es xlwings (las hojas sin Excel no tienen api)
+    """
+    if es_headless():
+        raise OLENoSoportado(f"Objetos OLE embebidos requieren Excel (motor de llenado: {BACKEND})")
+    return ws.api.OLEObjects()
+
+
+def abrir_excel(visible: bool = False, add_book: bool = False, **kwargs):
+    """
+    Equivalente a xw.App(...) para el motor configurado
+
+    Sin Excel regresa un AppHeadless con la misma interfaz (books.open,
+    sheets, range().value, pictures.add, save, close, quit).
+    """
+    if es_headless():
+        return AppHeadless(visible=visible, add_book=add_book, parche=BACKEND == 'xml')
+    return xw.App(visible=visible, add_book=add_book, **kwargs)
+
+
+def cerrar_procesos_excel(incluir_word: bool = False, espera: float = 0):
+    """taskkill de Excel (y Word) colgados; solo aplica con el motor xlwings en Windows"""
+    if es_headless() or os.name != 'nt':
+        return
+    subprocess.run(['taskkill', '/f', '/im', 'excel.exe'], capture_output=True)
+    if incluir_word:
+        subprocess.run(['taskkill', '/f', '/im', 'WINWORD.EXE'], capture_output=True)
+    if espera:
+        time.sleep(espera)
+
+
+_pool_llenado: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+# Módulos con las funciones de llenado que se mandan al pool
+MODULOS_LLENADO = ('lote_site_survey',)
+
+
+def _inicializar_proceso():
+    """Initializer del pool: importa los módulos de llenado una vez por proceso"""
+    for modulo in MODULOS_LLENADO:
+        importlib.import_module(modulo)
+
+
+def _contexto_pool():
+    """
+    forkserver (Linux) o spawn: los procesos no se copian del servidor, que ya
+    tiene hilos (fork podría heredar un lock tomado y colgarse)
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        contexto = multiprocessing.get_context('forkserver')
+        # El servidor importa una sola vez lo pesado (pandas, openpyxl, fill_spec)
+        contexto.set_forkserver_preload(list(MODULOS_LLENADO))
+        return contexto
+    return multiprocessing.get_context('spawn')
+
+
+def _pool() -> concurrent.futures.ProcessPoolExecutor:
+    global _pool_llenado
+    if _pool_llenado is None:
+        _pool_llenado = concurrent.futures.ProcessPoolExecutor(
+            max_workers=PROCESOS_LLENADO,
+            mp_context=_contexto_pool(),
+            initializer=_inicializar_proceso
+        )
+        logger.info(f"⚙️ Pool de llenado: {PROCESOS_LLENADO} procesos")
+    return _pool_llenado
+
+
+def _llenar_con_clones(clones, funcion, args, kwargs):
+    """Tarea del pool: reconoce los clones de plantilla del proceso padre y llena"""
+    registro_plantillas.adoptar_clones(clones)
+    return funcion(*args, **kwargs)
+
+
+def ejecutar_llenado(funcion, *args, **kwargs):
+    """
+    Ejecuta un llenado y regresa su resultado
+
+    Sin Excel los llenados son CPU puro y no comparten estado COM, así que se
+    mandan a un pool de procesos (no los frena el GIL). Con xlwings se llama
+    directo: Excel ya serializa el trabajo y COM no cruza procesos.
+    """
+    if not es_headless() or PROCESOS_LLENADO <= 0:
+        return funcion(*args, **kwargs)
+    global _pool_llenado
+    # Los clones se registran en este proceso; sin ellos el proceso del pool relee el libro completo
+    clones = registro_plantillas.exportar_clones(a for a in args if isinstance(a, str))
+    try:
+        pickle.dumps((funcion, args, kwargs))
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        logger.warning(f"⚠️ Llenado no serializable, se ejecuta en el mismo proceso ({e})")
+        return funcion(*args, **kwargs)
+    try:
+        return _pool().submit(_llenar_con_clones, clones, funcion, args, kwargs).result()
+    except BrokenProcessPool as e:
+        # Un proceso del pool murió: se recrea en el siguiente llenado
+        _pool_llenado = None
+        logger.warning(f"⚠️ Pool de llenado caído, se ejecuta en el mismo proceso ({e})")
+        return funcion(*args, **kwargs)
+
+
+def mapear_llenados(funcion, tareas: Iterable[Tuple]) -> Iterator[Tuple[int, Any]]:
+    """
+    Ejecuta funcion(*tarea) para cada tarea y produce (índice, resultado) en
+    orden de terminación
+
+    Para llenados que no abren Excel (parche XML directo), así que usa el
+    pool aunque el motor configurado sea xlwings. Si una tarea falla, su
+    resultado es la excepción.
+    """
+    global _pool_llenado
+    tareas = list(tareas)
+    pendientes = set(range(len(tareas)))
+    if PROCESOS_LLENADO > 0 and tareas:
+        try:
+            pickle.dumps((funcion, tareas[0]))
+            futuros = {_pool().submit(funcion, *tarea): i for i, tarea in enumerate(tareas)}
+            for futuro in concurrent.futures.as_completed(futuros):
+                i = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    resultado = e
+                pendientes.discard(i)
+                yield i, resultado
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            logger.warning(f"⚠️ Llenados no serializables, se ejecutan en el mismo proceso ({e})")
+        except BrokenProcessPool as e:
+            _pool_llenado = None
+            logger.warning(f"⚠️ Pool de llenado caído, {len(pendientes)} llenados siguen en el mismo proceso ({e})")
+    for i in sorted(pendientes):
+        try:
+            yield i, funcion(*tareas[i])
+        except Exception as e:
+            yield i, e
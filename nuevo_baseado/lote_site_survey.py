@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generación en lote ("mail-merge") de Site Surveys
+Selecciona filas de la hoja de enlaces por lista de IDs, ESTADO o región,
+evalúa el plan de llenado (fill_spec) de cada fila y parchea la plantilla ya
+compilada en memoria (template_registry) en un pool de procesos. Los libros
+se escriben en archivos_generados y/o en un zip, con el estado de cada ID.
+
+Uso: python lote_site_survey.py [--ids ID ...] [--estado ESTADO ...] [--region REGION ...]
+                                [--tipo ptp|ptmp] [--zip salida.zip] [--sin-archivos]
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import logging
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from artifact_index import TIPO_SITE_SURVEY, TIPO_SITE_SURVEY_PTMP, indice_artefactos
+from config_diseno_solucion import ESTADO_A_REGION
+from excel_headless import AppHeadless, LibroHeadless
+from fill_spec import PLAN_SITE_SURVEY_PTMP, PLAN_SITE_SURVEY_PTP, ejecutar_plan, evaluar
+from llenado_backend import BACKEND as BACKEND_LLENADO, PROCESOS_LLENADO, abrir_excel, mapear_llenados
+from sheet_normalization import plegar_texto
+from template_registry import registro_plantillas
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# tipo de documento -> plantilla (mismas rutas que site_survey_generator)
+PLANTILLAS_LOTE = {
+    'ptp': os.path.join(BASE_DIR, 'site_survey', 'EJEMPLO SS VACIO.xlsx'),
+    'ptmp': os.path.join(BASE_DIR, 'static', 'plantillas', 'EJEMPLO SS PtMP VACIO.xlsx'),
+}
+
+# tipo de documento -> plan de llenado (el pool recibe el tipo: los planes no se serializan)
+PLANES_LOTE = {'ptp': PLAN_SITE_SURVEY_PTP, 'ptmp': PLAN_SITE_SURVEY_PTMP}
+
+# tipo de documento -> tipo en el índice de artefactos
+TIPOS_ARTEFACTO_LOTE = {'ptp': TIPO_SITE_SURVEY, 'ptmp': TIPO_SITE_SURVEY_PTMP}
+
+# Máximo de IDs por lote (un request no debe quedarse con todo el pool)
+MAX_LOTE = int(os.environ.get('FANGIO_LOTE_MAXIMO', '500'))
+
+
+def _limpiar_id(user_id) -> str:
+    return re.sub(r'[^a-zA-Z0-9_-]', '', str(user_id))
+
+
+def nombre_archivo_lote(user_id, tipo_documento: str, timestamp: Optional[str] = None) -> str:
+    """
+    Nombre de un libro del lote, el mismo que usa site_survey_generator
+
+    En el zip va sin timestamp; en archivos_generados lleva el del lote para
+    no sobrescribir las versiones anteriores del ID.
+    """
+    base = f'ss_ptmp_{_limpiar_id(user_id)}' if tipo_documento == 'ptmp' else f'ss_{_limpiar_id(user_id)}'
+    return f'{base}_{timestamp}.xlsx' if timestamp else f'{base}.xlsx'
+
+
+def seleccionar_filas(df: pd.DataFrame, ids: Iterable = (), estados: Iterable = (),
+                      regiones: Iterable = ()) -> pd.DataFrame:
+    """
+    Filas de la hoja que pide el lote (una por ID; la primera si hay duplicados)
+
+    Los filtros se combinan: ids ∪ (estado ∈ estados) ∪ (región ∈ regiones).
+    ESTADO y región se comparan plegados ('nuevo leon' == 'Nuevo León').
+    """
+    if df.empty or 'ID' not in df.columns:
+        return df.iloc[0:0]
+    ids = {str(i).strip() for i in ids if str(i).strip()}
+    estados = {plegar_texto(e) for e in estados}
+    regiones = {plegar_texto(r) for r in regiones}
+    seleccion = pd.Series(False, index=df.index)
+    columna_id = df['ID'].astype(str).str.strip()
+    if ids:
+        seleccion |= columna_id.isin(ids)
+    if (estados or regiones) and 'ESTADO' in df.columns:
+        estado = df['ESTADO'].map(lambda e: str(e).strip() if isinstance(e, str) else '')
+        if estados:
+            seleccion |= estado.map(plegar_texto).isin(estados)
+        if regiones:
+            region = {plegar_texto(nombre): plegar_texto(region) for nombre, region in ESTADO_A_REGION.items()}
+            seleccion |= estado.map(lambda e: region.get(plegar_texto(e), 'otra')).isin(regiones)
+    filas = df[seleccion]
+    return filas[~columna_id[seleccion].duplicated()]
+
+
+def llenar_site_survey(ruta_plantilla: str, fila: Dict, nombre_a, nombre_b, tipo_documento: str = 'ptp') -> bytes:
+    """
+    Libro lleno de una fila, en memoria, con el plan del tipo de documento
+
+    Con parche directo no se carga el libro: la plantilla compilada recibe los
+    valores del plan. Si la plantilla no admite parche se llena con openpyxl.
+    """
+    plan = PLANES_LOTE[tipo_documento]
+    compilada = registro_plantillas.obtener(ruta_plantilla)
+    if compilada.parche is not None:
+        return compilada.parche.llenar(evaluar(plan, fila, nombre_a=nombre_a, nombre_b=nombre_b))
+    libro = LibroHeadless(AppHeadless(), ruta_plantilla, contenido=compilada.contenido)
+    try:
+        ejecutar_plan(plan, libro, fila, nombre_a=nombre_a, nombre_b=nombre_b)
+        salida = io.BytesIO()
+        libro.wb.save(salida)
+        return salida.getvalue()
+    finally:
+        libro.wb.close()
+
+
+def _llenar_item(ruta_plantilla: str, fila: Dict, nombre_a, nombre_b, tipo_documento: str = 'ptp'):
+    """Tarea del pool: (bytes, segundos)"""
+    inicio = time.perf_counter()
+    contenido = llenar_site_survey(ruta_plantilla, fila, nombre_a, nombre_b, tipo_documento)
+    return contenido, time.perf_counter() - inicio
+
+
+def llenar_archivo_ptp_optimizado(output_path, row, nombre_a, nombre_b, user_id):
+    """
+    Función optimizada para llenar archivos PtP con datos del Site Survey
+
+    Está en este módulo (no en app.py) para que los procesos del pool de
+    llenado la importen por nombre sin cargar la app.
+    """
+    try:
+        print("🚀 INICIANDO LLENADO OPTIMIZADO DEL ARCHIVO PTP...")
+        
+        # ===== DEBUG INICIAL - VERIFICAR DATOS RECIBIDOS =====
+        print("🔍 DEBUG INICIAL - VERIFICANDO DATOS RECIBIDOS:")
+        print(f"  - output_path: {output_path}")
+        print(f"  - nombre_a: '{nombre_a}'")
+        print(f"  - nombre_b: '{nombre_b}'")
+        print(f"  - user_id: '{user_id}'")
+        print(f"  - row es DataFrame? {hasattr(row, 'index')}")
+        if hasattr(row, 'index'):
+            print(f"  - row tiene {len(row)} campos")
+            print(f"  - Primeros 5 campos: {list(row.index)[:5]}")
+            print(f"  - ID en row: '{row.get('ID', 'NO ENCONTRADO')}'")
+            print(f"  - ID 2 en row: '{row.get('ID 2', 'NO ENCONTRADO')}'")
+            print(f"  - ¿user_id coincide con ID? {row.get('ID', 'NO ENCONTRADO') == user_id}")
+        else:
+            print(f"  - row NO es un DataFrame válido")
+            print(f"  - Tipo de row: {type(row)}")
+            print(f"  - Contenido de row: {row}")
+        
+        print("🔍 FIN DEBUG INICIAL")
+        print("=" * 80)
+        
+        print(f"📗 Motor de llenado: {BACKEND_LLENADO}")
+        
+        # Iniciar Excel
+        try:
+            app_excel = abrir_excel(visible=False)
+            app_excel.display_alerts = False
+            app_excel.screen_updating = False
+            print("✅ Excel iniciado correctamente")
+        except Exception as excel_error:
+            print(f"❌ Error iniciando Excel: {excel_error}")
+            return False
+        
+        # Abrir el archivo
+        try:
+            wb = app_excel.books.open(output_path)
+            print("✅ Archivo abierto correctamente")
+        except Exception as e:
+            print(f"❌ Error abriendo archivo: {e}")
+            return False
+        
+        # Obtener las hojas del Site Survey
+        try:
+            print("📋 Obteniendo hojas del Site Survey...")
+            ws_caratula = wb.sheets['0. Carátula']
+            ws_info_a = wb.sheets['1. Información General A']
+            ws_info_b = wb.sheets['2. Información General B']
+            ws_info_c = wb.sheets['3. Espacios en Torre y Piso A-B']
+            ws_info_d = wb.sheets['4. Planos A']
+            ws_info_e = wb.sheets['5. Planos B']
+            ws_info_f = wb.sheets['6. Reporte Fotos A']
+            ws_info_g = wb.sheets['7. Reporte Fotos B']
+            print("✅ Todas las hojas obtenidas")
+            
+            # Debug: Verificar que las hojas se obtuvieron correctamente
+            print(f"🔍 DEBUG HOJAS:")
+            print(f"  - ws_caratula: {ws_caratula.name if ws_caratula else 'NO OBTENIDA'}")
+            print(f"  - ws_info_a: {ws_info_a.name if ws_info_a else 'NO OBTENIDA'}")
+            print(f"  - ws_info_b: {ws_info_b.name if ws_info_b else 'NO OBTENIDA'}")
+            print(f"  - ws_info_c: {ws_info_c.name if ws_info_c else 'NO OBTENIDA'}")
+            
+            # Verificar que las hojas no sean None
+            if not ws_info_a:
+                print("❌ ERROR: ws_info_a es None")
+                return False
+            if not ws_info_b:
+                print("❌ ERROR: ws_info_b es None")
+                return False
+            if not ws_info_c:
+                print("❌ ERROR: ws_info_c es None")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Error obteniendo hojas: {e}")
+            return False
+        
+        # Carátula, hojas 1-7 y checkboxes salen del plan compilado (fill_spec):
+        # se evalúa la fila y se escribe en una sola pasada por hoja
+        print("🔥 LLENANDO TODOS LOS PARÁMETROS DESDE EL PLAN COMPILADO...")
+        celdas_escritas = ejecutar_plan(PLAN_SITE_SURVEY_PTP, wb, row, nombre_a=nombre_a, nombre_b=nombre_b)
+
+        print(f"✅ LLENADO COMPLETO DEL ARCHIVO PTP FINALIZADO ({celdas_escritas} celdas)")
+        
+        # Guardar y cerrar
+        wb.save(output_path)
+        wb.close()
+        app_excel.quit()
+        
+        print("🎉 ARCHIVO PTP GENERADO EXITOSAMENTE!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ ERROR en llenar_archivo_ptp_optimizado: {e}")
+        import traceback
+        print(f"🔍 Traceback completo: {traceback.format_exc()}")
+        
+        # Intentar cerrar Excel si está abierto
+        try:
+            if 'wb' in locals():
+                wb.close()
+            if 'app_excel' in locals():
+                app_excel.quit()
+        except:
+            pass
+        
+        return False
+
+
+def _escribir_atomico(ruta: str, contenido: bytes):
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _indexar(user_id, tipo_documento: str, ruta: str):
+    """Registra el libro en el índice de artefactos; un fallo del índice no rompe el lote"""
+    try:
+        indice_artefactos().registrar(user_id, TIPOS_ARTEFACTO_LOTE[tipo_documento], ruta)
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo indexar {ruta}: {e}")
+
+
+def generar_lote(filas: pd.DataFrame, tipo_documento: str = 'ptp', destino_dir: Optional[str] = None,
+                 zip_salida=None, ids_pedidos: Iterable = ()) -> Dict:
+    """
+    Llena un Site Survey por fila en paralelo
+
+    Args:
+        filas: filas de la hoja (seleccionar_filas)
+        tipo_documento: 'ptp' o 'ptmp'
+        destino_dir: carpeta donde guardar cada libro (p. ej. archivos_generados)
+        zip_salida: ruta o archivo abierto donde escribir el zip (incluye resumen_lote.json)
+        ids_pedidos: IDs solicitados explícitamente; los que no están en la hoja se reportan
+
+    Returns:
+        Resumen con el estado de cada ID y el throughput
+    """
+    if tipo_documento not in PLANTILLAS_LOTE:
+        raise ValueError(f"Tipo de documento no soportado en lote: {tipo_documento}")
+    if len(filas) > MAX_LOTE:
+        raise ValueError(f"El lote tiene {len(filas)} IDs; el máximo es {MAX_LOTE}")
+    ruta_plantilla = PLANTILLAS_LOTE[tipo_documento]
+    # Se compila (o valida) en el proceso principal antes de repartir el trabajo
+    registro_plantillas.obtener(ruta_plantilla)
+
+    inicio = time.perf_counter()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if destino_dir:
+        os.makedirs(destino_dir, exist_ok=True)
+
+    ids = [str(i).strip() for i in filas['ID']] if len(filas) else []
+    tareas = [
+        (ruta_plantilla, fila.to_dict(), fila.get('Nombre del sitio A', ''), fila.get('Nombre del sitio B', ''),
+         tipo_documento)
+        for _, fila in filas.iterrows()
+    ]
+    items: List[Dict] = [{'id': i, 'estado': 'pendiente'} for i in ids]
+    encontrados = set(ids)
+    items += [{'id': str(i).strip(), 'estado': 'no_encontrado'}
+              for i in dict.fromkeys(ids_pedidos) if str(i).strip() and str(i).strip() not in encontrados]
+
+    zip_lote = zipfile.ZipFile(zip_salida, 'w', zipfile.ZIP_STORED) if zip_salida is not None else None
+    total_bytes = 0
+    try:
+        for indice, resultado in mapear_llenados(_llenar_item, tareas):
+            item = items[indice]
+            if isinstance(resultado, Exception):
+                item.update(estado='error', error=str(resultado))
+                logger.warning(f"⚠️ Lote: {item['id']} falló: {resultado}")
+                continue
+            contenido, segundos = resultado
+            total_bytes += len(contenido)
+            item.update(estado='ok', bytes=len(contenido), ms=round(segundos * 1000, 1))
+            if zip_lote is not None:
+                # xlsx ya viene comprimido: se guarda sin recomprimir
+                zip_lote.writestr(nombre_archivo_lote(item['id'], tipo_documento), contenido)
+            if destino_dir:
+                nombre = nombre_archivo_lote(item['id'], tipo_documento, timestamp)
+                ruta = os.path.join(destino_dir, nombre)
+                _escribir_atomico(ruta, contenido)
+                _indexar(item['id'], tipo_documento, ruta)
+                item['archivo'] = nombre
+        segundos_total = time.perf_counter() - inicio
+        exitosos = sum(1 for item in items if item['estado'] == 'ok')
+        resumen = {
+            'tipo_documento': tipo_documento,
+            'total': len(items),
+            'exitosos': exitosos,
+            'fallidos': len(items) - exitosos,
+            'segundos': round(segundos_total, 3),
+            'por_segundo': round(exitosos / segundos_total, 2) if segundos_total else None,
+            'bytes': total_bytes,
+            'procesos': PROCESOS_LLENADO,
+            'items': items,
+        }
+        if zip_lote is not None:
+            zip_lote.writestr('resumen_lote.json', json.dumps(resumen, ensure_ascii=False, indent=2))
+    finally:
+        if zip_lote is not None:
+            zip_lote.close()
+    logger.info(f"📦 Lote {tipo_documento}: {resumen['exitosos']}/{resumen['total']} en "
+                f"{resumen['segundos']}s ({resumen['por_segundo']}/s)")
+    return resumen
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Genera Site Surveys en lote')
+    parser.add_argument('--ids', nargs='*', default=[], help='IDs de enlace')
+    parser.add_argument('--estado', nargs='*', default=[], help='ESTADO del sitio A')
+    parser.add_argument('--region', nargs='*', default=[], help='Región (CENTRO, NORTE, ...)')
+    parser.add_argument('--tipo', default='ptp', choices=sorted(PLANTILLAS_LOTE))
+    parser.add_argument('--zip', dest='zip_salida', help='Escribe los libros en este zip')
+    parser.add_argument('--sin-archivos', action='store_true', help='No copiar a archivos_generados')
+    args = parser.parse_args(argv)
+    if not (args.ids or args.estado or args.region):
+        parser.error('Indica --ids, --estado o --region')
+
+    # La app registra las plantillas y abre el snapshot de la hoja de enlaces
+    from app import get_cached_dataframe
+
+    filas = seleccionar_filas(get_cached_dataframe(), args.ids, args.estado, args.region)
+    destino = None if args.sin_archivos else os.path.join(BASE_DIR, 'archivos_generados')
+    resumen = generar_lote(filas, args.tipo, destino_dir=destino, zip_salida=args.zip_salida, ids_pedidos=args.ids)
+    for item in resumen['items']:
+        detalle = item.get('archivo') or item.get('error') or ''
+        print(f"{'✅' if item['estado'] == 'ok' else '❌'} {item['id']}: {item['estado']} {detalle}")
+    print(f"📦 {resumen['exitosos']}/{resumen['total']} en {resumen['segundos']}s ({resumen['por_segundo']}/s)")
+    return 0 if resumen['fallidos'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de archivos permanentes en SQLite (WAL)
+Reemplaza archivos_permanentes.json: cada almacenamiento es un INSERT atómico
+(dos guardados simultáneos ya no se pisan el registro) y listar/buscar son
+consultas paginadas con índices en user_id, tipo y fecha_creacion, en lugar
+de cargar y recorrer la lista completa en cada petición.
+
+La primera vez que se abre el registro se importa archivos_permanentes.json
+(si existe) y se renombra a archivos_permanentes.json.migrado.
+
+FANGIO_REGISTRO_PERMANENTES = ruta del archivo SQLite
+"""
+
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_PERMANENTES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archivos_permanentes')
+RUTA_REGISTRO = os.environ.get(
+    'FANGIO_REGISTRO_PERMANENTES', os.path.join(DIRECTORIO_PERMANENTES, 'archivos_permanentes.db')
+)
+RUTA_JSON_LEGADO = os.path.join(DIRECTORIO_PERMANENTES, 'archivos_permanentes.json')
+
+POR_PAGINA = 200
+MAX_POR_PAGINA = 1000
+
+# Columna SQLite -> llave del registro en la API (la misma que tenía el JSON)
+COLUMNAS = (
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('tipo', 'tipo'),
+    ('fila_idx', 'fila_idx'),
+    ('archivo_original', 'archivo_original'),
+    ('archivo_permanente', 'archivo_permanente'),
+    ('nombre_permanente', 'nombre_permanente'),
+    ('fecha_creacion', 'fecha_creacion'),
+    ('tamano_bytes', 'tamaño_bytes'),
+    ('estado', 'estado'),
+)
+
+_ESQUEMA = (
+    'CREATE TABLE IF NOT EXISTS archivos ('
+    'id TEXT PRIMARY KEY, user_id TEXT COLLATE NOCASE, tipo TEXT COLLATE NOCASE, fila_idx TEXT, '
+    'archivo_original TEXT, archivo_permanente TEXT, nombre_permanente TEXT, '
+    'fecha_creacion TEXT, tamano_bytes INTEGER, estado TEXT)',
+    'CREATE INDEX IF NOT EXISTS ix_archivos_user_id ON archivos (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_archivos_tipo ON archivos (tipo)',
+    'CREATE INDEX IF NOT EXISTS ix_archivos_fecha ON archivos (fecha_creacion)',
+    'CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)',
+)
+
+
+def _fecha_iso(valor) -> Optional[str]:
+    """Fecha de filtro normalizada al formato de fecha_creacion; None si no es válida"""
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(str(valor).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return fecha.replace(tzinfo=None).isoformat()
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class RegistroPermanentes:
+    """Registro SQLite de archivos almacenados permanentemente"""
+
+    def __init__(self, ruta: str = RUTA_REGISTRO, ruta_json: Optional[str] = RUTA_JSON_LEGADO):
+        self.ruta = ruta
+        self.ruta_json = ruta_json
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        self._local = threading.local()
+        with self._conexion() as conn:
+            for sentencia in _ESQUEMA:
+                conn.execute(sentencia)
+        if ruta_json:
+            self.importar_json(ruta_json)
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _a_fila(registro: Dict) -> Tuple:
+        fila = []
+        for columna, llave in COLUMNAS:
+            valor = registro.get(llave, registro.get(columna))
+            if columna == 'fila_idx' and valor is not None:
+                valor = str(valor)
+            fila.append(valor)
+        return tuple(fila)
+
+    @staticmethod
+    def _a_registro(fila: sqlite3.Row) -> Dict:
+        return {llave: fila[columna] for columna, llave in COLUMNAS}
+
+    def agregar(self, registro: Dict):
+        """Inserta (o reemplaza, si el ID ya existe) un registro en una sola transacción"""
+        marcadores = ', '.join('?' for _ in COLUMNAS)
+        with self._conexion() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO archivos ({', '.join(c for c, _ in COLUMNAS)}) VALUES ({marcadores})",
+                self._a_fila(registro)
+            )
+
+    def obtener(self, archivo_id: str) -> Optional[Dict]:
+        fila = self._conexion().execute('SELECT * FROM archivos WHERE id = ?', (archivo_id,)).fetchone()
+        return None if fila is None else self._a_registro(fila)
+
+    def buscar(self, user_id: Optional[str] = None, tipo: Optional[str] = None,
+               fecha_inicio: Optional[str] = None, fecha_fin: Optional[str] = None,
+               exacto: bool = False, pagina: int = 1, por_pagina: int = POR_PAGINA) -> Tuple[List[Dict], int]:
+        """
+        Registros que cumplen los filtros, más recientes primero, y el total sin paginar
+
+        user_id y tipo se comparan sin distinguir mayúsculas: por subcadena (como
+        la búsqueda anterior) o, con exacto=True, por igualdad usando los índices.
+        Fechas inválidas se ignoran, igual que antes.
+        """
+        condiciones, parametros = [], []
+        for columna, valor in (('user_id', user_id), ('tipo', tipo)):
+            if not valor:
+                continue
+            if exacto:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+            else:
+                condiciones.append(f"{columna} LIKE ? ESCAPE '\\'")
+                parametros.append(f"%{_escapar_like(valor)}%")
+        for operador, valor in (('>=', _fecha_iso(fecha_inicio)), ('<=', _fecha_iso(fecha_fin))):
+            if valor:
+                condiciones.append(f"fecha_creacion {operador} ?")
+                parametros.append(valor)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ''
+
+        por_pagina = max(1, min(int(por_pagina), MAX_POR_PAGINA))
+        pagina = max(1, int(pagina))
+        conn = self._conexion()
+        total = conn.execute(f"SELECT COUNT(*) FROM archivos {donde}", parametros).fetchone()[0]
+        filas = conn.execute(
+            f"SELECT * FROM archivos {donde} ORDER BY fecha_creacion DESC LIMIT ? OFFSET ?",
+            parametros + [por_pagina, (pagina - 1) * por_pagina]
+        ).fetchall()
+        return [self._a_registro(fila) for fila in filas], total
+
+    def listar(self, pagina: int = 1, por_pagina: int = POR_PAGINA) -> Tuple[List[Dict], int]:
+        return self.buscar(pagina=pagina, por_pagina=por_pagina)
+
+    def importar_json(self, ruta_json: str) -> int:
+        """
+        Importa una sola vez el archivos_permanentes.json legado
+
+        La importación corre en una transacción exclusiva y queda anotada en la
+        tabla meta, así que si varios workers arrancan a la vez solo uno la hace.
+        """
+        if not os.path.exists(ruta_json):
+            return 0
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE clave = 'json_importado'").fetchone():
+                conn.rollback()
+                return 0
+            with open(ruta_json, 'r', encoding='utf-8') as f:
+                registros = json.load(f)
+            marcadores = ', '.join('?' for _ in COLUMNAS)
+            conn.executemany(
+                f"INSERT OR IGNORE INTO archivos ({', '.join(c for c, _ in COLUMNAS)}) VALUES ({marcadores})",
+                [self._a_fila(registro) for registro in registros if registro.get('id')]
+            )
+            conn.execute(
+                "INSERT INTO meta (clave, valor) VALUES ('json_importado', ?)", (datetime.now().isoformat(),)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception(f"❌ No se pudo importar {ruta_json}")
+            return 0
+        try:
+            os.replace(ruta_json, f"{ruta_json}.migrado")
+        except OSError as e:
+            logger.warning(f"⚠️ {ruta_json} importado pero no renombrado: {e}")
+        logger.info(f"📥 {len(registros)} archivos permanentes importados de {os.path.basename(ruta_json)}")
+        return len(registros)
+
+
+_registro: Optional[RegistroPermanentes] = None
+_registro_lock = threading.Lock()
+
+
+def registro_permanentes() -> RegistroPermanentes:
+    """Registro global; se abre (e importa el JSON legado) en el primer uso"""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                _registro = RegistroPermanentes()
+    return _registro
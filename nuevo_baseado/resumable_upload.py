@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Subidas reanudables por bloques (KMZ, ZIP y lotes de fotos)
+Con enlaces móviles inestables un corte a la mitad obligaba a volver a subir
+el archivo completo. Aquí el archivo se manda en bloques con su offset; cada
+bloque se agrega a un .part y el avance queda en SQLite, así que después de
+un corte el cliente pregunta el offset y sigue desde ahí (también si el
+bloque se cortó a la mitad: cuenta lo que sí llegó). Al completarse, el
+archivo se verifica, se reconoce su tipo y entra al almacén de blobs.
+
+Protocolo:
+    POST   /subidas_reanudables        {"nombre", "tamano", "sha256"?} -> {"upload_id", "offset", ...}
+    PUT    /subidas_reanudables/<id>   cuerpo = bloque; Upload-Offset: n (o Content-Range: bytes n-m/total)
+    GET    /subidas_reanudables/<id>   estado; se reanuda desde "offset" (también en el header Upload-Offset)
+    DELETE /subidas_reanudables/<id>   cancela
+
+Una subida completa se usa en los endpoints existentes mandando el campo
+"subida:<campo>" = upload_id en lugar del archivo (p. ej. subida:zip_file).
+
+FANGIO_SUBIDAS_REANUDABLES_DIR = carpeta de .part y del registro
+FANGIO_SUBIDA_BLOQUE_MB = tamaño de bloque sugerido al cliente (4 por defecto)
+FANGIO_SUBIDA_CADUCIDAD_H = horas sin actividad antes de descartar una subida (24)
+"""
+
+import os
+import re
+import time
+import uuid
+import shutil
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+
+from blob_store import almacen_blobs
+from upload_stream import DIRECTORIO_SUBIDAS, LIMITES_POR_TIPO, MB, detectar_tipo, registrar_metadatos, tipo_por_extension
+
+try:
+    from werkzeug.datastructures import FileStorage, ImmutableMultiDict, MultiDict
+    from werkzeug.exceptions import BadRequest
+    from upload_stream import PeticionStreaming
+    HAS_FLASK = True
+except ImportError:
+    HAS_FLASK = False
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_REANUDABLES = os.environ.get(
+    'FANGIO_SUBIDAS_REANUDABLES_DIR', os.path.join(DIRECTORIO_SUBIDAS, 'reanudables')
+)
+TAMANO_BLOQUE = int(float(os.environ.get('FANGIO_SUBIDA_BLOQUE_MB', '4')) * MB)
+CADUCIDAD = float(os.environ.get('FANGIO_SUBIDA_CADUCIDAD_H', '24')) * 3600
+
+# Campo de formulario con el que un endpoint recibe una subida completa
+PREFIJO_CAMPO = 'subida:'
+
+# Un PUT que murió sin liberar su bloque deja de bloquear la subida después de esto
+_CONCESION = 300
+_BLOQUE_LECTURA = 1 << 20
+_BYTES_FIRMA = 16
+
+_ESQUEMA = (
+    'CREATE TABLE IF NOT EXISTS subidas ('
+    'id TEXT PRIMARY KEY, nombre TEXT NOT NULL, tamano_total INTEGER NOT NULL, '
+    'recibido INTEGER NOT NULL DEFAULT 0, sha256_esperado TEXT, sha256 TEXT, tipo TEXT, mime TEXT, '
+    'completa INTEGER NOT NULL DEFAULT 0, escribiendo REAL, creado REAL NOT NULL, actualizado REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS ix_subidas_actualizado ON subidas (actualizado)',
+)
+
+_RANGO = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class SubidaInvalida(Exception):
+    """Petición que no se puede aplicar a la subida; codigo es el status HTTP"""
+
+    def __init__(self, mensaje: str, codigo: int = 400, offset: Optional[int] = None):
+        super().__init__(mensaje)
+        self.codigo = codigo
+        self.offset = offset
+
+
+def offset_de_peticion(encabezados) -> Optional[int]:
+    """Offset del bloque según Upload-Offset o Content-Range; None si no viene"""
+    if encabezados.get('Upload-Offset') is not None:
+        try:
+            return int(encabezados['Upload-Offset'])
+        except ValueError:
+            raise SubidaInvalida('Upload-Offset inválido')
+    rango = encabezados.get('Content-Range')
+    if rango:
+        coincidencia = _RANGO.match(rango.strip())
+        if not coincidencia:
+            raise SubidaInvalida('Content-Range inválido')
+        return int(coincidencia.group(1))
+    return None
+
+
+class SubidaCompletada:
+    """
+    Stream de solo lectura de una subida reanudable ya ensamblada
+
+    Se inyecta como FileStorage en request.files; guardar_subida y el
+    almacén de blobs la copian o la enlazan sin volver a hashearla.
+    """
+
+    def __init__(self, ruta_almacen: str, metadatos: Dict):
+        self.ruta_almacen = ruta_almacen
+        self._metadatos = metadatos
+        self._archivo = None
+
+    def metadatos(self) -> Dict:
+        return self._metadatos
+
+    def _lectura(self):
+        if self._archivo is None:
+            self._archivo = open(self.ruta_almacen, 'rb')
+        return self._archivo
+
+    def read(self, n: int = -1) -> bytes:
+        return self._lectura().read(n)
+
+    def readline(self, n: int = -1) -> bytes:
+        return self._lectura().readline(n)
+
+    def seek(self, posicion: int, desde: int = 0) -> int:
+        return self._lectura().seek(posicion, desde)
+
+    def tell(self) -> int:
+        return self._lectura().tell()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def __iter__(self):
+        return iter(self._lectura())
+
+    @property
+    def closed(self) -> bool:
+        return self._archivo is None or self._archivo.closed
+
+    def entregar(self, destino: str) -> Dict:
+        destino = os.path.abspath(destino)
+        shutil.copyfile(self.ruta_almacen, destino)
+        registrar_metadatos(destino, self._metadatos)
+        return dict(self._metadatos, ruta=destino)
+
+    def reubicado(self, ruta: str):
+        registrar_metadatos(ruta, self._metadatos)
+
+    def close(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+
+
+class SubidasReanudables:
+    """Registro (SQLite, WAL) y ensamblado de subidas por bloques"""
+
+    def __init__(self, raiz: str = DIRECTORIO_REANUDABLES):
+        self.raiz = raiz
+        os.makedirs(raiz, exist_ok=True)
+        self.ruta_db = os.path.join(raiz, 'subidas.db')
+        self._local = threading.local()
+        # Hash acumulado de los bloques recibidos por este proceso: {id: (offset, sha256)}
+        self._hashes = {}
+        self._hashes_lock = threading.Lock()
+        self._ultima_limpieza = 0.0
+        with self._conexion() as conn:
+            for sentencia in _ESQUEMA:
+                conn.execute(sentencia)
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta_db, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _ruta_parte(self, upload_id: str) -> str:
+        return os.path.join(self.raiz, f"{upload_id}.part")
+
+    def _ruta_completa(self, upload_id: str) -> str:
+        """Referencia al blob de la subida completa (la mantiene viva en el almacén)"""
+        return os.path.join(self.raiz, f"{upload_id}.completa")
+
+    def _fila(self, upload_id: str) -> sqlite3.Row:
+        fila = None
+        if re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+            fila = self._conexion().execute('SELECT * FROM subidas WHERE id = ?', (upload_id,)).fetchone()
+        if fila is None:
+            raise SubidaInvalida(f"La subida {upload_id} no existe o ya caducó", 404)
+        return fila
+
+    @staticmethod
+    def _a_estado(fila: sqlite3.Row) -> Dict:
+        return {
+            'upload_id': fila['id'],
+            'nombre': fila['nombre'],
+            'tamano': fila['tamano_total'],
+            'offset': fila['recibido'],
+            'completa': bool(fila['completa']),
+            'sha256': fila['sha256'],
+            'tipo': fila['tipo'],
+            'mime': fila['mime'],
+        }
+
+    # ----- protocolo -----
+
+    def crear(self, nombre: Optional[str], tamano, sha256: Optional[str] = None) -> Dict:
+        """Abre una subida de `tamano` bytes; rechaza desde aquí lo que pasa el límite del tipo"""
+        nombre = os.path.basename(str(nombre or '').replace('\\', '/'))
+        if not nombre:
+            raise SubidaInvalida('Falta el nombre del archivo')
+        try:
+            tamano = int(tamano)
+        except (TypeError, ValueError):
+            raise SubidaInvalida('Falta el tamaño del archivo')
+        if tamano <= 0:
+            raise SubidaInvalida('El archivo está vacío')
+        tipo = tipo_por_extension(nombre)
+        if tamano > LIMITES_POR_TIPO[tipo]:
+            raise SubidaInvalida(f"{nombre} supera el límite de {LIMITES_POR_TIPO[tipo] // MB} MB "
+                                 f"para archivos {tipo}", 413)
+        if sha256 and not re.fullmatch(r'[0-9a-fA-F]{64}', sha256):
+            raise SubidaInvalida('sha256 inválido')
+        self.limpiar_caducas()
+        upload_id = uuid.uuid4().hex
+        open(self._ruta_parte(upload_id), 'wb').close()
+        ahora = time.time()
+        with self._conexion() as conn:
+            conn.execute(
+                'INSERT INTO subidas (id, nombre, tamano_total, sha256_esperado, creado, actualizado) '
+                'VALUES (?, ?, ?, ?, ?, ?)', (upload_id, nombre, tamano, sha256.lower() if sha256 else None, ahora, ahora)
+            )
+        with self._hashes_lock:
+            self._hashes[upload_id] = (0, hashlib.sha256())
+        logger.info(f"📤 Subida reanudable {upload_id[:8]} abierta: {nombre} ({tamano / MB:.1f} MB)")
+        return dict(self._a_estado(self._fila(upload_id)), tamano_bloque=TAMANO_BLOQUE)
+
+    def estado(self, upload_id: str) -> Dict:
+        return self._a_estado(self._fila(upload_id))
+
+    def escribir(self, upload_id: str, offset: int, flujo) -> Dict:
+        """
+        Agrega un bloque que empieza en offset
+
+        El offset debe ser exactamente lo recibido hasta ahora (409 con el
+        offset correcto si no). Si la conexión se corta a la mitad, lo que sí
+        llegó queda guardado y el siguiente PUT sigue desde ahí.
+        """
+        fila = self._fila(upload_id)
+        if fila['completa']:
+            if offset == fila['tamano_total']:
+                return self._a_estado(fila)
+            raise SubidaInvalida('La subida ya está completa', 409, fila['tamano_total'])
+        if offset != fila['recibido']:
+            raise SubidaInvalida(f"Se esperaba el offset {fila['recibido']}", 409, fila['recibido'])
+
+        ahora = time.time()
+        with self._conexion() as conn:
+            tomada = conn.execute(
+                'UPDATE subidas SET escribiendo = ? WHERE id = ? AND recibido = ? AND completa = 0 '
+                'AND (escribiendo IS NULL OR escribiendo < ?)', (ahora, upload_id, offset, ahora - _CONCESION)
+            ).rowcount
+        if not tomada:
+            raise SubidaInvalida('Otro bloque de esta subida está en curso', 409, fila['recibido'])
+
+        with self._hashes_lock:
+            previo = self._hashes.pop(upload_id, None)
+        if previo and previo[0] == offset:
+            h = previo[1]
+        else:
+            h = hashlib.sha256() if offset == 0 else None
+        maximo = fila['tamano_total'] - offset
+        escritos = 0
+        try:
+            with open(self._ruta_parte(upload_id), 'r+b') as f:
+                # Lo que haya quedado después del offset registrado (un bloque a medias) se descarta
+                f.seek(offset)
+                f.truncate()
+                for bloque in iter(lambda: flujo.read(_BLOQUE_LECTURA), b''):
+                    if escritos + len(bloque) > maximo:
+                        raise SubidaInvalida(f"El bloque pasa del tamaño declarado ({fila['tamano_total']} bytes)",
+                                             413)
+                    f.write(bloque)
+                    if h is not None:
+                        h.update(bloque)
+                    escritos += len(bloque)
+        finally:
+            with self._conexion() as conn:
+                conn.execute(
+                    'UPDATE subidas SET recibido = ?, escribiendo = NULL, actualizado = ? WHERE id = ?',
+                    (offset + escritos, time.time(), upload_id)
+                )
+            if h is not None:
+                with self._hashes_lock:
+                    self._hashes[upload_id] = (offset + escritos, h)
+
+        if offset + escritos == fila['tamano_total']:
+            return self._completar(upload_id)
+        return self.estado(upload_id)
+
+    def _completar(self, upload_id: str) -> Dict:
+        """Verifica el sha256, reconoce el tipo y mueve el archivo ensamblado al almacén de blobs"""
+        fila = self._fila(upload_id)
+        parte = self._ruta_parte(upload_id)
+        with self._hashes_lock:
+            acumulado = self._hashes.pop(upload_id, None)
+        if acumulado and acumulado[0] == fila['tamano_total']:
+            sha = acumulado[1].hexdigest()
+        else:
+            # Los bloques llegaron a otro proceso (o hubo un reinicio): una lectura al final
+            h = hashlib.sha256()
+            with open(parte, 'rb') as f:
+                for bloque in iter(lambda: f.read(_BLOQUE_LECTURA), b''):
+                    h.update(bloque)
+            sha = h.hexdigest()
+        if fila['sha256_esperado'] and sha != fila['sha256_esperado']:
+            self.cancelar(upload_id)
+            raise SubidaInvalida(f"El sha256 de {fila['nombre']} no coincide; vuelve a subirlo", 422)
+
+        with open(parte, 'rb') as f:
+            cabecera = f.read(_BYTES_FIRMA)
+        tipo_extension = tipo_por_extension(fila['nombre'])
+        tipo, mime = detectar_tipo(cabecera, fila['nombre'])
+        tipo = tipo or tipo_extension
+        limite = min(LIMITES_POR_TIPO[tipo], LIMITES_POR_TIPO[tipo_extension])
+        if fila['tamano_total'] > limite:
+            self.cancelar(upload_id)
+            raise SubidaInvalida(f"{fila['nombre']} supera el límite de {limite // MB} MB para archivos {tipo}", 413)
+
+        almacen_blobs().guardar_archivo(parte, self._ruta_completa(upload_id), sha)
+        with self._conexion() as conn:
+            conn.execute(
+                'UPDATE subidas SET completa = 1, sha256 = ?, tipo = ?, mime = ?, actualizado = ? WHERE id = ?',
+                (sha, tipo, mime, time.time(), upload_id)
+            )
+        logger.info(f"📦 Subida reanudable {upload_id[:8]} completa: {fila['nombre']} ({sha[:12]})")
+        return self.estado(upload_id)
+
+    def archivo(self, upload_id: str, campo: str):
+        """FileStorage de una subida completa, para ponerlo en request.files"""
+        fila = self._fila(upload_id)
+        if not fila['completa']:
+            raise SubidaInvalida(f"La subida {upload_id} no está completa", 409, fila['recibido'])
+        metadatos = {
+            'nombre': fila['nombre'],
+            'tipo': fila['tipo'],
+            'tipo_extension': tipo_por_extension(fila['nombre']),
+            'mime': fila['mime'],
+            'tamano_bytes': fila['tamano_total'],
+            'sha256': fila['sha256'],
+            'md5': None,
+        }
+        with self._conexion() as conn:
+            conn.execute('UPDATE subidas SET actualizado = ? WHERE id = ?', (time.time(), upload_id))
+        return FileStorage(stream=SubidaCompletada(self._ruta_completa(upload_id), metadatos),
+                           filename=fila['nombre'], name=campo, content_type=fila['mime'])
+
+    def cancelar(self, upload_id: str):
+        """Borra la subida y sus archivos (el blob se libera en la siguiente recolección)"""
+        with self._conexion() as conn:
+            conn.execute('DELETE FROM subidas WHERE id = ?', (upload_id,))
+        with self._hashes_lock:
+            self._hashes.pop(upload_id, None)
+        for ruta in (self._ruta_parte(upload_id), self._ruta_completa(upload_id)):
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def limpiar_caducas(self, forzar: bool = False) -> int:
+        """Descarta las subidas sin actividad en CADUCIDAD (a lo más una vez cada 10 minutos)"""
+        ahora = time.time()
+        if not forzar and ahora - self._ultima_limpieza < 600:
+            return 0
+        self._ultima_limpieza = ahora
+        caducas = [fila['id'] for fila in self._conexion().execute(
+            'SELECT id FROM subidas WHERE actualizado < ?', (ahora - CADUCIDAD,))]
+        for upload_id in caducas:
+            self.cancelar(upload_id)
+        if caducas:
+            logger.info(f"🧹 {len(caducas)} subidas reanudables caducas descartadas")
+        return len(caducas)
+
+
+_subidas: Optional[SubidasReanudables] = None
+_subidas_lock = threading.Lock()
+
+
+def subidas_reanudables() -> SubidasReanudables:
+    """Registro global; se abre en el primer uso"""
+    global _subidas
+    if _subidas is None:
+        with _subidas_lock:
+            if _subidas is None:
+                _subidas = SubidasReanudables()
+    return _subidas
+
+
+if HAS_FLASK:
+    class PeticionReanudable(PeticionStreaming):
+        """
+        PeticionStreaming que además acepta subidas reanudables completas
+
+        Un campo "subida:<campo>" = upload_id aparece en request.files como
+        el archivo <campo>, así que los endpoints no cambian.
+        """
+
+        def _load_form_data(self):
+            if 'form' in self.__dict__:
+                return
+            super()._load_form_data()
+            referencias = [(llave[len(PREFIJO_CAMPO):], valor)
+                           for llave, valor in self.form.items(multi=True) if llave.startswith(PREFIJO_CAMPO)]
+            if not referencias:
+                return
+            archivos = MultiDict(self.files.items(multi=True))
+            for campo, upload_id in referencias:
+                try:
+                    archivos.add(campo, subidas_reanudables().archivo(upload_id.strip(), campo))
+                except SubidaInvalida as e:
+                    raise BadRequest(str(e))
+            self.__dict__['files'] = ImmutableMultiDict(archivos)
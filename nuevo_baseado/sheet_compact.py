@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Representación compacta en memoria del snapshot de la hoja de enlaces
+Cada worker de gunicorn guarda su propia copia, así que se convierten las
+columnas de pocas categorías a `category`, las numéricas a su dtype y se
+descartan las columnas que ningún llenado lee.
+"""
+
+import ast
+import logging
+import os
+import re
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+import pandas as pd
+
+from sheet_index import CAMPOS_BUSQUEDA, COLUMNAS_INDICE
+from sheet_normalization import SUFIJO_NORMALIZADO, canonicalizar_encabezado
+
+logger = logging.getLogger(__name__)
+
+# Columnas que siempre se guardan como categóricas (además de las '__norm')
+COLUMNAS_CATEGORICAS = (
+    'ESTADO', 'ESTADO 2',
+    'Tipo de Zona', 'Tipo de Zona 2',
+    'Banda',
+    'Tipo de Torre', 'Tipo de Torre2',
+    'Tipo de Camino', 'Tipo de Camino 2',
+)
+
+# Módulos cuyos literales de texto definen qué columnas lee el llenado
+FUENTES_COLUMNAS = ('app.py', 'config_diseno_solucion.py', 'fill_spec.py', 'frequency_table.py')
+
+# Un texto con cero a la izquierda (C.P, teléfonos) no se convierte a número
+_CERO_IZQUIERDA = re.compile(r'^\s*[+-]?0\d')
+
+
+def bytes_por_columna(df: pd.DataFrame) -> Dict[str, int]:
+    """Bytes reales (deep) de cada columna"""
+    uso = df.memory_usage(index=False, deep=True)
+    return {str(columna): int(bytes_) for columna, bytes_ in uso.items()}
+
+
+def columnas_referenciadas(rutas: Iterable[str]) -> Set[str]:
+    """
+    Literales de texto de los módulos indicados, en forma canónica
+
+    Cualquier columna cuyo nombre aparezca como literal (row.get('...'),
+    mapeos campo -> celda, etc.) se considera usada.
+    """
+    literales: Set[str] = set()
+    for ruta in rutas:
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                arbol = ast.parse(f.read(), filename=ruta)
+        except (OSError, SyntaxError) as e:
+            logger.warning(f"⚠️ No se pudieron leer columnas usadas de {ruta}: {e}")
+            continue
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Constant) and isinstance(nodo.value, str):
+                literales.add(canonicalizar_encabezado(nodo.value))
+    return literales
+
+
+def columnas_en_uso(directorio: Optional[str] = None) -> Set[str]:
+    """Columnas que lee la aplicación: literales de FUENTES_COLUMNAS + índices"""
+    directorio = directorio or os.path.dirname(os.path.abspath(__file__))
+    usadas = columnas_referenciadas(os.path.join(directorio, nombre) for nombre in FUENTES_COLUMNAS)
+    usadas.update(COLUMNAS_INDICE)
+    usadas.update(columna for _, columna in CAMPOS_BUSQUEDA)
+    return usadas
+
+
+def _a_numerico(serie: pd.Series) -> Optional[pd.Series]:
+    """La serie como número si todos sus valores lo son; None si no"""
+    valores = serie.dropna()
+    if valores.empty:
+        return None
+    texto = valores.astype(str)
+    if texto.str.match(_CERO_IZQUIERDA).any():
+        return None
+    numeros = pd.to_numeric(texto.str.strip(), errors='coerce')
+    if numeros.isna().any():
+        return None
+    return numeros.reindex(serie.index)
+
+
+def compactar_hoja(df: pd.DataFrame, conservar: Optional[Set[str]] = None,
+                   categoricas: Iterable[str] = COLUMNAS_CATEGORICAS) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Regresa una copia compacta del DataFrame y el reporte de memoria
+
+    Args:
+        df: snapshot ya normalizado (encabezados canónicos)
+        conservar: columnas a mantener; None conserva todas
+        categoricas: columnas que pasan a `category` si existen
+
+    Returns:
+        (df_compacto, reporte) con bytes por columna antes y después
+    """
+    antes = bytes_por_columna(df)
+    tipos_antes = {str(c): str(t) for c, t in df.dtypes.items()}
+
+    eliminadas = []
+    if conservar is not None:
+        eliminadas = [
+            c for c in df.columns
+            if c not in conservar and not (str(c).endswith(SUFIJO_NORMALIZADO) and
+                                           str(c)[:-len(SUFIJO_NORMALIZADO)] in conservar)
+        ]
+    compacto = df.drop(columns=eliminadas)
+
+    categoricas = set(categoricas)
+    # Los IDs y nombres se indexan como texto aunque parezcan números
+    textuales = set(COLUMNAS_INDICE) | {columna for _, columna in CAMPOS_BUSQUEDA}
+    for columna in compacto.columns:
+        serie = compacto[columna]
+        if serie.dtype != object and not pd.api.types.is_string_dtype(serie.dtype):
+            continue
+        if columna in categoricas or str(columna).endswith(SUFIJO_NORMALIZADO):
+            compacto[columna] = serie.astype('category')
+            continue
+        if columna in textuales:
+            continue
+        numerica = _a_numerico(serie)
+        if numerica is not None:
+            compacto[columna] = numerica
+
+    despues = bytes_por_columna(compacto)
+    reporte = {
+        'total_antes': sum(antes.values()),
+        'total_despues': sum(despues.values()),
+        'eliminadas': [str(c) for c in eliminadas],
+        'columnas': {
+            columna: {
+                'antes': bytes_,
+                'despues': despues.get(columna, 0),
+                'dtype_antes': tipos_antes[columna],
+                'dtype_despues': str(compacto[columna].dtype) if columna in despues else None
+            }
+            for columna, bytes_ in sorted(antes.items(), key=lambda item: -item[1])
+        }
+    }
+    logger.info(
+        f"🗜️ Hoja compactada: {reporte['total_antes'] / 1024 / 1024:.1f}MB -> "
+        f"{reporte['total_despues'] / 1024 / 1024:.1f}MB ({len(eliminadas)} columnas sin uso descartadas)"
+    )
+    return compacto, reporte
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índices en memoria sobre un snapshot de la hoja de enlaces
+Se construyen una sola vez al cargar el snapshot y se comparten entre requests
+"""
+
+import bisect
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columnas indexadas: ID del enlace (sitio A) e ID 2 (sitio B)
+COLUMNAS_INDICE = ('ID', 'ID 2')
+
+# Campos del autocompletado (en orden de prioridad) y su columna en la hoja
+CAMPOS_BUSQUEDA = (
+    ('id', 'ID'),
+    ('nombre_a', 'Nombre del sitio A'),
+    ('nombre_b', 'Nombre del sitio B'),
+)
+
+# Tipos de coincidencia en orden de relevancia
+EXACTO, PREFIJO, SUBCADENA, APROXIMADO = 'exacto', 'prefijo', 'subcadena', 'aproximado'
+_RANGO_TIPO = {EXACTO: 0, PREFIJO: 1, SUBCADENA: 2, APROXIMADO: 3}
+
+
+def clave_id(valor) -> str:
+    """Normaliza un ID para el índice (texto sin espacios laterales)"""
+    return str(valor).strip()
+
+
+class IndiceEnlaces:
+    """
+    Índice hash ID -> posiciones de fila (O(1) por consulta)
+
+    Las posiciones son posicionales (para `df.iloc`) y valen tanto para el
+    DataFrame por defecto como para la variante de texto del mismo snapshot.
+    """
+
+    def __init__(self, df: pd.DataFrame, columnas: Iterable[str] = COLUMNAS_INDICE):
+        self.filas = len(df)
+        self.posiciones: Dict[str, Dict[str, List[int]]] = {}
+        self.duplicados: Dict[str, Dict[str, List[int]]] = {}
+
+        for columna in columnas:
+            if columna not in df.columns:
+                continue
+            mapa: Dict[str, List[int]] = {}
+            for pos, valor in enumerate(df[columna].tolist()):
+                if pd.isna(valor):
+                    continue
+                clave = clave_id(valor)
+                if clave:
+                    mapa.setdefault(clave, []).append(pos)
+            self.posiciones[columna] = mapa
+            self.duplicados[columna] = {k: v for k, v in mapa.items() if len(v) > 1}
+
+            if self.duplicados[columna]:
+                muestra = list(self.duplicados[columna].items())[:10]
+                logger.warning(
+                    f"⚠️ {len(self.duplicados[columna])} valores duplicados en '{columna}' "
+                    f"(ejemplos: {', '.join(f'{k} x{len(v)}' for k, v in muestra)})"
+                )
+
+    def buscar(self, valor, columna: str = 'ID') -> List[int]:
+        """Posiciones de las filas cuyo `columna` coincide exactamente con `valor`"""
+        if valor is None:
+            return []
+        return self.posiciones.get(columna, {}).get(clave_id(valor), [])
+
+    def contiene(self, valor, columna: str = 'ID') -> bool:
+        """True si el valor existe en la columna indexada"""
+        return bool(self.buscar(valor, columna))
+
+    def resumen(self) -> Dict:
+        """Tamaño del índice y conteo de duplicados por columna"""
+        return {
+            columna: {
+                'claves': len(mapa),
+                'duplicados': len(self.duplicados.get(columna, {}))
+            }
+            for columna, mapa in self.posiciones.items()
+        }
+
+
+def _ngramas(texto: str, n: int) -> set:
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+def _distancia_prefijo(consulta: str, valor: str, maximo: int) -> int:
+    """
+    Distancia de edición de `consulta` contra el mejor prefijo de `valor`
+    (el resto de `valor` es gratis, como al ir tecleando); corta en `maximo`
+    """
+    previa = list(range(len(valor) + 1))
+    for i, c in enumerate(consulta, 1):
+        actual = [i] + [0] * len(valor)
+        for j, v in enumerate(valor, 1):
+            actual[j] = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (c != v))
+        if min(actual) > maximo:
+            return maximo + 1
+        previa = actual
+    return min(previa)
+
+
+class IndiceBusqueda:
+    """
+    Índice de autocompletado sobre ID, Nombre del sitio A y Nombre del sitio B
+
+    - exacto: diccionario valor -> posiciones
+    - prefijo: lista ordenada (valor, posición) con bisect
+    - subcadena: postings de bigramas/trigramas intersectados y verificados
+    - aproximado: candidatos por trigramas compartidos + distancia de edición
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.filas = len(df)
+        self.valores: Dict[str, List[Optional[str]]] = {}
+        self.exactos: Dict[str, Dict[str, List[int]]] = {}
+        self.ordenados: Dict[str, List[Tuple[str, int]]] = {}
+        self.postings: Dict[str, Dict[str, set]] = {}
+
+        for campo, columna in CAMPOS_BUSQUEDA:
+            if columna not in df.columns:
+                continue
+            valores = [None if pd.isna(v) else str(v).strip().lower() or None for v in df[columna].tolist()]
+            exactos: Dict[str, List[int]] = {}
+            postings: Dict[str, set] = {}
+            for pos, valor in enumerate(valores):
+                if valor is None:
+                    continue
+                exactos.setdefault(valor, []).append(pos)
+                for gram in _ngramas(valor, 2) | _ngramas(valor, 3):
+                    postings.setdefault(gram, set()).add(pos)
+            self.valores[campo] = valores
+            self.exactos[campo] = exactos
+            self.ordenados[campo] = sorted((v, p) for p, v in enumerate(valores) if v is not None)
+            self.postings[campo] = postings
+
+    def buscar(self, consulta: str, limite: int = 10,
+               campos: Iterable[str] = ('id', 'nombre_a', 'nombre_b'),
+               aproximado: bool = True) -> Tuple[List[Dict], int]:
+        """
+        Busca coincidencias rankeadas (exacto > prefijo > subcadena > aproximado)
+
+        Args:
+            consulta: texto tecleado por el usuario
+            limite: máximo de resultados (top-k)
+            campos: campos donde buscar, en orden de prioridad
+            aproximado: incluir coincidencias con errores de tecleo
+
+        Returns:
+            (resultados, total): cada resultado trae posicion, tipo y campo;
+            total es el número de filas distintas que coincidieron
+        """
+        q = str(consulta or '').strip().lower()
+        if not q:
+            return [], 0
+
+        mejores: Dict[int, Tuple] = {}
+
+        def registrar(pos, tipo, campo, prioridad):
+            clave = (_RANGO_TIPO[tipo], prioridad, len(self.valores[campo][pos]), pos)
+            if pos not in mejores or clave < mejores[pos][0]:
+                mejores[pos] = (clave, tipo, campo)
+
+        for prioridad, campo in enumerate(campos):
+            if campo not in self.valores:
+                continue
+            valores = self.valores[campo]
+
+            for pos in self.exactos[campo].get(q, []):
+                registrar(pos, EXACTO, campo, prioridad)
+
+            ordenados = self.ordenados[campo]
+            i = bisect.bisect_left(ordenados, (q, -1))
+            while i < len(ordenados) and ordenados[i][0].startswith(q):
+                registrar(ordenados[i][1], PREFIJO, campo, prioridad)
+                i += 1
+
+            for pos in self._candidatos_subcadena(campo, q):
+                if q in valores[pos]:
+                    registrar(pos, SUBCADENA, campo, prioridad)
+
+            # Los errores de tecleo solo se buscan si faltan resultados para el top-k
+            if aproximado and len(q) >= 4 and len(mejores) < limite:
+                maximo = 1 if len(q) < 8 else 2
+                for pos in self._candidatos_aproximados(campo, q, maximo):
+                    if pos not in mejores and _distancia_prefijo(q, valores[pos], maximo) <= maximo:
+                        registrar(pos, APROXIMADO, campo, prioridad)
+
+        ordenados = sorted(mejores.items(), key=lambda item: item[1][0])
+        resultados = [
+            {'posicion': pos, 'tipo': tipo, 'campo': campo}
+            for pos, (_, tipo, campo) in ordenados[:limite]
+        ]
+        return resultados, len(mejores)
+
+    def _candidatos_subcadena(self, campo: str, q: str) -> set:
+        """Intersección de postings de los n-gramas de la consulta"""
+        if len(q) < 2:
+            return set()
+        postings = self.postings[campo]
+        n = 3 if len(q) >= 3 else 2
+        grams = sorted(_ngramas(q, n), key=lambda g: len(postings.get(g, ())))
+        candidatos = None
+        for gram in grams:
+            lista = postings.get(gram)
+            if not lista:
+                return set()
+            candidatos = lista if candidatos is None else candidatos & lista
+            if not candidatos:
+                return set()
+        return candidatos or set()
+
+    def _candidatos_aproximados(self, campo: str, q: str, maximo: int, tope: int = 200) -> List[int]:
+        """Filas que comparten suficientes trigramas con la consulta (filtro por conteo)"""
+        postings = self.postings[campo]
+        grams = _ngramas(q, 3)
+        minimo = max(1, len(grams) - 3 * maximo)
+        conteo: Dict[int, int] = {}
+        for gram in grams:
+            for pos in postings.get(gram, ()):
+                conteo[pos] = conteo.get(pos, 0) + 1
+        candidatos = [pos for pos, c in conteo.items() if c >= minimo]
+        candidatos.sort(key=lambda pos: -conteo[pos])
+        return candidatos[:tope]
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingesta del CSV de la hoja de enlaces
+Un solo parser para todo el proceso: lector CSV de Arrow multihilo, proyección
+a las columnas que usa la aplicación y una única política de valores N/A.
+Sin pyarrow se usa el motor C de pandas con las mismas reglas.
+"""
+
+import io
+import csv
+import logging
+from typing import Iterable, List, Optional, Set, Union
+
+import pandas as pd
+
+from sheet_normalization import canonicalizar_encabezado
+
+# Importación condicional: sin pyarrow se parsea con pandas
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pa_compute
+    import pyarrow.csv as pa_csv
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+# Política N/A única: estas celdas (exactas) son valores faltantes en todas las variantes
+VALORES_NA = (
+    '', '#N/A', '#N/A N/A', '#NA', 'N/A', 'n/a', 'NA', '<NA>',
+    'NULL', 'null', 'NaN', 'nan', '-NaN', '-nan', 'None',
+)
+
+
+def encabezados_csv(contenido: bytes) -> List[str]:
+    """
+    Encabezados del CSV con los duplicados renombrados como pandas
+    ('Foto', 'Foto' -> 'Foto', 'Foto.1')
+    """
+    lector = csv.reader(io.TextIOWrapper(io.BytesIO(contenido), encoding='utf-8-sig', newline=''))
+    primera = next(lector, [])
+    vistos = {}
+    encabezados = []
+    for nombre in primera:
+        if nombre in vistos:
+            vistos[nombre] += 1
+            nombre = f"{nombre}.{vistos[nombre]}"
+        vistos.setdefault(nombre, 0)
+        encabezados.append(nombre)
+    return encabezados
+
+
+def proyeccion(encabezados: List[str], columnas: Optional[Iterable[str]]) -> List[str]:
+    """Encabezados originales cuya forma canónica está en `columnas` (todos si es None)"""
+    if columnas is None:
+        return list(encabezados)
+    deseadas: Set[str] = {canonicalizar_encabezado(c) for c in columnas}
+    return [e for e in encabezados if canonicalizar_encabezado(e) in deseadas]
+
+
+def _fechas_como_texto(tabla):
+    """
+    Arrow infiere fechas y horas ISO; pandas las deja como texto y así las
+    escribe el llenado. Solo reconoce la forma ISO exacta, así que el cast de
+    regreso reproduce el texto original.
+    """
+    columnas = []
+    for i, campo in enumerate(tabla.schema):
+        columna = tabla.column(i)
+        if pa.types.is_temporal(campo.type):
+            columna = pa_compute.cast(columna, pa.string())
+        elif pa.types.is_null(campo.type):
+            # Columna vacía: NaN flotante, como pandas
+            columna = pa.nulls(len(columna), pa.float64())
+        columnas.append(columna)
+    return pa.table(columnas, names=tabla.column_names)
+
+
+def _leer_arrow(contenido: bytes, encabezados: List[str], incluidas: List[str], texto: bool) -> pd.DataFrame:
+    tabla = pa_csv.read_csv(
+        io.BytesIO(contenido),
+        read_options=pa_csv.ReadOptions(column_names=encabezados, skip_rows=1, use_threads=True),
+        # Las celdas de comentarios pueden traer saltos de línea entre comillas
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=incluidas,
+            # Variante de texto: sin inferencia de tipos; si no, Arrow infiere en paralelo
+            column_types={nombre: pa.string() for nombre in incluidas} if texto else None,
+            null_values=list(VALORES_NA),
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True
+        )
+    )
+    if not texto:
+        tabla = _fechas_como_texto(tabla)
+    return tabla.to_pandas(use_threads=True)
+
+
+def _leer_pandas(contenido: bytes, encabezados: List[str], incluidas: List[str], texto: bool) -> pd.DataFrame:
+    return pd.read_csv(
+        io.BytesIO(contenido), names=encabezados, header=0, usecols=incluidas,
+        keep_default_na=False, na_values=list(VALORES_NA), dtype=str if texto else None
+    )
+
+
+def leer_hoja_csv(origen: Union[bytes, str], columnas: Optional[Iterable[str]] = None,
+                  texto: bool = False) -> pd.DataFrame:
+    """
+    Parsea el CSV exportado de la hoja
+
+    Args:
+        origen: bytes del CSV o ruta al archivo
+        columnas: nombres (en cualquier forma de espacios) a conservar; None = todas
+        texto: True para tener todo como texto con '' en lugar de NaN
+               (variante para huellas de fila y rutas que comparan cadenas)
+
+    Returns:
+        DataFrame con las columnas proyectadas en el orden del CSV
+    """
+    if isinstance(origen, str):
+        with open(origen, 'rb') as f:
+            origen = f.read()
+    encabezados = encabezados_csv(origen)
+    if not encabezados:
+        return pd.DataFrame()
+    incluidas = proyeccion(encabezados, columnas)
+
+    if HAS_PYARROW:
+        try:
+            df = _leer_arrow(origen, encabezados, incluidas, texto)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+            logger.warning(f"⚠️ Lector CSV de Arrow falló, se usa pandas: {e}")
+            df = _leer_pandas(origen, encabezados, incluidas, texto)
+    else:
+        df = _leer_pandas(origen, encabezados, incluidas, texto)
+
+    if texto:
+        df = df.fillna('')
+    return df
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalización de la hoja de enlaces al cargar cada snapshot
+Encabezados canónicos, valores N/A uniformes y columnas categóricas ya
+plegadas (minúsculas, sin acentos ni signos) para que el llenado no tenga
+que normalizar celda por celda en cada request.
+"""
+
+import logging
+import unicodedata
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Sufijo de las columnas con el texto ya plegado: 'Riesgo' -> 'Riesgo__norm'
+SUFIJO_NORMALIZADO = '__norm'
+
+# Columnas de texto con hasta este número de valores distintos se consideran
+# categóricas y se pliegan en el snapshot
+MAX_CATEGORIAS = 200
+
+# Identificador de la normalización; cambia si cambia lo que produce
+# normalizar_hoja (los snapshots persistidos con otra versión se re-preparan)
+VERSION_NORMALIZACION = '1'
+
+_SIGNOS = str.maketrans('', '', "-_.,;:()[]{} ")
+
+
+def canonicalizar_encabezado(nombre) -> str:
+    """'  ESTADO ' -> 'ESTADO': sin espacios laterales ni espacios repetidos"""
+    return ' '.join(str(nombre).split())
+
+
+def plegar_texto(texto) -> str:
+    """
+    Texto plegado para comparar categorías: minúsculas, sin acentos, sin
+    espacios y sin "-_.,;:()[]{}"; '' si no es texto
+    """
+    if not isinstance(texto, str):
+        return ""
+    texto = unicodedata.normalize('NFD', texto.strip().lower())
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn')
+    return texto.translate(_SIGNOS)
+
+
+def columna_normalizada(columna: str) -> str:
+    """Nombre de la columna plegada de `columna`"""
+    return canonicalizar_encabezado(columna) + SUFIJO_NORMALIZADO
+
+
+def canonicalizar_encabezados(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Renombra las columnas a su forma canónica (in-place)
+
+    Si un encabezado colapsa a un nombre que ya existe en la hoja, conserva su
+    nombre original (nunca se juntan dos columnas distintas).
+    """
+    renombres: Dict[str, str] = {}
+    usados = set(df.columns)
+    for columna in df.columns:
+        canonico = canonicalizar_encabezado(columna)
+        if canonico == columna:
+            continue
+        if canonico in usados:
+            logger.warning(f"⚠️ Encabezado '{columna}' duplica a '{canonico}'; se conserva sin normalizar")
+            continue
+        usados.add(canonico)
+        renombres[columna] = canonico
+    if renombres:
+        df.rename(columns=renombres, inplace=True)
+    return df
+
+
+def plegar_serie(serie: pd.Series) -> np.ndarray:
+    """
+    plegar_texto sobre una columna completa: se pliega cada valor distinto una
+    sola vez y el resultado se expande con los códigos de factorize
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    plegados = np.array([plegar_texto(v) for v in unicos] + [''], dtype=object)
+    # El centinela -1 (NaN) cae en el '' agregado al final
+    return plegados[codigos]
+
+
+def _columnas_texto(df: pd.DataFrame):
+    return [c for c, tipo in df.dtypes.items() if tipo == object or pd.api.types.is_string_dtype(tipo)]
+
+
+def normaliza_na(valor):
+    """Valor de una celda con la política N/A: vacíos, NaN y 'n/a' -> 'N/A'"""
+    if isinstance(valor, str) and valor.strip().lower() == "n/a":
+        return "N/A"
+    elif pd.isna(valor):
+        return "N/A"
+    elif valor == "" or (isinstance(valor, str) and valor.strip() == ""):
+        return "N/A"
+    return valor
+
+
+def mapear_na(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica la misma política N/A en todas las columnas de texto (in-place):
+    celdas en blanco y variantes de 'n/a' con espacios o mayúsculas pasan a NaN,
+    igual que las celdas vacías y 'N/A' que ya descarta read_csv
+    """
+    for columna in _columnas_texto(df):
+        serie = df[columna]
+        es_texto = serie.map(type).eq(str).to_numpy()
+        if not es_texto.any():
+            continue
+        limpio = serie[es_texto].str.strip().str.lower()
+        vacias = limpio.isin(('', 'n/a')).to_numpy()
+        if vacias.any():
+            posiciones = np.flatnonzero(es_texto)[vacias]
+            df.iloc[posiciones, df.columns.get_loc(columna)] = np.nan
+    return df
+
+
+def normalizar_hoja(df: pd.DataFrame, max_categorias: int = MAX_CATEGORIAS) -> pd.DataFrame:
+    """
+    Normaliza un snapshot recién parseado (in-place) y lo regresa
+
+    - encabezados canónicos
+    - política N/A uniforme
+    - una columna '<columna>__norm' plegada por cada columna de texto categórica
+    """
+    canonicalizar_encabezados(df)
+    mapear_na(df)
+
+    nuevas = {}
+    for columna in _columnas_texto(df):
+        if str(columna).endswith(SUFIJO_NORMALIZADO):
+            continue
+        if df[columna].nunique(dropna=True) > max_categorias:
+            continue
+        nuevas[columna_normalizada(columna)] = plegar_serie(df[columna])
+    if nuevas:
+        # Un solo concat en lugar de insertar columna por columna
+        plegadas = pd.DataFrame(nuevas, index=df.index)
+        df = pd.concat([df.drop(columns=[c for c in nuevas if c in df.columns]), plegadas], axis=1)
+    logger.info(f"🧹 Hoja normalizada: {len(df.columns) - len(nuevas)} columnas, {len(nuevas)} categóricas plegadas")
+    return df
+
+
+def texto_normalizado(fila, columna: str) -> str:
+    """
+    Valor plegado de `columna` en una fila del snapshot (Series o dict)
+
+    Lee la columna '__norm' precalculada; si la fila no la trae (variante de
+    texto o columna no categórica) pliega el valor en el momento.
+    """
+    valor: Optional[str] = fila.get(columna_normalizada(columna))
+    if isinstance(valor, str):
+        return valor
+    return plegar_texto(fila.get(canonicalizar_encabezado(columna), ''))
@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Almacén de snapshots de la base de enlaces (Google Sheets) para Fangio Telecom
+Una sola copia por proceso, revalidación condicional y datos stale mientras refresca.
+Cada versión descargada se persiste en disco (Arrow IPC + CSV original) para
+arrancar en frío sin esperar a Google y poder operar sin conexión.
+La frescura de una fila concreta se confirma comparando huellas de fila,
+sin vaciar el snapshot que usan los demás usuarios.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from sheet_index import IndiceBusqueda, IndiceEnlaces
+from sheet_ingest import encabezados_csv, leer_hoja_csv
+from sheet_normalization import canonicalizar_encabezado, canonicalizar_encabezados
+from single_flight import SingleFlight
+
+# Importación condicional: sin pyarrow se persiste solo el CSV original
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_ARROW = 'hoja.arrow'
+ARCHIVO_CSV = 'hoja.csv'
+ARCHIVO_META = 'meta.json'
+
+# Clave single-flight de la revalidación de la hoja completa
+CLAVE_REFRESCO = 'hoja_enlaces'
+
+
+def huella_valores(valores) -> str:
+    """Huella de una fila: celdas como texto sin espacios laterales"""
+    texto = '\x1f'.join('' if pd.isna(v) else str(v).strip() for v in valores)
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+
+def url_consulta_fila(url_export: str, columna: int, valor: str) -> Optional[str]:
+    """
+    URL de la API de visualización de Google que devuelve solo las filas cuyo
+    valor en `columna` (posición 0-based) es `valor`; None si la URL de
+    exportación no es de Google Sheets
+    """
+    if '/export' not in url_export:
+        return None
+    letra = ''
+    n = columna + 1
+    while n:
+        n, resto = divmod(n - 1, 26)
+        letra = chr(65 + resto) + letra
+    consulta = f"select * where {letra} = '{str(valor).replace(chr(39), '')}'"
+    base = url_export.split('/export')[0]
+    return f"{base}/gviz/tq?tqx=out:csv&headers=1&tq={urllib.parse.quote(consulta)}"
+
+
+@dataclass
+class SheetSnapshot:
+    """Versión inmutable de la hoja de enlaces ya descargada y parseada"""
+    version: str
+    raw: Optional[bytes]
+    df: pd.DataFrame
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    loaded_at: float = field(default_factory=time.time)
+    validated_at: float = field(default_factory=time.time)
+    raw_path: Optional[str] = None
+    columnas: Optional[frozenset] = field(default=None, repr=False)
+    indice: Optional[IndiceEnlaces] = field(default=None, repr=False)
+    _df_texto: Optional[pd.DataFrame] = field(default=None, repr=False)
+    _busqueda: Optional[IndiceBusqueda] = field(default=None, repr=False)
+    _busqueda_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self):
+        # Índice ID -> filas construido una sola vez por snapshot
+        if self.indice is None:
+            self.indice = IndiceEnlaces(self.df)
+
+    def huella_fila(self, posicion: int) -> str:
+        """Huella (sha1) de una fila tal como viene en el CSV, para detectar cambios"""
+        return huella_valores(self.dataframe(texto=True).iloc[posicion].tolist())
+
+    def busqueda(self) -> IndiceBusqueda:
+        """Índice de autocompletado del snapshot (se construye en la primera búsqueda)"""
+        if self._busqueda is None:
+            with self._busqueda_lock:
+                if self._busqueda is None:
+                    inicio = time.time()
+                    self._busqueda = IndiceBusqueda(self.df)
+                    logger.info(f"🔍 Índice de búsqueda del snapshot {self.version[:10]} construido en {time.time() - inicio:.2f}s")
+        return self._busqueda
+
+    def contenido(self) -> bytes:
+        """Bytes del CSV original (se leen de disco si el snapshot vino persistido)"""
+        if self.raw is None and self.raw_path:
+            with open(self.raw_path, 'rb') as f:
+                self.raw = f.read()
+        return self.raw
+
+    def dataframe(self, texto: bool = False) -> pd.DataFrame:
+        """
+        Regresa el DataFrame del snapshot
+
+        Args:
+            texto: True para la variante todo-texto (valores N/A como '') con
+                   las mismas columnas proyectadas; se parsea una sola vez
+        """
+        if not texto:
+            return self.df
+        if self._df_texto is None:
+            self._df_texto = canonicalizar_encabezados(
+                leer_hoja_csv(self.contenido(), self.columnas, texto=True)
+            )
+        return self._df_texto
+
+
+class SheetSnapshotStore:
+    """
+    Servicio de snapshots de la hoja de enlaces compartido por todo el proceso
+
+    - La primera lectura descarga la hoja (bloquea una sola vez).
+    - Mientras el snapshot sea más joven que el TTL se sirve sin tocar la red.
+    - Al vencer el TTL se sirve el snapshot stale y se revalida en segundo
+      plano con If-None-Match / If-Modified-Since; si Google responde 304 o el
+      contenido es idéntico no se vuelve a parsear.
+    - Solo hay una revalidación en vuelo (single-flight): las lecturas que
+      necesitan esperar se unen a ella y las demás reciben el snapshot stale.
+    - Si se indica `directorio`, cada versión nueva se guarda en disco y se
+      conservan las últimas `max_versiones` para poder hacer rollback.
+    - Con `cache` (p. ej. CacheLRU con segundo nivel) la última descarga se
+      comparte entre workers y solo uno de ellos va a Google por TTL.
+    """
+
+    def __init__(self, url: str, ttl: int = 300, timeout: int = 15,
+                 preparar: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                 directorio: Optional[str] = None, max_versiones: int = 5, cache=None,
+                 preparacion: Optional[str] = None, columnas: Optional[Iterable[str]] = None):
+        self.url = url
+        # Proyección de columnas al parsear (None = todas)
+        self.columnas = frozenset(columnas) if columnas is not None else None
+        self.cache = cache
+        self.ttl = ttl
+        self.timeout = timeout
+        self.preparar = preparar
+        # Versión de `preparar`: el Arrow persistido con otra versión se vuelve a preparar desde el CSV
+        self.preparacion = preparacion
+        self.directorio = directorio
+        self.max_versiones = max_versiones
+        self.fijado = False
+        self._snapshot: Optional[SheetSnapshot] = None
+        self._lock = threading.Lock()
+        self._vuelo = SingleFlight()
+        self._stale = False
+        self.frescura_fila = 60
+        self._filas_confirmadas: Dict[str, tuple] = {}
+        self._consulta_fila_suspendida_hasta = 0.0
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'descargas': 0,
+            'no_modificado': 0,
+            'compartido': 0,
+            'errores': 0,
+            'ultimo_error': None,
+            'filas_confirmadas': 0,
+            'filas_cambiadas': 0,
+            'filas_sin_consulta': 0
+        }
+
+    # ----- API pública -----
+
+    def get_snapshot(self, forzar: bool = False) -> Optional[SheetSnapshot]:
+        """
+        Obtiene el snapshot vigente
+
+        Args:
+            forzar: revalidar contra Google antes de responder (bloqueante)
+
+        Returns:
+            SheetSnapshot o None si nunca se pudo descargar la hoja
+        """
+        snapshot = self._snapshot
+        if snapshot is None and not forzar:
+            snapshot = self.cargar_desde_disco()
+        if snapshot is None or (forzar and not self.fijado):
+            return self._refrescar(bloqueante=True)
+
+        if self.fijado:
+            self.stats['hits'] += 1
+        elif self._stale or time.time() - snapshot.validated_at >= self.ttl:
+            self.stats['stale_hits'] += 1
+            self._refrescar_en_segundo_plano()
+        else:
+            self.stats['hits'] += 1
+        return snapshot
+
+    def dataframe(self, texto: bool = False, forzar: bool = False) -> pd.DataFrame:
+        """
+        DataFrame compartido de la hoja de enlaces (no modificar in-place)
+
+        Raises:
+            RuntimeError: si no hay snapshot y la descarga falla
+        """
+        snapshot = self.get_snapshot(forzar=forzar)
+        if snapshot is None:
+            raise RuntimeError(f"No se pudo obtener la hoja de enlaces: {self.stats['ultimo_error']}")
+        return snapshot.dataframe(texto=texto)
+
+    def dataframe_para_id(self, user_id, texto: bool = False) -> pd.DataFrame:
+        """
+        DataFrame cuya fila de `user_id` está confirmada como vigente
+
+        En lugar de vaciar el cache, consulta en Google solo las filas de ese ID
+        y compara su huella con la del snapshot:
+        - igual: se usa el snapshot tal cual (sigue caliente para todos)
+        - distinta o sin poder consultar la fila: revalidación condicional del
+          snapshot completo (un 304 si nada cambió) y se usa el resultado
+        Una confirmación vale `frescura_fila` segundos por ID.
+        """
+        snapshot = self.get_snapshot()
+        if snapshot is None or self.fijado:
+            return self.dataframe(texto=texto)
+
+        clave = str(user_id).strip()
+        confirmada = self._filas_confirmadas.get(clave)
+        ahora = time.time()
+        if (ahora - snapshot.validated_at < self.frescura_fila or
+                (confirmada and confirmada[0] == snapshot.version and ahora - confirmada[1] < self.frescura_fila)):
+            return snapshot.dataframe(texto=texto)
+
+        vigente = self._fila_vigente(snapshot, clave)
+        if vigente:
+            self.stats['filas_confirmadas'] += 1
+            self._filas_confirmadas[clave] = (snapshot.version, ahora)
+            return snapshot.dataframe(texto=texto)
+
+        if vigente is None:
+            self.stats['filas_sin_consulta'] += 1
+        else:
+            self.stats['filas_cambiadas'] += 1
+            logger.info(f"🔄 La fila {clave} cambió en Google Sheets; revalidando snapshot")
+        # La fila cambió: ir directo a Google, sin la descarga compartida por otros workers
+        snapshot = self._refrescar(bloqueante=True, usar_compartido=False) or snapshot
+        self._filas_confirmadas[clave] = (snapshot.version, time.time())
+        return snapshot.dataframe(texto=texto)
+
+    def _fila_vigente(self, snapshot: SheetSnapshot, user_id: str) -> Optional[bool]:
+        """
+        Compara las filas de `user_id` en Google contra el snapshot
+
+        Returns:
+            True si coinciden, False si cambiaron, None si no se pudo consultar
+        """
+        if time.time() < self._consulta_fila_suspendida_hasta:
+            return None
+        # La consulta gviz usa la letra de la columna en la hoja completa, no en la proyección
+        encabezados = [canonicalizar_encabezado(e) for e in encabezados_csv(snapshot.contenido())]
+        if 'ID' not in encabezados:
+            return None
+        url = url_consulta_fila(self.url, encabezados.index('ID'), user_id)
+        if url is None:
+            return None
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url), timeout=self.timeout) as response:
+                remoto = leer_hoja_csv(response.read(), self.columnas, texto=True)
+        except Exception as e:
+            # La consulta por fila no está disponible para esta hoja; no insistir por 10 minutos
+            logger.warning(f"⚠️ Consulta de fila no disponible, se usará revalidación completa: {e}")
+            self._consulta_fila_suspendida_hasta = time.time() + 600
+            return None
+
+        if len(remoto.columns) != len(snapshot.dataframe(texto=True).columns):
+            return False
+        locales = sorted(snapshot.huella_fila(pos) for pos in snapshot.indice.buscar(user_id))
+        remotas = sorted(huella_valores(fila) for fila in remoto.itertuples(index=False))
+        return locales == remotas
+
+    def indice_para(self, df: pd.DataFrame) -> Optional[IndiceEnlaces]:
+        """
+        Índice del snapshot al que pertenece `df` (variante normal o de texto);
+        None si el DataFrame no proviene del snapshot vigente
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and (df is snapshot.df or df is snapshot._df_texto):
+            return snapshot.indice
+        return None
+
+    def busqueda_para(self, df: pd.DataFrame) -> Optional[IndiceBusqueda]:
+        """Índice de autocompletado del snapshot al que pertenece `df`"""
+        snapshot = self._snapshot
+        if snapshot is not None and (df is snapshot.df or df is snapshot._df_texto):
+            return snapshot.busqueda()
+        return None
+
+    def invalidar(self):
+        """Marca el snapshot como vencido; la siguiente lectura revalida en segundo plano"""
+        self._stale = True
+
+    def info(self) -> Dict:
+        """Estado del snapshot y contadores para monitoreo"""
+        snapshot = self._snapshot
+        info = dict(self.stats)
+        info['single_flight'] = dict(self._vuelo.stats)
+        if snapshot is not None:
+            info.update({
+                'version': snapshot.version,
+                'filas': len(snapshot.df),
+                'edad_segundos': round(time.time() - snapshot.validated_at, 1),
+                'cargado': snapshot.loaded_at,
+                'fijado': self.fijado,
+                'indice': snapshot.indice.resumen()
+            })
+        return info
+
+    # ----- Persistencia en disco -----
+
+    def listar_versiones(self) -> List[Dict]:
+        """Versiones persistidas, de la más reciente a la más antigua"""
+        if not self.directorio or not os.path.isdir(self.directorio):
+            return []
+        versiones = []
+        for nombre in sorted(os.listdir(self.directorio), reverse=True):
+            if nombre.startswith('.'):
+                continue
+            meta_path = os.path.join(self.directorio, nombre, ARCHIVO_META)
+            if not os.path.exists(meta_path):
+                continue
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+                meta['carpeta'] = nombre
+                versiones.append(meta)
+            except Exception as e:
+                logger.warning(f"⚠️ Snapshot dañado en {nombre}: {e}")
+        return versiones
+
+    def cargar_desde_disco(self, version: Optional[str] = None) -> Optional[SheetSnapshot]:
+        """
+        Carga la versión persistida más reciente (o la indicada) si aún no hay
+        snapshot en memoria; queda marcada como stale para revalidar en segundo plano
+        """
+        with self._lock:
+            if self._snapshot is not None and version is None:
+                return self._snapshot
+            for meta in self.listar_versiones():
+                if version is not None and not meta['version'].startswith(version):
+                    continue
+                try:
+                    snapshot = self._leer_version(meta)
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo cargar snapshot {meta['carpeta']}: {e}")
+                    continue
+                self._snapshot = snapshot
+                self._stale = True
+                return snapshot
+        return None
+
+    def restaurar_version(self, version: str) -> Optional[SheetSnapshot]:
+        """
+        Rollback: sirve una versión persistida y suspende la revalidación
+        hasta llamar a `liberar()` (para aislar una edición errónea en la hoja)
+        """
+        self.fijado = True
+        snapshot = self.cargar_desde_disco(version=version)
+        if snapshot is None:
+            self.fijado = False
+        else:
+            logger.info(f"⏪ Hoja de enlaces fijada en la versión {snapshot.version[:10]}")
+        return snapshot
+
+    def liberar(self):
+        """Quita el rollback y vuelve a revalidar contra Google"""
+        self.fijado = False
+        self._stale = True
+
+    def _leer_version(self, meta: Dict) -> SheetSnapshot:
+        """Lee una versión del disco: Arrow con memory-map, o el CSV si no hay Arrow"""
+        inicio = time.time()
+        carpeta = os.path.join(self.directorio, meta['carpeta'])
+        arrow_path = os.path.join(carpeta, ARCHIVO_ARROW)
+        csv_path = os.path.join(carpeta, ARCHIVO_CSV)
+
+        if HAS_PYARROW and os.path.exists(arrow_path) and meta.get('preparacion') == self.preparacion:
+            with pa.memory_map(arrow_path, 'r') as source:
+                df = pa_ipc.open_file(source).read_all().to_pandas()
+        else:
+            df = leer_hoja_csv(csv_path, self.columnas)
+            if self.preparar is not None:
+                df = self.preparar(df)
+
+        logger.info(f"💾 Snapshot {meta['version'][:10]} cargado desde disco: {len(df)} filas en {(time.time() - inicio) * 1000:.0f}ms")
+        return SheetSnapshot(
+            version=meta['version'],
+            raw=None,
+            raw_path=csv_path,
+            df=df,
+            etag=meta.get('etag'),
+            last_modified=meta.get('last_modified'),
+            validated_at=meta.get('descargado', 0),
+            columnas=self.columnas
+        )
+
+    def _persistir(self, snapshot: SheetSnapshot):
+        """Escribe la versión en una carpeta temporal y la publica con rename atómico"""
+        if not self.directorio:
+            return
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            carpeta = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{snapshot.version[:10]}"
+            tmp = tempfile.mkdtemp(prefix='.tmp_', dir=self.directorio)
+            with open(os.path.join(tmp, ARCHIVO_CSV), 'wb') as f:
+                f.write(snapshot.contenido())
+
+            formato = 'csv'
+            if HAS_PYARROW:
+                try:
+                    tabla = pa.Table.from_pandas(snapshot.df, preserve_index=False)
+                    with pa.OSFile(os.path.join(tmp, ARCHIVO_ARROW), 'wb') as sink:
+                        with pa_ipc.new_file(sink, tabla.schema) as writer:
+                            writer.write_table(tabla)
+                    formato = 'arrow'
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo convertir el snapshot a Arrow, se guarda solo CSV: {e}")
+
+            with open(os.path.join(tmp, ARCHIVO_META), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': snapshot.version,
+                    'etag': snapshot.etag,
+                    'last_modified': snapshot.last_modified,
+                    'descargado': snapshot.loaded_at,
+                    'filas': len(snapshot.df),
+                    'formato': formato,
+                    'preparacion': self.preparacion
+                }, f, indent=2)
+            os.replace(tmp, os.path.join(self.directorio, carpeta))
+            snapshot.raw_path = os.path.join(self.directorio, carpeta, ARCHIVO_CSV)
+            self._podar_versiones()
+        except Exception as e:
+            logger.error(f"❌ Error persistiendo snapshot de hoja de enlaces: {e}")
+
+    def _podar_versiones(self):
+        """Conserva solo las últimas `max_versiones` versiones en disco"""
+        for meta in self.listar_versiones()[self.max_versiones:]:
+            shutil.rmtree(os.path.join(self.directorio, meta['carpeta']), ignore_errors=True)
+
+    # ----- Refresco -----
+
+    def _refrescar_en_segundo_plano(self):
+        """Lanza la revalidación en un hilo, salvo que ya haya una en vuelo"""
+        if self._vuelo.en_vuelo(CLAVE_REFRESCO):
+            return
+        threading.Thread(
+            target=self._refrescar, name='sheet-snapshot-refresh', daemon=True
+        ).start()
+
+    def _refrescar(self, bloqueante: bool = False, usar_compartido: bool = True) -> Optional[SheetSnapshot]:
+        """
+        Revalida el snapshot contra Google con single-flight: si ya hay una
+        revalidación en curso, se espera su resultado en lugar de descargar otra vez
+        """
+        return self._vuelo.do(CLAVE_REFRESCO, lambda: self._refrescar_ahora(
+            precalentar=not bloqueante, usar_compartido=usar_compartido))
+
+    def _refrescar_ahora(self, precalentar: bool, usar_compartido: bool = True) -> Optional[SheetSnapshot]:
+        """Descarga condicional; ante error conserva el snapshot anterior"""
+        if self.fijado and self._snapshot is not None:
+            return self._snapshot
+        try:
+            snapshot = self._descargar(self._snapshot, usar_compartido=usar_compartido)
+            if snapshot is not self._snapshot:
+                self._persistir(snapshot)
+                if precalentar:
+                    # En segundo plano: dejar listo el autocompletado antes de publicar
+                    snapshot.busqueda()
+            self._snapshot = snapshot
+            self._stale = False
+        except Exception as e:
+            self.stats['errores'] += 1
+            self.stats['ultimo_error'] = str(e)
+            logger.error(f"❌ Error revalidando hoja de enlaces: {e}")
+        return self._snapshot
+
+    def _descargar(self, actual: Optional[SheetSnapshot], usar_compartido: bool = True) -> SheetSnapshot:
+        """
+        GET condicional de la hoja; solo parsea si el contenido cambió.
+        Si otro worker ya revalidó la hoja dentro del TTL (cache compartido),
+        se reutiliza su descarga en lugar de ir a Google.
+        """
+        raw, etag, last_modified, validado = self._leer_compartido(actual) if usar_compartido else (None,) * 4
+        if raw is None:
+            req = urllib.request.Request(self.url)
+            if actual is not None:
+                if actual.etag:
+                    req.add_header('If-None-Match', actual.etag)
+                if actual.last_modified:
+                    req.add_header('If-Modified-Since', actual.last_modified)
+
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                    raw = response.read()
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or actual is None:
+                    raise
+                raw, etag, last_modified = actual.contenido(), actual.etag, actual.last_modified
+            validado = time.time()
+            self._publicar_compartido(raw, etag, last_modified, validado)
+
+        version = hashlib.sha1(raw).hexdigest()
+        if actual is not None and actual.version == version:
+            self.stats['no_modificado'] += 1
+            actual.etag = etag or actual.etag
+            actual.last_modified = last_modified or actual.last_modified
+            actual.validated_at = validado
+            return actual
+
+        inicio = time.time()
+        df = leer_hoja_csv(raw, self.columnas)
+        if self.preparar is not None:
+            df = self.preparar(df)
+        self.stats['descargas'] += 1
+        logger.info(f"✅ Snapshot de hoja de enlaces {version[:10]} cargado: {len(df)} filas en {time.time() - inicio:.2f}s")
+        return SheetSnapshot(version=version, raw=raw, df=df, etag=etag, last_modified=last_modified,
+                             validated_at=validado, columnas=self.columnas)
+
+    def _leer_compartido(self, actual: Optional[SheetSnapshot]):
+        """Descarga reciente publicada por otro proceso en el cache compartido"""
+        vacio = (None, None, None, None)
+        if self.cache is None:
+            return vacio
+        entrada = self.cache.get(CLAVE_REFRESCO)
+        if not entrada or time.time() - entrada['validado'] >= self.ttl:
+            return vacio
+        if actual is not None and entrada['validado'] <= actual.validated_at:
+            return vacio
+        self.stats['compartido'] += 1
+        return entrada['raw'], entrada['etag'], entrada['last_modified'], entrada['validado']
+
+    def _publicar_compartido(self, raw: bytes, etag, last_modified, validado: float):
+        """Publica la descarga para que los demás workers no vuelvan a ir a Google"""
+        if self.cache is None:
+            return
+        self.cache.set(CLAVE_REFRESCO, {
+            'raw': raw,
+            'etag': etag,
+            'last_modified': last_modified,
+            'validado': validado
+        }, ttl=self.ttl)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Coalescencia de peticiones (single-flight) para Fangio Telecom
+Una sola ejecución en vuelo por clave; los demás hilos esperan su resultado
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Llamada:
+    """Ejecución en curso para una clave"""
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+        self.esperando = 0
+
+
+class SingleFlight:
+    """
+    Garantiza que por cada clave haya como máximo una ejecución en vuelo
+
+    Si llega una segunda llamada con la misma clave mientras la primera sigue
+    corriendo, espera y recibe el mismo resultado (o la misma excepción) en
+    lugar de repetir el trabajo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._llamadas: Dict[Hashable, _Llamada] = {}
+        self.stats = {
+            'ejecuciones': 0,
+            'esperas_coalescidas': 0,
+            'errores': 0
+        }
+
+    def do(self, clave: Hashable, funcion: Callable[[], Any]) -> Any:
+        """Ejecuta `funcion` o se une a la ejecución en vuelo de `clave`"""
+        with self._lock:
+            llamada = self._llamadas.get(clave)
+            if llamada is not None:
+                llamada.esperando += 1
+                self.stats['esperas_coalescidas'] += 1
+                lider = False
+            else:
+                llamada = _Llamada()
+                self._llamadas[clave] = llamada
+                self.stats['ejecuciones'] += 1
+                lider = True
+
+        if not lider:
+            llamada.evento.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado
+
+        try:
+            llamada.resultado = funcion()
+            return llamada.resultado
+        except BaseException as e:
+            llamada.error = e
+            self.stats['errores'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._llamadas.pop(clave, None)
+            llamada.evento.set()
+
+    def en_vuelo(self, clave: Hashable) -> bool:
+        """True si hay una ejecución en curso para la clave"""
+        with self._lock:
+            return clave in self._llamadas
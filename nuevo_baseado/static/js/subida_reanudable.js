@@ -0,0 +1,135 @@
+// SUBIDAS REANUDABLES POR BLOQUES (KMZ, ZIP, FOTOS)
+// Manda el archivo en bloques a /subidas_reanudables; si la conexión se cae,
+// pregunta al servidor el offset y sigue desde ahí. El upload_id queda en
+// localStorage, así que también se reanuda después de recargar la página.
+// Regresa el upload_id para mandarlo como "subida:<campo>" en el formulario.
+
+const SUBIDA_REINTENTOS = 8;
+
+function claveSubidaReanudable(file) {
+    return `subida_reanudable:${file.name}:${file.size}:${file.lastModified}`;
+}
+
+function esperarSubida(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+async function estadoSubidaReanudable(uploadId) {
+    const response = await fetch(`/subidas_reanudables/${uploadId}`);
+    if (response.status === 404) return null;
+    if (!response.ok) throw new Error(`Error consultando la subida (${response.status})`);
+    return response.json();
+}
+
+async function abrirSubidaReanudable(file) {
+    const response = await fetch('/subidas_reanudables', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ nombre: file.name, tamano: file.size })
+    });
+    const data = await response.json();
+    if (!response.ok || !data.success) throw new Error(data.message || 'No se pudo iniciar la subida');
+    return data;
+}
+
+async function subirReanudable(file, onProgreso) {
+    const clave = claveSubidaReanudable(file);
+    let estado = null;
+    const guardado = localStorage.getItem(clave);
+    if (guardado) {
+        estado = await estadoSubidaReanudable(guardado);
+        if (estado) console.log(`🔁 Reanudando ${file.name} desde ${estado.offset} bytes`);
+    }
+    if (!estado) {
+        estado = await abrirSubidaReanudable(file);
+        localStorage.setItem(clave, estado.upload_id);
+    }
+    const uploadId = estado.upload_id;
+    const tamanoBloque = estado.tamano_bloque || 4 * 1024 * 1024;
+    let offset = estado.offset;
+    let fallos = 0;
+    let conflictos = 0;
+
+    while (!estado.completa) {
+        if (onProgreso) onProgreso(offset, file.size);
+        const fin = Math.min(offset + tamanoBloque, file.size);
+        try {
+            const response = await fetch(`/subidas_reanudables/${uploadId}`, {
+                method: 'PUT',
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Range': `bytes ${offset}-${fin - 1}/${file.size}`
+                },
+                body: file.slice(offset, fin)
+            });
+            const data = await response.json();
+            if (response.ok) {
+                estado = data;
+                offset = data.offset;
+                fallos = 0;
+                conflictos = 0;
+                continue;
+            }
+            if (response.status === 409 && data.offset !== undefined) {
+                // El servidor tiene otro offset (p. ej. un bloque que llegó a medias). Si no
+                // avanzó, otro bloque de esta subida sigue en curso: espera antes de reintentar
+                if (data.offset === offset) {
+                    if (++conflictos > SUBIDA_REINTENTOS) throw new Error(data.message || `Error subiendo ${file.name}`);
+                    console.warn(`⏳ Otro bloque de ${file.name} está en curso, reintento ${conflictos}`);
+                    await esperarSubida(Math.min(30000, 1000 * 2 ** conflictos));
+                }
+                // Se toma el estado del servidor (offset y si ya está completa) antes de reenviar
+                const actual = await estadoSubidaReanudable(uploadId);
+                if (!actual) {
+                    localStorage.removeItem(clave);
+                    throw new Error(`La subida de ${file.name} ya no existe en el servidor`);
+                }
+                estado = actual;
+                offset = actual.offset;
+                continue;
+            }
+            localStorage.removeItem(clave);
+            throw new Error(data.message || `Error subiendo ${file.name}`);
+        } catch (error) {
+            if (!(error instanceof TypeError) || ++fallos > SUBIDA_REINTENTOS) throw error;
+            // Error de red: espera y pregunta cuánto llegó antes de seguir
+            console.warn(`⚠️ Conexión interrumpida subiendo ${file.name}, reintento ${fallos}`);
+            await esperarSubida(Math.min(30000, 1000 * 2 ** fallos));
+            try {
+                const actual = await estadoSubidaReanudable(uploadId);
+                if (actual) { estado = actual; offset = actual.offset; }
+            } catch (e) {
+                // Sigue sin conexión: el siguiente intento lo vuelve a preguntar
+            }
+        }
+    }
+    if (onProgreso) onProgreso(file.size, file.size);
+    localStorage.removeItem(clave);
+    console.log(`✅ ${file.name} subido (${uploadId})`);
+    return uploadId;
+}
+
+// FormData de un formulario con sus archivos ya subidos por bloques: cada archivo
+// va como "subida:<campo>" = upload_id. onProgreso recibe los bytes enviados y el
+// total de todos los archivos del formulario.
+async function formularioReanudable(form, onProgreso) {
+    const entradas = Array.from(new FormData(form).entries());
+    // Un input de archivo vacío llega como un File sin nombre: se omite
+    const archivos = entradas.filter(([, valor]) => valor instanceof File && valor.name);
+    const total = archivos.reduce((suma, [, file]) => suma + file.size, 0);
+    const formData = new FormData();
+    let previos = 0;
+    for (const [campo, valor] of entradas) {
+        if (!(valor instanceof File)) {
+            formData.append(campo, valor);
+            continue;
+        }
+        if (!valor.name) continue;
+        const uploadId = await subirReanudable(valor, enviados => {
+            if (onProgreso) onProgreso(previos + enviados, total);
+        });
+        previos += valor.size;
+        formData.append(`subida:${campo}`, uploadId);
+    }
+    return formData;
+}
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro de plantillas Excel compiladas en memoria
+Cada plantilla (PtP, PtMP, diseño de solución) se lee, valida y analiza una
+sola vez: firma, hojas requeridas, hojas y celdas combinadas/geometría
+(xlsx_patch). Los llenados trabajan sobre una copia de la versión en memoria
+y la plantilla se recarga sola cuando cambia el hash del archivo.
+"""
+
+import io
+import os
+import time
+import hashlib
+import logging
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import openpyxl
+
+from xlsx_patch import PlantillaNoParcheable, PlantillaXlsx
+
+logger = logging.getLogger(__name__)
+
+SIGNATURA_XLSX = b'PK\x03\x04'
+TAMANO_MINIMO = 1000  # bytes
+# Copias recientes que se siguen reconociendo como clones de una plantilla
+MAX_CLONES = 256
+
+
+class PlantillaInvalida(ValueError):
+    """La plantilla no existe, está dañada o le faltan hojas"""
+
+
+class PlantillaCompilada:
+    """Contenido, huella y metadatos de una versión de la plantilla"""
+
+    def __init__(self, ruta: str, contenido: bytes, firma_archivo: Tuple[int, int]):
+        self.ruta = ruta
+        self.contenido = contenido
+        self.firma_archivo = firma_archivo
+        self.huella = hashlib.sha256(contenido).hexdigest()
+        self.cargada = time.time()
+        if contenido[:4] != SIGNATURA_XLSX:
+            raise PlantillaInvalida(f"{os.path.basename(ruta)} no es un archivo Excel válido (.xlsx)")
+        if len(contenido) < TAMANO_MINIMO:
+            raise PlantillaInvalida(f"{os.path.basename(ruta)} es muy pequeña ({len(contenido)} bytes), puede estar corrupta")
+        try:
+            self.parche: Optional[PlantillaXlsx] = PlantillaXlsx(contenido)
+            self.hojas: List[str] = list(self.parche.nombres_hojas)
+        except (PlantillaNoParcheable, KeyError) as e:
+            # Se puede llenar con Excel/openpyxl, pero no con el parche directo
+            logger.warning(f"⚠️ {os.path.basename(ruta)} no admite parche directo: {e}")
+            self.parche = None
+            self.hojas = self._hojas_openpyxl(contenido)
+        except zipfile.BadZipFile as e:
+            raise PlantillaInvalida(f"{os.path.basename(ruta)} está dañada: {e}") from e
+
+    @staticmethod
+    def _hojas_openpyxl(contenido: bytes) -> List[str]:
+        wb = openpyxl.load_workbook(io.BytesIO(contenido), read_only=True)
+        try:
+            return list(wb.sheetnames)
+        finally:
+            wb.close()
+
+    def info(self) -> Dict:
+        return {
+            'ruta': self.ruta,
+            'sha256': self.huella,
+            'bytes': len(self.contenido),
+            'hojas': self.hojas,
+            'parche_directo': self.parche is not None,
+            'cargada': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.cargada)),
+        }
+
+
+class RegistroPlantillas:
+    """
+    Plantillas por nombre lógico ('ptp', 'ptmp', 'diseno_solucion', ...)
+
+    Uso:
+        registro.registrar('ptp', ruta, hojas_requeridas=[...])
+        registro.obtener('ptp')             # valida y compila la primera vez
+        registro.clonar('ptp', salida)      # copia de la versión en memoria
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rutas: Dict[str, str] = {}
+        self._requeridas: Dict[str, Tuple[str, ...]] = {}
+        self._compiladas: Dict[str, PlantillaCompilada] = {}
+        self._clones: 'OrderedDict[str, Tuple[PlantillaCompilada, Tuple[int, int]]]' = OrderedDict()
+        self.stats = {'compilaciones': 0, 'recargas': 0, 'clones': 0}
+
+    def registrar(self, nombre: str, ruta: str, hojas_requeridas: Iterable[str] = ()):
+        """Declara una plantilla; no lee el archivo hasta el primer uso"""
+        with self._lock:
+            self._rutas[nombre] = os.path.abspath(ruta)
+            self._requeridas[nombre] = tuple(hojas_requeridas)
+
+    def ruta(self, nombre: str) -> str:
+        return self._rutas.get(nombre, os.path.abspath(nombre))
+
+    @staticmethod
+    def _firma(ruta: str) -> Tuple[int, int]:
+        estado = os.stat(ruta)
+        return estado.st_mtime_ns, estado.st_size
+
+    def _compilada(self, ruta: str) -> PlantillaCompilada:
+        """Versión compilada vigente de `ruta` (recarga si cambió el hash)"""
+        try:
+            firma = self._firma(ruta)
+        except OSError:
+            raise PlantillaInvalida(f"Falta la plantilla en la ruta esperada: {ruta}")
+        with self._lock:
+            actual = self._compiladas.get(ruta)
+            if actual is not None and actual.firma_archivo == firma:
+                return actual
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            if actual is not None and hashlib.sha256(contenido).hexdigest() == actual.huella:
+                # Solo cambió la fecha del archivo
+                actual.firma_archivo = firma
+                return actual
+            nueva = PlantillaCompilada(ruta, contenido, firma)
+            self._compiladas[ruta] = nueva
+            if actual is None:
+                self.stats['compilaciones'] += 1
+                logger.info(f"📑 Plantilla compilada: {os.path.basename(ruta)} ({len(nueva.hojas)} hojas)")
+            else:
+                self.stats['recargas'] += 1
+                logger.info(f"🔄 Plantilla recargada: {os.path.basename(ruta)} ({actual.huella[:8]} -> {nueva.huella[:8]})")
+            return nueva
+
+    def obtener(self, nombre: str) -> PlantillaCompilada:
+        """
+        Plantilla validada y compilada
+
+        Raises:
+            PlantillaInvalida: si no existe, está dañada o le faltan hojas requeridas
+        """
+        compilada = self._compilada(self.ruta(nombre))
+        faltantes = [h for h in self._requeridas.get(nombre, ()) if h not in compilada.hojas]
+        if faltantes:
+            raise PlantillaInvalida(f"La hoja '{faltantes[0]}' no existe en la plantilla de Excel.")
+        return compilada
+
+    def clonar(self, nombre: str, destino: str) -> str:
+        """Escribe en `destino` una copia de la versión en memoria de la plantilla"""
+        compilada = self.obtener(nombre)
+        directorio = os.path.dirname(os.path.abspath(destino))
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(compilada.contenido)
+        os.replace(temporal, destino)
+        destino = os.path.abspath(destino)
+        with self._lock:
+            # Se guarda la versión clonada: si la plantilla se recarga, el clon sigue siendo de esta
+            self._clones[destino] = (compilada, self._firma(destino))
+            self._clones.move_to_end(destino)
+            while len(self._clones) > MAX_CLONES:
+                self._clones.popitem(last=False)
+            self.stats['clones'] += 1
+        return destino
+
+    def exportar_clones(self, rutas: Iterable[str]) -> List[Tuple[str, str, str, Tuple[int, int]]]:
+        """
+        (destino, plantilla, huella, firma) de las rutas que son clones, para
+        que otro proceso (pool de llenado) los reconozca con adoptar_clones
+        """
+        exportados = []
+        with self._lock:
+            for ruta in rutas:
+                clon = self._clones.get(os.path.abspath(ruta))
+                if clon is not None:
+                    compilada, firma = clon
+                    exportados.append((os.path.abspath(ruta), compilada.ruta, compilada.huella, firma))
+        return exportados
+
+    def adoptar_clones(self, clones: Iterable[Tuple[str, str, str, Tuple[int, int]]]):
+        """
+        Registra clones hechos en otro proceso; la plantilla se compila aquí una
+        vez y solo se adopta si es la misma versión que se clonó
+        """
+        for destino, ruta, huella, firma in clones:
+            try:
+                compilada = self._compilada(ruta)
+            except PlantillaInvalida:
+                continue
+            if compilada.huella != huella:
+                # La plantilla cambió desde el clon: parche_para relee el archivo
+                continue
+            with self._lock:
+                self._clones[destino] = (compilada, firma)
+                self._clones.move_to_end(destino)
+                while len(self._clones) > MAX_CLONES:
+                    self._clones.popitem(last=False)
+
+    def parche_para(self, ruta: str) -> Optional[PlantillaXlsx]:
+        """
+        Plantilla ya analizada para abrir `ruta` sin volver a leerla: la ruta
+        de una plantilla registrada o un clon que no se ha modificado
+        """
+        ruta = os.path.abspath(ruta)
+        with self._lock:
+            clon = self._clones.get(ruta)
+        try:
+            if clon is not None:
+                compilada, firma = clon
+                return compilada.parche if self._firma(ruta) == firma else None
+            if ruta in self._rutas.values():
+                return self._compilada(ruta).parche
+        except (OSError, PlantillaInvalida):
+            return None
+        return None
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                'plantillas': {
+                    nombre: (self._compiladas[ruta].info() if ruta in self._compiladas else {'ruta': ruta, 'cargada': None})
+                    for nombre, ruta in self._rutas.items()
+                },
+                'clones_recientes': len(self._clones),
+                **self.stats
+            }
+
+
+# Registro compartido por el proceso
+registro_plantillas = RegistroPlantillas()
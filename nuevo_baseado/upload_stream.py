@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ingesta de subidas en streaming
+Werkzeug escribe cada archivo de un multipart en el objeto que regresa
+Request._get_file_stream; por defecto es un SpooledTemporaryFile que después
+FileStorage.save vuelve a copiar y que cualquier hash vuelve a leer. Con
+PeticionStreaming ese objeto es una SubidaEnCurso: el cuerpo llega por
+bloques a un temporal en Temp/subidas, sha256 y md5 se calculan en la misma
+pasada, el tipo real se reconoce por los primeros bytes y la petición se
+corta con 413 en cuanto el archivo pasa el límite de su tipo, sin esperar a
+recibirlo completo.
+
+guardar_subida(archivo, destino) mueve el temporal al destino con os.replace
+(sin copiar) y regresa los metadatos; metadatos_archivo(ruta) los devuelve
+después a quien necesite el hash (FileManager, FileCache, la huella de la
+caché de generaciones) mientras el archivo no haya cambiado.
+
+FANGIO_LIMITE_<TIPO>_MB = límite por tipo (IMAGEN, PDF, KMZ, ZIP, EXCEL, WORD, DWG, OTRO)
+FANGIO_SUBIDAS_DIR = carpeta de temporales (en el mismo disco que los destinos)
+"""
+
+import os
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+try:
+    from flask import Request
+    from werkzeug.exceptions import RequestEntityTooLarge
+    HAS_FLASK = True
+except ImportError:
+    RequestEntityTooLarge = ValueError
+    HAS_FLASK = False
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_SUBIDAS = os.environ.get(
+    'FANGIO_SUBIDAS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Temp', 'subidas')
+)
+
+MB = 1024 * 1024
+_BLOQUE = 1 << 20
+_BYTES_FIRMA = 16
+
+_LIMITES_MB = {
+    'imagen': 20,
+    'pdf': 50,
+    'kmz': 50,
+    'excel': 50,
+    'word': 50,
+    'dwg': 100,
+    'zip': 500,
+    'otro': 100,
+}
+LIMITES_POR_TIPO = {
+    tipo: int(float(os.environ.get(f'FANGIO_LIMITE_{tipo.upper()}_MB', mb)) * MB)
+    for tipo, mb in _LIMITES_MB.items()
+}
+
+_TIPOS_POR_EXTENSION = {
+    '.jpg': 'imagen', '.jpeg': 'imagen', '.png': 'imagen', '.gif': 'imagen',
+    '.bmp': 'imagen', '.webp': 'imagen',
+    '.pdf': 'pdf',
+    '.kmz': 'kmz', '.kml': 'kmz',
+    '.zip': 'zip',
+    '.xlsx': 'excel', '.xlsm': 'excel', '.xls': 'excel',
+    '.docx': 'word', '.doc': 'word',
+    '.dwg': 'dwg',
+}
+
+# (firma, desplazamiento, tipo, mime); 'contenedor' se precisa con la extensión
+_FIRMAS = (
+    (b'%PDF-', 0, 'pdf', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'imagen', 'image/png'),
+    (b'\xff\xd8\xff', 0, 'imagen', 'image/jpeg'),
+    (b'GIF8', 0, 'imagen', 'image/gif'),
+    (b'WEBP', 8, 'imagen', 'image/webp'),
+    (b'AC10', 0, 'dwg', 'image/vnd.dwg'),
+    (b'PK\x03\x04', 0, 'contenedor', 'application/zip'),
+    (b'PK\x05\x06', 0, 'contenedor', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 0, 'contenedor', 'application/x-ole-storage'),
+)
+
+
+def tipo_por_extension(nombre: Optional[str]) -> str:
+    return _TIPOS_POR_EXTENSION.get(os.path.splitext(nombre or '')[1].lower(), 'otro')
+
+
+def detectar_tipo(cabecera: bytes, nombre: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (tipo, mime) según los primeros bytes; (None, None) si no hay firma conocida
+
+    ZIP y OLE son contenedores de KMZ, xlsx, docx, xls y doc: el tipo lo
+    decide la extensión y, si no es ninguno de esos, queda como zip/otro.
+    """
+    por_extension = tipo_por_extension(nombre)
+    for firma, desplazamiento, tipo, mime in _FIRMAS:
+        if cabecera[desplazamiento:desplazamiento + len(firma)] != firma:
+            continue
+        if tipo == 'contenedor':
+            if mime == 'application/zip':
+                tipo = por_extension if por_extension in ('kmz', 'excel', 'word') else 'zip'
+            else:
+                tipo = por_extension if por_extension in ('excel', 'word') else 'otro'
+        return tipo, mime
+    return None, None
+
+
+class SubidaExcedida(RequestEntityTooLarge):
+    """Archivo que pasó el límite de su tipo (413)"""
+
+
+class SubidaEnCurso:
+    """
+    Archivo de una subida escrito por bloques a un temporal mientras llega
+
+    Werkzeug lo llena con write() y lo rebobina al terminar la parte; para
+    el resto de la app se comporta como el stream de un FileStorage (read,
+    seek, close). Con entregar() el temporal se mueve al destino.
+    """
+
+    def __init__(self, nombre: Optional[str] = None, content_type: Optional[str] = None,
+                 content_length: Optional[int] = None, directorio: str = DIRECTORIO_SUBIDAS):
+        self.nombre = nombre or ''
+        self.content_type = content_type
+        self.tipo_extension = tipo_por_extension(self.nombre)
+        self.tipo = self.tipo_extension
+        self.mime = None
+        self.limite = LIMITES_POR_TIPO[self.tipo]
+        self.tamano = 0
+        self.entregada = False
+        self._cabecera = b''
+        self._sha256 = hashlib.sha256()
+        self._md5 = hashlib.md5()
+        self._metadatos = None
+        if content_length and content_length > self.limite:
+            raise self._excedida(content_length)
+        os.makedirs(directorio, exist_ok=True)
+        fd, self.ruta = tempfile.mkstemp(prefix='subida_', suffix='.part', dir=directorio)
+        self._archivo = os.fdopen(fd, 'w+b')
+
+    def _excedida(self, tamano: int) -> SubidaExcedida:
+        return SubidaExcedida(
+            f"{self.nombre or 'El archivo'} supera el límite de {self.limite // MB} MB "
+            f"para archivos {self.tipo} ({tamano / MB:.1f} MB o más)"
+        )
+
+    def _reconocer(self):
+        tipo, mime = detectar_tipo(self._cabecera, self.nombre)
+        if tipo is None:
+            return
+        self.tipo, self.mime = tipo, mime
+        # Un contenido que no coincide con su extensión no escapa del límite más estricto
+        self.limite = min(LIMITES_POR_TIPO[tipo], LIMITES_POR_TIPO[self.tipo_extension])
+        if tipo != self.tipo_extension:
+            logger.warning(f"⚠️ {self.nombre}: el contenido es {tipo} ({mime}), "
+                           f"la extensión dice {self.tipo_extension}")
+
+    # ----- escritura (werkzeug) -----
+
+    def write(self, datos) -> int:
+        if len(self._cabecera) < _BYTES_FIRMA:
+            self._cabecera += bytes(datos[:_BYTES_FIRMA - len(self._cabecera)])
+            if len(self._cabecera) >= _BYTES_FIRMA:
+                self._reconocer()
+        if self.tamano + len(datos) > self.limite:
+            self.close()
+            raise self._excedida(self.tamano + len(datos))
+        self._sha256.update(datos)
+        self._md5.update(datos)
+        self.tamano += len(datos)
+        return self._archivo.write(datos)
+
+    def metadatos(self) -> Dict:
+        """Hash, tamaño y tipo calculados mientras llegaba el archivo"""
+        if self._metadatos is None:
+            if len(self._cabecera) < _BYTES_FIRMA:
+                self._reconocer()
+            self._metadatos = {
+                'nombre': self.nombre,
+                'tipo': self.tipo,
+                'tipo_extension': self.tipo_extension,
+                'mime': self.mime or self.content_type,
+                'tamano_bytes': self.tamano,
+                'sha256': self._sha256.hexdigest(),
+                'md5': self._md5.hexdigest(),
+            }
+        return self._metadatos
+
+    # ----- lectura (resto de la app) -----
+
+    def _lectura(self):
+        if self._archivo is None or self._archivo.closed:
+            # Ya entregada: se lee desde donde quedó
+            self._archivo = open(self.ruta, 'rb')
+        return self._archivo
+
+    def read(self, n: int = -1) -> bytes:
+        return self._lectura().read(n)
+
+    def readline(self, n: int = -1) -> bytes:
+        return self._lectura().readline(n)
+
+    def seek(self, posicion: int, desde: int = 0) -> int:
+        return self._lectura().seek(posicion, desde)
+
+    def tell(self) -> int:
+        return self._lectura().tell()
+
+    def flush(self):
+        if self._archivo is not None and not self._archivo.closed:
+            self._archivo.flush()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return not self.entregada
+
+    def __iter__(self):
+        return iter(self._lectura())
+
+    @property
+    def closed(self) -> bool:
+        return self._archivo is None or self._archivo.closed
+
+    # ----- entrega -----
+
+    def entregar(self, destino: str) -> Dict:
+        """
+        Deja el archivo en destino y regresa sus metadatos (con 'ruta')
+
+        La primera entrega mueve el temporal; si el mismo archivo se guarda
+        otra vez se copia desde la entrega anterior, sin volver a hashear.
+        """
+        destino = os.path.abspath(destino)
+        metadatos = self.metadatos()
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        if self.entregada:
+            shutil.copyfile(self.ruta, destino)
+        else:
+            _mover(self.ruta, destino)
+            self.ruta = destino
+            self.entregada = True
+        registrar_metadatos(destino, metadatos)
+        return dict(metadatos, ruta=destino)
+
+    def reubicado(self, ruta: str):
+        """Avisa que el archivo entregado terminó en otra ruta (p. ej. enlazado desde el almacén)"""
+        self.ruta = os.path.abspath(ruta)
+        registrar_metadatos(self.ruta, self.metadatos())
+
+    def close(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        if not self.entregada:
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+
+
+def _mover(origen: str, destino: str):
+    try:
+        os.replace(origen, destino)
+    except OSError:
+        # Otro disco: move copia y borra
+        shutil.move(origen, destino)
+
+
+def guardar_subida(archivo, destino: str) -> Dict:
+    """
+    Reemplazo de FileStorage.save: deja la subida en destino y regresa sus metadatos
+
+    Con PeticionStreaming (o una subida reanudable) el archivo ya está en
+    disco y hasheado, así que solo se mueve o se copia. Si el stream es otro (p. ej. una petición armada sin
+    PeticionStreaming) se copia en una sola pasada que también hashea.
+    """
+    flujo = archivo.stream
+    if hasattr(flujo, 'entregar'):
+        return flujo.entregar(destino)
+    ingesta = SubidaEnCurso(archivo.filename, archivo.content_type,
+                            directorio=os.path.dirname(os.path.abspath(destino)))
+    try:
+        try:
+            flujo.seek(0)
+        except (AttributeError, OSError):
+            pass
+        for bloque in iter(lambda: flujo.read(_BLOQUE), b''):
+            ingesta.write(bloque)
+        return ingesta.entregar(destino)
+    finally:
+        ingesta.close()
+
+
+# ----- metadatos por ruta -----
+
+_MAX_METADATOS = 4096
+_metadatos: 'OrderedDict[str, Tuple[int, int, Dict]]' = OrderedDict()
+_metadatos_lock = threading.Lock()
+
+
+def registrar_metadatos(ruta: str, metadatos: Dict):
+    ruta = os.path.abspath(ruta)
+    st = os.stat(ruta)
+    with _metadatos_lock:
+        _metadatos[ruta] = (st.st_size, st.st_mtime_ns, metadatos)
+        _metadatos.move_to_end(ruta)
+        while len(_metadatos) > _MAX_METADATOS:
+            _metadatos.popitem(last=False)
+
+
+def metadatos_archivo(ruta: str) -> Optional[Dict]:
+    """Metadatos de una subida guardada en ruta; None si no se conocen o el archivo cambió"""
+    ruta = os.path.abspath(ruta)
+    with _metadatos_lock:
+        entrada = _metadatos.get(ruta)
+    if entrada is None:
+        return None
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        st = None
+    if st is None or (st.st_size, st.st_mtime_ns) != entrada[:2]:
+        with _metadatos_lock:
+            _metadatos.pop(ruta, None)
+        return None
+    return entrada[2]
+
+
+def limpiar_temporales(edad_maxima: float = 6 * 3600, directorio: str = DIRECTORIO_SUBIDAS) -> int:
+    """Borra temporales de subidas interrumpidas (proceso caído a media petición)"""
+    if not os.path.isdir(directorio):
+        return 0
+    limite = time.time() - edad_maxima
+    borrados = 0
+    for entrada in os.scandir(directorio):
+        try:
+            if entrada.name.endswith('.part') and entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+                borrados += 1
+        except OSError:
+            pass
+    if borrados:
+        logger.info(f"🧹 {borrados} temporales de subidas interrumpidas borrados")
+    return borrados
+
+
+if HAS_FLASK:
+    class PeticionStreaming(Request):
+        """Request de Flask cuyos archivos se escriben con SubidaEnCurso"""
+
+        def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+            return SubidaEnCurso(filename, content_type, content_length)
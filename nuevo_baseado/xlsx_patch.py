@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Llenado de plantillas xlsx parcheando el XML directamente
+El xlsx es un zip: solo se reescriben las hojas con celdas escritas,
+sharedStrings y (si hace falta) workbook.xml; estilos, dibujos, imágenes,
+controles de formulario y el resto de las hojas se copian byte por byte sin
+descomprimir ni recomprimir.
+"""
+
+import io
+import re
+import math
+import struct
+import logging
+import zipfile
+import datetime as dt
+import posixpath
+from typing import Any, Dict, List, Optional, Tuple, Union
+from xml.sax.saxutils import escape, unescape
+
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import column_index_from_string, range_boundaries
+from openpyxl.utils.cell import coordinate_from_string
+
+logger = logging.getLogger(__name__)
+
+_RE_SHEET_DATA = re.compile(r'<sheetData\s*/>|<sheetData>(.*?)</sheetData>', re.S)
+_RE_FILA = re.compile(r'<row\b([^>]*?)(?:/>|>(.*?)</row>)', re.S)
+_RE_CELDA = re.compile(r'<c\b([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+_RE_REF = re.compile(r'\br="([A-Z]{1,3})(\d+)"')
+_RE_ATRIBUTO = re.compile(r'([\w:]+)="([^"]*)"')
+_RE_MERGE = re.compile(r'<mergeCell\b[^>]*\bref="([^"]+)"')
+_RE_SI = re.compile(r'<si>(.*?)</si>|<si/>', re.S)
+_RE_T = re.compile(r'<t\b[^>]*>(.*?)</t>|<t\b[^>]*/>', re.S)
+_RE_V = re.compile(r'<v>(.*?)</v>', re.S)
+_RE_F = re.compile(r'<f\b([^>]*?)(?:/>|>.*?</f>)', re.S)
+_RE_CELL_XFS = re.compile(r'<cellXfs\b[^>]*?(?:/>|>(.*?)</cellXfs>)', re.S)
+_RE_XF = re.compile(r'<xf\b([^>]*?)(?:/>|>(.*?)</xf>)', re.S)
+_RE_NUM_FMT = re.compile(r'<numFmt\b([^>]*?)/?>')
+# Caracteres que XML 1.0 no permite
+_RE_ILEGALES = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_ESCAPE_ATRIBUTO = {'"': '&quot;'}
+_TIPO_HOJA = '/worksheet'
+_TIPO_SHARED_STRINGS = '/sharedStrings'
+_TIPO_CALC_CHAIN = '/calcChain'
+_TIPO_ESTILOS = '/styles'
+
+# numFmtId integrados para fechas nuevas: m/d/yy h:mm, h:mm:ss, mm-dd-yy
+FORMATO_FECHA_HORA = 22
+FORMATO_HORA = 21
+FORMATO_FECHA = 14
+
+
+class PlantillaNoParcheable(ValueError):
+    """La plantilla tiene una estructura que el parche directo no maneja"""
+
+
+def _atributos(texto: str) -> Dict[str, str]:
+    return {k: unescape(v, {'&quot;': '"'}) for k, v in _RE_ATRIBUTO.findall(texto or '')}
+
+
+def _texto_atributos(atributos: Dict[str, str]) -> str:
+    return ''.join(f' {k}="{escape(v, _ESCAPE_ATRIBUTO)}"' for k, v in atributos.items())
+
+
+def _texto_xml(valor: str) -> str:
+    return escape(_RE_ILEGALES.sub('', valor))
+
+
+def referencia_celda(celda: str) -> Tuple[int, int]:
+    """'AB12' -> (12, 28)"""
+    letras, fila = coordinate_from_string(celda.replace('$', '').upper())
+    return fila, column_index_from_string(letras)
+
+
+def _resolver_destino(origen: str, destino: str) -> str:
+    """Target de un .rels relativo a la parte que lo declara"""
+    if destino.startswith('/'):
+        return destino[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(origen), destino))
+
+
+def _relaciones(xml: str, parte: str) -> Dict[str, Tuple[str, str]]:
+    """Id -> (tipo, parte destino) de un archivo .rels"""
+    relaciones = {}
+    for etiqueta in re.findall(r'<Relationship\b[^>]*>', xml):
+        atributos = _atributos(etiqueta)
+        if atributos.get('TargetMode') == 'External':
+            continue
+        relaciones[atributos['Id']] = (atributos.get('Type', ''), _resolver_destino(parte, atributos['Target']))
+    return relaciones
+
+
+def _serial_excel(valor, fecha1904: bool) -> float:
+    base = dt.datetime(1904, 1, 1) if fecha1904 else dt.datetime(1899, 12, 30)
+    if isinstance(valor, dt.time):
+        return (valor.hour * 3600 + valor.minute * 60 + valor.second + valor.microsecond / 1e6) / 86400
+    if not isinstance(valor, dt.datetime):
+        valor = dt.datetime(valor.year, valor.month, valor.day)
+    return (valor.replace(tzinfo=None) - base).total_seconds() / 86400
+
+
+def _normalizar_valor(valor):
+    """Igual que el llenado con xlwings: NaN/NaT -> vacío, escalares numpy/pandas -> Python"""
+    if valor is None:
+        return None
+    try:
+        if valor != valor:
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(valor, 'to_pydatetime'):
+        return valor.to_pydatetime()
+    if hasattr(valor, 'item') and not isinstance(valor, (str, bytes, dt.date)):
+        return valor.item()
+    return valor
+
+
+class _Hoja:
+    """Metadatos precalculados de una hoja de la plantilla"""
+
+    def __init__(self, nombre: str, parte: str, xml: str):
+        self.nombre = nombre
+        self.parte = parte
+        self.xml = xml
+        datos = _RE_SHEET_DATA.search(xml)
+        if datos is None:
+            raise PlantillaNoParcheable(f"La hoja '{nombre}' no tiene <sheetData>")
+        self.inicio_datos = datos.start()
+        self.fin_datos = datos.end()
+        # (número, atributos, contenido, XML original de la fila)
+        self.filas: List[Tuple[int, str, str, str]] = []
+        for fila in _RE_FILA.finditer(datos.group(1) or ''):
+            atributos = _atributos(fila.group(1))
+            if 'r' not in atributos:
+                raise PlantillaNoParcheable(f"La hoja '{nombre}' tiene filas sin atributo r")
+            self.filas.append((int(atributos['r']), fila.group(1), fila.group(2) or '', fila.group(0)))
+        self.numeros_filas = {numero for numero, _, _, _ in self.filas}
+        # Celda combinada (no ancla) -> rango
+        self.combinadas: Dict[Tuple[int, int], str] = {}
+        for rango in _RE_MERGE.findall(xml):
+            min_col, min_row, max_col, max_row = range_boundaries(rango)
+            for fila in range(min_row, max_row + 1):
+                for columna in range(min_col, max_col + 1):
+                    if (fila, columna) != (min_row, min_col):
+                        self.combinadas[(fila, columna)] = rango
+        self.contenido_filas = {numero: contenido for numero, _, contenido, _ in self.filas}
+        # Geometría: anchos de columna (caracteres) y altos de fila (puntos) de la plantilla
+        formato = re.search(r'<sheetFormatPr\b([^>]*)', xml)
+        formato = _atributos(formato.group(1)) if formato else {}
+        self.ancho_defecto = float(formato['defaultColWidth']) if 'defaultColWidth' in formato else None
+        self.alto_defecto = float(formato['defaultRowHeight']) if 'defaultRowHeight' in formato else None
+        self.columnas: Dict[int, Tuple[Optional[float], bool]] = {}
+        for columna in re.finditer(r'<col\b([^>]*?)/?>', xml):
+            atributos = _atributos(columna.group(1))
+            ancho = float(atributos['width']) if 'width' in atributos else None
+            oculta = atributos.get('hidden') in ('1', 'true')
+            # max="16384" marca "hasta el final"; basta con las columnas en uso
+            for i in range(int(atributos['min']), min(int(atributos['max']), 1024) + 1):
+                self.columnas[i] = (ancho, oculta)
+        self.alturas: Dict[int, Tuple[Optional[float], bool]] = {}
+        for numero, atributos_fila, _, _ in self.filas:
+            atributos = _atributos(atributos_fila)
+            if 'ht' in atributos or atributos.get('hidden') in ('1', 'true'):
+                self.alturas[numero] = (float(atributos['ht']) if 'ht' in atributos else None,
+                                        atributos.get('hidden') in ('1', 'true'))
+        # La plantilla no cambia: cada fila se separa en celdas una sola vez
+        self._celdas_por_fila: Dict[int, List[Tuple[int, str, str, str]]] = {}
+        self._celdas: Optional[Dict[Tuple[int, int], Tuple[str, str]]] = None
+
+    def celdas_fila(self, numero: int) -> List[Tuple[int, str, str, str]]:
+        """[(columna, atributos, contenido, XML original)] de una fila de la plantilla"""
+        celdas = self._celdas_por_fila.get(numero)
+        if celdas is None:
+            celdas = []
+            for celda in _RE_CELDA.finditer(self.contenido_filas.get(numero, '')):
+                referencia = _RE_REF.search(celda.group(1))
+                if referencia is None:
+                    raise PlantillaNoParcheable(f"La hoja '{self.nombre}' tiene celdas sin atributo r")
+                celdas.append((column_index_from_string(referencia.group(1)), celda.group(1),
+                               celda.group(2) or '', celda.group(0)))
+            self._celdas_por_fila[numero] = celdas
+        return celdas
+
+    def celdas(self) -> Dict[Tuple[int, int], Tuple[str, str]]:
+        """(fila, columna) -> (atributos, contenido) de todas las celdas, bajo demanda"""
+        if self._celdas is None:
+            self._celdas = {
+                (numero, columna): (atributos, interior)
+                for numero in self.numeros_filas
+                for columna, atributos, interior, _ in self.celdas_fila(numero)
+            }
+        return self._celdas
+
+
+class PlantillaXlsx:
+    """
+    Plantilla xlsx abierta una vez; cada llenado produce un xlsx nuevo
+    parcheando solo las partes afectadas
+
+    Uso:
+        plantilla = PlantillaXlsx('EJEMPLO SS VACIO.xlsx')
+        contenido = plantilla.llenar({'1. Datos': {'D5': 'Sitio A', 'M20': True}}, 'salida.xlsx')
+    """
+
+    def __init__(self, origen: Union[str, bytes]):
+        if isinstance(origen, str):
+            with open(origen, 'rb') as f:
+                origen = f.read()
+        self.contenido = origen
+        with zipfile.ZipFile(io.BytesIO(origen)) as zin:
+            self.miembros = zin.infolist()
+            self._crudos = {info.filename: self._datos_crudos(info) for info in self.miembros}
+            textos = {}
+
+            def leer(parte: str) -> str:
+                if parte not in textos:
+                    textos[parte] = zin.read(parte).decode('utf-8')
+                return textos[parte]
+
+            self.parte_libro = self._parte_libro(leer('_rels/.rels'))
+            self.xml_libro = leer(self.parte_libro)
+            rels_libro = posixpath.join(posixpath.dirname(self.parte_libro), '_rels',
+                                        posixpath.basename(self.parte_libro) + '.rels')
+            self.rels_libro = rels_libro
+            relaciones = _relaciones(leer(rels_libro), self.parte_libro)
+
+            self.hojas: Dict[str, _Hoja] = {}
+            self.nombres_hojas: List[str] = []
+            for etiqueta in re.findall(r'<sheet\b[^>]*>', self.xml_libro):
+                atributos = _atributos(etiqueta)
+                rid = next((v for k, v in atributos.items() if k.endswith(':id')), None)
+                tipo, parte = relaciones.get(rid, ('', ''))
+                self.nombres_hojas.append(atributos['name'])
+                if tipo.endswith(_TIPO_HOJA):
+                    self.hojas[atributos['name']] = _Hoja(atributos['name'], parte, leer(parte))
+
+            self.parte_strings = next((p for t, p in relaciones.values() if t.endswith(_TIPO_SHARED_STRINGS)), None)
+            self.parte_calc_chain = next((p for t, p in relaciones.values() if t.endswith(_TIPO_CALC_CHAIN)), None)
+            self.xml_strings = leer(self.parte_strings) if self.parte_strings else None
+            self.parte_estilos = next((p for t, p in relaciones.values() if t.endswith(_TIPO_ESTILOS)), None)
+            self.xml_estilos = leer(self.parte_estilos) if self.parte_estilos else None
+            self.xml_tipos = leer('[Content_Types].xml')
+            self.xml_rels_libro = leer(rels_libro)
+
+        self.fecha1904 = bool(re.search(r'<workbookPr\b[^>]*\bdate1904="(1|true)"', self.xml_libro))
+        self.strings: List[str] = []
+        self.indice_strings: Dict[str, int] = {}
+        if self.xml_strings:
+            for i, si in enumerate(_RE_SI.finditer(self.xml_strings)):
+                interior = si.group(1) or ''
+                partes = _RE_T.findall(interior)
+                texto = unescape(''.join(partes))
+                self.strings.append(texto)
+                # Solo se reutilizan cadenas sin formato enriquecido
+                if '<r>' not in interior and texto not in self.indice_strings:
+                    self.indice_strings[texto] = i
+
+        # cellXfs (atributos, interior) y numFmtId con formato de fecha, para escribir fechas
+        self.xfs: List[Tuple[str, str]] = []
+        self.formatos_fecha = {i for i, codigo in BUILTIN_FORMATS.items() if is_date_format(codigo)}
+        if self.xml_estilos:
+            cell_xfs = _RE_CELL_XFS.search(self.xml_estilos)
+            if cell_xfs is not None:
+                self.xfs = [(m.group(1), m.group(2) or '') for m in _RE_XF.finditer(cell_xfs.group(1) or '')]
+            for etiqueta in _RE_NUM_FMT.findall(self.xml_estilos):
+                atributos = _atributos(etiqueta)
+                if 'numFmtId' in atributos and is_date_format(atributos.get('formatCode', '')):
+                    self.formatos_fecha.add(int(atributos['numFmtId']))
+
+    # ----- Lectura -----
+
+    @staticmethod
+    def _parte_libro(rels_paquete: str) -> str:
+        for tipo, parte in _relaciones(rels_paquete, '').values():
+            if tipo.endswith('/officeDocument'):
+                return parte
+        raise PlantillaNoParcheable("El paquete no declara workbook.xml")
+
+    def _datos_crudos(self, info: zipfile.ZipInfo) -> memoryview:
+        """Bytes comprimidos tal como están en el zip (sin descomprimir)"""
+        encabezado = self.contenido[info.header_offset:info.header_offset + zipfile.sizeFileHeader]
+        campos = struct.unpack(zipfile.structFileHeader, encabezado)
+        inicio = (info.header_offset + zipfile.sizeFileHeader
+                  + campos[zipfile._FH_FILENAME_LENGTH] + campos[zipfile._FH_EXTRA_FIELD_LENGTH])
+        return memoryview(self.contenido)[inicio:inicio + info.compress_size]
+
+    def hoja(self, nombre: str) -> _Hoja:
+        if nombre not in self.hojas:
+            raise KeyError(f"No existe la hoja '{nombre}'")
+        return self.hojas[nombre]
+
+    def valor(self, hoja: str, celda: str):
+        """Valor de una celda de la plantilla (como lo leería openpyxl)"""
+        atributos, interior = self.hoja(hoja).celdas().get(referencia_celda(celda), ('', ''))
+        tipo = _atributos(atributos).get('t', 'n')
+        if tipo == 'inlineStr':
+            return unescape(''.join(_RE_T.findall(interior))) or None
+        formula = re.search(r'<f\b[^>]*>(.+?)</f>', interior, re.S)
+        if formula is not None:
+            return '=' + unescape(formula.group(1))
+        v = _RE_V.search(interior)
+        if v is None:
+            return None
+        texto = unescape(v.group(1))
+        if tipo == 's':
+            return self.strings[int(texto)]
+        if tipo == 'b':
+            return texto == '1'
+        if tipo in ('str', 'e'):
+            return texto
+        numero = float(texto)
+        return int(numero) if numero.is_integer() and 'E' not in texto.upper() and '.' not in texto else numero
+
+    # ----- Escritura -----
+
+    @property
+    def admite_fechas(self) -> bool:
+        """False si no hay cellXfs donde registrar un formato de fecha"""
+        return bool(self.xfs)
+
+    def _estilo_fecha(self, estilo: Optional[str], valor, estilos: Dict[Tuple[int, int], int]) -> Optional[str]:
+        """
+        Estilo (s) para escribir una fecha: el de la celda si ya tiene formato de
+        fecha; si no, una copia de ese xf con formato de fecha que se agrega a
+        styles.xml en este llenado (una por estilo y formato)
+        """
+        if not self.admite_fechas:
+            raise PlantillaNoParcheable("La plantilla no tiene cellXfs para dar formato de fecha")
+        base = int(estilo) if estilo is not None and estilo.isdigit() and int(estilo) < len(self.xfs) else 0
+        if int(_atributos(self.xfs[base][0]).get('numFmtId', '0')) in self.formatos_fecha:
+            return estilo
+        if isinstance(valor, dt.datetime):
+            formato = FORMATO_FECHA_HORA
+        elif isinstance(valor, dt.time):
+            formato = FORMATO_HORA
+        else:
+            formato = FORMATO_FECHA
+        if (base, formato) not in estilos:
+            estilos[(base, formato)] = len(self.xfs) + len(estilos)
+        return str(estilos[(base, formato)])
+
+    def _celda_xml(self, referencia: str, atributos_previos: str, valor, strings: List[str],
+                   indice: Dict[str, int], estilos: Dict[Tuple[int, int], int]) -> str:
+        atributos = {'r': referencia}
+        estilo = _atributos(atributos_previos).get('s')
+        if estilo is not None:
+            atributos['s'] = estilo
+        valor = _normalizar_valor(valor)
+        if valor is None:
+            return f'<c{_texto_atributos(atributos)}/>'
+        if isinstance(valor, bool):
+            atributos['t'] = 'b'
+            return f'<c{_texto_atributos(atributos)}><v>{int(valor)}</v></c>'
+        if isinstance(valor, (dt.datetime, dt.date, dt.time)):
+            # Sin formato de fecha el serial se vería (y se leería) como número
+            estilo = self._estilo_fecha(estilo, valor, estilos)
+            if estilo is not None:
+                atributos['s'] = estilo
+            valor = _serial_excel(valor, self.fecha1904)
+        if isinstance(valor, (int, float)):
+            if isinstance(valor, float) and not math.isfinite(valor):
+                return f'<c{_texto_atributos(atributos)}/>'
+            return f'<c{_texto_atributos(atributos)}><v>{valor!r}</v></c>'
+        texto = str(valor)
+        if self.parte_strings is None:
+            atributos['t'] = 'inlineStr'
+            return f'<c{_texto_atributos(atributos)}><is><t xml:space="preserve">{_texto_xml(texto)}</t></is></c>'
+        if texto not in indice:
+            indice[texto] = len(strings)
+            strings.append(texto)
+        atributos['t'] = 's'
+        return f'<c{_texto_atributos(atributos)}><v>{indice[texto]}</v></c>'
+
+    def _parchear_fila(self, existentes: List[Tuple[int, str, str, str]], escrituras: Dict[int, Tuple[str, Any]],
+                       strings, indice, estilos, formulas: List[str]) -> str:
+        partes = []
+        pendientes = sorted(escrituras.items())
+        i = 0
+        for columna, atributos_celda, interior, original in existentes:
+            while i < len(pendientes) and pendientes[i][0] < columna:
+                referencia, valor = pendientes[i][1]
+                partes.append(self._celda_xml(referencia, '', valor, strings, indice, estilos))
+                i += 1
+            if i < len(pendientes) and pendientes[i][0] == columna:
+                referencia, valor = pendientes[i][1]
+                formula = _RE_F.search(interior)
+                if formula is not None:
+                    if 'ref' in _atributos(formula.group(1)) and 'shared' in formula.group(1):
+                        # Las celdas que comparten la fórmula dependen del texto de esta
+                        raise PlantillaNoParcheable(f"{referencia} es la celda maestra de una fórmula compartida")
+                    formulas.append(referencia)
+                partes.append(self._celda_xml(referencia, atributos_celda, valor, strings, indice, estilos))
+                i += 1
+            else:
+                partes.append(original)
+        for _, (referencia, valor) in pendientes[i:]:
+            partes.append(self._celda_xml(referencia, '', valor, strings, indice, estilos))
+        return ''.join(partes)
+
+    def _parchear_hoja(self, hoja: _Hoja, escrituras: Dict[str, Any], strings, indice, estilos,
+                       formulas: List[str]) -> str:
+        por_fila: Dict[int, Dict[int, Tuple[str, Any]]] = {}
+        for celda, valor in escrituras.items():
+            fila, columna = referencia_celda(celda)
+            if (fila, columna) in hoja.combinadas:
+                # Excel ignora escrituras dentro de una celda combinada que no es el ancla
+                logger.debug(f"{hoja.nombre}!{celda} está combinada; se ignora la escritura")
+                continue
+            por_fila.setdefault(fila, {})[columna] = (celda.replace('$', '').upper(), valor)
+
+        salida = []
+        for numero, atributos, _, original in hoja.filas:
+            # Filas que no existían en la plantilla, en orden
+            for nueva in sorted(n for n in por_fila if n < numero and n not in hoja.numeros_filas):
+                celdas = self._parchear_fila([], por_fila.pop(nueva), strings, indice, estilos, formulas)
+                salida.append(f'<row r="{nueva}">{celdas}</row>')
+            if numero in por_fila:
+                # spans es una pista de rango de columnas; al cambiar las celdas se omite
+                atributos_fila = {k: v for k, v in _atributos(atributos).items() if k != 'spans'}
+                celdas = self._parchear_fila(hoja.celdas_fila(numero), por_fila.pop(numero), strings, indice, estilos, formulas)
+                salida.append(f'<row{_texto_atributos(atributos_fila)}>{celdas}</row>')
+            else:
+                salida.append(original)
+        for nueva in sorted(por_fila):
+            celdas = self._parchear_fila([], por_fila[nueva], strings, indice, estilos, formulas)
+            salida.append(f'<row r="{nueva}">{celdas}</row>')
+        return (hoja.xml[:hoja.inicio_datos] + '<sheetData>' + ''.join(salida) + '</sheetData>'
+                + hoja.xml[hoja.fin_datos:])
+
+    def _xml_strings(self, strings: List[str]) -> str:
+        nuevas = strings[len(self.strings):]
+        agregado = ''.join(f'<si><t xml:space="preserve">{_texto_xml(s)}</t></si>' for s in nuevas)
+        xml = self.xml_strings
+        if re.search(r'<sst\b[^>]*/>', xml):
+            xml = re.sub(r'<sst\b([^>]*)/>', lambda m: f'<sst{m.group(1)}>{agregado}</sst>', xml, count=1)
+        else:
+            fin = xml.rindex('</sst>')
+            xml = xml[:fin] + agregado + xml[fin:]
+        # count = referencias totales; con uniqueCount basta para Excel y no obliga a recorrer las hojas
+        def ajustar(m):
+            atributos = _atributos(m.group(1))
+            atributos['uniqueCount'] = str(len(strings))
+            if 'count' in atributos:
+                atributos['count'] = str(int(atributos['count']) + len(nuevas))
+            return f'<sst{_texto_atributos(atributos)}{m.group(2)}'
+        return re.sub(r'<sst\b([^>]*?)(/?>)', ajustar, xml, count=1)
+
+    def _xml_estilos(self, estilos: Dict[Tuple[int, int], int]) -> str:
+        """styles.xml con los xf de fecha agregados al final de cellXfs"""
+        nuevos = []
+        for (base, formato), _ in sorted(estilos.items(), key=lambda e: e[1]):
+            atributos_xf, interior = self.xfs[base]
+            atributos = _atributos(atributos_xf)
+            atributos['numFmtId'] = str(formato)
+            atributos['applyNumberFormat'] = '1'
+            nuevos.append(f'<xf{_texto_atributos(atributos)}>{interior}</xf>' if interior
+                          else f'<xf{_texto_atributos(atributos)}/>')
+        xml = self.xml_estilos
+        fin = _RE_CELL_XFS.search(xml).end() - len('</cellXfs>')
+        xml = xml[:fin] + ''.join(nuevos) + xml[fin:]
+
+        def ajustar(m):
+            atributos = _atributos(m.group(1))
+            atributos['count'] = str(len(self.xfs) + len(nuevos))
+            return f'<cellXfs{_texto_atributos(atributos)}>'
+        return re.sub(r'<cellXfs\b([^>]*)>', ajustar, xml, count=1)
+
+    def _xml_libro(self) -> str:
+        """workbook.xml con recálculo completo al abrir (las fórmulas ven los valores nuevos)"""
+        xml = self.xml_libro
+        calc = re.search(r'<calcPr\b([^>]*?)/?>', xml)
+        if calc is not None:
+            atributos = _atributos(calc.group(1))
+            atributos['fullCalcOnLoad'] = '1'
+            return xml[:calc.start()] + f'<calcPr{_texto_atributos(atributos)}/>' + xml[calc.end():]
+        # calcPr va después de sheets/functionGroups/externalReferences/definedNames
+        fin = 0
+        for patron in (r'</sheets>', r'<sheets\b[^>]*/>', r'</functionGroups>', r'<functionGroups\b[^>]*/>',
+                       r'</externalReferences>', r'</definedNames>'):
+            for m in re.finditer(patron, xml):
+                fin = max(fin, m.end())
+        return xml[:fin] + '<calcPr fullCalcOnLoad="1"/>' + xml[fin:]
+
+    def llenar(self, escrituras: Dict[str, Dict[str, Any]], destino: Optional[str] = None) -> bytes:
+        """
+        Produce el xlsx llenado
+
+        Args:
+            escrituras: {hoja: {celda: valor}}; valor None deja la celda vacía
+            destino: ruta donde guardar el resultado (opcional)
+
+        Returns:
+            bytes del xlsx resultante
+        """
+        strings = list(self.strings)
+        indice = dict(self.indice_strings)
+        estilos: Dict[Tuple[int, int], int] = {}
+        formulas: List[str] = []
+        reemplazos: Dict[str, bytes] = {}
+        for nombre, celdas in escrituras.items():
+            if not celdas:
+                continue
+            hoja = self.hoja(nombre)
+            reemplazos[hoja.parte] = self._parchear_hoja(hoja, celdas, strings, indice, estilos, formulas).encode('utf-8')
+        if len(strings) > len(self.strings):
+            reemplazos[self.parte_strings] = self._xml_strings(strings).encode('utf-8')
+        if estilos:
+            reemplazos[self.parte_estilos] = self._xml_estilos(estilos).encode('utf-8')
+
+        omitir = set()
+        if reemplazos:
+            reemplazos[self.parte_libro] = self._xml_libro().encode('utf-8')
+        if formulas and self.parte_calc_chain:
+            # calcChain lista las celdas con fórmula; si se sobrescribió alguna, Excel lo reconstruye
+            omitir.add(self.parte_calc_chain)
+            reemplazos['[Content_Types].xml'] = re.sub(
+                r'<Override\b[^>]*PartName="/' + re.escape(self.parte_calc_chain) + r'"[^>]*/>', '', self.xml_tipos
+            ).encode('utf-8')
+            reemplazos[self.rels_libro] = re.sub(
+                r'<Relationship\b[^>]*Type="[^"]*' + _TIPO_CALC_CHAIN + r'"[^>]*/>', '', self.xml_rels_libro
+            ).encode('utf-8')
+
+        salida = io.BytesIO()
+        with zipfile.ZipFile(salida, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in self.miembros:
+                if info.filename in omitir:
+                    continue
+                if info.filename in reemplazos:
+                    nuevo = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    nuevo.compress_type = zipfile.ZIP_DEFLATED
+                    nuevo.external_attr = info.external_attr
+                    zout.writestr(nuevo, reemplazos[info.filename])
+                else:
+                    self._copiar_crudo(zout, info)
+        contenido = salida.getvalue()
+        if destino:
+            with open(destino, 'wb') as f:
+                f.write(contenido)
+        return contenido
+
+    def _copiar_crudo(self, zout: zipfile.ZipFile, info: zipfile.ZipInfo):
+        """Copia un miembro con sus bytes comprimidos originales (sin recomprimir)"""
+        copia = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        copia.compress_type = info.compress_type
+        copia.external_attr = info.external_attr
+        copia.create_system = info.create_system
+        copia.CRC = info.CRC
+        copia.compress_size = info.compress_size
+        copia.file_size = info.file_size
+        # Sin descriptor de datos: CRC y tamaños van en el encabezado local
+        copia.flag_bits = info.flag_bits & ~0x08
+        copia.header_offset = zout.fp.tell()
+        zout.fp.write(copia.FileHeader(zip64=None))
+        zout.fp.write(self._crudos[info.filename])
+        zout.start_dir = zout.fp.tell()
+        zout.filelist.append(copia)
+        zout.NameToInfo[copia.filename] = copia
+        zout._didModify = True